@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+El stream del mapa de calor (/api/alertas/heatmap/stream/, Server-Sent Events)
+mantiene conexiones abiertas, por lo que debe servirse con este entry point:
+
+    uvicorn Seguridad.asgi:application --host 0.0.0.0 --port 8000
 """
 
 import os
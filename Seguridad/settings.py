@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -56,6 +57,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware', #<---- para trabajar con CORS
     'django.middleware.common.CommonMiddleware', #<---- para trabajar con CORS
+    'api.instrumentacion.InstrumentacionConsultasMiddleware', #<---- consultas/tiempo de BD por request
 ]
 
 ROOT_URLCONF = 'Seguridad.urls'
@@ -78,6 +80,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Seguridad.wsgi.application'
+ASGI_APPLICATION = 'Seguridad.asgi.application'
 
 
 # Database
@@ -97,6 +100,28 @@ DATABASES = {
     }
 }
 
+# Caché compartido por todos los workers y comandos: tiles del mapa de calor, roles,
+# versión del clasificador y anomalías se invalidan desde un proceso y los demás deben
+# verlo (el LocMemCache por defecto es privado de cada proceso). Con REDIS_URL se usa
+# Redis (paquete redis); si no, la tabla cache_api de la base (migración 0030).
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "cache_api",
+            # Un tile por zoom y punto: el límite por defecto (300) expulsaría todo enseguida
+            "OPTIONS": {"MAX_ENTRIES": 50000},
+        }
+    }
+
 
 
 # Password validation
@@ -136,6 +161,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Medios direccionados por contenido: archivos_alertas/<sha[:2]>/<sha[2:4]>/<sha256>.<ext>
+# con deduplicación (api/almacenamiento.py). Migrar los existentes: `manage.py migrar_archivos`
+STORAGES = {
+    "default": {"BACKEND": "api.almacenamiento.AlmacenamientoContenido"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -150,7 +182,8 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER                 # ← agregado (para usarlo
 # xd
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication con caché de usuarios por proceso (api/autenticacion.py)
+        'api.autenticacion.JWTAutenticacionCacheada',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -159,6 +192,11 @@ REST_FRAMEWORK = {
 
 
 
+# Caché de usuarios autenticados por JWT: máximo de entradas y vigencia por proceso
+# (los cambios de un usuario se ven antes en todos los workers vía su versión en CACHES)
+AUTH_CACHE_MAXIMO = 10000
+AUTH_CACHE_SEGUNDOS = 30
+
 # JWT configuración personalizada para que use idUsuario en lugar de id
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=240),
@@ -172,6 +210,101 @@ AUTH_USER_MODEL = "api.Usuario"
 
 CORS_ALLOW_ALL_ORIGINS = True  # Permitir todas las solicitudes CORS (útil para desarrollo)
 
+# Paginación por cursor de los listados de incidentes (?page_size=&cursor=)
+INCIDENTES_PAGE_SIZE = 50
+INCIDENTES_PAGE_SIZE_MAX = 500
+# Filas por lote del cursor del servidor en los volcados ?stream=json|ndjson
+INCIDENTES_STREAM_CHUNK_SIZE = 2000
+
+# Stream SSE del mapa de calor: segundos entre comentarios keep-alive
+HEATMAP_STREAM_HEARTBEAT = 15
+
+# Delta-sync (/api/alertas/cambios/?since=): máximo de cambios por respuesta
+CAMBIOS_ALERTAS_LIMITE = 1000
+
+# Tiles del mapa de calor (/api/alertas/heatmap/tiles/z/x/y)
+HEATMAP_TILE_BINS = 64
+HEATMAP_TILE_ZOOM_MAX = 18
+HEATMAP_TILE_CACHE_SECONDS = 300
+# Zoom mínimo que se invalida al cambiar un incidente; los menores sólo expiran por TTL
+HEATMAP_TILE_ZOOM_MIN_INVALIDAR = 10
+
+# Outbox de correos (api/correo.py): workers del pool, reintentos y backoff.
+# CORREO_POOL_EN_PROCESO = False si se despacha aparte con `manage.py procesar_correos`
+CORREO_WORKERS = 2
+CORREO_LOTE = 20
+CORREO_MAX_INTENTOS = 6
+CORREO_BACKOFF_SEGUNDOS = 30
+CORREO_POOL_EN_PROCESO = True
+CORREO_RETENCION_DIAS = 7  # los enviados se borran del outbox pasado este plazo
+RESET_PASSWORD_MINUTOS = 30  # vigencia del enlace de restablecer contraseña
+
+# Subidas reanudables (api/cargas.py): tamaño máximo del archivo y de cada parte.
+# Las sesiones abiertas sin actividad vencen tras CARGA_EXPIRA_HORAS (`manage.py limpiar_cargas`)
+CARGA_TAMANO_MAX = 500 * 1024 * 1024
+CARGA_CHUNK_MAX = 8 * 1024 * 1024
+CARGA_CHUNK_SUGERIDO = 1024 * 1024
+CARGA_EXPIRA_HORAS = 24
+
+# Alta masiva (POST /api/incidentes/lote/): máximo de incidentes por request
+INCIDENTES_LOTE_MAX = 500
+# Cambio de estado masivo (PATCH /api/gestion/incidentes/estado/): máximo de filas por request
+GESTION_LOTE_MAX = 1000
+
+# Miniaturas (api/miniaturas.py): procesos del pool y lado máximo en px.
+# Requiere Pillow; para la portada de los videos, ffmpeg en el PATH
+MINIATURAS_WORKERS = 2
+MINIATURA_LADO = 320
+PREVIA_LADO = 1024
+
+# Escala automática por palabras clave (api/clasificador.py): procesos y tamaño de lote
+# de `manage.py reclasificar_escalas`
+CLASIFICADOR_WORKERS = 2
+CLASIFICADOR_LOTE = 2000
+# Vigencia máxima del autómata de cada proceso (además de la versión en el caché)
+CLASIFICADOR_RECARGA_SEGUNDOS = 300
+
+# Reportes duplicados (api/duplicados.py): mismo hecho si está a menos del radio, dentro
+# de la ventana y con NombreIncidente parecido (fracción de palabras en común)
+DUPLICADOS_ACTIVO = True
+DUPLICADOS_RADIO_METROS = 150
+DUPLICADOS_VENTANA_MINUTOS = 60
+DUPLICADOS_SIMILITUD = 0.5
+
+# Zonas calientes (api/zonas_calor.py, `manage.py calcular_zonas_calor`): ventanas en horas,
+# escalas mínimas calculadas y parámetros de DBSCAN (radio de vecindad y vecinos mínimos)
+ZONAS_CALOR_VENTANAS = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24}
+ZONAS_CALOR_ESCALAS = [1, 2, 3]
+ZONAS_CALOR_EPS_METROS = 250
+ZONAS_CALOR_MIN_PUNTOS = 5
+ZONAS_CALOR_MAX_ZONAS = 200
+ZONAS_CALOR_CACHE_SECONDS = 3600
+
+# Picos de incidentes (api/anomalias.py): celdas geohash de esta precisión cuyo conteo de
+# las últimas horas supera por ANOMALIAS_Z desviaciones su media para esa hora de la semana
+ANOMALIAS_PRECISION = 6
+ANOMALIAS_VENTANA_HORAS = 3
+ANOMALIAS_Z = 3.0
+ANOMALIAS_MINIMO = 3
+ANOMALIAS_SEMANAS_MINIMAS = 2
+ANOMALIAS_HISTORIA_SEMANAS = 12
+ANOMALIAS_CACHE_SECONDS = 60
+
+# Instrumentación por request: avisar cuando una misma consulta se repite N veces (N+1)
+CONSULTAS_UMBRAL_REPETIDAS = 10
+
+# Logs estructurados (una línea JSON por request) del logger api.consultas
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.consultas": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 import os
 from pathlib import Path
 
@@ -179,3 +312,15 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'archivos_alertas')
+
+# Métricas Prometheus (/api/metricas): un archivo por worker en METRICAS_DIR.
+# Vaciar el directorio al desplegar; el scraper se autentica con METRICAS_TOKEN.
+METRICAS_DIR = os.environ.get("METRICAS_DIR", "")
+METRICAS_TOKEN = os.environ.get("METRICAS_TOKEN", "")
+
+# Servir MEDIA_URL (api/medios.py): "nginx" -> X-Accel-Redirect a MEDIOS_ACCEL_PREFIJO
+# (location internal con alias a MEDIA_ROOT), "apache" -> X-Sendfile, "" -> desde Python
+MEDIOS_SERVIDOR = os.environ.get("MEDIOS_SERVIDOR", "")
+MEDIOS_ACCEL_PREFIJO = "/media-interno/"
+# Vigencia de las URLs firmadas que emiten los serializers (entre 1 y 2 veces este valor)
+MEDIOS_FIRMA_SEGUNDOS = 24 * 3600
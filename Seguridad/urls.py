@@ -17,12 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from api import medios
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),  # tu app
+    # Archivos de incidentes (también en producción): autoriza y delega a nginx/apache
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:nombre>", medios.servir, name='medios'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -4,8 +4,10 @@ from .models import (
     EmpresaSeguridad, DetalleEmpresa, Administrador, Alerta,
     EscalaAlerta, DetalleAlerta, EstadoAtencionReporte,
     AtencionReporte, HistoriaAtencionReporte, PlanContrato,
-    ContratoEmpresa
+    ContratoEmpresa, ResumenDiarioAlerta, CambioAlerta, CorreoPendiente,
+    SesionCarga, ArchivoContenido, ZonaCalor, ActividadCelda
 )
+from .correo import ORIGENES_SENSIBLES
 
 # Opción 1: registrar todo de forma simple
 admin.site.register(Usuario)
@@ -24,3 +26,21 @@ admin.site.register(AtencionReporte)
 admin.site.register(HistoriaAtencionReporte)
 admin.site.register(PlanContrato)
 admin.site.register(ContratoEmpresa)
+admin.site.register(ResumenDiarioAlerta)
+admin.site.register(CambioAlerta)
+admin.site.register(SesionCarga)
+admin.site.register(ArchivoContenido)
+admin.site.register(ZonaCalor)
+admin.site.register(ActividadCelda)
+
+
+@admin.register(CorreoPendiente)
+class CorreoPendienteAdmin(admin.ModelAdmin):
+    # El cuerpo de los correos sensibles (enlaces de reset) no se muestra
+    list_display = ("idCorreo", "Origen", "Destinatario", "Estado", "Intentos", "FechaCreacion", "FechaEnvio")
+    list_filter = ("Estado", "Origen")
+
+    def get_exclude(self, request, obj=None):
+        if obj is not None and obj.Origen in ORIGENES_SENSIBLES:
+            return ("CuerpoTexto", "CuerpoHtml")
+        return super().get_exclude(request, obj)
@@ -0,0 +1,259 @@
+# api/almacenamiento.py — almacenamiento de medios direccionado por contenido
+#
+# Cada archivo se guarda con el nombre de su SHA-256 (no el del cliente):
+#   archivos_alertas/ab/cd/abcd…ef.jpg
+# Dos subidas iguales (la misma foto reportada por veinte vecinos) comparten un solo
+# archivo; ArchivoContenido lleva la cuenta de referencias y el archivo se borra cuando
+# llega a 0. Los dos niveles de prefijo limitan cada carpeta a ~65k subcarpetas/archivos.
+# Los archivos anteriores se migran con `manage.py migrar_archivos`.
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import miniaturas
+from .models import ArchivoContenido, DetalleAlerta, SesionCarga
+
+logger = logging.getLogger(__name__)
+
+CARPETA_ENTRANTES = ".entrantes"  # temporales en el mismo disco (os.replace atómico)
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,8}$")
+_BLOQUE = 1024 * 1024
+
+
+def extension(nombre):
+    ext = os.path.splitext(nombre or "")[1].lower()
+    return ext if _EXTENSION.match(ext) else ""
+
+
+def nombre_contenido(carpeta, sha256, ext=""):
+    return "/".join(p for p in (carpeta.strip("/"), sha256[:2], sha256[2:4], sha256 + ext) if p)
+
+
+def es_contenido(nombre):
+    """True si `nombre` ya es una ruta direccionada por contenido."""
+    partes = (nombre or "").split("/")
+    if len(partes) < 3:
+        return False
+    base = os.path.splitext(partes[-1])[0]
+    return (re.fullmatch(r"[0-9a-f]{64}", base) is not None
+            and partes[-3] == base[:2] and partes[-2] == base[2:4])
+
+
+def referenciar(nombre, sha256, tamano, cantidad=1):
+    """Suma `cantidad` referencias (crea la fila si es el primer uso)."""
+    if ArchivoContenido.objects.filter(Ruta=nombre).update(
+            Referencias=F("Referencias") + cantidad):
+        return
+    try:
+        with transaction.atomic():
+            ArchivoContenido.objects.create(
+                Ruta=nombre, Sha256=sha256, Tamano=tamano, Referencias=cantidad)
+    except IntegrityError:
+        # Otra subida del mismo contenido creó la fila entre medio
+        ArchivoContenido.objects.filter(Ruta=nombre).update(
+            Referencias=F("Referencias") + cantidad)
+
+
+def liberar(nombre):
+    """
+    Resta una referencia (llamar en la transacción que deja de usar el archivo).
+    Los archivos anteriores a la migración no tienen fila y no se tocan.
+    """
+    if not nombre:
+        return
+    actualizados = ArchivoContenido.objects.filter(Ruta=nombre, Referencias__gt=0).update(
+        Referencias=F("Referencias") - 1)
+    if actualizados:
+        transaction.on_commit(lambda: purgar(nombre))
+
+
+def liberar_sobrante(nombre):
+    """
+    Resta una referencia duplicada sin bajar de 1: el mismo dueño llegó a tener dos
+    (p. ej. un incidente al que se adjunta una carga con su mismo contenido).
+    """
+    if nombre:
+        ArchivoContenido.objects.filter(Ruta=nombre, Referencias__gt=1).update(
+            Referencias=F("Referencias") - 1)
+
+
+def _borrar(nombre, storage):
+    for ruta in (nombre, *miniaturas.rutas(nombre)):
+        try:
+            os.remove(storage.path(ruta))
+        except FileNotFoundError:
+            pass
+
+
+def purgar(nombre=None):
+    """Borra los archivos sin referencias (uno o todos). Devuelve cuántos se borraron."""
+    storage = AlmacenamientoContenido()
+    qs = ArchivoContenido.objects.filter(Referencias=0)
+    if nombre:
+        qs = qs.filter(Ruta=nombre)
+    borrados = 0
+    for id_archivo in qs.values_list("idArchivo", flat=True).iterator():
+        with transaction.atomic():
+            # Bloqueo de la fila: una subida simultánea del mismo contenido espera aquí
+            # y, al no encontrar la fila, la recrea y vuelve a escribir el archivo.
+            fila = (ArchivoContenido.objects.select_for_update(skip_locked=True)
+                    .filter(idArchivo=id_archivo, Referencias=0).first())
+            if fila is None:
+                continue
+            _borrar(fila.Ruta, storage)
+            fila.delete()
+            borrados += 1
+    return borrados
+
+
+class AlmacenamientoContenido(FileSystemStorage):
+    """
+    FileSystemStorage que ignora el nombre del cliente (salvo carpeta y extensión)
+    y guarda por SHA-256, sin duplicar contenido. Cada save() suma una referencia.
+    """
+
+    def _temporal(self):
+        carpeta = os.path.join(self.location, CARPETA_ENTRANTES)
+        os.makedirs(carpeta, exist_ok=True)
+        return tempfile.mkstemp(dir=carpeta)
+
+    def _save(self, name, content):
+        # Una sola pasada: se escribe al temporal mientras se calcula el hash
+        fd, temporal = self._temporal()
+        sha, tamano = hashlib.sha256(), 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    sha.update(chunk)
+                    tamano += len(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(temporal)
+            raise
+        return self.ubicar(temporal, os.path.dirname(name), extension(name),
+                           sha.hexdigest(), tamano)
+
+    def ubicar(self, temporal, carpeta, ext, sha256, tamano, conservar=False):
+        """
+        Mueve un archivo temporal (en este mismo disco) a su ruta por contenido y
+        suma la referencia. Si el contenido ya existe, el temporal se descarta.
+        Con `conservar` el origen queda intacto (se enlaza o copia) y lo borra quien llama.
+        """
+        nombre = nombre_contenido(carpeta, sha256, ext)
+        # Primero la referencia y después el archivo: un purgar() simultáneo nunca
+        # borra un archivo recién referenciado (ver purgar)
+        referenciar(nombre, sha256, tamano)
+        destino = self.path(nombre)
+        if os.path.exists(destino):
+            if not conservar:
+                os.remove(temporal)
+        elif conservar:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            try:
+                os.link(temporal, destino)
+            except OSError:  # otro disco o sin hard links
+                shutil.copyfile(temporal, destino)
+            os.chmod(destino, self.file_permissions_mode or 0o644)
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.chmod(temporal, self.file_permissions_mode or 0o644)
+            os.replace(temporal, destino)
+        return nombre
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final sale del contenido: no hace falta buscar uno libre
+        return name
+
+
+def guardar_archivo(ruta, carpeta, nombre_original, sha256=None, conservar=False):
+    """
+    Guarda un archivo que ya está en disco (p. ej. una carga reanudable verificada)
+    moviéndolo a su ruta por contenido (con `conservar`, sin tocar el origen).
+    Devuelve el nombre relativo a MEDIA_ROOT.
+    """
+    storage = AlmacenamientoContenido()
+    tamano = os.path.getsize(ruta)
+    if sha256 is None:
+        h = hashlib.sha256()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(_BLOQUE), b""):
+                h.update(bloque)
+        sha256 = h.hexdigest()
+    return storage.ubicar(ruta, carpeta, extension(nombre_original), sha256, tamano, conservar)
+
+
+# ---------------------------- Migración de archivos existentes ----------------------------
+def _copiar_con_hash(origen, storage):
+    fd, temporal = storage._temporal()
+    h, tamano = hashlib.sha256(), 0
+    try:
+        with os.fdopen(fd, "wb") as destino, open(origen, "rb") as f:
+            for bloque in iter(lambda: f.read(_BLOQUE), b""):
+                h.update(bloque)
+                tamano += len(bloque)
+                destino.write(bloque)
+    except BaseException:
+        os.remove(temporal)
+        raise
+    return temporal, h.hexdigest(), tamano
+
+
+def migrar(conservar=False):
+    """
+    Pasa los archivos guardados con el nombre del cliente a rutas por contenido,
+    actualiza DetalleAlerta/SesionCarga y cuenta las referencias. Idempotente.
+    Con `conservar` no se borran los originales.
+    """
+    storage = AlmacenamientoContenido()
+    resultado = {"archivos": 0, "deduplicados": 0, "filas": 0, "faltantes": 0}
+    nombres = (
+        DetalleAlerta.objects.exclude(Archivo="").exclude(Archivo__isnull=True)
+        .order_by().values_list("Archivo", flat=True).distinct()
+    )
+    for nombre in list(nombres):
+        if es_contenido(nombre):
+            continue
+        origen = storage.path(nombre)
+        if not os.path.exists(origen):
+            resultado["faltantes"] += 1
+            continue
+
+        # Se copia: el original se borra recién cuando las filas apuntan al nuevo
+        temporal, sha256, tamano = _copiar_con_hash(origen, storage)
+        nuevo = nombre_contenido(os.path.dirname(nombre), sha256, extension(nombre))
+        if os.path.exists(storage.path(nuevo)):
+            resultado["deduplicados"] += 1
+        with transaction.atomic():
+            filas = DetalleAlerta.objects.filter(Archivo=nombre)
+            sesiones = SesionCarga.objects.filter(Archivo=nombre)
+            usos = filas.count() + sesiones.filter(Estado="completa").count()
+            storage.ubicar(temporal, os.path.dirname(nombre), extension(nombre), sha256, tamano)
+            if usos > 1:
+                referenciar(nuevo, sha256, tamano, usos - 1)
+
+            # Las miniaturas también pasan a la ruta por contenido (se comparten)
+            miniatura_vieja, previa_vieja = miniaturas.rutas(nombre)
+            miniatura, previa = miniaturas.rutas(nuevo)
+            for viejo, actual in ((miniatura_vieja, miniatura), (previa_vieja, previa)):
+                if os.path.exists(storage.path(viejo)) and not os.path.exists(storage.path(actual)):
+                    os.makedirs(os.path.dirname(storage.path(actual)), exist_ok=True)
+                    os.replace(storage.path(viejo), storage.path(actual))
+            resultado["filas"] += filas.update(
+                Archivo=nuevo,
+                Miniatura=miniatura if os.path.exists(storage.path(miniatura)) else None,
+            )
+            sesiones.update(Archivo=nuevo)
+        resultado["archivos"] += 1
+        if not conservar:
+            _borrar(nombre, storage)
+    return resultado
@@ -0,0 +1,206 @@
+# api/anomalias.py — detección incremental de picos de incidentes por celda
+#
+# Cada alta (registrar_incidente / registrar_incidentes_lote) suma 1 en ActividadCelda para
+# su celda (prefijo de ANOMALIAS_PRECISION del Geohash) y su hora de la semana: un UPDATE
+# por fila, sin consultar el historial. La fila guarda el conteo de la hora en curso y la
+# suma y suma de cuadrados de los conteos de todas las semanas; al sumar c a una hora que
+# ya tenía k, la suma de cuadrados crece (k+c)² - k² = 2kc + c². Las semanas sin
+# incidentes no tienen fila pero cuentan (como 0) al calcular la media: se cuentan desde
+# el inicio del detector (la fila más antigua).
+#
+# `detectar()` compara los incidentes de las últimas ANOMALIAS_VENTANA_HORAS de cada celda
+# con lo esperado para esas horas de la semana (media y varianza de las semanas
+# anteriores) y marca las celdas con z >= ANOMALIAS_Z. Lo leen /api/dashboard/anomalias/ y
+# el dashboard de administración. `manage.py reconstruir_anomalias` rehace la línea base.
+
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DateTimeField, F, Min, Q, Subquery, Value, When
+from django.utils import timezone
+
+from . import geohash
+from .models import ActividadCelda, DetalleAlerta
+
+PRECISION = getattr(settings, "ANOMALIAS_PRECISION", 6)  # ~1.2 km x 0.6 km
+VENTANA_HORAS = getattr(settings, "ANOMALIAS_VENTANA_HORAS", 3)
+Z_MINIMO = getattr(settings, "ANOMALIAS_Z", 3.0)
+MINIMO = getattr(settings, "ANOMALIAS_MINIMO", 3)  # incidentes en la ventana para marcar
+SEMANAS_MINIMAS = getattr(settings, "ANOMALIAS_SEMANAS_MINIMAS", 2)  # de historia para comparar
+HISTORIA_SEMANAS = getattr(settings, "ANOMALIAS_HISTORIA_SEMANAS", 12)  # reconstruir_anomalias
+MAXIMO = getattr(settings, "ANOMALIAS_MAXIMO", 50)
+CACHE_SEGUNDOS = getattr(settings, "ANOMALIAS_CACHE_SECONDS", 60)
+_SEMANA = timedelta(days=7)
+
+
+def _hora(fecha):
+    """(inicio de la hora local, hora de la semana 0-167) de una fecha."""
+    local = timezone.localtime(fecha).replace(minute=0, second=0, microsecond=0)
+    return local, local.weekday() * 24 + local.hour
+
+
+def _celda(det):
+    if det.idCanonico_id or not det.Geohash:
+        return None  # los duplicados no son incidentes nuevos
+    return det.Geohash[:PRECISION]
+
+
+# ---------------------------- Actualización (por alta) ----------------------------
+def _sumar(celda, hora_semana, hora, cantidad):
+    """Suma `cantidad` incidentes de `hora` a la fila de la celda, creándola si no existe."""
+    filtro = {"Celda": celda, "HoraSemana": hora_semana}
+    misma = Q(Hora=hora)
+    nueva = Q(Hora__lt=hora)  # la última vez fue otra semana: la hora en curso empieza en 0
+    # Todas las expresiones leen los valores anteriores de la fila (un solo UPDATE)
+    cambios = {
+        "Cantidad": Case(When(misma, then=F("Cantidad") + cantidad),
+                         When(nueva, then=Value(cantidad)), default=F("Cantidad")),
+        # Una semana anterior a `Hora` (reporte atrasado) se suma como si tuviera sólo estos
+        "SumaCuadrados": Case(When(misma, then=F("SumaCuadrados") + 2 * cantidad * F("Cantidad")
+                                   + cantidad * cantidad),
+                              default=F("SumaCuadrados") + cantidad * cantidad),
+        "Hora": Case(When(nueva, then=Value(hora)), default=F("Hora"), output_field=DateTimeField()),
+        "Suma": F("Suma") + cantidad,
+    }
+
+    if ActividadCelda.objects.filter(**filtro).update(**cambios):
+        return
+    try:
+        # Savepoint: si otro request creó la fila a la vez, reintentamos el UPDATE
+        with transaction.atomic():
+            ActividadCelda.objects.create(
+                Hora=hora, Cantidad=cantidad, Suma=cantidad,
+                SumaCuadrados=cantidad * cantidad, Desde=hora, **filtro)
+    except IntegrityError:
+        ActividadCelda.objects.filter(**filtro).update(**cambios)
+
+
+def registrar_alta(det):
+    """Nuevo DetalleAlerta (registrar_incidente). Misma transacción que el alta."""
+    registrar_altas([det])
+
+
+def registrar_altas(dets):
+    """Lote de DetalleAlerta nuevos: un UPDATE por celda y hora."""
+    grupos = Counter()
+    for det in dets:
+        celda = _celda(det)
+        if celda:
+            grupos[(celda, *_hora(det.FechaHora))] += 1
+    # En orden de hora: una misma fila puede recibir horas de semanas distintas
+    for (celda, hora, hora_semana), cantidad in sorted(grupos.items(), key=lambda g: g[0][1]):
+        _sumar(celda, hora_semana, hora, cantidad)
+
+
+def reconstruir(semanas=None):
+    """
+    Rehace ActividadCelda con las últimas `semanas` de DetalleAlerta (inicio del detector:
+    hace `semanas`). Para `manage.py reconstruir_anomalias`; devuelve las filas creadas.
+    """
+    semanas = semanas or HISTORIA_SEMANAS
+    inicio, _ = _hora(timezone.now() - semanas * _SEMANA)
+    conteos = Counter()
+    qs = DetalleAlerta.objects.filter(
+        idCanonico__isnull=True, Geohash__isnull=False, FechaHora__gte=inicio,
+    ).values_list("Geohash", "FechaHora")
+    for gh, fecha in qs.iterator(chunk_size=5000):
+        if gh:
+            conteos[(gh[:PRECISION], *_hora(fecha))] += 1
+
+    filas = {}
+    for (celda, hora, hora_semana), cantidad in sorted(conteos.items(), key=lambda c: c[0][1]):
+        fila = filas.get((celda, hora_semana))
+        if fila is None:
+            fila = filas[(celda, hora_semana)] = ActividadCelda(
+                Celda=celda, HoraSemana=hora_semana, Desde=inicio)
+        fila.Hora, fila.Cantidad = hora, cantidad
+        fila.Suma += cantidad
+        fila.SumaCuadrados += cantidad * cantidad
+
+    with transaction.atomic():
+        ActividadCelda.objects.all().delete()
+        ActividadCelda.objects.bulk_create(filas.values(), batch_size=2000)
+    cache.delete_many(["anomalias:inicio", "anomalias:actual"])
+    return len(filas)
+
+
+# ---------------------------- Detección ----------------------------
+def _inicio():
+    """Inicio del detector (la fila más antigua), cacheado por proceso."""
+    inicio = cache.get("anomalias:inicio")
+    if inicio is None:
+        inicio = ActividadCelda.objects.aggregate(m=Min("Desde"))["m"]
+        if inicio is not None:
+            cache.set("anomalias:inicio", inicio, 3600)
+    return inicio
+
+
+def detectar(ahora=None):
+    """
+    Celdas cuyo conteo de las últimas VENTANA_HORAS supera lo esperado por Z_MINIMO
+    desviaciones, de mayor a menor z. Una consulta (más la del inicio, cacheada).
+    """
+    inicio = _inicio()
+    if inicio is None:
+        return []
+    hora_actual, _ = _hora(ahora or timezone.now())
+    horas = [_hora(hora_actual - timedelta(hours=i)) for i in range(VENTANA_HORAS)]
+    # Semanas anteriores a cada hora de la ventana desde el inicio del detector
+    previas = {hs: (hora - inicio) // _SEMANA for hora, hs in horas}
+    if min(previas.values()) < SEMANAS_MINIMAS:
+        return []  # todavía no hay historia con qué comparar
+    actual = dict((hs, hora) for hora, hs in horas)
+
+    recientes = ActividadCelda.objects.filter(Hora__gte=horas[-1][0]).values("Celda")
+    filas = ActividadCelda.objects.filter(
+        Celda__in=Subquery(recientes), HoraSemana__in=list(actual),
+    ).values_list("Celda", "HoraSemana", "Hora", "Cantidad", "Suma", "SumaCuadrados")
+
+    celdas = defaultdict(lambda: [0, 0.0, 0.0])  # observados, esperados, varianza
+    for celda, hs, hora, cantidad, suma, suma_cuadrados in filas:
+        k = cantidad if hora == actual[hs] else 0
+        p = previas[hs]
+        media = (suma - k) / p
+        acumulado = celdas[celda]
+        acumulado[0] += k
+        acumulado[1] += media
+        acumulado[2] += max((suma_cuadrados - k * k) / p - media * media, 0.0)
+
+    marcadas = []
+    for celda, (observados, esperados, varianza) in celdas.items():
+        if observados < MINIMO:
+            continue
+        # Piso de Poisson (varianza >= media) y de 1: una celda sin historia no da z infinito
+        z = (observados - esperados) / math.sqrt(max(varianza, esperados, 1.0))
+        if z >= Z_MINIMO:
+            s, w, n, e = geohash.caja(celda)
+            marcadas.append({
+                "celda": celda,
+                "lat": round((s + n) / 2, 6),
+                "lng": round((w + e) / 2, 6),
+                "bbox": [round(s, 6), round(w, 6), round(n, 6), round(e, 6)],
+                "observados": observados,
+                "esperados": round(esperados, 2),
+                "desviacion": round(math.sqrt(varianza), 2),
+                "z": round(z, 2),
+            })
+    marcadas.sort(key=lambda m: m["z"], reverse=True)
+    return marcadas[:MAXIMO]
+
+
+def obtener():
+    """Resultado de detectar() cacheado CACHE_SEGUNDOS (lo consultan los dashboards cada 30 s)."""
+    datos = cache.get("anomalias:actual")
+    if datos is None:
+        datos = {
+            "generado": timezone.now().isoformat(),
+            "ventana_horas": VENTANA_HORAS,
+            "z_minimo": Z_MINIMO,
+            "anomalias": detectar(),
+        }
+        cache.set("anomalias:actual", datos, CACHE_SEGUNDOS)
+    return datos
@@ -0,0 +1,130 @@
+# api/autenticacion.py — JWTAuthentication con caché de usuarios por proceso
+#
+# simplejwt busca el Usuario en la base en cada request autenticado (una consulta por
+# cada poll). Aquí se guarda en un LRU local con TTL, junto con la versión del usuario
+# que vive en el caché compartido (CACHES): en un acierto sólo se lee esa versión.
+# Al guardar o borrar un Usuario (perfil_usuario, cambiar_password, reset de contraseña,
+# desactivación desde el admin) api/signals.py sube su versión al hacer commit, y todos
+# los workers descartan su copia en el siguiente request. Si la versión sale del caché
+# se recrea con un valor nuevo (nunca uno ya usado): sólo se pierden las copias locales.
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import metricas
+
+MAXIMO = getattr(settings, "AUTH_CACHE_MAXIMO", 10000)
+TTL_SEGUNDOS = getattr(settings, "AUTH_CACHE_SEGUNDOS", 30)
+# Basta con que la versión dure más que las copias locales; si vence, se recrea
+VERSION_SEGUNDOS = max(TTL_SEGUNDOS * 10, 3600)
+
+
+def _clave_version(id_usuario):
+    return f"autenticacion:version:{id_usuario}"
+
+
+def version(id_usuario):
+    clave = _clave_version(id_usuario)
+    valor = cache.get(clave)
+    if valor is None:
+        cache.add(clave, time.time_ns(), VERSION_SEGUNDOS)
+        valor = cache.get(clave)
+    return valor
+
+
+class CacheUsuarios:
+    """LRU acotado con vencimiento: id de usuario -> (instante, versión, Usuario)."""
+
+    def __init__(self, maximo=MAXIMO, ttl=TTL_SEGUNDOS):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Claves como str: simplejwt guarda el id en el token como texto
+    def obtener(self, id_usuario, version):
+        id_usuario = str(id_usuario)
+        with self._lock:
+            entrada = self._datos.get(id_usuario)
+            if entrada is None:
+                return None
+            guardado, version_guardada, usuario = entrada
+            if version_guardada != version or time.monotonic() - guardado > self.ttl:
+                del self._datos[id_usuario]
+                return None
+            self._datos.move_to_end(id_usuario)
+        # Copia: las vistas modifican request.user (p. ej. perfil_usuario) antes de guardar
+        return copy.copy(usuario)
+
+    def guardar(self, usuario, version):
+        with self._lock:
+            self._datos[str(usuario.pk)] = (time.monotonic(), version, copy.copy(usuario))
+            self._datos.move_to_end(str(usuario.pk))
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, id_usuario):
+        with self._lock:
+            self._datos.pop(str(id_usuario), None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+usuarios = CacheUsuarios()
+
+
+def invalidar(id_usuario):
+    """
+    Descarta el usuario cacheado en este proceso ahora, y al hacer commit sube su versión
+    compartida para que los demás workers (y este) no vuelvan a usar la copia vieja.
+    """
+    usuarios.invalidar(id_usuario)
+
+    def _subir():
+        usuarios.invalidar(id_usuario)
+        try:
+            cache.incr(_clave_version(id_usuario))
+        except ValueError:  # la versión ya no estaba en el caché: cualquier valor nuevo sirve
+            cache.set(_clave_version(id_usuario), time.time_ns(), VERSION_SEGUNDOS)
+
+    transaction.on_commit(_subir)
+
+
+class JWTAutenticacionCacheada(JWTAuthentication):
+    """JWTAuthentication que resuelve el usuario desde CacheUsuarios (BD sólo si no está)."""
+
+    def get_user(self, validated_token):
+        id_usuario = validated_token.get(api_settings.USER_ID_CLAIM)
+        if id_usuario is None:
+            return super().get_user(validated_token)
+        # La versión se lee antes que el usuario: si cambia en medio, la copia ya nace vieja
+        vigente = version(id_usuario)
+        usuario = usuarios.obtener(id_usuario, vigente)
+        if usuario is None:
+            metricas.AUTH_CACHE.inc(resultado="miss")
+            usuario = super().get_user(validated_token)
+            usuarios.guardar(usuario, vigente)
+            return usuario
+
+        metricas.AUTH_CACHE.inc(resultado="hit")
+        # Mismas verificaciones que simplejwt, sobre el usuario cacheado
+        if api_settings.CHECK_USER_IS_ACTIVE and not usuario.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(usuario.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed")
+        return usuario
@@ -0,0 +1,287 @@
+# api/benchmark.py — latencia, consultas y memoria de cada endpoint de api/urls.py
+#
+# Usa el cliente de pruebas de Django contra la base configurada (cargar antes un
+# volumen realista con `manage.py generar_dataset`). Cada caso se mide en dos pasadas:
+# una sólo de tiempos (p50/p95) y otra que cuenta consultas y el pico de memoria
+# (tracemalloc y el conteo de consultas agregan overhead, por eso van aparte).
+
+import contextlib
+import io
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import cambios, dataset, tiles
+from .instrumentacion import capturar
+from .models import Administrador, DetalleAlerta, RolUsuario, Usuario
+from .views import token_reset_password
+
+USUARIO_BENCHMARK = "benchmark"
+PASSWORD_BENCHMARK = "benchmark-123"
+
+# Endpoints que no se miden y por qué
+OMITIDOS = {
+    "heatmap-alertas-stream": "SSE: la conexión no termina (medir con un cliente async)",
+    "metricas": "endpoint interno del scraper (requiere METRICAS_TOKEN o staff)",
+    "carga": "PUT de bytes crudos con Content-Range: el costo es de disco, no de consultas",
+    "carga_finalizar": "requiere una carga completa (hashea el archivo entero)",
+}
+
+
+class Caso:
+    def __init__(self, nombre, url_name, metodo="get", kwargs=None, params=None,
+                 data=None, headers=None, auth=True, escritura=False, antes=None):
+        self.nombre = nombre
+        self.url_name = url_name
+        self.metodo = metodo
+        self.kwargs = kwargs or {}
+        self.params = params or {}
+        self.data = data
+        self.headers = headers or {}
+        self.auth = auth
+        self.escritura = escritura
+        self.antes = antes  # callable(contexto) ejecutado antes de cada request (fuera del tiempo)
+
+
+def usuario_benchmark(admin=False):
+    """
+    Cuenta con contraseña conocida para medir el login y los endpoints autenticados.
+    Con `admin` (sólo para --escritura) se enlaza a un Administrador: el cambio de
+    estado en lote lo exige.
+    """
+    usuario = Usuario.objects.filter(nombre=USUARIO_BENCHMARK).first()
+    if usuario is None:
+        usuario = Usuario.objects.create_user(
+            correo=f"{USUARIO_BENCHMARK}@example.com", contra=PASSWORD_BENCHMARK,
+            nombre=USUARIO_BENCHMARK)
+    elif not usuario.check_password(PASSWORD_BENCHMARK):
+        usuario.set_password(PASSWORD_BENCHMARK)
+        usuario.save(update_fields=["password"])
+    if admin and not Administrador.objects.filter(idRolUsuario__idUsuario=usuario).exists():
+        rol = RolUsuario.objects.create(NombreRol="Administrador", idUsuario=usuario)
+        Administrador.objects.create(idRolUsuario=rol, Nombre=USUARIO_BENCHMARK, Apellido="")
+    # Reportes propios para que mis_reportes/resumen no midan una lista vacía
+    if not DetalleAlerta.objects.filter(idUsuario=usuario).exists():
+        dataset.sembrar_incidentes(200, [usuario.idUsuario], dias=30, semilla=0)
+    return usuario
+
+
+def _contexto(client):
+    """Valores que necesitan los casos: tokens, un incidente, un tile con datos, etc."""
+    resp = client.post(reverse("token_obtain_pair"),
+                       {"username": USUARIO_BENCHMARK, "password": PASSWORD_BENCHMARK},
+                       format="json")
+    tokens = resp.json()
+    reciente = DetalleAlerta.objects.order_by("-FechaHora", "-idTipoIncidencia").first()
+    s, w, n, e = dataset.LIMA_BBOX
+    centro = ((s + n) / 2, (w + e) / 2)
+    x, y = tiles.tile_para_punto(centro[0], centro[1], 12)
+    return {
+        "access": tokens.get("access"),
+        "refresh": tokens.get("refresh"),
+        "id_incidente": reciente.idTipoIncidencia if reciente else 0,
+        "ids_lote": list(DetalleAlerta.objects.order_by("-FechaHora", "-idTipoIncidencia")
+                         .values_list("idTipoIncidencia", flat=True)[:50]),
+        "tile": {"z": 12, "x": x, "y": y},
+        "bbox": f"{centro[0] - 0.05},{centro[1] - 0.05},{centro[0] + 0.05},{centro[1] + 0.05}",
+        "version": cambios.version_actual(),
+        "kwargs_reset": {"token": token_reset_password(
+            Usuario.objects.get(idUsuario=tokens.get("idUsuario")))},
+    }
+
+
+def casos(ctx):
+    pagina = {"page_size": "50"}
+    login = {"username": USUARIO_BENCHMARK, "password": PASSWORD_BENCHMARK}
+    return [
+        Caso("login", "token_obtain_pair", "post", data=login, auth=False),
+        Caso("refresh", "token_refresh", "post", data={"refresh": ctx["refresh"]}, auth=False),
+        Caso("me", "me"),
+        Caso("resumen", "resumen"),
+        Caso("resumen_slash", "resumen_slash"),
+        Caso("mis_reportes", "mis_reportes"),
+        Caso("mis_reportes_paginado", "mis_reportes_slash", params=pagina),
+        Caso("todas_alertas", "todas_alertas", auth=False),
+        Caso("todas_alertas_paginado", "todas_alertas", params=pagina, auth=False),
+        Caso("todas_alertas_ndjson", "todas_alertas", params={"stream": "ndjson"}, auth=False),
+        Caso("alertas_cambios_al_dia", "alertas_cambios",
+             params={"since": str(ctx["version"])}, auth=False),
+        Caso("perfil_usuario", "perfil_usuario"),
+        Caso("dashboard_stats", "dashboard_stats", auth=False),
+        Caso("emergency_personnel", "emergency_personnel", auth=False),
+        Caso("recent_activities", "recent_activities", auth=False),
+        Caso("dashboard_anomalias", "dashboard_anomalias", auth=False),
+        Caso("historial_incidentes", "historial_incidentes"),
+        Caso("historial_incidentes_paginado", "historial_incidentes", params=pagina),
+        Caso("heatmap", "heatmap-alertas", auth=False),
+        Caso("heatmap_bbox", "heatmap-alertas", params={"bbox": ctx["bbox"]}, auth=False),
+        Caso("heatmap_binario", "heatmap-alertas", auth=False,
+             headers={"HTTP_ACCEPT": "application/vnd.seguridad.heatmap"}),
+        Caso("heatmap_tile_cache", "heatmap-tiles", kwargs=ctx["tile"], auth=False),
+        Caso("heatmap_tile_sin_cache", "heatmap-tiles-slash", kwargs=ctx["tile"], auth=False,
+             antes=lambda _ctx: cache.clear()),
+        Caso("zonas_calor", "zonas-calor", params={"ventana": "30d"}, auth=False),
+        Caso("gestion_list_incidentes", "gestion_list_incidentes"),
+        Caso("gestion_list_incidentes_paginado", "gestion_list_incidentes", params=pagina),
+        # --- escritura: sólo con --escritura (modifican la base) ---
+        Caso("registro", "registro", "post", auth=False, escritura=True,
+             antes=lambda c: c.update(data_registro={
+                 "username": f"bench{time.perf_counter_ns()}",
+                 "email": f"bench{time.perf_counter_ns()}@example.com",
+                 "password": PASSWORD_BENCHMARK})),
+        Caso("registrar_incidente", "registrar_incidente", "post", escritura=True, data={
+            "Ubicacion": "Lat -12.0464, Lng -77.0428", "NombreIncidente": "Benchmark",
+            "Descripcion": "Incidente creado por el benchmark", "escala": "1",
+            "Latitud": "-12.0464", "Longitud": "-77.0428"}),
+        Caso("registrar_incidente_slash", "registrar_incidente_slash", "post", escritura=True, data={
+            "Ubicacion": "Lat -12.0464, Lng -77.0428", "NombreIncidente": "Benchmark",
+            "escala": "2", "Latitud": "-12.0464", "Longitud": "-77.0428"}),
+        # 50 incidentes por request: las consultas no dependen del tamaño del lote
+        Caso("registrar_incidentes_lote", "registrar_incidentes_lote", "post", escritura=True,
+             data=[{
+                 "Ubicacion": "Lat -12.0464, Lng -77.0428", "NombreIncidente": "Benchmark lote",
+                 "escala": 1 + i % 3, "Latitud": -12.0464 + i / 1000, "Longitud": -77.0428,
+             } for i in range(50)]),
+        Caso("enviar_correo", "enviar_correo", "post", auth=False, escritura=True,
+             data={"email": f"{USUARIO_BENCHMARK}@example.com"}),
+        # El enlace sirve una sola vez: token nuevo antes de cada request
+        Caso("cambio_contrasena", "cambio_contrasena", "post", auth=False, escritura=True,
+             kwargs=ctx["kwargs_reset"], data={"password": PASSWORD_BENCHMARK},
+             antes=lambda c: c["kwargs_reset"].update(token=token_reset_password(
+                 Usuario.objects.get(nombre=USUARIO_BENCHMARK)))),
+        Caso("cambiar_password", "cambiar_password", "post", escritura=True,
+             data={"nueva": PASSWORD_BENCHMARK}),
+        Caso("gestion_update_incidente", "gestion_update_incidente", "patch", escritura=True,
+             kwargs={"id": ctx["id_incidente"]}, data={"estado": "En proceso"}),
+        # Alterna el estado destino: cada request cambia de verdad las 50 filas
+        Caso("gestion_update_incidentes_lote", "gestion_update_incidentes_lote", "patch",
+             escritura=True, antes=lambda c: c.update(data_gestion_update_incidentes_lote={
+                 "estado": "Pendiente" if c.get("data_gestion_update_incidentes_lote", {})
+                 .get("estado") == "En proceso" else "En proceso",
+                 "ids": c["ids_lote"]})),
+        Caso("cargas", "cargas", "post", escritura=True, data={
+            "nombre": "benchmark.mp4", "tamano": 1024 * 1024, "sha256": "0" * 64}),
+    ]
+
+
+def _percentil(valores, p):
+    orden = sorted(valores)
+    k = max(0, min(len(orden) - 1, round(p / 100 * (len(orden) - 1))))
+    return orden[k]
+
+
+def _ejecutar(client, caso, ctx, preparar=True):
+    if preparar and caso.antes:
+        caso.antes(ctx)
+    url = reverse(caso.url_name, kwargs=caso.kwargs)
+    data = caso.data if caso.data is not None else ctx.get(f"data_{caso.nombre}")
+    headers = dict(caso.headers)
+    if caso.auth:
+        headers["HTTP_AUTHORIZATION"] = f"Bearer {ctx['access']}"
+    metodo = getattr(client, caso.metodo)
+    inicio = time.perf_counter()
+    if caso.metodo == "get":
+        resp = metodo(url, caso.params, **headers)
+    else:
+        resp = metodo(url, data or {}, format="json", **headers)
+    # Las respuestas streaming se consumen completas: es parte del costo
+    cuerpo = b"".join(resp.streaming_content) if resp.streaming else resp.content
+    return time.perf_counter() - inicio, resp.status_code, len(cuerpo)
+
+
+def medir(caso, client, ctx, iteraciones, calentamiento=1):
+    for _ in range(calentamiento):
+        _ejecutar(client, caso, ctx)
+
+    tiempos = []
+    for _ in range(iteraciones):
+        segundos, status, tamano = _ejecutar(client, caso, ctx)
+        tiempos.append(segundos * 1000)
+
+    # Pasada instrumentada: consultas, tiempo en BD y pico de memoria de un request
+    tracemalloc.start()
+    try:
+        if caso.antes:
+            caso.antes(ctx)  # sus consultas no son del endpoint
+        with capturar() as registro:
+            _ejecutar(client, caso, ctx, preparar=False)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "caso": caso.nombre,
+        "url_name": caso.url_name,
+        "metodo": caso.metodo.upper(),
+        "ruta": reverse(caso.url_name, kwargs=caso.kwargs),
+        "status": status,
+        "bytes": tamano,
+        "iteraciones": iteraciones,
+        "p50_ms": round(_percentil(tiempos, 50), 3),
+        "p95_ms": round(_percentil(tiempos, 95), 3),
+        "media_ms": round(statistics.fmean(tiempos), 3),
+        "max_ms": round(max(tiempos), 3),
+        "consultas": registro.consultas,
+        "consultas_cache": registro.cache,
+        "duplicadas": registro.duplicadas,
+        "db_ms": round(registro.segundos * 1000, 3),
+        "memoria_pico_kb": round(pico / 1024, 1),
+    }
+
+
+def ejecutar(iteraciones=20, escritura=False, solo=None, progreso=None):
+    """Mide todos los casos y devuelve el reporte (dict serializable a JSON)."""
+    setup_test_environment()  # correo locmem y host 'testserver'
+    salida_vistas = io.StringIO()
+    try:
+        # Las vistas imprimen trazas de depuración: no deben ensuciar el reporte
+        with contextlib.redirect_stdout(salida_vistas):
+            usuario_benchmark(admin=escritura)
+            client = APIClient()
+            ctx = _contexto(client)
+            lista = [
+                c for c in casos(ctx)
+                if (escritura or not c.escritura) and (not solo or c.nombre in solo)
+            ]
+            resultados = []
+            for caso in lista:
+                if progreso:
+                    progreso(caso.nombre)
+                resultados.append(medir(caso, client, ctx, iteraciones))
+    finally:
+        teardown_test_environment()
+
+    nombres = {n for n in get_resolver("api.urls").reverse_dict if isinstance(n, str)}
+    cubiertos = {c.url_name for c in casos(ctx)}
+    return {
+        "fecha": timezone.now().isoformat(),
+        "vendor": connection.vendor,
+        "filas": {
+            "Usuario": Usuario.objects.count(),
+            "DetalleAlerta": DetalleAlerta.objects.count(),
+        },
+        "iteraciones": iteraciones,
+        "escritura": escritura,
+        "resultados": resultados,
+        "omitidos": OMITIDOS,
+        "sin_caso": sorted(nombres - cubiertos - set(OMITIDOS)),
+    }
+
+
+def comparar(actual, anterior):
+    """[(caso, p50_antes, p50_ahora, variación %)] para los casos presentes en ambos reportes."""
+    previos = {r["caso"]: r for r in anterior.get("resultados", [])}
+    filas = []
+    for r in actual["resultados"]:
+        p = previos.get(r["caso"])
+        if p and p["p50_ms"]:
+            filas.append((r["caso"], p["p50_ms"], r["p50_ms"],
+                          round((r["p50_ms"] - p["p50_ms"]) / p["p50_ms"] * 100, 1)))
+    return filas
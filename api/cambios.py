@@ -0,0 +1,75 @@
+# api/cambios.py — log de cambios de DetalleAlerta para delta-sync (?since=<versión>)
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import CambioAlerta, DetalleAlerta, VersionCambios
+
+# Máximo de cambios por respuesta; el cliente repite con la nueva versión si `mas`
+LIMITE_CAMBIOS = getattr(settings, "CAMBIOS_ALERTAS_LIMITE", 1000)
+
+
+def version_actual():
+    return VersionCambios.objects.values_list("Valor", flat=True).get(pk=1)
+
+
+def registrar(id_incidente, operacion):
+    """
+    Anota un insert/update/delete. Debe llamarse dentro de la transacción
+    que modifica el DetalleAlerta.
+    """
+    # El UPDATE bloquea el contador hasta el commit: versiones en orden de commit
+    VersionCambios.objects.filter(pk=1).update(Valor=F("Valor") + 1)
+    CambioAlerta.objects.create(
+        Version=version_actual(),
+        idTipoIncidencia=id_incidente,
+        Operacion=operacion,
+    )
+
+
+def registrar_lote(ids_incidentes, operacion):
+    """Como `registrar` para varios incidentes: un solo UPDATE del contador y un INSERT."""
+    ids_incidentes = list(ids_incidentes)
+    if not ids_incidentes:
+        return
+    VersionCambios.objects.filter(pk=1).update(Valor=F("Valor") + len(ids_incidentes))
+    primera = version_actual() - len(ids_incidentes) + 1
+    CambioAlerta.objects.bulk_create([
+        CambioAlerta(Version=primera + i, idTipoIncidencia=pk, Operacion=operacion)
+        for i, pk in enumerate(ids_incidentes)
+    ])
+
+
+def cambios_desde(since, a_dict):
+    """
+    Cambios posteriores a `since`, colapsados por incidente (gana el último).
+    Devuelve (cambios, version, mas). Si el cliente ya está al día es una
+    sola consulta por rango sobre el índice único de Version.
+    """
+    log = list(
+        CambioAlerta.objects
+        .filter(Version__gt=since)
+        .order_by("Version")
+        .values_list("Version", "idTipoIncidencia", "Operacion")[:LIMITE_CAMBIOS + 1]
+    )
+    mas = len(log) > LIMITE_CAMBIOS
+    log = log[:LIMITE_CAMBIOS]
+    if not log:
+        return [], since, False
+
+    ultima_op = {}
+    for _, pk, op in log:
+        ultima_op[pk] = op
+
+    vivos = {
+        a.idTipoIncidencia: a
+        for a in DetalleAlerta.objects.select_related("idUsuario").filter(
+            pk__in=[pk for pk, op in ultima_op.items() if op != "delete"])
+    }
+    cambios = []
+    for pk, op in ultima_op.items():
+        if pk in vivos:
+            cambios.append({"op": "upsert", "alerta": a_dict(vivos[pk])})
+        else:
+            cambios.append({"op": "delete", "id": pk})
+    return cambios, log[-1][0], mas
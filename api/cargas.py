@@ -0,0 +1,259 @@
+# api/cargas.py — subidas reanudables por partes (fotos/videos de incidentes)
+#
+#   POST   /api/cargas/                  {nombre, tamano, sha256, tipo?} -> sesión
+#   GET    /api/cargas/<id>/             estado y `recibido` (desde dónde reanudar)
+#   PUT    /api/cargas/<id>/             cuerpo crudo + Content-Range: bytes a-b/total
+#   POST   /api/cargas/<id>/finalizar/   verifica tamaño y SHA-256; opcional idTipoIncidencia
+#
+# Cada PUT se escribe directo al archivo .part en disco por bloques (sin pasar por el
+# spool de uploads de Django), así la memoria del worker no depende del tamaño del video.
+
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from . import almacenamiento, medios
+from .models import SesionCarga
+
+CARPETA_PARTES = "archivos_alertas/cargas"
+CARPETA_FINAL = "archivos_alertas"  # la misma que DetalleAlerta.Archivo (upload_to)
+TAMANO_MAX = getattr(settings, "CARGA_TAMANO_MAX", 500 * 1024 * 1024)
+CHUNK_MAX = getattr(settings, "CARGA_CHUNK_MAX", 8 * 1024 * 1024)
+CHUNK_SUGERIDO = getattr(settings, "CARGA_CHUNK_SUGERIDO", 1024 * 1024)
+EXPIRA = timedelta(hours=getattr(settings, "CARGA_EXPIRA_HORAS", 24))
+_BLOQUE = 64 * 1024
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class ErrorCarga(Exception):
+    """Error de validación de una carga; `status` es el código HTTP a devolver."""
+
+    def __init__(self, mensaje, status=400, recibido=None):
+        super().__init__(mensaje)
+        self.status = status
+        self.recibido = recibido
+
+
+class ChecksumInvalido(ErrorCarga):
+    """El archivo completo no coincide con el SHA-256 declarado: hay que reiniciar la carga."""
+
+    def __init__(self, sesion):
+        super().__init__("El checksum SHA-256 no coincide; la carga se reinició", status=422,
+                         recibido=0)
+        self.sesion = sesion
+
+
+def _ruta_parte(sesion):
+    return os.path.join(settings.MEDIA_ROOT, CARPETA_PARTES, f"{sesion.idSesion}.part")
+
+
+def datos(sesion):
+    return {
+        "id": str(sesion.idSesion),
+        "nombre": sesion.NombreArchivo,
+        "tamano": sesion.Tamano,
+        "recibido": sesion.Recibido,
+        "estado": sesion.Estado,
+        "chunk_sugerido": CHUNK_SUGERIDO,
+        "chunk_max": CHUNK_MAX,
+        "archivo": medios.url(None, sesion.Archivo),
+        "idTipoIncidencia": sesion.idTipoIncidencia_id,
+    }
+
+
+def crear(usuario, nombre, tamano, sha256, tipo=None):
+    nombre = get_valid_filename(os.path.basename(nombre or ""))[:200]
+    if not nombre:
+        raise ErrorCarga("nombre es requerido")
+    try:
+        tamano = int(tamano)
+    except (TypeError, ValueError):
+        raise ErrorCarga("tamano debe ser un número de bytes")
+    if not 0 < tamano <= TAMANO_MAX:
+        raise ErrorCarga(f"tamano debe estar entre 1 y {TAMANO_MAX} bytes")
+    sha256 = (sha256 or "").strip().lower()
+    if not re.fullmatch(r"[0-9a-f]{64}", sha256):
+        raise ErrorCarga("sha256 debe ser el hash hexadecimal del archivo completo")
+
+    sesion = SesionCarga.objects.create(
+        idUsuario=usuario, NombreArchivo=nombre, Tamano=tamano,
+        Sha256=sha256, TipoContenido=(tipo or "")[:100] or None,
+    )
+    os.makedirs(os.path.dirname(_ruta_parte(sesion)), exist_ok=True)
+    # Reservar el archivo (vacío); los rangos se escriben en su offset
+    open(_ruta_parte(sesion), "wb").close()
+    return sesion
+
+
+def obtener(usuario, id_sesion):
+    """Sesión del usuario o ErrorCarga 404 (también si expiró sin completarse)."""
+    try:
+        sesion = SesionCarga.objects.filter(idSesion=id_sesion, idUsuario=usuario).first()
+    except ValidationError:  # id que no es un UUID
+        sesion = None
+    if sesion is None:
+        raise ErrorCarga("Sesión de carga no encontrada", status=404)
+    if sesion.Estado == "abierta" and sesion.FechaActualizacion < timezone.now() - EXPIRA:
+        raise ErrorCarga("La sesión de carga expiró", status=404)
+    return sesion
+
+
+def escribir_rango(sesion, content_range, longitud, stream):
+    """
+    Escribe un rango al .part leyendo `stream` por bloques. El rango puede solaparse
+    con lo ya recibido (reintento de un chunk) pero no dejar huecos.
+    Devuelve la sesión actualizada.
+    """
+    if sesion.Estado != "abierta":
+        raise ErrorCarga("La carga ya fue finalizada", status=409)
+    m = _CONTENT_RANGE.match(content_range or "")
+    if not m:
+        raise ErrorCarga("Content-Range debe ser 'bytes inicio-fin/total'")
+    inicio, fin, total = (int(g) for g in m.groups())
+    largo = fin - inicio + 1
+    if total != sesion.Tamano or fin < inicio or fin >= total:
+        raise ErrorCarga("Content-Range fuera del tamaño declarado", status=416,
+                         recibido=sesion.Recibido)
+    if largo > CHUNK_MAX:
+        raise ErrorCarga(f"Cada parte puede tener como máximo {CHUNK_MAX} bytes", status=413)
+    if longitud is not None and longitud != largo:
+        raise ErrorCarga("Content-Length no coincide con Content-Range")
+    if inicio > sesion.Recibido:
+        # Hueco: el cliente debe reanudar desde `recibido`
+        raise ErrorCarga("Falta un rango anterior", status=416, recibido=sesion.Recibido)
+
+    fd = os.open(_ruta_parte(sesion), os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        pos, restante = inicio, largo
+        while restante:
+            bloque = stream.read(min(_BLOQUE, restante))
+            if not bloque:
+                break
+            os.pwrite(fd, bloque, pos)
+            pos += len(bloque)
+            restante -= len(bloque)
+    finally:
+        os.close(fd)
+    if restante:
+        # Conexión cortada a mitad: se guarda lo recibido de forma contigua
+        fin = pos - 1
+
+    if fin >= inicio:
+        # Greatest: un PUT repetido/atrasado nunca hace retroceder el offset
+        SesionCarga.objects.filter(pk=sesion.pk, Recibido__gte=inicio).update(
+            Recibido=Greatest(F("Recibido"), fin + 1), FechaActualizacion=timezone.now())
+    sesion.refresh_from_db()
+    if restante:
+        raise ErrorCarga("Cuerpo incompleto; reanudar desde `recibido`", status=400,
+                         recibido=sesion.Recibido)
+    return sesion
+
+
+def _sha256(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _borrar_parte(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def finalizar(sesion):
+    """
+    Verifica tamaño y checksum y guarda el archivo en su ubicación final (llamar dentro
+    de la transacción). El .part se borra recién al hacer commit: si la transacción se
+    revierte, la sesión vuelve a "abierta" con su .part y el cliente puede reintentar.
+    Con un checksum distinto lanza ChecksumInvalido sin tocar nada (ver `reiniciar`).
+    """
+    if sesion.Estado != "abierta":
+        return sesion
+    ruta = _ruta_parte(sesion)
+    if sesion.Recibido != sesion.Tamano or os.path.getsize(ruta) != sesion.Tamano:
+        raise ErrorCarga("La carga no está completa", status=409, recibido=sesion.Recibido)
+    if _sha256(ruta) != sesion.Sha256:
+        raise ChecksumInvalido(sesion)
+
+    # Ruta por contenido (mismo disco: hard link, sin copiar); el hash ya está verificado
+    sesion.Archivo = almacenamiento.guardar_archivo(
+        ruta, CARPETA_FINAL, sesion.NombreArchivo, sesion.Sha256, conservar=True)
+    transaction.on_commit(lambda: _borrar_parte(ruta))
+    sesion.Estado = "completa"
+    sesion.FechaActualizacion = timezone.now()
+    sesion.save(update_fields=["Archivo", "Estado", "FechaActualizacion"])
+    return sesion
+
+
+def reiniciar(sesion):
+    """
+    Datos corruptos: se descarta todo para que el cliente vuelva a empezar. Llamar fuera
+    de la transacción que falló, así el Recibido=0 no se revierte junto con ella.
+    """
+    SesionCarga.objects.filter(pk=sesion.pk, Estado="abierta").update(
+        Recibido=0, FechaActualizacion=timezone.now())
+    open(_ruta_parte(sesion), "wb").close()
+
+
+def validar_adjunto(sesion, det):
+    """Lo que `adjuntar` exige del incidente; verificarlo antes de mover el archivo."""
+    if sesion.idTipoIncidencia_id and sesion.idTipoIncidencia_id != det.idTipoIncidencia:
+        raise ErrorCarga("La carga ya está adjunta a otro incidente", status=409)
+
+
+def adjuntar(sesion, det):
+    """
+    Asocia el archivo verificado al DetalleAlerta (llamar dentro de la transacción).
+    Devuelve False si ya estaba adjunta a ese incidente (reintento de finalizar).
+    """
+    if sesion.Estado == "abierta":
+        raise ErrorCarga("La carga no está finalizada", status=409)
+    validar_adjunto(sesion, det)
+    if sesion.Estado == "adjuntada":
+        # La referencia de la sesión ya pasó al incidente: soltarla otra vez borraría su archivo
+        return False
+    # La referencia de la sesión pasa al incidente; la de su archivo anterior se suelta
+    if det.Archivo and det.Archivo.name == sesion.Archivo:
+        almacenamiento.liberar_sobrante(sesion.Archivo)  # mismo contenido: nunca llega a 0
+    elif det.Archivo:
+        almacenamiento.liberar(det.Archivo.name)
+    det.Archivo.name = sesion.Archivo
+    det.save(update_fields=["Archivo"])
+    sesion.idTipoIncidencia = det
+    sesion.Estado = "adjuntada"
+    sesion.save(update_fields=["idTipoIncidencia", "Estado"])
+    return True
+
+
+def cancelar(sesion):
+    """Descarta una carga abierta y su .part."""
+    try:
+        os.remove(_ruta_parte(sesion))
+    except FileNotFoundError:
+        pass
+    sesion.delete()
+
+
+def limpiar_expiradas():
+    """Borra las sesiones abiertas vencidas y sus .part. Devuelve cuántas."""
+    vencidas = SesionCarga.objects.filter(
+        Estado="abierta", FechaActualizacion__lt=timezone.now() - EXPIRA)
+    total = 0
+    for sesion in vencidas.iterator():
+        cancelar(sesion)
+        total += 1
+    return total
@@ -0,0 +1,172 @@
+# api/clasificador.py — escala automática de un reporte a partir de EscalaAlerta
+#
+# Cada fila de EscalaAlerta es una escala (Descripcion: "Bajo"/"Medio"/"Alto" o 1/2/3)
+# con sus palabras clave (palabra_clave, separadas por coma). Todas se compilan en un solo
+# autómata (api/palabras.py) que clasifica en tiempo lineal en el largo del texto; si
+# coinciden palabras de varias escalas gana la más alta. Sin coincidencias: 4 (Pendiente).
+#
+# Recarga en caliente: api/signals.py sube la versión en el caché compartido (CACHES) al
+# cambiar EscalaAlerta y cada proceso recompila su autómata en la siguiente clasificación.
+# Si la versión sale del caché se recrea con un valor nuevo (nunca uno ya usado), así que
+# perderla sólo provoca una recompilación de más. Además cada autómata vence a los
+# CLASIFICADOR_RECARGA_SEGUNDOS por si el caché no fuera compartido.
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import cambios, estadisticas, palabras, tiempo_real, tiles
+from .models import DetalleAlerta, EscalaAlerta
+
+logger = logging.getLogger(__name__)
+
+SIN_ESCALA = 4  # "Pendiente (por asignar)"
+WORKERS = getattr(settings, "CLASIFICADOR_WORKERS", 2)
+LOTE = getattr(settings, "CLASIFICADOR_LOTE", 2000)
+RECARGA_SEGUNDOS = getattr(settings, "CLASIFICADOR_RECARGA_SEGUNDOS", 300)
+_CLAVE_VERSION = "escalas:version"
+_NIVELES = {"bajo": 1, "baja": 1, "1": 1, "medio": 2, "media": 2, "2": 2, "alto": 3, "alta": 3, "3": 3}
+
+
+def _version():
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        # Valor nuevo, no 1: un proceso con un autómata de una versión ya expulsada recompila
+        cache.add(_CLAVE_VERSION, time.time_ns(), None)
+        version = cache.get(_CLAVE_VERSION)
+    return version
+
+
+def nivel(descripcion):
+    """Escala (1-3) que representa una fila de EscalaAlerta, o None."""
+    return _NIVELES.get(palabras.normalizar(descripcion).strip())
+
+
+def pares():
+    """[(palabra, escala), ...] de todas las filas de EscalaAlerta reconocibles."""
+    resultado = []
+    for id_escala, descripcion, palabra_clave in EscalaAlerta.objects.values_list(
+            "idEscalaIncidencia", "Descripcion", "palabra_clave"):
+        escala = nivel(descripcion)
+        if escala is None:
+            logger.warning("EscalaAlerta %s: Descripcion %r no es Bajo/Medio/Alto, se ignora",
+                           id_escala, descripcion)
+            continue
+        resultado += [(p, escala) for p in palabras.separar(palabra_clave)]
+    return resultado
+
+
+_lock = threading.Lock()
+_compilado = (None, None, 0.0)  # (versión, Automata, instante de compilación)
+
+
+def _vigente(version):
+    return _compilado[0] == version and time.monotonic() - _compilado[2] < RECARGA_SEGUNDOS
+
+
+def automata():
+    """Autómata de este proceso, recompilado si EscalaAlerta cambió."""
+    global _compilado
+    version = _version()
+    if not _vigente(version):
+        with _lock:
+            if not _vigente(version):
+                _compilado = (version, palabras.Automata(pares()), time.monotonic())
+    return _compilado[1]
+
+
+def texto(nombre, descripcion):
+    return f"{nombre or ''} {descripcion or ''}"
+
+
+def clasificar(nombre, descripcion=None):
+    """Escala (1-3) según las palabras clave del nombre y la descripción, o 4 si no hay."""
+    return automata().buscar(texto(nombre, descripcion)) or SIN_ESCALA
+
+
+def invalidar():
+    """Sube la versión al hacer commit: todos los procesos recompilan."""
+    def _subir():
+        try:
+            cache.incr(_CLAVE_VERSION)
+        except ValueError:  # la versión ya no estaba en el caché: cualquier valor nuevo sirve
+            cache.set(_CLAVE_VERSION, time.time_ns(), None)
+
+    transaction.on_commit(_subir)
+
+
+# ---------------------------- Reclasificación masiva ----------------------------
+def _aplicar(resultados, filas):
+    """Guarda las escalas que cambiaron: un UPDATE por escala destino."""
+    por_escala = {}
+    cambiados = []
+    for pk, escala in resultados:
+        det = filas[pk]
+        if det.Escala != escala:
+            por_escala.setdefault(escala, []).append(pk)
+            cambiados.append((det, det.Escala))
+            det.Escala = escala
+    if not cambiados:
+        return 0
+    with transaction.atomic():
+        for escala, ids in por_escala.items():
+            DetalleAlerta.objects.filter(pk__in=ids).update(Escala=escala)
+        estadisticas.registrar_cambios_escala(cambiados)
+        cambios.registrar_lote([det.pk for det, _ in cambiados], "update")
+        tiempo_real.publicar_lote([det for det, _ in cambiados])
+        tiles.invalidar_puntos([(det.Latitud, det.Longitud) for det, _ in cambiados])
+    return len(cambiados)
+
+
+def reclasificar(todas=False, lote=None, workers=None, simular=False):
+    """
+    Reclasifica los incidentes sin escala (4) o, con `todas`, todos. Sólo cambian los que
+    tienen alguna palabra clave: una escala puesta a mano no vuelve a 4 por no coincidir.
+    Los lotes se clasifican en paralelo en un pool de procesos y se guardan a medida que
+    terminan.
+    Devuelve (revisados, cambiados). Para `manage.py reclasificar_escalas`.
+    """
+    lote = lote or LOTE
+    qs = DetalleAlerta.objects.only(
+        "idTipoIncidencia", "NombreIncidente", "Descripcion", "Escala", "FechaHora",
+        "EstadoIncidente", "Latitud", "Longitud",
+    ).order_by("idTipoIncidencia")
+    if not todas:
+        qs = qs.filter(Escala=SIN_ESCALA)
+
+    revisados = cambiados = 0
+    pendientes = []  # (futuro, {pk: det})
+
+    def vaciar(hasta):
+        nonlocal revisados, cambiados
+        while len(pendientes) > hasta:
+            futuro, filas = pendientes.pop(0)
+            resultados = futuro.result()
+            revisados += len(resultados)
+            resultados = [(pk, escala) for pk, escala in resultados if escala is not None]
+            if not simular:
+                cambiados += _aplicar(resultados, filas)
+            else:
+                cambiados += sum(1 for pk, escala in resultados if filas[pk].Escala != escala)
+
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers or WORKERS, mp_context=contexto,
+                             initializer=palabras.iniciar_proceso, initargs=(pares(),)) as pool:
+        ultimo = 0
+        while True:
+            # Por rango de pk: cada lote es una consulta por índice (sin OFFSET)
+            filas = {det.pk: det for det in qs.filter(idTipoIncidencia__gt=ultimo)[:lote]}
+            if not filas:
+                break
+            ultimo = max(filas)
+            trabajo = [(pk, texto(d.NombreIncidente, d.Descripcion)) for pk, d in filas.items()]
+            pendientes.append((pool.submit(palabras.clasificar_lote, trabajo, None), filas))
+            vaciar((workers or WORKERS) * 2)  # acota la memoria: pocos lotes en vuelo
+        vaciar(0)
+    return revisados, cambiados
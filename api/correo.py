@@ -0,0 +1,305 @@
+# api/correo.py — outbox de correos: encolar en la transacción y despachar con un pool fijo
+#
+# encolar() inserta un CorreoPendiente (durable: sobrevive a reinicios del worker).
+# Lo despachan CORREO_WORKERS hilos, cada uno con UNA conexión SMTP reutilizada para
+# todo su lote, con reintentos y backoff exponencial. El pool corre dentro del proceso
+# web (se arranca al primer encolar) o aparte con `manage.py procesar_correos`.
+# El cuerpo de los orígenes sensibles (reset de contraseña) se vacía al despacharse y
+# los enviados se purgan pasados CORREO_RETENCION_DIAS.
+#
+# Probar contra un SMTP local de depuración:
+#   python -m aiosmtpd -n -l localhost:1025   (o python -m smtpd -n -c DebuggingServer localhost:1025 en <=3.11)
+#   python manage.py procesar_correos --smtp localhost:1025
+
+import logging
+import mimetypes
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import timedelta
+from email.mime.image import MIMEImage
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import metricas, miniaturas
+from .models import CorreoPendiente
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, "CORREO_WORKERS", 2)
+LOTE = getattr(settings, "CORREO_LOTE", 20)
+MAX_INTENTOS = getattr(settings, "CORREO_MAX_INTENTOS", 6)
+BACKOFF_SEGUNDOS = getattr(settings, "CORREO_BACKOFF_SEGUNDOS", 30)
+# Correos "enviando" de un worker que murió vuelven a la cola pasado este tiempo
+RECLAMO_EXPIRA = timedelta(seconds=getattr(settings, "CORREO_RECLAMO_EXPIRA_SEGUNDOS", 600))
+POLL_SEGUNDOS = getattr(settings, "CORREO_POLL_SEGUNDOS", 5)
+# Imágenes más grandes no se embeben (no se cargan enteras en memoria)
+ADJUNTO_MAX_BYTES = getattr(settings, "CORREO_ADJUNTO_MAX_BYTES", 5 * 1024 * 1024)
+POOL_EN_PROCESO = getattr(settings, "CORREO_POOL_EN_PROCESO", True)
+# Orígenes con secretos en el cuerpo (enlaces de reset): se vacía al enviarse o fallar
+ORIGENES_SENSIBLES = frozenset(getattr(settings, "CORREO_ORIGENES_SENSIBLES", ("reset_password",)))
+# Los enviados se borran pasados estos días (purgar(), una vez por PURGA_SEGUNDOS en el pool)
+RETENCION_DIAS = getattr(settings, "CORREO_RETENCION_DIAS", 7)
+PURGA_SEGUNDOS = getattr(settings, "CORREO_PURGA_SEGUNDOS", 3600)
+
+
+def adjunto_embebible(archivo):
+    """
+    True si el FieldFile se puede embeber (cid:): se embebe su vista previa
+    (api.miniaturas, también para videos) o, sin Pillow, la imagen si es pequeña.
+    """
+    if not archivo:
+        return False
+    if miniaturas.disponible(archivo.name):
+        return True
+    tipo, _ = mimetypes.guess_type(archivo.name)
+    try:
+        return bool(tipo and tipo.startswith("image/") and archivo.size <= ADJUNTO_MAX_BYTES)
+    except OSError:
+        return False
+
+
+def encolar(origen, asunto, destinatario, texto, html=None, adjunto_inline=None):
+    """
+    Inserta el correo en el outbox. Llamar dentro de la transacción del cambio
+    que lo origina: el despacho se dispara recién al hacer commit.
+    """
+    correo = CorreoPendiente.objects.create(
+        Origen=origen,
+        Asunto=asunto[:250],
+        Destinatario=destinatario,
+        CuerpoTexto=texto,
+        CuerpoHtml=html,
+        AdjuntoInline=adjunto_inline,
+    )
+    if POOL_EN_PROCESO:
+        transaction.on_commit(despertar)
+    return correo
+
+
+def encolar_lote(correos):
+    """
+    Inserta varios correos en un solo INSERT. `correos`: dicts con los argumentos
+    de `encolar` (origen, asunto, destinatario, texto, html, adjunto_inline).
+    """
+    nuevos = CorreoPendiente.objects.bulk_create([
+        CorreoPendiente(
+            Origen=c["origen"],
+            Asunto=c["asunto"][:250],
+            Destinatario=c["destinatario"],
+            CuerpoTexto=c["texto"],
+            CuerpoHtml=c.get("html"),
+            AdjuntoInline=c.get("adjunto_inline"),
+        )
+        for c in correos
+    ], batch_size=500)
+    if nuevos and POOL_EN_PROCESO:
+        transaction.on_commit(despertar)
+    return nuevos
+
+
+def _backoff(intentos):
+    base = BACKOFF_SEGUNDOS * (2 ** (intentos - 1))
+    return timedelta(seconds=base * random.uniform(0.8, 1.2))
+
+
+def reclamar(limite=LOTE):
+    """
+    Marca hasta `limite` correos listos como 'enviando' para este worker y los devuelve.
+    SKIP LOCKED en PostgreSQL; en otras bases el token de reclamo evita duplicados.
+    """
+    ahora = timezone.now()
+    listos = (
+        Q(Estado="pendiente", ProximoIntento__lte=ahora)
+        | Q(Estado="enviando", ReclamadoEn__lt=ahora - RECLAMO_EXPIRA)
+    )
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        ids = list(
+            CorreoPendiente.objects.select_for_update(skip_locked=True)
+            .filter(listos).order_by("ProximoIntento")
+            .values_list("idCorreo", flat=True)[:limite]
+        )
+        if not ids:
+            return []
+        CorreoPendiente.objects.filter(listos, idCorreo__in=ids).update(
+            Estado="enviando", Reclamo=token, ReclamadoEn=ahora)
+    return list(CorreoPendiente.objects.filter(Reclamo=token).order_by("idCorreo"))
+
+
+def _mensaje(correo, conexion):
+    msg = EmailMultiAlternatives(
+        correo.Asunto, correo.CuerpoTexto, settings.DEFAULT_FROM_EMAIL,
+        [correo.Destinatario], connection=conexion,
+    )
+    if correo.CuerpoHtml:
+        msg.attach_alternative(correo.CuerpoHtml, "text/html")
+    if correo.AdjuntoInline:
+        # La vista previa de ~100 KB en lugar del original de varios MB
+        ruta = miniaturas.previa_para_correo(correo.AdjuntoInline)
+        if ruta and os.path.getsize(ruta) <= ADJUNTO_MAX_BYTES:
+            tipo, _ = mimetypes.guess_type(ruta)
+            with open(ruta, "rb") as f:
+                # Subtipo por extensión: los nombres por contenido no dependen del cliente
+                imagen = MIMEImage(f.read(), _subtype=tipo.split("/")[1] if tipo else "jpeg")
+            imagen.add_header("Content-ID", "<imagen_reporte>")
+            imagen.add_header("Content-Disposition", "inline", filename=os.path.basename(ruta))
+            msg.attach(imagen)
+    return msg
+
+
+def _sin_cuerpo(correo):
+    """Cambios que vacían el cuerpo de un correo sensible ya despachado."""
+    if correo.Origen in ORIGENES_SENSIBLES:
+        return {"CuerpoTexto": "", "CuerpoHtml": None}
+    return {}
+
+
+def _marcar_enviado(correo):
+    CorreoPendiente.objects.filter(pk=correo.pk, Reclamo=correo.Reclamo).update(
+        Estado="enviado", FechaEnvio=timezone.now(), UltimoError=None, Reclamo=None,
+        **_sin_cuerpo(correo))
+
+
+def _marcar_error(correo, error):
+    intentos = correo.Intentos + 1
+    cambios = {"Intentos": intentos, "UltimoError": str(error)[:2000], "Reclamo": None}
+    if intentos >= MAX_INTENTOS:
+        cambios["Estado"] = "fallido"
+        cambios.update(_sin_cuerpo(correo))
+    else:
+        cambios["Estado"] = "pendiente"
+        cambios["ProximoIntento"] = timezone.now() + _backoff(intentos)
+    CorreoPendiente.objects.filter(pk=correo.pk, Reclamo=correo.Reclamo).update(**cambios)
+
+
+def enviar_lote(correos, conexion):
+    """Envía los correos reclamados por la misma conexión SMTP. Devuelve cuántos salieron."""
+    enviados = 0
+    for correo in correos:
+        metricas.CORREOS_EN_CURSO.inc(origen=correo.Origen)
+        try:
+            with metricas.medir_correo(correo.Origen):
+                conexion.open()  # no-op si ya está abierta
+                _mensaje(correo, conexion).send()
+        except Exception as e:
+            logger.warning("Correo %s falló (intento %s): %s", correo.pk, correo.Intentos + 1, e)
+            _marcar_error(correo, e)
+            # La conexión puede haber quedado inutilizable: se reabre en el próximo envío
+            conexion.close()
+        else:
+            _marcar_enviado(correo)
+            enviados += 1
+        finally:
+            metricas.CORREOS_EN_CURSO.dec(origen=correo.Origen)
+    return enviados
+
+
+def procesar(conexion=None, limite=LOTE):
+    """Un ciclo: reclama un lote y lo envía. Devuelve cuántos correos se reclamaron."""
+    correos = reclamar(limite)
+    if correos:
+        enviar_lote(correos, conexion or get_connection())
+    return len(correos)
+
+
+def purgar(dias=None):
+    """
+    Borra los correos enviados hace más de `dias` (RETENCION_DIAS) y vacía el cuerpo
+    de los sensibles que quedaron fallidos. Devuelve cuántos se borraron.
+    """
+    dias = RETENCION_DIAS if dias is None else dias
+    CorreoPendiente.objects.filter(Estado="fallido", Origen__in=ORIGENES_SENSIBLES).exclude(
+        CuerpoTexto="").update(CuerpoTexto="", CuerpoHtml=None)
+    borrados, _ = CorreoPendiente.objects.filter(
+        Estado="enviado", FechaEnvio__lt=timezone.now() - timedelta(days=dias)).delete()
+    return borrados
+
+
+# ---------------------------- Pool de workers ----------------------------
+class Pool:
+    """CORREO_WORKERS hilos; cada uno conserva su conexión SMTP mientras haya trabajo."""
+
+    def __init__(self, workers=WORKERS, conexion_kwargs=None):
+        self.workers = workers
+        self.conexion_kwargs = conexion_kwargs or {}
+        self._evento = threading.Event()
+        self._detener = threading.Event()
+        self._hilos = []
+        self._pid = None
+        self._purga = threading.Lock()
+        self._ultima_purga = None
+
+    def iniciar(self):
+        if self._pid == os.getpid() and self._hilos:
+            return
+        self._pid = os.getpid()  # tras un fork los hilos del padre no existen
+        self._detener.clear()
+        self._hilos = [
+            threading.Thread(target=self._bucle, name=f"correo-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def despertar(self):
+        self.iniciar()
+        self._evento.set()
+
+    def detener(self, esperar=True):
+        self._detener.set()
+        self._evento.set()
+        if esperar:
+            for hilo in self._hilos:
+                hilo.join()
+        self._hilos = []
+
+    def _purgar_si_toca(self):
+        """Un solo hilo purga, a lo sumo una vez cada PURGA_SEGUNDOS."""
+        if not self._purga.acquire(blocking=False):
+            return
+        try:
+            ahora = time.monotonic()
+            if self._ultima_purga is not None and ahora - self._ultima_purga < PURGA_SEGUNDOS:
+                return
+            self._ultima_purga = ahora
+            purgados = purgar()
+            if purgados:
+                logger.info("Outbox: %s correos enviados purgados", purgados)
+        except Exception:
+            logger.exception("Error purgando el outbox de correos")
+        finally:
+            self._purga.release()
+
+    def _bucle(self):
+        conexion = get_connection(**self.conexion_kwargs)
+        try:
+            while not self._detener.is_set():
+                close_old_connections()
+                try:
+                    reclamados = procesar(conexion)
+                except Exception:
+                    logger.exception("Error despachando el outbox de correos")
+                    reclamados = 0
+                if reclamados:
+                    continue  # hay más trabajo: misma conexión SMTP, sin esperar
+                conexion.close()  # ocioso: liberar la conexión SMTP
+                self._purgar_si_toca()
+                self._evento.wait(POLL_SEGUNDOS)
+                self._evento.clear()
+        finally:
+            conexion.close()
+            connection.close()
+
+
+_pool = Pool()
+
+
+def despertar():
+    _pool.despertar()
@@ -0,0 +1,185 @@
+# api/dataset.py — datos sintéticos para medir consultas y endpoints con volumen real
+#
+# Todo se inserta con bulk_create (sin pasar por las vistas): no genera correos,
+# ni entradas en CambioAlerta, ni eventos push. Al final se reconstruye el rollup.
+
+import math
+import os
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import estadisticas
+from .models import (
+    Administrador, AtencionReporte, DetalleAlerta, EstadoAtencionReporte,
+    RolAutoridad, RolUsuario, Usuario,
+)
+
+# Zona de Lima Metropolitana (south, west, north, east)
+LIMA_BBOX = (-12.25, -77.15, -11.80, -76.85)
+PREFIJO_CORREO = "sintetico"
+CARPETA_ARCHIVOS = "archivos_alertas/sintetico"
+
+# Focos por distrito: (lat, lng, desvío en grados, peso relativo)
+FOCOS = (
+    (-11.9577, -77.0622, 0.012, 5),  # Los Olivos
+    (-12.0264, -77.0560, 0.015, 4),  # San Martín de Porres
+    (-12.0464, -77.0428, 0.010, 4),  # Cercado de Lima
+    (-12.0000, -76.9990, 0.020, 3),  # San Juan de Lurigancho
+    (-11.9360, -77.0540, 0.012, 3),  # Comas
+    (-12.0560, -77.1180, 0.012, 2),  # Callao
+    (-12.1211, -77.0297, 0.008, 2),  # Miraflores
+)
+ESCALAS_PESOS = {1: 40, 2: 30, 3: 20, 4: 10}
+TIPOS = (
+    ("Robo al paso", 3), ("Asalto a mano armada", 3), ("Hurto de celular", 3),
+    ("Accidente de tránsito", 2), ("Choque vehicular", 2), ("Incendio", 2),
+    ("Vandalismo", 1), ("Daño a la propiedad", 1), ("Mascota perdida", 1),
+    ("Reporte sin clasificar", 4),
+)
+# Más incidentes de noche: peso por hora del día
+PESO_HORA = [3, 3, 2, 2, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 2, 2, 3, 3, 4, 5, 5, 5, 4, 4]
+
+# GIF 1x1 válido usado como archivo stub
+GIF_STUB = bytes.fromhex(
+    "47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b"
+)
+
+
+def _elegir_peso(rnd, pesos):
+    return rnd.choices(list(pesos), weights=list(pesos.values()))[0]
+
+
+def _coordenada(rnd):
+    lat, lng, sd, _ = rnd.choices(FOCOS, weights=[f[3] for f in FOCOS])[0]
+    s, w, n, e = LIMA_BBOX
+    if rnd.random() < 0.2:  # ruido disperso en toda la ciudad
+        return rnd.uniform(s, n), rnd.uniform(w, e)
+    return (min(max(rnd.gauss(lat, sd), s), n), min(max(rnd.gauss(lng, sd), w), e))
+
+
+def _fecha(rnd, ahora, dias):
+    # Más reciente = más probable (decaimiento exponencial suave) y hora nocturna
+    dia = min(int(rnd.expovariate(3.0 / max(dias, 1))), dias - 1)
+    hora = rnd.choices(range(24), weights=PESO_HORA)[0]
+    base = timezone.localtime(ahora) - timedelta(days=dia)
+    fecha = base.replace(hour=hora, minute=rnd.randint(0, 59), second=rnd.randint(0, 59))
+    return min(fecha, ahora)
+
+
+def _estado(rnd, fecha, ahora):
+    # Los incidentes viejos están casi siempre resueltos
+    horas = (ahora - fecha).total_seconds() / 3600
+    p_resuelto = 1 - math.exp(-horas / 72)
+    if rnd.random() < p_resuelto:
+        return "Resuelto"
+    return "En proceso" if rnd.random() < 0.4 else "Pendiente"
+
+
+def sembrar_usuarios(n):
+    inicio = Usuario.objects.filter(correo__startswith=PREFIJO_CORREO).count()
+    Usuario.objects.bulk_create([
+        # Sin contraseña usable: estas cuentas no pueden iniciar sesión
+        # bulk_create no llama a save(): las claves normalizadas se ponen aquí
+        Usuario(nombre=f"{PREFIJO_CORREO}{i}", correo=f"{PREFIJO_CORREO}{i}@example.com",
+                NombreNormalizado=f"{PREFIJO_CORREO}{i}",
+                CorreoNormalizado=f"{PREFIJO_CORREO}{i}@example.com", password="!")
+        for i in range(inicio, inicio + n)
+    ], batch_size=1000)
+    return list(Usuario.objects.filter(correo__startswith=PREFIJO_CORREO)
+                .values_list("idUsuario", flat=True))
+
+
+def _archivos_stub(cantidad=8):
+    carpeta = os.path.join(settings.MEDIA_ROOT, CARPETA_ARCHIVOS)
+    os.makedirs(carpeta, exist_ok=True)
+    nombres = []
+    for i in range(cantidad):
+        nombre = f"stub_{i}.gif"
+        ruta = os.path.join(carpeta, nombre)
+        if not os.path.exists(ruta):
+            with open(ruta, "wb") as f:
+                f.write(GIF_STUB)
+        nombres.append(f"{CARPETA_ARCHIVOS}/{nombre}")
+    return nombres
+
+
+def sembrar_incidentes(n, usuarios, dias=180, fraccion_archivos=0.0, semilla=None):
+    """Inserta `n` DetalleAlerta repartidos en los últimos `dias` y reconstruye el rollup."""
+    rnd = random.Random(semilla)
+    ahora = timezone.now()
+    archivos = _archivos_stub() if fraccion_archivos else []
+    lote = []
+    for _ in range(n):
+        nombre, escala_tipo = rnd.choice(TIPOS)
+        lat, lng = _coordenada(rnd)
+        fecha = _fecha(rnd, ahora, dias)
+        det = DetalleAlerta(
+            Ubicacion=f"Lat {lat:.4f}, Lng {lng:.4f}",
+            NombreIncidente=nombre,
+            Descripcion=f"{nombre} (dato sintético)",
+            FechaHora=fecha,
+            Escala=escala_tipo if rnd.random() < 0.7 else _elegir_peso(rnd, ESCALAS_PESOS),
+            EstadoIncidente=_estado(rnd, fecha, ahora),
+            Latitud=lat,
+            Longitud=lng,
+            idUsuario_id=rnd.choice(usuarios) if usuarios else None,
+        )
+        if archivos and rnd.random() < fraccion_archivos:
+            det.Archivo.name = rnd.choice(archivos)
+        det.calcular_geohash()  # bulk_create no llama a save()
+        lote.append(det)
+        if len(lote) >= 5000:
+            DetalleAlerta.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        DetalleAlerta.objects.bulk_create(lote)
+    estadisticas.reconstruir()
+
+
+def _catalogos_atencion():
+    """Rol/autoridad/admin/estado mínimos que exige AtencionReporte."""
+    rol, _ = RolUsuario.objects.get_or_create(
+        NombreRol="Sintético", defaults={"Descripcion": "Rol para datos sintéticos"})
+    autoridad, _ = RolAutoridad.objects.get_or_create(
+        TipoAutoridad="Serenazgo (sintético)", idRolUsuario=rol)
+    admin, _ = Administrador.objects.get_or_create(
+        Nombre="Operador", Apellido="Sintético", idRolUsuario=rol)
+    estados = [
+        EstadoAtencionReporte.objects.get_or_create(Tipo=t)[0]
+        for t in ("En proceso", "Resuelto")
+    ]
+    return autoridad, admin, estados
+
+
+def sembrar_atenciones(fraccion, semilla=None):
+    """Crea una AtencionReporte para una fracción de los incidentes no Pendiente."""
+    rnd = random.Random(semilla)
+    autoridad, admin, estados = _catalogos_atencion()
+    candidatos = (
+        DetalleAlerta.objects
+        .exclude(EstadoIncidente="Pendiente")
+        .filter(atenciones__isnull=True)
+        .values_list("idTipoIncidencia", "FechaHora", "EstadoIncidente")
+    )
+    lote = []
+    creadas = 0
+    for pk, fecha, estado in candidatos.iterator(chunk_size=5000):
+        if rnd.random() >= fraccion:
+            continue
+        lote.append(AtencionReporte(
+            idTipoIncidencia_id=pk,
+            idEstadoReporte=estados[1] if estado == "Resuelto" else estados[0],
+            idRolAutoridad=autoridad,
+            idAdministrador=admin,
+            FechaHoraAtencion=fecha + timedelta(minutes=rnd.randint(5, 600)),
+        ))
+        if len(lote) >= 5000:
+            creadas += len(AtencionReporte.objects.bulk_create(lote))
+            lote = []
+    if lote:
+        creadas += len(AtencionReporte.objects.bulk_create(lote))
+    estadisticas.reconstruir()
+    return creadas
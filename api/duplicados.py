@@ -0,0 +1,285 @@
+# api/duplicados.py — reportes duplicados del mismo hecho
+#
+# Cuando pasa algo en una avenida, decenas de vecinos reportan casi lo mismo en minutos.
+# Un reporte es duplicado de un incidente canónico si está a menos de DUPLICADOS_RADIO_METROS,
+# dentro de DUPLICADOS_VENTANA_MINUTOS y con NombreIncidente parecido. El duplicado queda
+# enlazado (DetalleAlerta.idCanonico) y sólo los canónicos cuentan en ResumenDiarioAlerta,
+# el mapa de calor y la lista de gestión; el cambio de estado de un canónico se propaga a
+# sus duplicados.
+#
+# Al registrar: la búsqueda usa las celdas geohash del radio (índice de Geohash) y
+# refina con la distancia real. Para el historial: `manage.py agrupar_duplicados` recorre
+# los incidentes en orden de fecha con una grilla en memoria.
+
+import math
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from . import cambios, estadisticas, geohash, palabras, tiempo_real, tiles
+from .models import DetalleAlerta
+
+ACTIVO = getattr(settings, "DUPLICADOS_ACTIVO", True)
+RADIO_METROS = getattr(settings, "DUPLICADOS_RADIO_METROS", 150)
+VENTANA = timedelta(minutes=getattr(settings, "DUPLICADOS_VENTANA_MINUTOS", 60))
+SIMILITUD_MINIMA = getattr(settings, "DUPLICADOS_SIMILITUD", 0.5)
+LOTE = 1000
+
+_METROS_POR_GRADO = 111_320.0
+_VACIAS = {"de", "del", "la", "las", "el", "los", "en", "un", "una", "y", "a", "al", "por", "con", "se"}
+
+
+# ---------------------------- Criterios ----------------------------
+def distancia_metros(lat1, lng1, lat2, lng2):
+    """Haversine (radio medio de la Tierra)."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6_371_000 * math.asin(min(1.0, math.sqrt(a)))
+
+
+def fichas(nombre):
+    """Palabras significativas del nombre, sin tildes ni mayúsculas."""
+    return frozenset(p for p in palabras.normalizar(nombre).split() if p not in _VACIAS)
+
+
+def similitud(a, b):
+    """
+    Fracción de las palabras del nombre más corto presentes en el otro:
+    "Robo" ~ "Robo de celular" = 1.0, "Choque" ~ "Incendio" = 0.0.
+    """
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def _grados(lat, metros):
+    """(grados de latitud, grados de longitud) equivalentes a `metros` en esa latitud."""
+    alto = metros / _METROS_POR_GRADO
+    return alto, alto / max(math.cos(math.radians(lat)), 0.01)
+
+
+def _coincide(lat, lng, fichas_nombre, candidato):
+    c_lat, c_lng, c_fichas = candidato
+    distancia = distancia_metros(lat, lng, c_lat, c_lng)
+    if distancia > RADIO_METROS or similitud(fichas_nombre, c_fichas) < SIMILITUD_MINIMA:
+        return None
+    return distancia
+
+
+# ---------------------------- Al registrar ----------------------------
+def buscar_canonico(lat, lng, fecha, nombre):
+    """
+    pk del incidente canónico del que este reporte sería duplicado, o None.
+    Sólo canónicos no resueltos: un hecho ya cerrado que se repite es un incidente nuevo.
+    """
+    if not ACTIVO or lat is None or lng is None:
+        return None
+    alto, ancho = _grados(lat, RADIO_METROS)
+    s, n, w, e = lat - alto, lat + alto, lng - ancho, lng + ancho
+    qs = DetalleAlerta.objects.filter(
+        idCanonico__isnull=True,
+        FechaHora__gte=fecha - VENTANA, FechaHora__lte=fecha + VENTANA,
+        Latitud__gte=s, Latitud__lte=n, Longitud__gte=w, Longitud__lte=e,
+    ).exclude(EstadoIncidente="Resuelto")
+    # Celdas geohash del radio: usa el índice parcial de Geohash (sólo canónicos activos)
+    celdas = geohash.celdas_bbox(s, w, n, e)
+    if celdas:
+        por_celda = Q()
+        for prefijo in celdas:
+            por_celda |= Q(Geohash__startswith=prefijo)
+        qs = qs.filter(por_celda)
+
+    mio = fichas(nombre)
+    mejor = None
+    for pk, c_lat, c_lng, c_nombre in qs.values_list(
+            "idTipoIncidencia", "Latitud", "Longitud", "NombreIncidente")[:200]:
+        distancia = _coincide(lat, lng, mio, (c_lat, c_lng, fichas(c_nombre)))
+        if distancia is not None and (mejor is None or distancia < mejor[0]):
+            mejor = (distancia, pk)
+    return mejor[1] if mejor else None
+
+
+class Grilla:
+    """
+    Índice en memoria por celdas de ~RADIO_METROS: cada punto sólo se compara con los
+    de su celda y las 8 vecinas. Las celdas guardan los puntos en orden de fecha y
+    descartan al consultar los que ya salieron de la ventana.
+    """
+
+    def __init__(self, lat_referencia):
+        self.alto, self.ancho = _grados(lat_referencia, RADIO_METROS)
+        self._celdas = defaultdict(deque)
+
+    def _celda(self, lat, lng):
+        return int(math.floor(lat / self.alto)), int(math.floor(lng / self.ancho))
+
+    def agregar(self, pk, fecha, lat, lng, fichas_nombre):
+        self._celdas[self._celda(lat, lng)].append((fecha, pk, lat, lng, fichas_nombre))
+
+    def buscar(self, fecha, lat, lng, fichas_nombre):
+        i, j = self._celda(lat, lng)
+        mejor = None
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                celda = self._celdas.get((i + di, j + dj))
+                if not celda:
+                    continue
+                while celda and fecha - celda[0][0] > VENTANA:
+                    celda.popleft()
+                for c_fecha, pk, c_lat, c_lng, c_fichas in celda:
+                    distancia = _coincide(lat, lng, fichas_nombre, (c_lat, c_lng, c_fichas))
+                    if distancia is not None and (mejor is None or distancia < mejor[0]):
+                        mejor = (distancia, pk)
+        return mejor[1] if mejor else None
+
+
+def enlazar_lote(dets):
+    """
+    Tras el bulk_create de registrar_incidentes_lote: busca el canónico de cada reporte
+    con una sola consulta (bbox y ventana de todo el lote) y agrupa también los reportes
+    del lote entre sí. Devuelve los dets que quedaron como duplicados (ya guardados).
+    """
+    candidatos = sorted(
+        (d for d in dets if d.Latitud is not None and d.Longitud is not None),
+        key=lambda d: (d.FechaHora, d.pk),
+    )
+    if not ACTIVO or not candidatos:
+        return []
+    alto, ancho = _grados(candidatos[0].Latitud, RADIO_METROS)
+    existentes = DetalleAlerta.objects.filter(
+        idCanonico__isnull=True,
+        FechaHora__gte=candidatos[0].FechaHora - VENTANA,
+        FechaHora__lte=candidatos[-1].FechaHora + VENTANA,
+        Latitud__gte=min(d.Latitud for d in candidatos) - alto,
+        Latitud__lte=max(d.Latitud for d in candidatos) + alto,
+        Longitud__gte=min(d.Longitud for d in candidatos) - ancho,
+        Longitud__lte=max(d.Longitud for d in candidatos) + ancho,
+    ).exclude(EstadoIncidente="Resuelto").exclude(
+        pk__in=[d.pk for d in candidatos]
+    ).order_by("FechaHora").values_list(
+        "idTipoIncidencia", "FechaHora", "Latitud", "Longitud", "NombreIncidente")
+
+    grilla = Grilla(candidatos[0].Latitud)
+    for pk, fecha, lat, lng, nombre in existentes:
+        grilla.agregar(pk, fecha, lat, lng, fichas(nombre))
+    enlazados = []
+    for det in candidatos:
+        mio = fichas(det.NombreIncidente)
+        canonico = grilla.buscar(det.FechaHora, det.Latitud, det.Longitud, mio)
+        if canonico is None:
+            grilla.agregar(det.pk, det.FechaHora, det.Latitud, det.Longitud, mio)
+        else:
+            det.idCanonico_id = canonico
+            enlazados.append(det)
+    if enlazados:
+        DetalleAlerta.objects.bulk_update(enlazados, ["idCanonico"], batch_size=500)
+    return enlazados
+
+
+# ---------------------------- Gestión ----------------------------
+def anotar_duplicados(qs):
+    """Agrega `cantidad_duplicados` (reportes enlazados) a un queryset de DetalleAlerta."""
+    conteo = (
+        DetalleAlerta.objects.filter(idCanonico=OuterRef("pk"))
+        .order_by().values("idCanonico").annotate(c=Count("pk")).values("c")
+    )
+    return qs.annotate(cantidad_duplicados=Coalesce(Subquery(conteo), 0))
+
+
+def propagar_estado(ids_canonicos, estado):
+    """Lleva el EstadoIncidente de los canónicos a sus duplicados (no cuentan en el resumen)."""
+    ids = list(
+        DetalleAlerta.objects.filter(idCanonico__in=ids_canonicos)
+        .exclude(EstadoIncidente=estado).values_list("idTipoIncidencia", flat=True)
+    )
+    if ids:
+        DetalleAlerta.objects.filter(pk__in=ids).update(EstadoIncidente=estado)
+        cambios.registrar_lote(ids, "update")
+    return len(ids)
+
+
+def promover(ids_duplicados):
+    """
+    Tras borrar un canónico (SET_NULL ya dejó sueltos a sus duplicados): el más antiguo
+    que sigue existiendo pasa a ser el canónico del resto y entra en el resumen.
+    """
+    hijos = list(DetalleAlerta.objects.filter(pk__in=ids_duplicados, idCanonico__isnull=True)
+                 .order_by("FechaHora", "idTipoIncidencia"))
+    if not hijos:
+        return None
+    nuevo, resto = hijos[0], hijos[1:]
+    if resto:
+        DetalleAlerta.objects.filter(pk__in=[h.pk for h in resto]).update(idCanonico=nuevo.pk)
+    estadisticas.registrar_alta(nuevo)
+    cambios.registrar_lote([h.pk for h in hijos], "update")
+    tiempo_real.publicar(nuevo)
+    tiles.invalidar(nuevo.Latitud, nuevo.Longitud)
+    return nuevo
+
+
+# ---------------------------- Historial ----------------------------
+def _fusionar(pares):
+    """Enlaza [(det, pk_canonico), ...] y saca a los duplicados del resumen y del mapa."""
+    dets = []
+    for det, canonico in pares:
+        det.idCanonico_id = canonico
+        dets.append(det)
+    with transaction.atomic():
+        DetalleAlerta.objects.bulk_update(dets, ["idCanonico"], batch_size=500)
+        estadisticas.registrar_fusiones(dets)
+        cambios.registrar_lote([d.pk for d in dets], "update")
+        tiempo_real.publicar_lote(dets, "delete")
+        tiles.invalidar_puntos([(d.Latitud, d.Longitud) for d in dets])
+
+
+def agrupar(desde=None, simular=False):
+    """
+    Agrupa los incidentes canónicos existentes (con coordenadas) en orden de fecha.
+    Devuelve (revisados, enlazados). Para `manage.py agrupar_duplicados`.
+    """
+    qs = DetalleAlerta.objects.filter(
+        idCanonico__isnull=True, Latitud__isnull=False, Longitud__isnull=False,
+    ).only(
+        "idTipoIncidencia", "FechaHora", "Latitud", "Longitud", "NombreIncidente",
+        "Escala", "EstadoIncidente",
+    ).order_by("FechaHora", "idTipoIncidencia")
+    if desde:
+        qs = qs.filter(FechaHora__gte=desde)
+
+    grilla = None
+    revisados = enlazados = 0
+    pendientes = []
+    for det in qs.iterator(chunk_size=LOTE):
+        revisados += 1
+        if grilla is None:
+            grilla = Grilla(det.Latitud)
+        mio = fichas(det.NombreIncidente)
+        canonico = grilla.buscar(det.FechaHora, det.Latitud, det.Longitud, mio)
+        if canonico is None:
+            grilla.agregar(det.pk, det.FechaHora, det.Latitud, det.Longitud, mio)
+            continue
+        enlazados += 1
+        pendientes.append((det, canonico))
+        if len(pendientes) >= LOTE and not simular:
+            _fusionar(pendientes)
+            pendientes = []
+    if pendientes and not simular:
+        _fusionar(pendientes)
+    return revisados, enlazados
+
+
+@transaction.atomic
+def separar_todos():
+    """Deshace todos los enlaces y recalcula el resumen. Devuelve cuántos se separaron."""
+    qs = DetalleAlerta.objects.filter(idCanonico__isnull=False)
+    puntos = list(qs.values_list("Latitud", "Longitud"))
+    separados = qs.update(idCanonico=None)
+    if separados:
+        estadisticas.reconstruir()
+        tiles.invalidar_puntos(puntos)
+    return separados
@@ -0,0 +1,240 @@
+# api/estadisticas.py — mantenimiento incremental de ResumenDiarioAlerta
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AtencionReporte, DetalleAlerta, ResumenDiarioAlerta
+
+
+def _clave(fecha_hora, escala, estado):
+    """(día local, escala, estado) del grupo al que pertenece un incidente."""
+    return (
+        timezone.localdate(fecha_hora),
+        escala,
+        estado or "Pendiente",
+    )
+
+
+def _ajustar(clave, total=0, con_atencion=0):
+    """
+    Suma `total` / `con_atencion` a la fila del grupo, creándola si no existe.
+    Debe llamarse dentro de la misma transacción que modifica DetalleAlerta.
+    """
+    if not total and not con_atencion:
+        return
+    fecha, escala, estado = clave
+    filtro = {"Fecha": fecha, "Escala": escala, "EstadoIncidente": estado}
+    cambios = {
+        "Total": F("Total") + total,
+        "ConAtencion": F("ConAtencion") + con_atencion,
+    }
+
+    if ResumenDiarioAlerta.objects.filter(**filtro).update(**cambios):
+        return
+    try:
+        # Savepoint: si otro request creó la fila a la vez, reintentamos el UPDATE
+        with transaction.atomic():
+            ResumenDiarioAlerta.objects.create(
+                Total=total, ConAtencion=con_atencion, **filtro)
+    except IntegrityError:
+        ResumenDiarioAlerta.objects.filter(**filtro).update(**cambios)
+
+
+def _tiene_atencion(id_incidente):
+    return AtencionReporte.objects.filter(idTipoIncidencia_id=id_incidente).exists()
+
+
+def registrar_alta(det):
+    """Nuevo DetalleAlerta (registrar_incidente). Los duplicados no cuentan."""
+    if det.idCanonico_id:
+        return
+    _ajustar(_clave(det.FechaHora, det.Escala, det.EstadoIncidente), total=1)
+
+
+def registrar_altas(dets):
+    """Lote de DetalleAlerta nuevos (registrar_incidentes_lote): un UPDATE por grupo."""
+    totales = Counter(
+        _clave(d.FechaHora, d.Escala, d.EstadoIncidente) for d in dets if not d.idCanonico_id)
+    for clave, total in totales.items():
+        _ajustar(clave, total=total)
+
+
+def registrar_cambio_estado(det, estado_anterior):
+    """Cambio de EstadoIncidente (gestion_update_incidente)."""
+    if det.idCanonico_id:
+        return
+    if (estado_anterior or "Pendiente") == (det.EstadoIncidente or "Pendiente"):
+        return
+    atendido = 1 if _tiene_atencion(det.pk) else 0
+    _ajustar(_clave(det.FechaHora, det.Escala, estado_anterior),
+             total=-1, con_atencion=-atendido)
+    _ajustar(_clave(det.FechaHora, det.Escala, det.EstadoIncidente),
+             total=1, con_atencion=atendido)
+
+
+def _mover(movimientos):
+    """
+    Mueve incidentes entre grupos: `movimientos` son (det, clave_anterior, clave_actual).
+    Una consulta de atenciones y un UPDATE por grupo afectado.
+    """
+    movimientos = [(d.pk, a, b) for d, a, b in movimientos if a != b and not d.idCanonico_id]
+    if not movimientos:
+        return
+    atendidos = set(
+        AtencionReporte.objects
+        .filter(idTipoIncidencia__in=[pk for pk, _, _ in movimientos])
+        .values_list("idTipoIncidencia", flat=True)
+    )
+    totales, con_atencion = Counter(), Counter()
+    for pk, anterior, actual in movimientos:
+        totales[anterior] -= 1
+        totales[actual] += 1
+        if pk in atendidos:
+            con_atencion[anterior] -= 1
+            con_atencion[actual] += 1
+    for clave in totales.keys() | con_atencion.keys():
+        _ajustar(clave, total=totales[clave], con_atencion=con_atencion[clave])
+
+
+def registrar_cambios_estado(cambios):
+    """
+    Lote de cambios de estado (gestion_update_incidentes_lote): `cambios` son pares
+    (det ya actualizado, estado_anterior).
+    """
+    _mover([
+        (d, _clave(d.FechaHora, d.Escala, anterior), _clave(d.FechaHora, d.Escala, d.EstadoIncidente))
+        for d, anterior in cambios
+    ])
+
+
+def registrar_cambios_escala(cambios):
+    """
+    Lote de cambios de escala (api.clasificador.reclasificar): `cambios` son pares
+    (det ya actualizado, escala_anterior).
+    """
+    _mover([
+        (d, _clave(d.FechaHora, anterior, d.EstadoIncidente), _clave(d.FechaHora, d.Escala, d.EstadoIncidente))
+        for d, anterior in cambios
+    ])
+
+
+def registrar_baja(det):
+    """DetalleAlerta eliminado (admin o cascada)."""
+    if det.idCanonico_id:
+        return
+    atendido = 1 if _tiene_atencion(det.pk) else 0
+    _ajustar(_clave(det.FechaHora, det.Escala, det.EstadoIncidente),
+             total=-1, con_atencion=-atendido)
+
+
+def registrar_fusiones(dets):
+    """Incidentes que pasaron a ser duplicados (api.duplicados): salen del resumen."""
+    if not dets:
+        return
+    atendidos = set(
+        AtencionReporte.objects
+        .filter(idTipoIncidencia__in=[d.pk for d in dets])
+        .values_list("idTipoIncidencia", flat=True)
+    )
+    totales, con_atencion = Counter(), Counter()
+    for d in dets:
+        clave = _clave(d.FechaHora, d.Escala, d.EstadoIncidente)
+        totales[clave] -= 1
+        if d.pk in atendidos:
+            con_atencion[clave] -= 1
+    for clave in totales:
+        _ajustar(clave, total=totales[clave], con_atencion=con_atencion[clave])
+
+
+def registrar_atencion(id_incidente, delta):
+    """
+    El incidente pasó a tener su primera AtencionReporte (delta=1)
+    o perdió la última (delta=-1).
+    """
+    det = (
+        DetalleAlerta.objects
+        .filter(pk=id_incidente, idCanonico__isnull=True)
+        .values("FechaHora", "Escala", "EstadoIncidente")
+        .first()
+    )
+    if det:
+        _ajustar(_clave(det["FechaHora"], det["Escala"], det["EstadoIncidente"]),
+                 con_atencion=delta)
+
+
+@transaction.atomic
+def reconstruir():
+    """Recalcula ResumenDiarioAlerta completo desde DetalleAlerta (sólo canónicos)."""
+    filas = (
+        DetalleAlerta.objects
+        .filter(idCanonico__isnull=True)
+        .annotate(
+            dia=TruncDate("FechaHora", tzinfo=timezone.get_current_timezone()),
+            atendido=Exists(
+                AtencionReporte.objects.filter(idTipoIncidencia=OuterRef("pk"))),
+        )
+        .values("dia", "Escala", "EstadoIncidente")
+        .annotate(
+            total=Count("pk"),
+            con_atencion=Count("pk", filter=Q(atendido=True)),
+        )
+    )
+    ResumenDiarioAlerta.objects.all().delete()
+    nuevos = ResumenDiarioAlerta.objects.bulk_create([
+        ResumenDiarioAlerta(
+            Fecha=f["dia"],
+            Escala=f["Escala"],
+            EstadoIncidente=f["EstadoIncidente"] or "Pendiente",
+            Total=f["total"],
+            ConAtencion=f["con_atencion"],
+        )
+        for f in filas
+    ], batch_size=1000)
+    return len(nuevos)
+
+
+def calcular_dashboard(hoy=None):
+    """
+    Estadísticas de dashboard_stats leídas sólo de ResumenDiarioAlerta
+    (dos consultas, independientes del tamaño de DetalleAlerta).
+    """
+    hoy = hoy or timezone.localdate()
+    inicio = hoy - timedelta(days=6)
+
+    escalas = list(
+        ResumenDiarioAlerta.objects
+        .values("Escala")
+        .annotate(total=Sum("Total"), con_atencion=Sum("ConAtencion"))
+    )
+    recientes = list(
+        ResumenDiarioAlerta.objects
+        .filter(Fecha__gte=inicio, Fecha__lte=hoy)
+        .values("Fecha", "Escala")
+        .annotate(total=Sum("Total"), con_atencion=Sum("ConAtencion"))
+    )
+
+    def _sum(filas, campo, **cond):
+        return sum(
+            int(f[campo] or 0) for f in filas
+            if all(f.get(k) == v for k, v in cond.items())
+        )
+
+    return {
+        "total_incidentes": _sum(escalas, "total"),
+        "casos_resueltos": _sum(escalas, "con_atencion"),
+        # Últimos 7 días a granularidad de día local
+        "alertas_activas": _sum(recientes, "total"),
+        "alertas_alta_escala": _sum(escalas, "total", Escala=3),
+        "alertas_media_escala": _sum(escalas, "total", Escala=2),
+        "alertas_baja_escala": _sum(escalas, "total", Escala=1),
+        "alertas_hoy": _sum(recientes, "total", Fecha=hoy),
+        "resueltas_hoy": _sum(recientes, "con_atencion", Fecha=hoy),
+        "por_dia": {
+            (f["Fecha"], f["Escala"]): int(f["total"] or 0) for f in recientes
+        },
+    }
@@ -0,0 +1,61 @@
+# api/exportacion.py — volcado completo de incidentes en streaming (memoria constante)
+
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Filas por lote del cursor del servidor (QuerySet.iterator)
+CHUNK_SIZE = getattr(settings, "INCIDENTES_STREAM_CHUNK_SIZE", 2000)
+
+FORMATOS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def formato_solicitado(request):
+    """
+    ?stream=1|json -> arreglo JSON, ?stream=ndjson -> un objeto por línea.
+    También acepta `Accept: application/x-ndjson`. None si no se pidió streaming.
+    """
+    valor = (request.GET.get("stream") or "").strip().lower()
+    if valor in {"1", "true", "json"}:
+        return "json"
+    if valor == "ndjson" or "application/x-ndjson" in request.META.get("HTTP_ACCEPT", ""):
+        return "ndjson"
+    return None
+
+
+def _dumps(obj):
+    return json.dumps(obj, cls=DjangoJSONEncoder)
+
+
+def _arreglo_json(filas, a_dict):
+    yield "["
+    primero = True
+    for fila in filas:
+        if primero:
+            primero = False
+            yield _dumps(a_dict(fila))
+        else:
+            yield "," + _dumps(a_dict(fila))
+    yield "]"
+
+
+def _ndjson(filas, a_dict):
+    for fila in filas:
+        yield _dumps(a_dict(fila)) + "\n"
+
+
+def respuesta_stream(qs, a_dict, formato):
+    """
+    Recorre `qs` con un cursor del servidor y emite cada fila convertida con
+    `a_dict` a medida que llega, sin armar la lista completa en memoria.
+    """
+    filas = qs.iterator(chunk_size=CHUNK_SIZE)
+    cuerpo = _ndjson(filas, a_dict) if formato == "ndjson" else _arreglo_json(filas, a_dict)
+    response = StreamingHttpResponse(cuerpo, content_type=FORMATOS[formato])
+    response["Cache-Control"] = "no-store"
+    return response
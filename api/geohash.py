@@ -0,0 +1,92 @@
+# api/geohash.py — geohash de las coordenadas de DetalleAlerta para filtrar por bbox
+#
+# Cada prefijo de un geohash es una celda de la grilla (más corto = celda más
+# grande), así una sola columna indexada sirve para todas las precisiones y
+# un bbox se traduce a unos pocos `LIKE 'prefijo%'` + refinamiento exacto.
+
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"  # orden ASCII: prefijos = rangos del índice
+PRECISION = 9  # ~4.8m x 4.8m
+MAX_CELDAS = 16
+
+
+def encode(lat, lng, precision=PRECISION):
+    lat_rango = [-90.0, 90.0]
+    lng_rango = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    n_bits = 0
+    par = True  # los bits pares son de longitud
+    while len(chars) < precision:
+        rango, valor = (lng_rango, lng) if par else (lat_rango, lat)
+        medio = (rango[0] + rango[1]) / 2
+        if valor >= medio:
+            bits = (bits << 1) | 1
+            rango[0] = medio
+        else:
+            bits <<= 1
+            rango[1] = medio
+        par = not par
+        n_bits += 1
+        if n_bits == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            n_bits = 0
+    return "".join(chars)
+
+
+def caja(prefijo):
+    """(s, w, n, e) de la celda de un geohash (o de uno de sus prefijos)."""
+    lat_rango = [-90.0, 90.0]
+    lng_rango = [-180.0, 180.0]
+    par = True
+    for c in prefijo:
+        valor = BASE32.index(c)
+        for bit in range(4, -1, -1):
+            rango = lng_rango if par else lat_rango
+            medio = (rango[0] + rango[1]) / 2
+            if (valor >> bit) & 1:
+                rango[0] = medio
+            else:
+                rango[1] = medio
+            par = not par
+    return lat_rango[0], lng_rango[0], lat_rango[1], lng_rango[1]
+
+
+def tamano_celda(precision):
+    """(alto en grados de latitud, ancho en grados de longitud) de una celda."""
+    total = 5 * precision
+    bits_lng = (total + 1) // 2
+    bits_lat = total // 2
+    return 180.0 / (1 << bits_lat), 360.0 / (1 << bits_lng)
+
+
+def _rango_indices(minimo, maximo, origen, paso):
+    return range(
+        int(math.floor((minimo - origen) / paso)),
+        int(math.floor((maximo - origen) / paso)) + 1,
+    )
+
+
+def celdas_bbox(s, w, n, e, max_celdas=MAX_CELDAS):
+    """
+    Prefijos de geohash que cubren el bbox, con la mayor precisión que no
+    pase de `max_celdas`. None si ni siquiera la precisión 1 alcanza.
+    """
+    mejor = None
+    for precision in range(1, PRECISION + 1):
+        alto, ancho = tamano_celda(precision)
+        filas = _rango_indices(s, n, -90.0, alto)
+        columnas = _rango_indices(w, e, -180.0, ancho)
+        if len(filas) * len(columnas) > max_celdas:
+            break
+        mejor = sorted({
+            encode(
+                min(90.0, -90.0 + (i + 0.5) * alto),
+                min(180.0, -180.0 + (j + 0.5) * ancho),
+                precision,
+            )
+            for i in filas for j in columnas
+        })
+    return mejor
@@ -0,0 +1,138 @@
+# api/heatmap.py — filtros compartidos del mapa de calor (REST y stream en tiempo real)
+
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import geohash
+from .models import DetalleAlerta
+
+VERDADEROS = {"1", "true", "t", "yes", "y"}
+
+
+def _parse_iso(dt_str):
+    if not dt_str:
+        return None
+    dt = parse_datetime(dt_str) or datetime.fromisoformat(dt_str)
+    # Normaliza a aware si viene naive
+    if dt and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_current_timezone())
+    return dt
+
+
+def _escala_to_intensity(escala: int | None) -> float:
+    return {1: 0.33, 2: 0.66, 3: 1.0}.get(int(escala or 1), 0.33)
+
+
+def punto(det):
+    """Punto del heatmap (con id) para un DetalleAlerta, usado por los eventos push."""
+    return {
+        "id": det.idTipoIncidencia,
+        "lat": det.Latitud,
+        "lng": det.Longitud,
+        "escala": det.Escala,
+        "estado": det.EstadoIncidente,
+        "fecha": det.FechaHora.isoformat(),
+    }
+
+
+class FiltroHeatmap:
+    """
+    Query params del mapa de calor:
+    incluir_resueltos, estado (csv), start, end, escala_min, escala_max,
+    bbox ("south,west,north,east") y limit.
+    """
+
+    def __init__(self, params):
+        self.incluir_resueltos = str(params.get("incluir_resueltos", "")).lower() in VERDADEROS
+
+        estados_csv = params.get("estado")  # p.ej. "Pendiente,En proceso"
+        self.estados = [s.strip() for s in (estados_csv or "").split(",") if s.strip()]
+
+        self.start = _parse_iso(params.get("start"))
+        self.end = _parse_iso(params.get("end"))
+
+        escala_min = params.get("escala_min")
+        escala_max = params.get("escala_max")
+        self.escala_min = int(escala_min) if escala_min else None
+        self.escala_max = int(escala_max) if escala_max else None
+
+        self.bbox = None
+        bbox = params.get("bbox")
+        if bbox:
+            try:
+                self.bbox = tuple(map(float, bbox.split(",")))
+                if len(self.bbox) != 4:
+                    self.bbox = None
+            except Exception:
+                self.bbox = None
+
+        try:
+            self.limit = int(params.get("limit") or 2000)
+        except Exception:
+            self.limit = 2000
+
+    def queryset(self):
+        qs = DetalleAlerta.objects.filter(
+            Latitud__isnull=False,
+            Longitud__isnull=False,
+            idCanonico__isnull=True,  # un punto por hecho, no por reporte
+        )
+
+        # --- filtros de estado ---
+        if not self.incluir_resueltos:
+            qs = qs.exclude(EstadoIncidente="Resuelto")
+        if self.estados:
+            qs = qs.filter(EstadoIncidente__in=self.estados)
+
+        # --- fechas ---
+        if self.start:
+            qs = qs.filter(FechaHora__gte=self.start)
+        if self.end:
+            qs = qs.filter(FechaHora__lte=self.end)
+
+        # --- escala ---
+        if self.escala_min is not None:
+            qs = qs.filter(Escala__gte=self.escala_min)
+        if self.escala_max is not None:
+            qs = qs.filter(Escala__lte=self.escala_max)
+
+        # --- bbox: celdas geohash en pantalla (índice) + refinamiento exacto ---
+        if self.bbox:
+            s, w, n, e = self.bbox
+            celdas = geohash.celdas_bbox(s, w, n, e)
+            if celdas:
+                por_celda = Q()
+                for prefijo in celdas:
+                    por_celda |= Q(Geohash__startswith=prefijo)
+                qs = qs.filter(por_celda)
+            qs = qs.filter(
+                Latitud__gte=s, Latitud__lte=n,
+                Longitud__gte=w, Longitud__lte=e
+            )
+        return qs
+
+    def coincide(self, p):
+        """
+        Aplica el mismo filtro a un punto de un evento push (ver `punto`).
+        `end` no se aplica: los clientes del stream suelen pedir end=ahora.
+        """
+        if p["lat"] is None or p["lng"] is None:
+            return False
+        if not self.incluir_resueltos and p["estado"] == "Resuelto":
+            return False
+        if self.estados and p["estado"] not in self.estados:
+            return False
+        if self.start and _parse_iso(p["fecha"]) < self.start:
+            return False
+        if self.escala_min is not None and p["escala"] < self.escala_min:
+            return False
+        if self.escala_max is not None and p["escala"] > self.escala_max:
+            return False
+        if self.bbox:
+            s, w, n, e = self.bbox
+            if not (s <= p["lat"] <= n and w <= p["lng"] <= e):
+                return False
+        return True
@@ -0,0 +1,90 @@
+# api/imagenes.py — generación de miniaturas (corre en los procesos del pool de api.miniaturas)
+#
+# Sin Django ni modelos: el pool usa procesos "spawn" que sólo importan este módulo.
+# Pillow es opcional (requirements.txt); los videos necesitan además `ffmpeg` en el PATH
+# para extraer el fotograma de portada.
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # sin Pillow no se generan miniaturas (se sirve el original)
+    Image = None
+
+EXT_VIDEO = {".mp4", ".mov", ".m4v", ".webm", ".mkv", ".avi", ".3gp"}
+EXT_IMAGEN = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff", ".heic"}
+
+
+def hay_pillow():
+    return Image is not None
+
+
+def hay_ffmpeg():
+    return shutil.which("ffmpeg") is not None
+
+
+def soporta_webp():
+    return Image is not None and features.check("webp")
+
+
+def es_video(ruta):
+    return os.path.splitext(ruta)[1].lower() in EXT_VIDEO
+
+
+def es_imagen(ruta):
+    return os.path.splitext(ruta)[1].lower() in EXT_IMAGEN
+
+
+def _portada(video, destino):
+    """Extrae un fotograma (1 s, o el primero si el video es más corto) como JPEG."""
+    for segundo in ("1", "0"):
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-ss", segundo, "-i", video,
+             "-frames:v", "1", "-q:v", "3", destino],
+            check=False, timeout=60, stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        if os.path.exists(destino) and os.path.getsize(destino) > 0:
+            return destino
+    raise ValueError("ffmpeg no pudo extraer un fotograma del video")
+
+
+def _guardar(img, destino, lado, formato, calidad):
+    copia = img.copy()
+    copia.thumbnail((lado, lado), Image.LANCZOS)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f"{destino}.tmp"
+    if formato == "WEBP":
+        copia.save(temporal, "WEBP", quality=calidad, method=4)
+    else:
+        copia.save(temporal, "JPEG", quality=calidad, optimize=True, progressive=True)
+    os.replace(temporal, destino)  # nunca se sirve un archivo a medio escribir
+
+
+def generar(origen, miniatura, previa, lado_miniatura, lado_previa, formato_miniatura="WEBP"):
+    """
+    Genera la miniatura (`lado_miniatura`, WEBP o JPEG) y la vista previa JPEG
+    (`lado_previa`, usada en los correos) de una imagen o video. `previa` puede ser None.
+    Devuelve la lista de archivos escritos.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow no está instalado")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fuente = _portada(origen, os.path.join(tmp, "portada.jpg")) if es_video(origen) else origen
+        with Image.open(fuente) as img:
+            # draft: los JPEG grandes se decodifican ya reducidos (mucho menos CPU y memoria)
+            img.draft("RGB", (lado_previa, lado_previa))
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            escritos = []
+            _guardar(img, miniatura, lado_miniatura, formato_miniatura, 70)
+            escritos.append(miniatura)
+            if previa:
+                _guardar(img, previa, lado_previa, "JPEG", 80)
+                escritos.append(previa)
+    return escritos
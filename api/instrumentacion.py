@@ -0,0 +1,195 @@
+# api/instrumentacion.py — consultas y tiempo de BD por request (Server-Timing + log estructurado)
+#
+# Cada conexión lleva un execute_wrapper permanente que anota en el RegistroConsultas
+# activo (un ContextVar). Así cuenta todo lo que pasa por el cursor de Django (ORM y SQL
+# crudo) sin depender de DEBUG, y también las vistas sync que ASGI corre en otro hilo
+# con su propia conexión (sync_to_async copia el contexto).
+
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metricas
+
+logger = logging.getLogger("api.consultas")
+
+# A partir de cuántas repeticiones de la misma consulta se avisa (posible N+1)
+UMBRAL_REPETIDAS = getattr(settings, "CONSULTAS_UMBRAL_REPETIDAS", 10)
+
+# Tablas de DatabaseCache: sus consultas son operaciones de caché (con Redis no serían SQL)
+# y se cuentan aparte, para que los presupuestos no dependan del backend del caché
+_TABLAS_CACHE = tuple(
+    f'"{c["LOCATION"]}"' for c in getattr(settings, "CACHES", {}).values()
+    if c.get("BACKEND", "").endswith("DatabaseCache")
+)
+# SQLite emite BEGIN/COMMIT por el cursor (PostgreSQL no): no son consultas
+_CONTROL_TRANSACCION = {"BEGIN", "COMMIT", "ROLLBACK"}
+
+
+_registro_actual = ContextVar("registro_consultas", default=None)
+
+
+class RegistroConsultas:
+    """
+    Acumula cantidad de consultas, tiempo total y repeticiones de un bloque.
+    `duplicadas`: misma SQL y mismos parámetros (trabajo repetido exacto).
+    `repetidas`: la plantilla SQL más repetida (firma típica de un N+1).
+    `cache`: consultas a la tabla de DatabaseCache (no suman en `consultas`).
+    """
+
+    def __init__(self, padre=None):
+        self.padre = padre  # registros anidados: el externo también cuenta
+        self.consultas = 0
+        self.cache = 0
+        self.segundos = 0.0
+        self._plantillas = Counter()
+        self._exactas = Counter()
+
+    def anotar(self, sql, params, segundos):
+        self.segundos += segundos
+        if sql in _CONTROL_TRANSACCION:
+            return
+        if _TABLAS_CACHE and any(t in sql for t in _TABLAS_CACHE):
+            self.cache += 1
+            return
+        self.consultas += 1
+        self._plantillas[sql] += 1
+        try:
+            self._exactas[(sql, repr(params))] += 1
+        except Exception:
+            pass
+
+    @property
+    def duplicadas(self):
+        return sum(n - 1 for n in self._exactas.values() if n > 1)
+
+    def mas_repetida(self):
+        """(sql, veces) de la plantilla más repetida, o (None, 0)."""
+        if not self._plantillas:
+            return None, 0
+        return self._plantillas.most_common(1)[0]
+
+    def resumen(self):
+        sql, veces = self.mas_repetida()
+        return {
+            "consultas": self.consultas,
+            "consultas_cache": self.cache,
+            "db_ms": round(self.segundos * 1000, 3),
+            "duplicadas": self.duplicadas,
+            "repetidas": veces,
+            "sql_repetida": sql if veces >= UMBRAL_REPETIDAS else None,
+        }
+
+
+def _wrapper(execute, sql, params, many, context):
+    registro = _registro_actual.get()
+    if registro is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        segundos = time.perf_counter() - inicio
+        while registro is not None:
+            registro.anotar(sql, params, segundos)
+            registro = registro.padre
+
+
+def _instalar(connection):
+    if _wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_wrapper)
+
+
+def _al_conectar(sender, connection, **kwargs):
+    _instalar(connection)
+
+
+connection_created.connect(_al_conectar, dispatch_uid="api.instrumentacion")
+
+
+@contextmanager
+def capturar():
+    """Cuenta las consultas ejecutadas dentro del bloque (en este contexto)."""
+    # Conexiones ya abiertas antes de importar este módulo
+    for alias in connections:
+        _instalar(connections[alias])
+    registro = RegistroConsultas(padre=_registro_actual.get())
+    token = _registro_actual.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_actual.reset(token)
+
+
+class InstrumentacionConsultasMiddleware:
+    """
+    Agrega `Server-Timing: db;dur=..;desc="N consultas", app;dur=..` a cada respuesta,
+    emite una línea JSON en el logger `api.consultas` y alimenta api.metricas. Las
+    consultas hechas mientras se itera una respuesta streaming no se cuentan (el header
+    ya fue enviado).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        with metricas.REQUESTS_EN_CURSO.en_curso(), capturar() as registro:
+            response = self.get_response(request)
+        self._reportar(request, response, registro, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        with metricas.REQUESTS_EN_CURSO.en_curso(), capturar() as registro:
+            response = await self.get_response(request)
+        self._reportar(request, response, registro, time.perf_counter() - inicio)
+        return response
+
+    def _reportar(self, request, response, registro, segundos):
+        datos = registro.resumen()
+        total_ms = round(segundos * 1000, 3)
+        timing = [
+            f'db;dur={datos["db_ms"]};desc="{datos["consultas"]} consultas"',
+            f"app;dur={total_ms}",
+        ]
+        if datos["duplicadas"]:
+            timing.append(f'dup;desc="{datos["duplicadas"]} duplicadas"')
+        previo = response.get("Server-Timing")
+        response["Server-Timing"] = ", ".join(([previo] if previo else []) + timing)
+
+        match = getattr(request, "resolver_match", None)
+        linea = {
+            "metodo": request.method,
+            "ruta": request.path,
+            "url_name": match.url_name if match else None,
+            "status": response.status_code,
+            "total_ms": total_ms,
+            **datos,
+        }
+        metricas.observar_request(
+            linea["url_name"], request.method, response.status_code, segundos,
+            registro.segundos, registro.consultas,
+            None if response.streaming else len(response.content),
+        )
+
+        if datos["sql_repetida"]:
+            logger.warning(json.dumps(linea, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(linea, ensure_ascii=False))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api import duplicados
+
+
+class Command(BaseCommand):
+    help = ("Enlaza los reportes existentes del mismo hecho (cerca, en la misma ventana y "
+            "con nombre parecido) a su incidente canónico.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", default=None,
+                            help="Sólo incidentes desde esta fecha ISO (p. ej. 2025-01-01T00:00)")
+        parser.add_argument("--simular", action="store_true",
+                            help="Sólo contar cuántos se enlazarían, sin guardar")
+        parser.add_argument("--separar", action="store_true",
+                            help="Deshacer todos los enlaces (p. ej. antes de cambiar el radio)")
+
+    def handle(self, *args, **options):
+        if options["separar"]:
+            separados = duplicados.separar_todos()
+            self.stdout.write(self.style.SUCCESS(f"Reportes separados: {separados}"))
+            return
+        desde = None
+        if options["desde"]:
+            desde = parse_datetime(options["desde"])
+            if desde is None:
+                raise CommandError("--desde no es una fecha ISO válida")
+            if timezone.is_naive(desde):
+                desde = timezone.make_aware(desde)
+        self.stdout.write(
+            f"Radio {duplicados.RADIO_METROS} m, ventana {duplicados.VENTANA}, "
+            f"similitud mínima {duplicados.SIMILITUD_MINIMA}")
+        revisados, enlazados = duplicados.agrupar(desde, options["simular"])
+        verbo = "se enlazarían" if options["simular"] else "enlazados"
+        self.stdout.write(self.style.SUCCESS(f"Incidentes revisados: {revisados}, {verbo}: {enlazados}"))
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchmark
+from api.testing import verificar_presupuestos
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide p50/p95, consultas y pico de memoria de cada endpoint de api/urls.py con el "
+        "cliente de pruebas de Django y emite el resultado en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iteraciones", type=int, default=20)
+        parser.add_argument("--escritura", action="store_true",
+                            help="Incluir endpoints que modifican la base (registro, PATCH, ...)")
+        parser.add_argument("--solo", nargs="+", metavar="CASO",
+                            help="Medir sólo estos casos")
+        parser.add_argument("--salida", help="Guardar el JSON en este archivo")
+        parser.add_argument("--comparar", metavar="JSON",
+                            help="Reporte anterior contra el que comparar el p50")
+        parser.add_argument("--presupuestos", action="store_true",
+                            help="Terminar con error si un caso excede su presupuesto de consultas")
+
+    def handle(self, *args, **options):
+        if options["iteraciones"] < 1:
+            raise CommandError("--iteraciones debe ser al menos 1")
+
+        reporte = benchmark.ejecutar(
+            iteraciones=options["iteraciones"],
+            escritura=options["escritura"],
+            solo=options["solo"],
+            progreso=lambda nombre: self.stderr.write(f"midiendo {nombre}..."),
+        )
+        texto = json.dumps(reporte, indent=2)
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                f.write(texto)
+            self.stderr.write(self.style.SUCCESS(f"Reporte guardado en {options['salida']}"))
+        else:
+            self.stdout.write(texto)
+
+        if options["comparar"]:
+            with open(options["comparar"], encoding="utf-8") as f:
+                anterior = json.load(f)
+            for caso, antes, ahora, variacion in benchmark.comparar(reporte, anterior):
+                estilo = self.style.ERROR if variacion > 10 else self.style.SUCCESS
+                self.stderr.write(estilo(
+                    f"{caso:<36} p50 {antes:>9.2f} -> {ahora:>9.2f} ms  ({variacion:+.1f}%)"))
+
+        if options["presupuestos"]:
+            excedidos = verificar_presupuestos(reporte["resultados"])
+            if excedidos:
+                raise CommandError("Presupuesto de consultas excedido: " + ", ".join(
+                    f"{caso} ({n} > {maximo})" for caso, n, maximo in excedidos))
@@ -0,0 +1,44 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import zonas_calor
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las zonas calientes (DBSCAN sobre los incidentes de cada ventana y escala "
+        "mínima) que sirve /api/alertas/zonas-calor/. Con --cada N repite cada N minutos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ventana", action="append", choices=list(zonas_calor.VENTANAS),
+                            help="Sólo esta ventana (repetible); por defecto todas")
+        parser.add_argument("--cada", type=int, metavar="MINUTOS",
+                            help="No terminar: recalcular cada MINUTOS (Ctrl+C para salir)")
+
+    def handle(self, *args, **options):
+        if options["cada"] is not None and options["cada"] < 1:
+            raise CommandError("--cada debe ser al menos 1 minuto")
+        self.stdout.write(
+            f"Radio {zonas_calor.EPS_METROS} m, mínimo {zonas_calor.MIN_PUNTOS} incidentes por núcleo")
+
+        if options["cada"] is None:
+            self._calcular(options["ventana"])
+            return
+
+        fin = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: fin.set())
+        while not fin.is_set():
+            self._calcular(options["ventana"])
+            fin.wait(options["cada"] * 60)
+
+    def _calcular(self, ventanas):
+        inicio = time.perf_counter()
+        resultado = zonas_calor.actualizar(ventanas)
+        detalle = ", ".join(f"{v}/escala>={e}: {n}" for (v, e), n in resultado.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Zonas calculadas en {time.perf_counter() - inicio:.2f} s ({detalle})"))
@@ -0,0 +1,126 @@
+import json
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api import dataset, paginacion
+from api.heatmap import FiltroHeatmap
+from api.models import CambioAlerta, DetalleAlerta, ResumenDiarioAlerta
+
+
+def _consultas():
+    """Consultas calientes de cada endpoint, armadas igual que en las vistas."""
+    uid = (
+        DetalleAlerta.objects.exclude(idUsuario__isnull=True)
+        .values_list("idUsuario_id", flat=True).first()
+    )
+    pagina = DetalleAlerta.objects.order_by(*paginacion.ORDEN)
+    medio = pagina.values_list("FechaHora", "idTipoIncidencia")[
+        max(DetalleAlerta.objects.count() // 2, 0):][:1]
+    cursor = medio[0] if medio else (timezone.now(), 0)
+
+    hoy = timezone.localdate()
+    tz = timezone.get_current_timezone()
+    desde = datetime.combine(hoy - timedelta(days=6), datetime.min.time(), tzinfo=tz)
+    hasta = datetime.combine(hoy + timedelta(days=1), datetime.min.time(), tzinfo=tz)
+    start = (timezone.now() - timedelta(days=14)).isoformat()
+    s, w, n, e = dataset.LIMA_BBOX
+    centro = ((s + n) / 2, (w + e) / 2)
+    bbox = f"{centro[0] - 0.02},{centro[1] - 0.02},{centro[0] + 0.02},{centro[1] + 0.02}"
+
+    return {
+        # listado de gestión / historial / todas_alertas (primera página y una intermedia)
+        "listado_primera_pagina": pagina[:paginacion.PAGE_SIZE_DEFAULT + 1],
+        "listado_pagina_cursor": pagina.filter(FechaHora__lte=cursor[0]).filter(
+            Q(FechaHora__lt=cursor[0]) | Q(FechaHora=cursor[0], idTipoIncidencia__lt=cursor[1])
+        )[:paginacion.PAGE_SIZE_DEFAULT + 1],
+        "mis_reportes": pagina.filter(idUsuario_id=uid)[:paginacion.PAGE_SIZE_DEFAULT + 1],
+        "resumen_por_dia": (
+            DetalleAlerta.objects
+            .filter(idUsuario_id=uid, FechaHora__gte=desde, FechaHora__lt=hasta)
+            .annotate(d=TruncDate("FechaHora")).values("d").annotate(cantidad=Count("pk"))
+        ),
+        "dashboard_rollup": (
+            ResumenDiarioAlerta.objects
+            .filter(Fecha__gte=hoy - timedelta(days=6), Fecha__lte=hoy)
+            .values("Fecha", "Escala").annotate(total=Sum("Total"))
+        ),
+        "heatmap_default": FiltroHeatmap({"start": start}).queryset()
+        .order_by("-FechaHora")
+        .values_list("Latitud", "Longitud", "Escala", "EstadoIncidente")[:2000],
+        "heatmap_bbox": FiltroHeatmap({"bbox": bbox}).queryset()
+        .order_by("-FechaHora")
+        .values_list("Latitud", "Longitud", "Escala", "EstadoIncidente")[:2000],
+        "delta_sync": CambioAlerta.objects.filter(Version__gt=0).order_by("Version")[:1001],
+    }
+
+
+def _usa_indice(plan):
+    if connection.vendor == "postgresql":
+        return "Index" in plan and 'Seq Scan on "DetalleAlerta"' not in plan \
+            and "Seq Scan on DetalleAlerta" not in plan
+    if connection.vendor == "sqlite":
+        return "USING" in plan and "INDEX" in plan
+    return "index" in plan.lower()
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN (ANALYZE en PostgreSQL) sobre las consultas de cada endpoint "
+        "e informa si usan índices. Con --sembrar inserta antes un dataset sintético."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sembrar", type=int, default=0,
+                            help="DetalleAlerta sintéticos a insertar antes de medir")
+        parser.add_argument("--usuarios", type=int, default=200,
+                            help="Usuarios sintéticos para repartir los incidentes sembrados")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+        parser.add_argument("--planes", action="store_true", help="Mostrar el plan completo")
+        parser.add_argument("--estricto", action="store_true",
+                            help="Terminar con error si alguna consulta no usa índice")
+
+    def handle(self, *args, **options):
+        if options["sembrar"]:
+            usuarios = dataset.sembrar_usuarios(options["usuarios"])
+            dataset.sembrar_incidentes(options["sembrar"], usuarios)
+
+        if connection.vendor == "postgresql":
+            # Estadísticas frescas: sin ellas el planner puede elegir seq scan
+            with connection.cursor() as cursor:
+                for tabla in ("DetalleAlerta", "ResumenDiarioAlerta", "CambioAlerta"):
+                    cursor.execute(f'ANALYZE "{tabla}"')
+            explain_kwargs = {"analyze": True, "buffers": True}
+        else:
+            explain_kwargs = {}
+
+        resultados = []
+        for nombre, qs in _consultas().items():
+            plan = qs.explain(**explain_kwargs)
+            resultados.append({
+                "consulta": nombre,
+                "usa_indice": _usa_indice(plan),
+                "plan": plan,
+            })
+
+        if options["json"]:
+            self.stdout.write(json.dumps({
+                "vendor": connection.vendor,
+                "filas_detalle_alerta": DetalleAlerta.objects.count(),
+                "consultas": resultados,
+            }, indent=2))
+        else:
+            for r in resultados:
+                estilo = self.style.SUCCESS if r["usa_indice"] else self.style.ERROR
+                self.stdout.write(estilo(
+                    f"{'índice' if r['usa_indice'] else 'SIN índice':>10}  {r['consulta']}"))
+                if options["planes"]:
+                    self.stdout.write(r["plan"] + "\n")
+
+        sin_indice = [r["consulta"] for r in resultados if not r["usa_indice"]]
+        if options["estricto"] and sin_indice:
+            raise CommandError(f"Consultas sin índice: {', '.join(sin_indice)}")
@@ -0,0 +1,57 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga un dataset sintético (usuarios, incidentes en Lima, atenciones y archivos "
+        "stub) con bulk_create, para medir consultas y endpoints con volumen de producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=1000)
+        parser.add_argument("--incidentes", type=int, default=100000)
+        parser.add_argument("--meses", type=int, default=6,
+                            help="Antigüedad máxima de los incidentes")
+        parser.add_argument("--atenciones", type=float, default=0.5,
+                            help="Fracción de incidentes no pendientes con AtencionReporte")
+        parser.add_argument("--archivos", type=float, default=0.1,
+                            help="Fracción de incidentes con un archivo stub adjunto")
+        parser.add_argument("--semilla", type=int, default=None,
+                            help="Semilla para repetir exactamente el mismo dataset")
+
+    def handle(self, *args, **options):
+        for campo in ("atenciones", "archivos"):
+            if not 0 <= options[campo] <= 1:
+                raise CommandError(f"--{campo} debe estar entre 0 y 1")
+
+        tiempos = {}
+        inicio = time.perf_counter()
+        usuarios = dataset.sembrar_usuarios(options["usuarios"])
+        tiempos["usuarios"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        dataset.sembrar_incidentes(
+            options["incidentes"], usuarios,
+            dias=options["meses"] * 30,
+            fraccion_archivos=options["archivos"],
+            semilla=options["semilla"],
+        )
+        tiempos["incidentes"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        atenciones = 0
+        if options["atenciones"]:
+            atenciones = dataset.sembrar_atenciones(options["atenciones"], semilla=options["semilla"])
+        tiempos["atenciones"] = time.perf_counter() - inicio
+
+        self.stdout.write(json.dumps({
+            "usuarios_sinteticos": len(usuarios),
+            "incidentes_insertados": options["incidentes"],
+            "atenciones_insertadas": atenciones,
+            "segundos": {k: round(v, 3) for k, v in tiempos.items()},
+        }, indent=2))
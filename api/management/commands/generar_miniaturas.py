@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api import imagenes, miniaturas
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas y vistas previas faltantes de los archivos de incidentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--todas", action="store_true",
+                            help="Regenerar también las que ya existen (p. ej. al cambiar MINIATURA_LADO)")
+        parser.add_argument("--limite", type=int, default=None, help="Máximo de incidentes a procesar")
+
+    def handle(self, *args, **options):
+        if not imagenes.hay_pillow():
+            self.stderr.write(self.style.ERROR("Pillow no está instalado: pip install Pillow"))
+            return
+        if not imagenes.hay_ffmpeg():
+            self.stdout.write(self.style.WARNING("ffmpeg no está en el PATH: se omiten los videos"))
+        ok, fallidas = miniaturas.procesar_pendientes(options["limite"], options["todas"])
+        self.stdout.write(self.style.SUCCESS(f"Miniaturas generadas: {ok}, omitidas/fallidas: {fallidas}"))
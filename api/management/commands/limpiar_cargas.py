@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import cargas
+
+
+class Command(BaseCommand):
+    help = "Borra las subidas reanudables abiertas que vencieron (CARGA_EXPIRA_HORAS) y sus archivos .part."
+
+    def handle(self, *args, **options):
+        total = cargas.limpiar_expiradas()
+        self.stdout.write(self.style.SUCCESS(f"Cargas vencidas eliminadas: {total}"))
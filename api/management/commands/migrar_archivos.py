@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api import almacenamiento
+
+
+class Command(BaseCommand):
+    help = ("Mueve los archivos de incidentes guardados con el nombre del cliente al "
+            "almacenamiento por contenido (SHA-256, deduplicado) y cuenta sus referencias.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--conservar", action="store_true",
+                            help="No borrar los archivos originales tras migrarlos")
+        parser.add_argument("--purgar", action="store_true",
+                            help="Borrar además los archivos que quedaron sin referencias")
+
+    def handle(self, *args, **options):
+        r = almacenamiento.migrar(conservar=options["conservar"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivos migrados: {r['archivos']} ({r['deduplicados']} ya existían), "
+            f"filas actualizadas: {r['filas']}, archivos faltantes: {r['faltantes']}"))
+        if options["purgar"]:
+            borrados = almacenamiento.purgar()
+            self.stdout.write(self.style.SUCCESS(f"Archivos sin referencias borrados: {borrados}"))
@@ -0,0 +1,60 @@
+import signal
+import threading
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from api import correo
+
+
+class Command(BaseCommand):
+    help = (
+        "Despacha el outbox de correos (CorreoPendiente) con un pool fijo de workers; "
+        "cada worker reutiliza su conexión SMTP. Con --una-vez vacía la cola, purga los "
+        "enviados de más de CORREO_RETENCION_DIAS y termina (para cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=correo.WORKERS)
+        parser.add_argument("--una-vez", action="store_true",
+                            help="Enviar lo pendiente (un worker) y salir")
+        parser.add_argument("--smtp", metavar="HOST:PUERTO",
+                            help="SMTP alternativo sin TLS ni credenciales (p. ej. localhost:1025)")
+
+    def handle(self, *args, **options):
+        conexion_kwargs = {}
+        if options["smtp"]:
+            host, _, puerto = options["smtp"].rpartition(":")
+            if not host or not puerto.isdigit():
+                raise CommandError("--smtp debe tener la forma HOST:PUERTO")
+            conexion_kwargs = {
+                "backend": "django.core.mail.backends.smtp.EmailBackend",
+                "host": host, "port": int(puerto),
+                "username": "", "password": "", "use_tls": False, "use_ssl": False,
+            }
+
+        if options["una_vez"]:
+            conexion = get_connection(**conexion_kwargs)
+            total = 0
+            try:
+                while True:
+                    reclamados = correo.procesar(conexion)
+                    if not reclamados:
+                        break
+                    total += reclamados
+            finally:
+                conexion.close()
+            purgados = correo.purgar()
+            self.stdout.write(self.style.SUCCESS(
+                f"Correos procesados: {total}, enviados purgados: {purgados}"))
+            return
+
+        pool = correo.Pool(workers=options["workers"], conexion_kwargs=conexion_kwargs)
+        fin = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: fin.set())
+        pool.iniciar()
+        self.stdout.write(f"Despachando correos con {options['workers']} workers (Ctrl+C para salir)")
+        while not fin.wait(1):
+            pass
+        pool.detener()
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api import clasificador
+
+
+class Command(BaseCommand):
+    help = "Asigna la escala por palabras clave (EscalaAlerta) a los incidentes sin escala."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--todas", action="store_true",
+                            help="Reclasificar todos los incidentes con alguna palabra clave, no sólo los "
+                                 "que tienen escala 4 (los demás conservan su escala)")
+        parser.add_argument("--lote", type=int, default=None,
+                            help=f"Incidentes por lote (por defecto {clasificador.LOTE})")
+        parser.add_argument("--workers", type=int, default=None,
+                            help=f"Procesos en paralelo (por defecto {clasificador.WORKERS})")
+        parser.add_argument("--simular", action="store_true",
+                            help="Sólo contar cuántos cambiarían, sin guardar")
+
+    def handle(self, *args, **options):
+        if not clasificador.pares():
+            self.stderr.write(self.style.ERROR("EscalaAlerta no tiene palabras clave reconocibles"))
+            return
+        revisados, cambiados = clasificador.reclasificar(
+            options["todas"], options["lote"], options["workers"], options["simular"])
+        verbo = "cambiarían" if options["simular"] else "cambiados"
+        self.stdout.write(self.style.SUCCESS(f"Incidentes revisados: {revisados}, {verbo}: {cambiados}"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import anomalias
+
+
+class Command(BaseCommand):
+    help = ("Reconstruye la línea base del detector de anomalías (ActividadCelda) con las "
+            "últimas semanas de DetalleAlerta. Correr al instalarlo o al cambiar la precisión.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--semanas", type=int, default=anomalias.HISTORIA_SEMANAS,
+                            help="Semanas de historia (inicio del detector)")
+
+    def handle(self, *args, **options):
+        if options["semanas"] < 1:
+            raise CommandError("--semanas debe ser al menos 1")
+        filas = anomalias.reconstruir(options["semanas"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Celdas x hora de la semana: {filas} ({options['semanas']} semanas, "
+            f"precisión {anomalias.PRECISION})"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api import estadisticas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye ResumenDiarioAlerta (rollup del dashboard) desde DetalleAlerta."
+
+    def handle(self, *args, **options):
+        filas = estadisticas.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"ResumenDiarioAlerta reconstruido: {filas} filas"))
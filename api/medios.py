@@ -0,0 +1,228 @@
+# api/medios.py — servir archivos de incidentes en producción (MEDIA_URL)
+#
+# La vista autoriza y luego delega la transferencia al servidor web:
+#   MEDIOS_SERVIDOR = "nginx"  -> X-Accel-Redirect a MEDIOS_ACCEL_PREFIJO (location internal)
+#   MEDIOS_SERVIDOR = "apache" -> X-Sendfile con la ruta absoluta (mod_xsendfile)
+#   MEDIOS_SERVIDOR = ""       -> el worker envía el archivo (FileResponse) con soporte de Range
+#
+# nginx:
+#   location /media-interno/ { internal; alias /ruta/a/MEDIA_ROOT/; }
+#
+# Autorización: URL firmada (la emiten los serializers a quien ya puede ver el reporte;
+# sirve para <img>/<video>, que no mandan el header Authorization) o usuario autenticado
+# (JWT o sesión del admin) dueño del reporte, administrador o staff.
+
+import base64
+import hashlib
+import hmac
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import almacenamiento, miniaturas, roles
+from .autenticacion import JWTAutenticacionCacheada
+from .models import DetalleAlerta, SesionCarga
+
+SERVIDOR = getattr(settings, "MEDIOS_SERVIDOR", "")
+ACCEL_PREFIJO = getattr(settings, "MEDIOS_ACCEL_PREFIJO", "/media-interno/")
+# Las firmas valen entre 1 y 2 ventanas; dentro de una ventana la URL no cambia (caché del navegador)
+FIRMA_SEGUNDOS = getattr(settings, "MEDIOS_FIRMA_SEGUNDOS", 24 * 3600)
+CACHE_INMUTABLE = getattr(settings, "MEDIOS_CACHE_SEGUNDOS", 365 * 24 * 3600)
+CACHE_LEGADO = 3600  # archivos con nombre del cliente: pueden cambiar
+_BLOQUE = 64 * 1024
+
+_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# ---------------------------- URLs firmadas ----------------------------
+def _firma(nombre, exp):
+    mac = hmac.new(settings.SECRET_KEY.encode(), f"medios:{nombre}:{exp}".encode(), hashlib.sha256)
+    return base64.urlsafe_b64encode(mac.digest()[:16]).rstrip(b"=").decode()
+
+
+def url(request, nombre):
+    """URL firmada de un archivo de MEDIA_ROOT (absoluta si hay request) o None."""
+    if not nombre:
+        return None
+    exp = (int(time.time()) // FIRMA_SEGUNDOS + 2) * FIRMA_SEGUNDOS
+    relativa = f"{settings.MEDIA_URL}{quote(nombre)}?exp={exp}&firma={_firma(nombre, exp)}"
+    return request.build_absolute_uri(relativa) if request else relativa
+
+
+def _firma_valida(request, nombre):
+    exp, firma = request.GET.get("exp", ""), request.GET.get("firma", "")
+    if not exp.isdigit() or int(exp) < time.time():
+        return False
+    return hmac.compare_digest(firma, _firma(nombre, exp))
+
+
+# ---------------------------- Autorización ----------------------------
+def _original(nombre):
+    """Archivo original del que deriva una miniatura/vista previa (o el mismo nombre)."""
+    carpeta, base = os.path.split(nombre)
+    if os.path.basename(carpeta) != miniaturas.CARPETA:
+        return nombre
+    for sufijo in (".previa.jpg", ".webp", ".jpg"):
+        if base.endswith(sufijo):
+            return os.path.join(os.path.dirname(carpeta), base[:-len(sufijo)])
+    return nombre
+
+
+def _usuario(request):
+    usuario = getattr(request, "user", None)
+    if usuario is not None and usuario.is_authenticated:
+        return usuario  # sesión del admin de Django
+    try:
+        resultado = JWTAutenticacionCacheada().authenticate(request)
+    except Exception:
+        return None
+    return resultado[0] if resultado else None
+
+
+def puede_ver(usuario, nombre):
+    if usuario.is_staff or roles.rol(usuario) == "admin":
+        return True
+    original = _original(nombre)
+    return (
+        DetalleAlerta.objects.filter(idUsuario=usuario)
+        .filter(Q(Archivo=original) | Q(Miniatura=nombre)).exists()
+        or SesionCarga.objects.filter(idUsuario=usuario, Archivo=original).exists()
+    )
+
+
+def _nombre_seguro(nombre):
+    partes = nombre.split("/")
+    # Ni rutas relativas, ni temporales (.entrantes), ni cargas a medio subir (.part)
+    if any(p in ("", ".", "..") or p.startswith(".") for p in partes) or nombre.endswith(".part"):
+        return None
+    return "/".join(partes)
+
+
+# ---------------------------- Respuesta ----------------------------
+def _rango(request, tamano, etag, modificado):
+    """(inicio, fin) pedido por Range, None para el archivo completo o "invalido" (416)."""
+    cabecera = request.headers.get("Range", "")
+    if not cabecera or request.method not in ("GET", "HEAD"):
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range not in (etag, http_date(modificado)):
+        return None  # el archivo cambió: se manda completo
+    m = _RANGO.match(cabecera.strip())
+    if not m:
+        return None  # multi-rango u otra unidad: se ignora (RFC 9110)
+    desde, hasta = m.groups()
+    if desde == "":
+        if hasta == "" or int(hasta) == 0:
+            return "invalido"
+        inicio, fin = max(0, tamano - int(hasta)), tamano - 1  # sufijo: últimos N bytes
+    else:
+        inicio = int(desde)
+        fin = min(int(hasta), tamano - 1) if hasta else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return "invalido"
+    return inicio, fin
+
+
+class _Porcion:
+    """Lector acotado a [inicio, fin] para FileResponse (sin tell/seek: no recalcula el largo)."""
+
+    def __init__(self, ruta, inicio, fin):
+        self._f = open(ruta, "rb")
+        self._f.seek(inicio)
+        self._restante = fin - inicio + 1
+
+    def read(self, n=-1):
+        if self._restante <= 0:
+            return b""
+        n = self._restante if n is None or n < 0 else min(n, self._restante)
+        datos = self._f.read(n)
+        self._restante -= len(datos)
+        return datos
+
+    def close(self):
+        self._f.close()
+
+
+def servir(request, nombre):
+    """
+    Ruta: MEDIA_URL<nombre> (p. ej. /media/archivos_alertas/ab/cd/<sha256>.jpg)
+    GET/HEAD con ETag, Last-Modified, Cache-Control largo y Range (videos).
+    """
+    if request.method not in ("GET", "HEAD"):
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+    nombre = _nombre_seguro(nombre)
+    if nombre is None:
+        raise Http404
+    if not _firma_valida(request, nombre):
+        usuario = _usuario(request)
+        if usuario is None:
+            return JsonResponse({"error": "No autorizado"}, status=401)
+        if not puede_ver(usuario, nombre):
+            return JsonResponse({"error": "Sin permiso para este archivo"}, status=403)
+
+    ruta = os.path.join(settings.MEDIA_ROOT, nombre)
+    try:
+        st = os.stat(ruta)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(ruta):
+        raise Http404
+
+    # Nombre = SHA-256 del contenido: nunca cambia (las miniaturas sí, si se regeneran)
+    inmutable = almacenamiento.es_contenido(nombre)
+    if inmutable:
+        etag = quote_etag(os.path.splitext(os.path.basename(nombre))[0])
+    else:
+        etag = quote_etag(f"{st.st_size:x}-{st.st_mtime_ns:x}")
+    modificado = int(st.st_mtime)
+    tipo = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+
+    def cabeceras(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(modificado)
+        # private: el archivo requiere autorización (ningún caché compartido lo guarda)
+        response["Cache-Control"] = (
+            f"private, max-age={CACHE_INMUTABLE}, immutable" if inmutable
+            else f"private, max-age={CACHE_LEGADO}"
+        )
+        response["Accept-Ranges"] = "bytes"
+        response["X-Content-Type-Options"] = "nosniff"
+        return response
+
+    no_modificado = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if no_modificado is not None:
+        return cabeceras(no_modificado)
+
+    # Offload: el servidor web hace la transferencia (y atiende Range por su cuenta)
+    if SERVIDOR == "nginx":
+        response = HttpResponse(content_type=tipo)
+        response["X-Accel-Redirect"] = ACCEL_PREFIJO + quote(nombre)
+        return cabeceras(response)
+    if SERVIDOR == "apache":
+        response = HttpResponse(content_type=tipo)
+        response["X-Sendfile"] = ruta
+        return cabeceras(response)
+
+    rango = _rango(request, st.st_size, etag, modificado)
+    if rango == "invalido":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{st.st_size}"
+        return cabeceras(response)
+    if rango is None:
+        # Archivo completo: con wsgi.file_wrapper el servidor WSGI puede usar sendfile()
+        response = FileResponse(open(ruta, "rb"), content_type=tipo)
+    else:
+        inicio, fin = rango
+        response = FileResponse(_Porcion(ruta, inicio, fin), status=206, content_type=tipo)
+        response["Content-Range"] = f"bytes {inicio}-{fin}/{st.st_size}"
+        response["Content-Length"] = fin - inicio + 1
+    response.block_size = _BLOQUE
+    return cabeceras(response)
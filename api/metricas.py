@@ -0,0 +1,318 @@
+# api/metricas.py — registro de métricas multi-proceso con exposición en formato Prometheus
+#
+# Cada proceso (worker de gunicorn/uvicorn) escribe sus valores en un archivo propio
+# mapeado en memoria dentro de METRICAS_DIR; /api/metricas suma los archivos de todos
+# los procesos. Los contadores e histogramas de procesos muertos se conservan (son
+# acumulativos); los gauges sólo cuentan procesos vivos.
+#
+# Formato del archivo: uint32 bytes usados | 4 bytes de relleno | registros
+#   registro = uint32 largo | clave utf-8 (rellenada a múltiplo de 8) | float64 valor
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+DIRECTORIO = getattr(settings, "METRICAS_DIR", "") or os.path.join(
+    tempfile.gettempdir(), "seguridad_metricas")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_TAMANO_INICIAL = 64 * 1024
+_CABECERA = 8
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class _ArchivoMmap:
+    """Diccionario clave -> float64 persistido en un archivo mmap (un escritor por archivo)."""
+
+    def __init__(self, ruta):
+        self._f = open(ruta, "a+b")
+        if os.fstat(self._f.fileno()).st_size == 0:
+            self._f.truncate(_TAMANO_INICIAL)
+        self._mm = mmap.mmap(self._f.fileno(), 0)
+        self._posiciones = {}
+        self._usado = struct.unpack_from("<I", self._mm, 0)[0] or _CABECERA
+        for clave, _, pos in _registros(self._mm, self._usado):
+            self._posiciones[clave] = pos
+
+    def _agregar(self, clave):
+        crudo = clave.encode("utf-8")
+        relleno = (8 - (4 + len(crudo)) % 8) % 8
+        largo = 4 + len(crudo) + relleno + 8
+        while self._usado + largo > len(self._mm):
+            nuevo = len(self._mm) * 2
+            self._mm.close()
+            self._f.truncate(nuevo)
+            self._mm = mmap.mmap(self._f.fileno(), 0)
+        struct.pack_into(f"<I{len(crudo) + relleno}sd", self._mm, self._usado,
+                         len(crudo), crudo, 0.0)
+        pos = self._usado + 4 + len(crudo) + relleno
+        self._usado += largo
+        # La cabecera se actualiza al final: un lector nunca ve un registro a medias
+        struct.pack_into("<I", self._mm, 0, self._usado)
+        self._posiciones[clave] = pos
+        return pos
+
+    def sumar(self, clave, delta):
+        pos = self._posiciones.get(clave) or self._agregar(clave)
+        valor = struct.unpack_from("<d", self._mm, pos)[0]
+        struct.pack_into("<d", self._mm, pos, valor + delta)
+
+
+def _registros(buf, usado):
+    pos = _CABECERA
+    while pos < usado:
+        largo = struct.unpack_from("<I", buf, pos)[0]
+        relleno = (8 - (4 + largo) % 8) % 8
+        clave = bytes(buf[pos + 4:pos + 4 + largo]).decode("utf-8")
+        pos_valor = pos + 4 + largo + relleno
+        yield clave, struct.unpack_from("<d", buf, pos_valor)[0], pos_valor
+        pos = pos_valor + 8
+
+
+def _leer(ruta):
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    if len(datos) < _CABECERA:
+        return []
+    usado = struct.unpack_from("<I", datos, 0)[0]
+    return [(clave, valor) for clave, valor, _ in _registros(datos, min(usado, len(datos)))]
+
+
+# Archivos del proceso actual (se reabren tras un fork: el pid cambia)
+_lock = threading.Lock()
+_archivos = {}
+_pid = None
+
+
+def _archivo(tipo):
+    global _pid
+    if _pid != os.getpid():
+        _archivos.clear()
+        _pid = os.getpid()
+    if tipo not in _archivos:
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        _archivos[tipo] = _ArchivoMmap(os.path.join(DIRECTORIO, f"{tipo}_{_pid}.db"))
+    return _archivos[tipo]
+
+
+def _sumar(tipo, clave, delta):
+    with _lock:
+        _archivo(tipo).sumar(clave, delta)
+
+
+def _clave(nombre, etiquetas, extra=""):
+    return json.dumps([nombre, etiquetas, extra], ensure_ascii=False)
+
+
+# ---------------------------- Tipos de métrica ----------------------------
+REGISTRO = []
+
+
+class _Metrica:
+    tipo = None
+    archivo = "acumulado"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        REGISTRO.append(self)
+
+    def _valores(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+        return [str(etiquetas[e]) for e in self.etiquetas]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **etiquetas):
+        _sumar(self.archivo, _clave(self.nombre, self._valores(etiquetas)), valor)
+
+
+class Gauge(_Metrica):
+    """Suma de los procesos vivos (p. ej. trabajos en curso)."""
+    tipo = "gauge"
+    archivo = "gauge"
+
+    def inc(self, valor=1, **etiquetas):
+        _sumar(self.archivo, _clave(self.nombre, self._valores(etiquetas)), valor)
+
+    def dec(self, valor=1, **etiquetas):
+        self.inc(-valor, **etiquetas)
+
+    @contextmanager
+    def en_curso(self, **etiquetas):
+        self.inc(**etiquetas)
+        try:
+            yield
+        finally:
+            self.dec(**etiquetas)
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **etiquetas):
+        valores = self._valores(etiquetas)
+        # Se guarda el conteo de cada bucket (no acumulado); la exposición lo acumula
+        indice = next((i for i, b in enumerate(self.buckets) if valor <= b), len(self.buckets))
+        with _lock:
+            archivo = _archivo(self.archivo)
+            archivo.sumar(_clave(self.nombre, valores, f"b{indice}"), 1)
+            archivo.sumar(_clave(self.nombre, valores, "sum"), valor)
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+
+# ---------------------------- Exposición ----------------------------
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _agregar_archivos():
+    totales = defaultdict(float)
+    if not os.path.isdir(DIRECTORIO):
+        return totales
+    for nombre in os.listdir(DIRECTORIO):
+        tipo, _, resto = nombre.partition("_")
+        if not resto.endswith(".db"):
+            continue
+        if tipo == "gauge":
+            try:
+                if not _proceso_vivo(int(resto[:-3])):
+                    continue
+            except ValueError:
+                continue
+        try:
+            for clave, valor in _leer(os.path.join(DIRECTORIO, nombre)):
+                totales[clave] += valor
+        except (OSError, struct.error, UnicodeDecodeError):
+            continue
+    return totales
+
+
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas_texto(nombres, valores, extra=()):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)] + list(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+def exposicion():
+    """Texto en formato de exposición de Prometheus (0.0.4) con todos los procesos."""
+    por_metrica = defaultdict(dict)
+    for clave, valor in _agregar_archivos().items():
+        nombre, valores, extra = json.loads(clave)
+        por_metrica[nombre][(tuple(valores), extra)] = valor
+
+    lineas = []
+    for m in REGISTRO:
+        lineas.append(f"# HELP {m.nombre} {m.ayuda}")
+        lineas.append(f"# TYPE {m.nombre} {m.tipo}")
+        muestras = por_metrica.get(m.nombre, {})
+        if m.tipo != "histogram":
+            for (valores, _), valor in sorted(muestras.items()):
+                lineas.append(f"{m.nombre}{_etiquetas_texto(m.etiquetas, valores)} {_numero(valor)}")
+            continue
+
+        for valores in sorted({v for v, _ in muestras}):
+            acumulado = 0
+            for i, limite in enumerate(m.buckets + (float("inf"),)):
+                acumulado += muestras.get((valores, f"b{i}"), 0)
+                le = f'le="{_numero(limite)}"'
+                lineas.append(f"{m.nombre}_bucket{_etiquetas_texto(m.etiquetas, valores, [le])} "
+                              f"{_numero(acumulado)}")
+            etiquetas = _etiquetas_texto(m.etiquetas, valores)
+            lineas.append(f"{m.nombre}_sum{etiquetas} {_numero(muestras.get((valores, 'sum'), 0))}")
+            lineas.append(f"{m.nombre}_count{etiquetas} {_numero(acumulado)}")
+    return "\n".join(lineas) + "\n"
+
+
+# ---------------------------- Métricas de la app ----------------------------
+REQUEST_SEGUNDOS = Histograma(
+    "seguridad_http_request_duration_seconds",
+    "Latencia de cada request por nombre de ruta (api/urls.py)", ("vista", "metodo"))
+REQUESTS = Contador(
+    "seguridad_http_requests_total", "Requests atendidos", ("vista", "metodo", "status"))
+REQUESTS_EN_CURSO = Gauge(
+    "seguridad_http_requests_in_progress", "Requests en curso en todos los workers")
+DB_SEGUNDOS = Histograma(
+    "seguridad_http_request_db_seconds", "Tiempo en la base de datos por request", ("vista",))
+CONSULTAS = Contador(
+    "seguridad_http_request_queries_total", "Consultas SQL ejecutadas", ("vista",))
+RESPUESTA_BYTES = Histograma(
+    "seguridad_http_response_size_bytes", "Tamaño del cuerpo de la respuesta (sin streaming)",
+    ("vista",), buckets=BUCKETS_BYTES)
+CORREO_SEGUNDOS = Histograma(
+    "seguridad_email_send_duration_seconds", "Duración del envío de cada correo", ("origen",))
+CORREOS = Contador(
+    "seguridad_email_sends_total", "Correos enviados por resultado", ("origen", "resultado"))
+CORREOS_EN_CURSO = Gauge(
+    "seguridad_email_sends_in_flight", "Correos del outbox enviándose en este momento",
+    ("origen",))
+AUTH_CACHE = Contador(
+    "seguridad_auth_user_cache_total",
+    "Usuarios de requests JWT resueltos desde el caché del proceso (hit) o la base (miss)",
+    ("resultado",))
+
+
+def observar_request(vista, metodo, status, segundos, db_segundos, consultas, tamano):
+    vista = vista or "sin_ruta"  # 404: no crear una serie por URL
+    REQUEST_SEGUNDOS.observar(segundos, vista=vista, metodo=metodo)
+    REQUESTS.inc(vista=vista, metodo=metodo, status=status)
+    DB_SEGUNDOS.observar(db_segundos, vista=vista)
+    if consultas:
+        CONSULTAS.inc(consultas, vista=vista)
+    if tamano is not None:
+        RESPUESTA_BYTES.observar(tamano, vista=vista)
+
+
+@contextmanager
+def medir_correo(origen):
+    """Mide un envío de correo: latencia y resultado (ok/error). Re-lanza la excepción."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        CORREOS.inc(origen=origen, resultado="error")
+        raise
+    else:
+        CORREOS.inc(origen=origen, resultado="ok")
+    finally:
+        CORREO_SEGUNDOS.observar(time.perf_counter() - inicio, origen=origen)
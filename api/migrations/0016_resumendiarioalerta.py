@@ -0,0 +1,58 @@
+# Generated by Django 5.1 on 2026-10-18 15:27
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def poblar_resumen(apps, schema_editor):
+    DetalleAlerta = apps.get_model('api', 'DetalleAlerta')
+    AtencionReporte = apps.get_model('api', 'AtencionReporte')
+    ResumenDiarioAlerta = apps.get_model('api', 'ResumenDiarioAlerta')
+
+    filas = (
+        DetalleAlerta.objects
+        .annotate(
+            dia=TruncDate('FechaHora', tzinfo=timezone.get_current_timezone()),
+            atendido=Exists(AtencionReporte.objects.filter(idTipoIncidencia=OuterRef('pk'))),
+        )
+        .values('dia', 'Escala', 'EstadoIncidente')
+        .annotate(total=Count('pk'), con_atencion=Count('pk', filter=Q(atendido=True)))
+    )
+    ResumenDiarioAlerta.objects.bulk_create([
+        ResumenDiarioAlerta(
+            Fecha=f['dia'],
+            Escala=f['Escala'],
+            EstadoIncidente=f['EstadoIncidente'] or 'Pendiente',
+            Total=f['total'],
+            ConAtencion=f['con_atencion'],
+        )
+        for f in filas
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_alter_detallealerta_escala'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioAlerta',
+            fields=[
+                ('idResumen', models.AutoField(primary_key=True, serialize=False)),
+                ('Fecha', models.DateField()),
+                ('Escala', models.PositiveSmallIntegerField(choices=[(1, 'Bajo'), (2, 'Medio'), (3, 'Alto'), (4, 'Pendiente (por asignar)')])),
+                ('EstadoIncidente', models.CharField(choices=[('Pendiente', 'Pendiente'), ('En proceso', 'En proceso'), ('Resuelto', 'Resuelto')], max_length=20)),
+                ('Total', models.IntegerField(default=0)),
+                ('ConAtencion', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'ResumenDiarioAlerta',
+                'constraints': [models.UniqueConstraint(fields=('Fecha', 'Escala', 'EstadoIncidente'), name='resumen_diario_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
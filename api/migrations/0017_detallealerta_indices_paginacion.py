@@ -0,0 +1,21 @@
+# Generated by Django 5.1 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_resumendiarioalerta'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detallealerta',
+            index=models.Index(fields=['-FechaHora', '-idTipoIncidencia'], name='detalle_fecha_pk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detallealerta',
+            index=models.Index(fields=['idUsuario', '-FechaHora', '-idTipoIncidencia'], name='detalle_usuario_fecha_idx'),
+        ),
+    ]
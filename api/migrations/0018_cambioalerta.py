@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-18 15:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def crear_contador(apps, schema_editor):
+    VersionCambios = apps.get_model('api', 'VersionCambios')
+    VersionCambios.objects.get_or_create(idVersion=1, defaults={'Valor': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_detallealerta_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioAlerta',
+            fields=[
+                ('idCambio', models.BigAutoField(primary_key=True, serialize=False)),
+                ('Version', models.BigIntegerField(unique=True)),
+                ('idTipoIncidencia', models.IntegerField()),
+                ('Operacion', models.CharField(choices=[('insert', 'insert'), ('update', 'update'), ('delete', 'delete')], max_length=10)),
+                ('FechaCambio', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'CambioAlerta',
+            },
+        ),
+        migrations.CreateModel(
+            name='VersionCambios',
+            fields=[
+                ('idVersion', models.AutoField(primary_key=True, serialize=False)),
+                ('Valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'VersionCambios',
+            },
+        ),
+        migrations.RunPython(crear_contador, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+from api import geohash
+
+
+def poblar_geohash(apps, schema_editor):
+    DetalleAlerta = apps.get_model('api', 'DetalleAlerta')
+    pendientes = (
+        DetalleAlerta.objects
+        .filter(Latitud__isnull=False, Longitud__isnull=False)
+        .only('idTipoIncidencia', 'Latitud', 'Longitud')
+    )
+    lote = []
+    for det in pendientes.iterator(chunk_size=2000):
+        det.Geohash = geohash.encode(det.Latitud, det.Longitud)
+        lote.append(det)
+        if len(lote) >= 2000:
+            DetalleAlerta.objects.bulk_update(lote, ['Geohash'])
+            lote = []
+    if lote:
+        DetalleAlerta.objects.bulk_update(lote, ['Geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_cambioalerta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallealerta',
+            name='Geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.RunPython(poblar_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_detallealerta_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detallealerta',
+            index=models.Index(condition=models.Q(('Latitud__isnull', False), ('Longitud__isnull', False), models.Q(('EstadoIncidente', 'Resuelto'), _negated=True)), fields=['-FechaHora'], include=('Latitud', 'Longitud', 'Escala', 'EstadoIncidente'), name='detalle_heatmap_activos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detallealerta',
+            index=models.Index(condition=models.Q(('EstadoIncidente', 'Resuelto'), _negated=True), fields=['Geohash'], name='detalle_geohash_activos_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-18 15:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_detallealerta_indices_heatmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoPendiente',
+            fields=[
+                ('idCorreo', models.BigAutoField(primary_key=True, serialize=False)),
+                ('Origen', models.CharField(max_length=40)),
+                ('Asunto', models.CharField(max_length=250)),
+                ('Destinatario', models.CharField(max_length=200)),
+                ('CuerpoTexto', models.TextField()),
+                ('CuerpoHtml', models.TextField(blank=True, null=True)),
+                ('AdjuntoInline', models.CharField(blank=True, max_length=300, null=True)),
+                ('Estado', models.CharField(choices=[('pendiente', 'pendiente'), ('enviando', 'enviando'), ('enviado', 'enviado'), ('fallido', 'fallido')], default='pendiente', max_length=10)),
+                ('Intentos', models.PositiveSmallIntegerField(default=0)),
+                ('ProximoIntento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('Reclamo', models.CharField(blank=True, max_length=32, null=True)),
+                ('ReclamadoEn', models.DateTimeField(blank=True, null=True)),
+                ('UltimoError', models.TextField(blank=True, null=True)),
+                ('FechaCreacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('FechaEnvio', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'CorreoPendiente',
+                'indexes': [models.Index(condition=models.Q(('Estado__in', ['pendiente', 'enviando'])), fields=['ProximoIntento'], name='correo_pendiente_cola_idx'), models.Index(fields=['Reclamo'], name='correo_pendiente_reclamo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1 on 2026-10-18 15:52
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_correopendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionCarga',
+            fields=[
+                ('idSesion', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('NombreArchivo', models.CharField(max_length=250)),
+                ('TipoContenido', models.CharField(blank=True, max_length=100, null=True)),
+                ('Tamano', models.BigIntegerField()),
+                ('Sha256', models.CharField(max_length=64)),
+                ('Recibido', models.BigIntegerField(default=0)),
+                ('Estado', models.CharField(choices=[('abierta', 'abierta'), ('completa', 'completa'), ('adjuntada', 'adjuntada')], default='abierta', max_length=10)),
+                ('Archivo', models.CharField(blank=True, max_length=300, null=True)),
+                ('FechaCreacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('FechaActualizacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('idTipoIncidencia', models.ForeignKey(blank=True, db_column='idTipoIncidencia', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sesiones_carga', to='api.detallealerta')),
+                ('idUsuario', models.ForeignKey(db_column='idUsuario', on_delete=django.db.models.deletion.CASCADE, related_name='sesiones_carga', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'SesionCarga',
+            },
+        ),
+    ]
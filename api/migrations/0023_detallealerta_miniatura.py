@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_sesioncarga'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallealerta',
+            name='Miniatura',
+            field=models.CharField(blank=True, editable=False, max_length=300, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-18 15:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_detallealerta_miniatura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoContenido',
+            fields=[
+                ('idArchivo', models.BigAutoField(primary_key=True, serialize=False)),
+                ('Ruta', models.CharField(max_length=300, unique=True)),
+                ('Sha256', models.CharField(db_index=True, max_length=64)),
+                ('Tamano', models.BigIntegerField()),
+                ('Referencias', models.PositiveIntegerField(default=0)),
+                ('FechaCreacion', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'ArchivoContenido',
+            },
+        ),
+    ]
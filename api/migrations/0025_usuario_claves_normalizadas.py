@@ -0,0 +1,71 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normalizar(valor):
+    if not valor:
+        return None
+    return unicodedata.normalize("NFKC", str(valor)).strip().casefold() or None
+
+
+def conflictos(usuarios):
+    """
+    [(campo, clave, [ids])] de las claves que comparten varias cuentas. `usuarios`:
+    (idUsuario, nombre, correo). Las cuentas sin nombre o sin correo no chocan.
+    """
+    por_clave = {}
+    for id_usuario, nombre, correo in usuarios:
+        for campo, valor in (("nombre", nombre), ("correo", correo)):
+            clave = _normalizar(valor)
+            if clave is not None:
+                por_clave.setdefault((campo, clave), []).append(id_usuario)
+    return [(campo, clave, ids) for (campo, clave), ids in por_clave.items() if len(ids) > 1]
+
+
+def poblar_claves(apps, schema_editor):
+    Usuario = apps.get_model("api", "Usuario")
+    usuarios = list(Usuario.objects.order_by("idUsuario").values_list("idUsuario", "nombre", "correo"))
+    # Cuentas que sólo difieren en mayúsculas: el login busca por la clave, así que una
+    # de ellas no podría entrar. No se elige cuál: hay que resolverlas antes de migrar.
+    choques = conflictos(usuarios)
+    if choques:
+        detalle = "\n".join(
+            f"  {campo} '{clave}': usuarios {', '.join(map(str, ids))}" for campo, clave, ids in choques)
+        raise RuntimeError(
+            "Hay cuentas cuyo nombre o correo sólo difiere en mayúsculas/acentos compatibles. "
+            "Renombrar o fusionar estas cuentas y volver a ejecutar migrate:\n" + detalle)
+    for id_usuario, nombre, correo in usuarios:
+        Usuario.objects.filter(pk=id_usuario).update(
+            NombreNormalizado=_normalizar(nombre), CorreoNormalizado=_normalizar(correo))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_archivocontenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='NombreNormalizado',
+            field=models.CharField(editable=False, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='CorreoNormalizado',
+            field=models.CharField(editable=False, max_length=200, null=True),
+        ),
+        migrations.RunPython(poblar_claves, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='usuario',
+            name='NombreNormalizado',
+            field=models.CharField(editable=False, max_length=200, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='usuario',
+            name='CorreoNormalizado',
+            field=models.CharField(editable=False, max_length=200, null=True, unique=True),
+        ),
+    ]
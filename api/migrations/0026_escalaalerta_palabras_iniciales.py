@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Las palabras que antes estaban fijas en views.determinar_escala
+PALABRAS_INICIALES = [
+    ("Alto", "robo, asalto, hurto, intento de asesinato, asesinato, homicidio"),
+    ("Medio", "accidente, choque, incendio, explosión"),
+    ("Bajo", "daño, vandalismo, desperfecto, mascota perdida, robo de mascota"),
+]
+
+
+def sembrar_palabras(apps, schema_editor):
+    EscalaAlerta = apps.get_model("api", "EscalaAlerta")
+    if EscalaAlerta.objects.exists():
+        return  # ya configuradas desde el admin
+    EscalaAlerta.objects.bulk_create([
+        EscalaAlerta(Descripcion=descripcion, palabra_clave=palabras)
+        for descripcion, palabras in PALABRAS_INICIALES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0025_usuario_claves_normalizadas"),
+    ]
+
+    operations = [
+        migrations.RunPython(sembrar_palabras, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-18 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_escalaalerta_palabras_iniciales'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='detallealerta',
+            name='detalle_heatmap_activos_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='detallealerta',
+            name='detalle_geohash_activos_idx',
+        ),
+        migrations.AddField(
+            model_name='detallealerta',
+            name='idCanonico',
+            field=models.ForeignKey(blank=True, db_column='idCanonico', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicados', to='api.detallealerta'),
+        ),
+        migrations.AddIndex(
+            model_name='detallealerta',
+            index=models.Index(condition=models.Q(('Latitud__isnull', False), ('Longitud__isnull', False), ('idCanonico__isnull', True), models.Q(('EstadoIncidente', 'Resuelto'), _negated=True)), fields=['-FechaHora'], include=('Latitud', 'Longitud', 'Escala', 'EstadoIncidente'), name='detalle_heatmap_activos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detallealerta',
+            index=models.Index(condition=models.Q(('idCanonico__isnull', True), models.Q(('EstadoIncidente', 'Resuelto'), _negated=True)), fields=['Geohash'], name='detalle_geohash_activos_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
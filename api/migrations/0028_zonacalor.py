@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-18 16:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_detallealerta_idcanonico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZonaCalor',
+            fields=[
+                ('idZona', models.BigAutoField(primary_key=True, serialize=False)),
+                ('Ventana', models.CharField(max_length=10)),
+                ('EscalaMinima', models.PositiveSmallIntegerField()),
+                ('Latitud', models.FloatField()),
+                ('Longitud', models.FloatField()),
+                ('RadioMetros', models.FloatField()),
+                ('Cantidad', models.IntegerField()),
+                ('Peso', models.FloatField()),
+                ('EscalaMaxima', models.PositiveSmallIntegerField()),
+                ('Casco', models.JSONField(default=list)),
+                ('PrimerReporte', models.DateTimeField()),
+                ('UltimoReporte', models.DateTimeField()),
+                ('FechaCalculo', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'ZonaCalor',
+                'indexes': [models.Index(fields=['Ventana', 'EscalaMinima', '-Peso'], name='zona_calor_ventana_idx')],
+            },
+        ),
+    ]
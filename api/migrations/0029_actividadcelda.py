@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_zonacalor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActividadCelda',
+            fields=[
+                ('idActividad', models.BigAutoField(primary_key=True, serialize=False)),
+                ('Celda', models.CharField(max_length=12)),
+                ('HoraSemana', models.PositiveSmallIntegerField()),
+                ('Hora', models.DateTimeField()),
+                ('Cantidad', models.IntegerField(default=0)),
+                ('Suma', models.IntegerField(default=0)),
+                ('SumaCuadrados', models.BigIntegerField(default=0)),
+                ('Desde', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'ActividadCelda',
+                'indexes': [models.Index(fields=['Hora'], name='actividad_celda_hora_idx')],
+                'constraints': [models.UniqueConstraint(fields=('Celda', 'HoraSemana'), name='actividad_celda_hora_uniq')],
+            },
+        ),
+    ]
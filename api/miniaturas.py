@@ -0,0 +1,185 @@
+# api/miniaturas.py — miniaturas y vistas previas de los archivos de incidentes
+#
+# Tras subir una foto/video se programa (al hacer commit) su procesamiento en un pool
+# de procesos: una miniatura de MINIATURA_LADO px (WebP, o JPEG si Pillow no trae WebP)
+# y una vista previa JPEG de PREVIA_LADO px para los correos. Ambas quedan junto al
+# original, en <carpeta>/miniaturas/. DetalleAlerta.Miniatura se llena al terminar y los
+# serializers la exponen como `thumbnail_url`. Los archivos ya existentes se procesan
+# con `manage.py generar_miniaturas`.
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import cambios, imagenes
+from .models import DetalleAlerta
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, "MINIATURAS_WORKERS", 2)
+MINIATURA_LADO = getattr(settings, "MINIATURA_LADO", 320)
+PREVIA_LADO = getattr(settings, "PREVIA_LADO", 1024)
+EN_PROCESO = getattr(settings, "MINIATURAS_EN_PROCESO", True)
+CARPETA = "miniaturas"
+
+
+def disponible(nombre):
+    """True si se puede generar la miniatura de este archivo en este servidor."""
+    if not nombre or not imagenes.hay_pillow():
+        return False
+    if imagenes.es_video(nombre):
+        return imagenes.hay_ffmpeg()
+    return imagenes.es_imagen(nombre)
+
+
+def rutas(nombre):
+    """(miniatura, previa) relativas a MEDIA_ROOT para el archivo original `nombre`."""
+    carpeta, base = os.path.split(nombre)
+    ext = ".webp" if imagenes.soporta_webp() else ".jpg"
+    return (
+        os.path.join(carpeta, CARPETA, base + ext),
+        os.path.join(carpeta, CARPETA, base + ".previa.jpg"),
+    )
+
+
+def _abs(nombre):
+    return os.path.join(settings.MEDIA_ROOT, nombre)
+
+
+def _argumentos(nombre):
+    miniatura, previa = rutas(nombre)
+    return (
+        _abs(nombre), _abs(miniatura), _abs(previa), MINIATURA_LADO, PREVIA_LADO,
+        "WEBP" if miniatura.endswith(".webp") else "JPEG",
+    )
+
+
+# ---------------------------- Pool de procesos ----------------------------
+_executor = None
+_pid = None
+
+
+def _pool():
+    global _executor, _pid
+    if _executor is None or _pid != os.getpid():
+        # spawn: los hijos no heredan hilos ni conexiones del worker web (sólo importan api.imagenes)
+        _executor = ProcessPoolExecutor(
+            max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        _pid = os.getpid()
+    return _executor
+
+
+def _guardar(id_incidente, nombre, futuro):
+    try:
+        futuro.result()
+    except Exception as e:
+        logger.warning("Miniatura de %s (incidente %s) falló: %s", nombre, id_incidente, e)
+        return False
+    miniatura, _ = rutas(nombre)
+    with transaction.atomic():
+        # Archivo=nombre: si el archivo cambió mientras tanto, no se pisa
+        actualizados = DetalleAlerta.objects.filter(
+            pk=id_incidente, Archivo=nombre).update(Miniatura=miniatura)
+        if actualizados:
+            cambios.registrar(id_incidente, "update")
+    return bool(actualizados)
+
+
+def _al_terminar(id_incidente, nombre):
+    def callback(futuro):
+        # Corre en el hilo de gestión del executor: usa y cierra su propia conexión
+        try:
+            _guardar(id_incidente, nombre, futuro)
+        except Exception:
+            logger.exception("No se pudo registrar la miniatura de %s", id_incidente)
+        finally:
+            connection.close()
+    return callback
+
+
+def enviar(id_incidente, nombre):
+    futuro = _pool().submit(imagenes.generar, *_argumentos(nombre))
+    futuro.add_done_callback(_al_terminar(id_incidente, nombre))
+    return futuro
+
+
+def programar(det):
+    """Programa la miniatura de `det` al hacer commit (llamar dentro de la transacción)."""
+    nombre = det.Archivo.name if det.Archivo else None
+    if not nombre:
+        return
+    miniatura, _ = rutas(nombre)
+    if os.path.exists(_abs(miniatura)):
+        # Mismo contenido ya procesado (api.almacenamiento lo comparte): se reutiliza
+        DetalleAlerta.objects.filter(pk=det.pk).update(Miniatura=miniatura)
+        det.Miniatura = miniatura
+        return
+    if not EN_PROCESO or not disponible(nombre):
+        return
+    id_incidente = det.idTipoIncidencia
+    transaction.on_commit(lambda: enviar(id_incidente, nombre))
+
+
+def procesar_pendientes(limite=None, todas=False, lote=None):
+    """
+    Genera las miniaturas faltantes (o todas) esperando cada lote. Devuelve
+    (procesadas, fallidas). Para `manage.py generar_miniaturas`.
+    """
+    qs = DetalleAlerta.objects.exclude(Archivo="").exclude(Archivo__isnull=True)
+    if not todas:
+        qs = qs.filter(Miniatura__isnull=True)
+    filas = qs.order_by("idTipoIncidencia").values_list("idTipoIncidencia", "Archivo")
+    if limite:
+        filas = filas[:limite]
+
+    lote = lote or WORKERS * 4
+    ok = fallidas = 0
+    pendientes = []
+
+    def vaciar():
+        nonlocal ok, fallidas
+        wait([f for _, _, f in pendientes])
+        for id_incidente, nombre, futuro in pendientes:
+            if _guardar(id_incidente, nombre, futuro):
+                ok += 1
+            else:
+                fallidas += 1
+        pendientes.clear()
+
+    for id_incidente, nombre in filas.iterator():
+        if not disponible(nombre) or not os.path.exists(_abs(nombre)):
+            fallidas += 1
+            continue
+        pendientes.append((id_incidente, nombre,
+                           _pool().submit(imagenes.generar, *_argumentos(nombre))))
+        if len(pendientes) >= lote:
+            vaciar()
+    vaciar()
+    return ok, fallidas
+
+
+def previa_para_correo(nombre):
+    """
+    Ruta absoluta de la imagen a embeber en un correo: la vista previa (generándola
+    en este hilo si aún no existe) o, si no se puede, el original tal cual. None si
+    no hay nada embebible.
+    """
+    if not nombre:
+        return None
+    if disponible(nombre):
+        _, previa = rutas(nombre)
+        if not os.path.exists(_abs(previa)):
+            try:
+                imagenes.generar(*_argumentos(nombre))
+            except Exception as e:
+                logger.warning("No se pudo generar la vista previa de %s: %s", nombre, e)
+        if os.path.exists(_abs(previa)):
+            return _abs(previa)
+    if imagenes.es_imagen(nombre) and os.path.exists(_abs(nombre)):
+        return _abs(nombre)
+    return None
+
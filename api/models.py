@@ -1,4 +1,7 @@
 # api/models.py
+import unicodedata
+import uuid
+
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import (
@@ -7,10 +10,26 @@ from django.contrib.auth.models import (
     BaseUserManager
 )
 
+def normalizar_clave(valor):
+    """Clave de búsqueda de nombre/correo: NFKC + casefold (sin distinguir mayúsculas)."""
+    if not valor:
+        return None
+    return unicodedata.normalize("NFKC", str(valor)).strip().casefold() or None
+
+
 # ========================
 #  MANAGER DE USUARIO
 # ========================
 class UsuarioManager(BaseUserManager):
+    def por_nombre(self, nombre):
+        """Usuario por nombre de login (índice único de NombreNormalizado) o None."""
+        clave = normalizar_clave(nombre)
+        return self.filter(NombreNormalizado=clave).first() if clave else None
+
+    def por_correo(self, correo):
+        clave = normalizar_clave(correo)
+        return self.filter(CorreoNormalizado=clave).first() if clave else None
+
     def create_user(self, correo, contra=None, **extra_fields):
         if not correo:
             raise ValueError("El usuario debe tener un correo")
@@ -42,6 +61,9 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     correo = models.CharField(max_length=200, unique=True)
     password = models.CharField(db_column="contra", max_length=250)
     fecha_creacion = models.DateTimeField(default=timezone.now)
+    # Claves normalizadas (normalizar_clave) para login y registro: búsqueda por índice único
+    NombreNormalizado = models.CharField(max_length=200, unique=True, null=True, editable=False)
+    CorreoNormalizado = models.CharField(max_length=200, unique=True, null=True, editable=False)
 
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
@@ -57,6 +79,16 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.nombre if self.nombre else self.correo
 
+    def save(self, *args, **kwargs):
+        self.NombreNormalizado = normalizar_clave(self.nombre)
+        self.CorreoNormalizado = normalizar_clave(self.correo)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            derivados = {"nombre": "NombreNormalizado", "correo": "CorreoNormalizado"}
+            kwargs["update_fields"] = set(update_fields) | {
+                derivados[f] for f in update_fields if f in derivados}
+        super().save(*args, **kwargs)
+
 
 # ========================
 #  DEMÁS TABLAS
@@ -213,6 +245,8 @@ class Alerta(models.Model):
 from django.db import models
 from django.utils import timezone
 
+from . import geohash
+
 class DetalleAlerta(models.Model):
     ESCALA_CHOICES = (
         (1, "Bajo"),
@@ -247,6 +281,8 @@ class DetalleAlerta(models.Model):
     NombreIncidente = models.CharField(max_length=250)
     Latitud = models.FloatField(null=True, blank=True)
     Longitud = models.FloatField(null=True, blank=True)
+    # Geohash de (Latitud, Longitud); sus prefijos son las celdas de la grilla (api/geohash.py)
+    Geohash = models.CharField(max_length=12, null=True, blank=True, db_index=True, editable=False)
     idUsuario = models.ForeignKey(
         'Usuario',
         on_delete=models.CASCADE,
@@ -256,8 +292,21 @@ class DetalleAlerta(models.Model):
         blank=True
     )
 
+    # Reporte repetido del mismo hecho (cerca y minutos después): apunta al incidente
+    # canónico. Conteos, mapa y gestión sólo usan los canónicos (api/duplicados.py)
+    idCanonico = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        related_name='duplicados',
+        db_column='idCanonico',
+        null=True,
+        blank=True,
+    )
+
     # >>> NUEVO CAMPO para foto o video
     Archivo = models.FileField(upload_to='archivos_alertas/', blank=True, null=True)
+    # Miniatura generada en segundo plano (api/miniaturas.py), relativa a MEDIA_ROOT
+    Miniatura = models.CharField(max_length=300, null=True, blank=True, editable=False)
 
     # >>> NUEVO CAMPO EstadoIncidente (sin FK) - Pendiente, En proceso, Resuelto
     ESTADO_INCIDENTE_CHOICES = (
@@ -273,6 +322,28 @@ class DetalleAlerta(models.Model):
 
     class Meta:
         db_table = 'DetalleAlerta'
+        indexes = [
+            # Paginación por cursor de los listados (orden -FechaHora, -pk)
+            models.Index(fields=['-FechaHora', '-idTipoIncidencia'], name='detalle_fecha_pk_idx'),
+            # mis_reportes / resumen: historial de un usuario
+            models.Index(fields=['idUsuario', '-FechaHora', '-idTipoIncidencia'], name='detalle_usuario_fecha_idx'),
+            # HeatmapAlertView por defecto (sin resueltos, con coordenadas, más recientes primero);
+            # INCLUDE permite un index-only scan en PostgreSQL
+            models.Index(
+                fields=['-FechaHora'],
+                name='detalle_heatmap_activos_idx',
+                condition=models.Q(Latitud__isnull=False, Longitud__isnull=False, idCanonico__isnull=True)
+                & ~models.Q(EstadoIncidente='Resuelto'),
+                include=['Latitud', 'Longitud', 'Escala', 'EstadoIncidente'],
+            ),
+            # HeatmapAlertView con bbox: prefijos geohash de incidentes no resueltos
+            models.Index(
+                fields=['Geohash'],
+                name='detalle_geohash_activos_idx',
+                opclasses=['varchar_pattern_ops'],
+                condition=models.Q(idCanonico__isnull=True) & ~models.Q(EstadoIncidente='Resuelto'),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.Ubicacion} - {self.idTipoIncidencia}"
@@ -280,6 +351,21 @@ class DetalleAlerta(models.Model):
     def escala_label(self):
         return dict(self.ESCALA_CHOICES).get(self.Escala, "")
 
+    def calcular_geohash(self):
+        if self.Latitud is None or self.Longitud is None:
+            self.Geohash = None
+        else:
+            self.Geohash = geohash.encode(self.Latitud, self.Longitud)
+        return self.Geohash
+
+    def save(self, *args, **kwargs):
+        # Mantener Geohash al día (bulk_create no pasa por aquí: llamar calcular_geohash)
+        self.calcular_geohash()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"Latitud", "Longitud"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"Geohash"}
+        super().save(*args, **kwargs)
+
 
 # --- ESCALA ALERTA ---
 class EscalaAlerta(models.Model):
@@ -408,3 +494,247 @@ class PerfilUsuario(models.Model):
 
     def __str__(self):
         return f"Perfil de {self.usuario.nombre or self.usuario.correo}"
+
+
+# ========================
+#  RESUMEN DIARIO (ROLLUP PARA EL DASHBOARD)
+# ========================
+class ResumenDiarioAlerta(models.Model):
+    """
+    Conteo de DetalleAlerta por día local × Escala × EstadoIncidente.
+    Se mantiene de forma incremental (ver api/estadisticas.py) y se puede
+    reconstruir con `py manage.py reconstruir_resumenes`.
+    """
+    idResumen = models.AutoField(primary_key=True)
+    Fecha = models.DateField()
+    Escala = models.PositiveSmallIntegerField(choices=DetalleAlerta.ESCALA_CHOICES)
+    EstadoIncidente = models.CharField(
+        max_length=20,
+        choices=DetalleAlerta.ESTADO_INCIDENTE_CHOICES
+    )
+    Total = models.IntegerField(default=0)
+    # Incidentes del grupo que tienen al menos una AtencionReporte
+    ConAtencion = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'ResumenDiarioAlerta'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['Fecha', 'Escala', 'EstadoIncidente'],
+                name='resumen_diario_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.Fecha} - Escala {self.Escala} - {self.EstadoIncidente}: {self.Total}"
+
+
+# ========================
+#  LOG DE CAMBIOS (DELTA-SYNC DE ALERTAS)
+# ========================
+class VersionCambios(models.Model):
+    """
+    Contador único (fila pk=1) de la versión del log de cambios.
+    Incrementarlo bloquea la fila hasta el commit, así las versiones
+    se hacen visibles en orden y ningún cliente se salta un cambio.
+    """
+    idVersion = models.AutoField(primary_key=True)
+    Valor = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'VersionCambios'
+
+    def __str__(self):
+        return f"Versión {self.Valor}"
+
+
+class CambioAlerta(models.Model):
+    OPERACION_CHOICES = (
+        ('insert', 'insert'),
+        ('update', 'update'),
+        ('delete', 'delete'),
+    )
+
+    idCambio = models.BigAutoField(primary_key=True)
+    Version = models.BigIntegerField(unique=True)
+    # Sin FK: el registro debe sobrevivir al borrado del incidente
+    idTipoIncidencia = models.IntegerField()
+    Operacion = models.CharField(max_length=10, choices=OPERACION_CHOICES)
+    FechaCambio = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'CambioAlerta'
+
+    def __str__(self):
+        return f"v{self.Version} {self.Operacion} {self.idTipoIncidencia}"
+
+
+# ========================
+#  OUTBOX DE CORREOS
+# ========================
+class CorreoPendiente(models.Model):
+    """
+    Correo por enviar. Se inserta en la misma transacción que el cambio que lo
+    origina (si hay rollback no se envía nada) y lo despacha api.correo.
+    """
+    ESTADO_CHOICES = (
+        ('pendiente', 'pendiente'),
+        ('enviando', 'enviando'),
+        ('enviado', 'enviado'),
+        ('fallido', 'fallido'),
+    )
+
+    idCorreo = models.BigAutoField(primary_key=True)
+    Origen = models.CharField(max_length=40)
+    Asunto = models.CharField(max_length=250)
+    Destinatario = models.CharField(max_length=200)
+    CuerpoTexto = models.TextField()
+    CuerpoHtml = models.TextField(null=True, blank=True)
+    # Imagen embebida (cid:imagen_reporte), ruta relativa a MEDIA_ROOT
+    AdjuntoInline = models.CharField(max_length=300, null=True, blank=True)
+    Estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente')
+    Intentos = models.PositiveSmallIntegerField(default=0)
+    ProximoIntento = models.DateTimeField(default=timezone.now)
+    Reclamo = models.CharField(max_length=32, null=True, blank=True)
+    ReclamadoEn = models.DateTimeField(null=True, blank=True)
+    UltimoError = models.TextField(null=True, blank=True)
+    FechaCreacion = models.DateTimeField(default=timezone.now)
+    FechaEnvio = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'CorreoPendiente'
+        indexes = [
+            # Cola: sólo las filas que faltan despachar
+            models.Index(
+                fields=['ProximoIntento'],
+                name='correo_pendiente_cola_idx',
+                condition=models.Q(Estado__in=['pendiente', 'enviando']),
+            ),
+            models.Index(fields=['Reclamo'], name='correo_pendiente_reclamo_idx'),
+        ]
+
+    def __str__(self):
+        return f"Correo {self.idCorreo} ({self.Estado}) a {self.Destinatario}"
+
+
+# ========================
+#  CARGAS REANUDABLES (FOTOS/VIDEOS)
+# ========================
+class SesionCarga(models.Model):
+    """
+    Subida por partes de un archivo grande: el cliente envía rangos de bytes con
+    PUT y puede reanudar desde `Recibido` tras un corte. Ver api/cargas.py.
+    """
+    ESTADO_CHOICES = (
+        ('abierta', 'abierta'),
+        ('completa', 'completa'),
+        ('adjuntada', 'adjuntada'),
+    )
+
+    idSesion = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    idUsuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='sesiones_carga',
+        db_column='idUsuario'
+    )
+    NombreArchivo = models.CharField(max_length=250)
+    TipoContenido = models.CharField(max_length=100, null=True, blank=True)
+    Tamano = models.BigIntegerField()
+    Sha256 = models.CharField(max_length=64)
+    # Bytes contiguos recibidos desde el inicio (el próximo PUT empieza aquí)
+    Recibido = models.BigIntegerField(default=0)
+    Estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='abierta')
+    # Ruta final relativa a MEDIA_ROOT (una vez verificada)
+    Archivo = models.CharField(max_length=300, null=True, blank=True)
+    idTipoIncidencia = models.ForeignKey(
+        DetalleAlerta,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='sesiones_carga',
+        db_column='idTipoIncidencia'
+    )
+    FechaCreacion = models.DateTimeField(default=timezone.now)
+    FechaActualizacion = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'SesionCarga'
+
+    def __str__(self):
+        return f"Carga {self.idSesion} ({self.Estado}) {self.Recibido}/{self.Tamano}"
+
+
+# Archivos de medios direccionados por contenido (api/almacenamiento.py): un archivo
+# físico por SHA-256, compartido por todos los reportes que lo suben.
+class ArchivoContenido(models.Model):
+    idArchivo = models.BigAutoField(primary_key=True)
+    # Ruta relativa a MEDIA_ROOT: <carpeta>/<sha[:2]>/<sha[2:4]>/<sha><ext>
+    Ruta = models.CharField(max_length=300, unique=True)
+    Sha256 = models.CharField(max_length=64, db_index=True)
+    Tamano = models.BigIntegerField()
+    # Cantidad de DetalleAlerta / SesionCarga que lo usan; en 0 se borra el archivo
+    Referencias = models.PositiveIntegerField(default=0)
+    FechaCreacion = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'ArchivoContenido'
+
+    def __str__(self):
+        return f"{self.Ruta} ({self.Referencias} ref.)"
+
+
+# Zonas calientes (api/zonas_calor.py): clusters de incidentes por ventana de tiempo y
+# escala mínima. Las recalcula periódicamente `manage.py calcular_zonas_calor`.
+class ZonaCalor(models.Model):
+    idZona = models.BigAutoField(primary_key=True)
+    Ventana = models.CharField(max_length=10)  # clave de ZONAS_CALOR_VENTANAS, p. ej. "7d"
+    EscalaMinima = models.PositiveSmallIntegerField()
+    Latitud = models.FloatField()  # centroide ponderado por escala
+    Longitud = models.FloatField()
+    RadioMetros = models.FloatField()  # distancia del centroide al incidente más lejano
+    Cantidad = models.IntegerField()
+    Peso = models.FloatField()  # suma de intensidades (misma escala que el mapa de calor)
+    EscalaMaxima = models.PositiveSmallIntegerField()
+    # Envolvente convexa [[lat, lng], ...] en sentido antihorario
+    Casco = models.JSONField(default=list)
+    PrimerReporte = models.DateTimeField()
+    UltimoReporte = models.DateTimeField()
+    FechaCalculo = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'ZonaCalor'
+        indexes = [
+            models.Index(fields=['Ventana', 'EscalaMinima', '-Peso'], name='zona_calor_ventana_idx'),
+        ]
+
+    def __str__(self):
+        return f"Zona {self.idZona} ({self.Ventana}, escala>={self.EscalaMinima}): {self.Cantidad}"
+
+
+class ActividadCelda(models.Model):
+    """
+    Detector de anomalías (api/anomalias.py): incidentes de una celda geohash en una hora
+    de la semana. Guarda el conteo de la última vez que ocurrió esa hora (Hora, Cantidad)
+    y la suma y suma de cuadrados de los conteos de todas las semanas (línea base).
+    """
+    idActividad = models.BigAutoField(primary_key=True)
+    Celda = models.CharField(max_length=12)  # prefijo del Geohash de DetalleAlerta
+    HoraSemana = models.PositiveSmallIntegerField()  # 0 = lunes 00h ... 167 = domingo 23h (hora local)
+    Hora = models.DateTimeField()  # inicio de la hora más reciente con incidentes
+    Cantidad = models.IntegerField(default=0)  # incidentes en `Hora`
+    Suma = models.IntegerField(default=0)
+    SumaCuadrados = models.BigIntegerField(default=0)
+    Desde = models.DateTimeField()  # primera hora registrada de la fila
+
+    class Meta:
+        db_table = 'ActividadCelda'
+        constraints = [
+            models.UniqueConstraint(fields=['Celda', 'HoraSemana'], name='actividad_celda_hora_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['Hora'], name='actividad_celda_hora_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.Celda} h{self.HoraSemana}: {self.Cantidad} ({self.Hora:%Y-%m-%d %H}h)"
@@ -0,0 +1,80 @@
+# api/paginacion.py — paginación por cursor (keyset) sobre (FechaHora, idTipoIncidencia)
+
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE_DEFAULT = getattr(settings, "INCIDENTES_PAGE_SIZE", 50)
+PAGE_SIZE_MAX = getattr(settings, "INCIDENTES_PAGE_SIZE_MAX", 500)
+
+# Orden estable: el pk desempata incidentes con la misma FechaHora
+ORDEN = ("-FechaHora", "-idTipoIncidencia")
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(fecha_hora, pk):
+    raw = json.dumps({"f": fecha_hora.isoformat(), "id": pk}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        fecha_hora = parse_datetime(data["f"])
+        pk = int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise CursorInvalido("cursor inválido")
+    if fecha_hora is None:
+        raise CursorInvalido("cursor inválido")
+    return fecha_hora, pk
+
+
+def _page_size(valor):
+    try:
+        n = int(valor) if valor else PAGE_SIZE_DEFAULT
+    except ValueError:
+        raise CursorInvalido("page_size debe ser un número")
+    return max(1, min(n, PAGE_SIZE_MAX))
+
+
+def solicitada(request):
+    """La paginación es opcional: sólo se activa con ?cursor= o ?page_size=."""
+    return "cursor" in request.GET or "page_size" in request.GET
+
+
+def paginar(request, qs):
+    """
+    Devuelve (filas, siguiente_cursor) para la página pedida.
+    Cada página es un rango del índice (FechaHora, idTipoIncidencia), sin OFFSET.
+    Lanza CursorInvalido si cursor/page_size no son válidos.
+    """
+    page_size = _page_size(request.GET.get("page_size"))
+    cursor = request.GET.get("cursor")
+
+    qs = qs.order_by(*ORDEN)
+    if cursor:
+        fecha_hora, pk = decodificar_cursor(cursor)
+        # FechaHora__lte redundante: deja que el índice haga un seek al inicio del rango
+        qs = qs.filter(FechaHora__lte=fecha_hora).filter(
+            Q(FechaHora__lt=fecha_hora) |
+            Q(FechaHora=fecha_hora, idTipoIncidencia__lt=pk)
+        )
+
+    filas = list(qs[:page_size + 1])
+    siguiente = None
+    if len(filas) > page_size:
+        filas = filas[:page_size]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(ultima.FechaHora, ultima.idTipoIncidencia)
+    return filas, siguiente
+
+
+def respuesta(resultados, siguiente):
+    return {"results": resultados, "next": siguiente}
@@ -0,0 +1,107 @@
+# api/palabras.py — autómata Aho-Corasick de palabras clave (corre también en los procesos
+# del pool de `manage.py reclasificar_escalas`)
+#
+# Sin Django ni modelos: el pool usa procesos "spawn" que sólo importan este módulo.
+# Texto y palabras se normalizan igual (sin tildes, minúsculas, un espacio entre palabras)
+# y cada palabra clave se busca precedida de un espacio: sólo coincide al inicio de una
+# palabra ("robo" encuentra "robos" pero no "microbo"). Cada palabra lleva un peso (la
+# escala) y el resultado es el mayor peso encontrado, en una sola pasada sobre el texto.
+
+import re
+import unicodedata
+from collections import deque
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar(texto):
+    """'  Intentó de ROBO, ¡ayer!' -> ' intento de robo ayer '"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    palabras = _NO_ALFANUMERICO.sub(" ", texto).split()
+    return f" {' '.join(palabras)} " if palabras else ""
+
+
+def separar(palabra_clave):
+    """Una fila de EscalaAlerta puede traer varias palabras: 'robo, asalto; hurto'."""
+    return [p.strip() for p in re.split(r"[,;\n]", palabra_clave or "") if p.strip()]
+
+
+class Automata:
+    """
+    Aho-Corasick sobre `pares` (palabra, peso). `buscar(texto)` devuelve el mayor peso
+    de las palabras presentes (o None) en tiempo lineal en el largo del texto.
+    """
+
+    def __init__(self, pares):
+        self._hijos = [{}]
+        self._fallo = [0]
+        self._peso = [None]  # mayor peso que termina en el nodo o en su cadena de fallos
+        self.palabras = 0
+        for palabra, peso in pares:
+            clave = normalizar(palabra).rstrip()
+            if clave:
+                self._agregar(clave, peso)
+        self._enlazar()
+        self.maximo = max((p for p in self._peso if p is not None), default=None)
+
+    def _agregar(self, clave, peso):
+        nodo = 0
+        for c in clave:
+            siguiente = self._hijos[nodo].get(c)
+            if siguiente is None:
+                siguiente = len(self._hijos)
+                self._hijos[nodo][c] = siguiente
+                self._hijos.append({})
+                self._fallo.append(0)
+                self._peso.append(None)
+            nodo = siguiente
+        if self._peso[nodo] is None or peso > self._peso[nodo]:
+            self._peso[nodo] = peso
+        self.palabras += 1
+
+    def _enlazar(self):
+        # BFS: el fallo de cada nodo ya está resuelto al procesar a sus hijos
+        cola = deque(self._hijos[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for c, hijo in self._hijos[nodo].items():
+                f = self._fallo[nodo]
+                while f and c not in self._hijos[f]:
+                    f = self._fallo[f]
+                destino = self._hijos[f].get(c, 0)
+                self._fallo[hijo] = destino if destino != hijo else 0
+                heredado = self._peso[self._fallo[hijo]]
+                if heredado is not None and (self._peso[hijo] is None or heredado > self._peso[hijo]):
+                    self._peso[hijo] = heredado
+                cola.append(hijo)
+
+    def buscar(self, texto):
+        mejor = None
+        nodo = 0
+        hijos, fallo, pesos = self._hijos, self._fallo, self._peso
+        for c in normalizar(texto):
+            while nodo and c not in hijos[nodo]:
+                nodo = fallo[nodo]
+            nodo = hijos[nodo].get(c, 0)
+            peso = pesos[nodo]
+            if peso is not None and (mejor is None or peso > mejor):
+                mejor = peso
+                if mejor == self.maximo:
+                    break  # no puede haber nada más grave
+        return mejor
+
+
+# ---------------------------- Procesos del pool ----------------------------
+_automata = None
+
+
+def iniciar_proceso(pares):
+    """initializer del pool: compila el autómata una vez por proceso."""
+    global _automata
+    _automata = Automata(pares)
+
+
+def clasificar_lote(filas, defecto):
+    """[(id, texto), ...] -> [(id, peso o `defecto`), ...] con el autómata del proceso."""
+    return [(pk, _automata.buscar(texto) or defecto) for pk, texto in filas]
@@ -0,0 +1,82 @@
+# api/renderers.py — formato binario compacto para los puntos del mapa de calor
+#
+# Se negocia con `Accept: application/vnd.seguridad.heatmap` (o ?format=heatmap);
+# JSON sigue siendo el formato por defecto. Todo en little-endian:
+#
+#   cabecera   "HMB1" | uint32 count | float64 lat0 | float64 lng0 | float64 paso
+#   estados    uint8 n | n × (uint8 largo + bytes utf-8)
+#   puntos     count × (uint16 lat_q | uint16 lng_q | uint8 intensidad | uint8 estado)
+#
+#   lat = lat0 + lat_q * paso,  lng = lng0 + lng_q * paso,  intensidad = byte / 255
+#
+# 6 bytes por punto (JSON: ~45), con ~1 m de precisión en un área del tamaño de Lima.
+#
+# NdjsonRenderer sólo existe para que la negociación de DRF acepte
+# `Accept: application/x-ndjson` en las vistas con volcado (api/exportacion.py).
+
+import json
+import struct
+
+import numpy as np
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+MAGIC = b"HMB1"
+_CUANTOS = 65535
+_PUNTO = np.dtype([("lat", "<u2"), ("lng", "<u2"), ("intensidad", "u1"), ("estado", "u1")])
+
+
+def empaquetar_puntos(points):
+    """points: [[lat, lng, intensity, estado], ...] como los devuelve HeatmapAlertView."""
+    estados = sorted({str(p[3]) for p in points})
+    indice = {e: i for i, e in enumerate(estados)}
+
+    if points:
+        coords = np.array([(p[0], p[1]) for p in points], dtype=np.float64)
+        lat0, lng0 = coords.min(axis=0)
+        span = float((coords.max(axis=0) - (lat0, lng0)).max())
+        paso = span / _CUANTOS if span > 0 else 1e-7
+    else:
+        coords = np.zeros((0, 2))
+        lat0 = lng0 = 0.0
+        paso = 1e-7
+
+    registros = np.zeros(len(points), dtype=_PUNTO)
+    registros["lat"] = np.rint((coords[:, 0] - lat0) / paso)
+    registros["lng"] = np.rint((coords[:, 1] - lng0) / paso)
+    registros["intensidad"] = np.rint(
+        np.clip([p[2] for p in points], 0.0, 1.0) * 255) if points else []
+    registros["estado"] = [indice[str(p[3])] for p in points]
+
+    partes = [MAGIC, struct.pack("<Iddd", len(points), lat0, lng0, paso),
+              struct.pack("<B", len(estados))]
+    for e in estados:
+        crudo = e.encode("utf-8")[:255]
+        partes.append(struct.pack("<B", len(crudo)) + crudo)
+    partes.append(registros.tobytes())
+    return b"".join(partes)
+
+
+class HeatmapBinarioRenderer(BaseRenderer):
+    media_type = "application/vnd.seguridad.heatmap"
+    format = "heatmap"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict) or "points" not in data:
+            # Errores: se devuelven como JSON
+            return json.dumps(data).encode("utf-8")
+        return empaquetar_puntos(data["points"])
+
+
+class NdjsonRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # El volcado se emite en api/exportacion.py; aquí llegan errores y respuestas no
+        # paginadas: una línea por elemento si es una lista
+        filas = data if isinstance(data, list) else [data]
+        return "".join(json.dumps(f, cls=DjangoJSONEncoder) + "\n" for f in filas).encode("utf-8")
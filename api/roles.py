@@ -0,0 +1,61 @@
+# api/roles.py — rol del usuario ("admin" / "user") para el login, cacheado
+#
+# El rol sale de RolUsuario -> Administrador (un JOIN por login). Se cachea por usuario
+# y se invalida desde api/signals.py cuando cambian RolUsuario o Administrador: los
+# RolUsuario nuevos invalidan sólo a su usuario; cualquier otro cambio sube la versión
+# y descarta todos los roles cacheados (son cambios raros, hechos desde el admin).
+# Roles y versión viven en el caché compartido (CACHES), así que todos los workers ven el
+# cambio en el siguiente request. Si la versión sale del caché se recrea con un valor
+# nuevo (nunca uno ya usado): sólo se pierden los roles cacheados.
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Administrador
+
+CACHE_SEGUNDOS = getattr(settings, "ROLES_CACHE_SEGUNDOS", 300)
+_CLAVE_VERSION = "roles:version"
+
+
+def _version():
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        cache.add(_CLAVE_VERSION, time.time_ns(), None)
+        version = cache.get(_CLAVE_VERSION)
+    return version
+
+
+def _clave(id_usuario):
+    return f"roles:{_version()}:{id_usuario}"
+
+
+def rol(usuario):
+    clave = _clave(usuario.pk)
+    valor = cache.get(clave)
+    if valor is None:
+        es_admin = Administrador.objects.filter(idRolUsuario__idUsuario=usuario).exists()
+        valor = "admin" if es_admin else "user"
+        cache.set(clave, valor, CACHE_SEGUNDOS)
+    return valor
+
+
+def es_admin(usuario):
+    """Staff de Django o usuario enlazado a un Administrador (acciones de gestión masivas)."""
+    return bool(usuario.is_staff or rol(usuario) == "admin")
+
+
+def invalidar(id_usuario=None):
+    """Descarta el rol cacheado de un usuario (o de todos) al hacer commit."""
+    def _borrar():
+        if id_usuario is not None:
+            cache.delete(_clave(id_usuario))
+            return
+        try:
+            cache.incr(_CLAVE_VERSION)
+        except ValueError:  # la versión ya no estaba en el caché: cualquier valor nuevo sirve
+            cache.set(_CLAVE_VERSION, time.time_ns(), None)
+
+    transaction.on_commit(_borrar)
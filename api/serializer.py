@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password, check_password
+from django.db.models import Case, CharField, OuterRef, Subquery, When
 from .models import Usuario, DetalleAlerta, AtencionReporte
+from . import medios
 
 
 # 🔹 Registro de usuario (se guarda en la tabla Usuario)
@@ -45,6 +47,8 @@ class LoginSerializer(serializers.Serializer):
 # 🔹 Serializador para DetalleAlerta
 class DetalleAlertaSerializer(serializers.ModelSerializer):
     Archivo = serializers.SerializerMethodField()
+    # Miniatura liviana para listados (null mientras se genera o si no hay archivo)
+    thumbnail_url = serializers.SerializerMethodField()
 
     class Meta:
         model = DetalleAlerta
@@ -52,10 +56,13 @@ class DetalleAlertaSerializer(serializers.ModelSerializer):
 
     def get_Archivo(self, obj):
         request = self.context.get('request')
-        if obj.Archivo and hasattr(obj.Archivo, 'url'):
-            # Devuelve la URL completa del archivo
-            return request.build_absolute_uri(obj.Archivo.url)
+        if obj.Archivo:
+            # URL completa y firmada (api/medios.py autoriza la descarga)
+            return medios.url(request, obj.Archivo.name)
         return None
+
+    def get_thumbnail_url(self, obj):
+        return medios.url(self.context.get('request'), obj.Miniatura)
     
     def validate_Escala(self, value):
         if value not in [1, 2, 3, 4]:
@@ -63,6 +70,24 @@ class DetalleAlertaSerializer(serializers.ModelSerializer):
         return value
 
 # Inicio Serializador para Historial de Incidentes
+def anotar_estado_atencion(qs):
+    """
+    Trae en la misma consulta el estado de la última atención (fallback legacy de
+    get_estado), sólo para filas sin EstadoIncidente. Evita una consulta por fila.
+    """
+    ultima = (
+        AtencionReporte.objects
+        .filter(idTipoIncidencia=OuterRef("pk"))
+        .order_by("-FechaHoraAtencion")
+        .values("idEstadoReporte__Tipo")[:1]
+    )
+    return qs.annotate(estado_atencion=Case(
+        When(EstadoIncidente="", then=Subquery(ultima)),
+        default=None,
+        output_field=CharField(),
+    ))
+
+
 class HistorialIncidenteSerializer(serializers.ModelSerializer):
     usuario = serializers.SerializerMethodField()
     estado = serializers.SerializerMethodField()
@@ -91,7 +116,9 @@ class HistorialIncidenteSerializer(serializers.ModelSerializer):
         if estado_directo:
             return estado_directo
 
-        # 2) Fallback legacy: última atención (si existe)
+        # 2) Fallback legacy: última atención (ya anotada por anotar_estado_atencion)
+        if hasattr(obj, "estado_atencion"):
+            return obj.estado_atencion or "Pendiente"
         ar = (
             AtencionReporte.objects
             .filter(idTipoIncidencia=obj)
@@ -119,6 +146,9 @@ class GestionIncidenteSerializer(serializers.ModelSerializer):
     usuario = serializers.SerializerMethodField()
     estado = serializers.CharField(source='EstadoIncidente')
     Escala = serializers.SerializerMethodField()  # devolver etiqueta legible
+    thumbnail_url = serializers.SerializerMethodField()
+    # Reportes del mismo hecho enlazados a este (api.duplicados.anotar_duplicados)
+    duplicados = serializers.IntegerField(source="cantidad_duplicados", read_only=True, default=0)
 
     class Meta:
         model = DetalleAlerta
@@ -131,11 +161,16 @@ class GestionIncidenteSerializer(serializers.ModelSerializer):
             "Escala",   # ahora es etiqueta
             "usuario",
             "estado",
+            "thumbnail_url",
+            "duplicados",
         )
 
     def get_usuario(self, obj):
         return getattr(getattr(obj, "idUsuario", None), "nombre", None)
 
+    def get_thumbnail_url(self, obj):
+        return medios.url(self.context.get("request"), obj.Miniatura)
+
     def get_Escala(self, obj):
         # Si Escala tiene choices, usa el display de Django
         try:
@@ -158,6 +193,29 @@ class IncidenteEstadoUpdateSerializer(serializers.Serializer):
         choices=[c[0] for c in DetalleAlerta.ESTADO_INCIDENTE_CHOICES]
     )
 
+
+class FiltroIncidentesSerializer(serializers.Serializer):
+    """Selección por filtro para los cambios de estado masivos (todos los campos opcionales)."""
+    estado = serializers.ChoiceField(
+        choices=[c[0] for c in DetalleAlerta.ESTADO_INCIDENTE_CHOICES], required=False
+    )
+    escala = serializers.IntegerField(required=False)
+    desde = serializers.DateTimeField(required=False)
+    hasta = serializers.DateTimeField(required=False)
+
+
+class IncidentesEstadoLoteSerializer(IncidenteEstadoUpdateSerializer):
+    """Body de gestion_update_incidentes_lote: estado destino + ids o filtro."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    filtro = FiltroIncidentesSerializer(required=False)
+
+    def validate(self, data):
+        if not data.get("ids") and not data.get("filtro"):
+            raise serializers.ValidationError("Indica 'ids' o un 'filtro' no vacío")
+        return data
+
 import os
 from pathlib import Path
 
@@ -0,0 +1,87 @@
+# api/signals.py — mantiene ResumenDiarioAlerta, el log de cambios y el stream del mapa
+# de calor ante cambios hechos fuera de las vistas (AtencionReporte se crea desde el
+# admin; DetalleAlerta se puede borrar desde el admin)
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import (
+    almacenamiento, autenticacion, cambios, clasificador, duplicados, estadisticas, roles,
+    tiempo_real, tiles,
+)
+from .models import (
+    Administrador, AtencionReporte, DetalleAlerta, EscalaAlerta, RolUsuario, SesionCarga, Usuario,
+)
+
+
+@receiver(post_save, sender=AtencionReporte)
+def atencion_creada(sender, instance, created, **kwargs):
+    if not created:
+        return
+    # Sólo la primera atención cambia el contador "ConAtencion"
+    atenciones = AtencionReporte.objects.filter(
+        idTipoIncidencia_id=instance.idTipoIncidencia_id).count()
+    if atenciones == 1:
+        estadisticas.registrar_atencion(instance.idTipoIncidencia_id, 1)
+
+
+@receiver(post_delete, sender=AtencionReporte)
+def atencion_eliminada(sender, instance, **kwargs):
+    if not AtencionReporte.objects.filter(
+            idTipoIncidencia_id=instance.idTipoIncidencia_id).exists():
+        estadisticas.registrar_atencion(instance.idTipoIncidencia_id, -1)
+
+
+@receiver(pre_delete, sender=DetalleAlerta)
+def incidente_por_eliminar(sender, instance, **kwargs):
+    # Antes del SET_NULL de idCanonico (que también pisa las instancias en memoria)
+    instance._canonico = instance.idCanonico_id
+    instance._duplicados = list(instance.duplicados.values_list("idTipoIncidencia", flat=True))
+
+
+@receiver(post_delete, sender=DetalleAlerta)
+def incidente_eliminado(sender, instance, **kwargs):
+    instance.idCanonico_id = getattr(instance, "_canonico", instance.idCanonico_id)
+    # En cascada, las AtencionReporte se borran antes y ya descontaron ConAtencion
+    estadisticas.registrar_baja(instance)
+    cambios.registrar(instance.idTipoIncidencia, "delete")
+    tiempo_real.publicar(instance, "delete")
+    tiles.invalidar(instance.Latitud, instance.Longitud)
+    if instance.Archivo:
+        almacenamiento.liberar(instance.Archivo.name)
+    if getattr(instance, "_duplicados", None):
+        duplicados.promover(instance._duplicados)
+
+
+@receiver(post_delete, sender=SesionCarga)
+def carga_eliminada(sender, instance, **kwargs):
+    # Una carga verificada y nunca adjuntada conserva su referencia al archivo
+    if instance.Estado == "completa":
+        almacenamiento.liberar(instance.Archivo)
+
+
+@receiver(post_save, sender=RolUsuario)
+def rol_usuario_guardado(sender, instance, created, **kwargs):
+    # Un rol nuevo (p. ej. el "Usuario" por defecto del registro) sólo afecta a su dueño
+    roles.invalidar(instance.idUsuario_id if created else None)
+
+
+@receiver(post_delete, sender=RolUsuario)
+@receiver(post_save, sender=Administrador)
+@receiver(post_delete, sender=Administrador)
+def rol_admin_cambiado(sender, instance, **kwargs):
+    roles.invalidar()
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def usuario_cambiado(sender, instance, **kwargs):
+    # Contraseña, perfil o desactivación: el próximo request lo vuelve a leer de la base
+    autenticacion.invalidar(instance.pk)
+
+
+@receiver(post_save, sender=EscalaAlerta)
+@receiver(post_delete, sender=EscalaAlerta)
+def escala_cambiada(sender, instance, **kwargs):
+    # Palabras clave nuevas o editadas desde el admin: todos los procesos recompilan
+    clasificador.invalidar()
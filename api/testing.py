@@ -0,0 +1,87 @@
+# api/testing.py — presupuestos de consultas por endpoint
+#
+# Uso en tests:
+#
+#     with presupuesto_consultas(3):
+#         self.client.get("/api/todas_alertas/?page_size=50")
+#
+# o, sobre un reporte de api.benchmark, verificar_presupuestos(reporte["resultados"]).
+
+from contextlib import contextmanager
+
+from .instrumentacion import capturar
+
+# Máximo de consultas por caso de api.benchmark. Deben ser constantes respecto al
+# número de filas: si un listado crece con los datos, hay un N+1.
+PRESUPUESTOS = {
+    "login": 2,  # fetch por índice + rol (cacheado tras el primer login)
+    "refresh": 2,
+    "me": 2,
+    "resumen": 5,
+    "resumen_slash": 5,
+    "mis_reportes": 2,
+    "mis_reportes_paginado": 2,
+    "todas_alertas": 1,
+    "todas_alertas_paginado": 1,
+    "todas_alertas_ndjson": 1,
+    "alertas_cambios_al_dia": 2,
+    "perfil_usuario": 2,
+    "dashboard_stats": 3,
+    "emergency_personnel": 3,
+    "recent_activities": 3,
+    "dashboard_anomalias": 2,
+    "historial_incidentes": 2,
+    "historial_incidentes_paginado": 2,
+    "heatmap": 1,
+    "heatmap_bbox": 1,
+    "heatmap_binario": 1,
+    "heatmap_tile_cache": 1,
+    "heatmap_tile_sin_cache": 1,
+    "zonas_calor": 1,
+    "gestion_list_incidentes": 2,
+    "gestion_list_incidentes_paginado": 2,
+    "registro": 6,
+    "registrar_incidente": 10,
+    "registrar_incidente_slash": 10,
+    "registrar_incidentes_lote": 12,
+    "enviar_correo": 2,
+    "cambio_contrasena": 3,
+    "cambiar_password": 3,
+    "gestion_update_incidente": 10,
+    "gestion_update_incidentes_lote": 16,
+    "cargas": 2,
+}
+
+
+class PresupuestoExcedido(AssertionError):
+    pass
+
+
+def _detalle(registro):
+    sql, veces = registro.mas_repetida()
+    texto = f"{registro.consultas} consultas, {registro.duplicadas} duplicadas"
+    if veces > 1:
+        texto += f"; la más repetida ({veces} veces): {sql[:300]}"
+    return texto
+
+
+@contextmanager
+def presupuesto_consultas(maximo):
+    """Falla con PresupuestoExcedido si el bloque ejecuta más de `maximo` consultas."""
+    with capturar() as registro:
+        yield registro
+    if registro.consultas > maximo:
+        raise PresupuestoExcedido(f"Presupuesto de {maximo} consultas excedido: {_detalle(registro)}")
+
+
+def verificar_presupuestos(resultados, presupuestos=PRESUPUESTOS):
+    """
+    Compara los resultados de api.benchmark con los presupuestos.
+    Devuelve la lista de [(caso, consultas, maximo)] excedidos (vacía si todo está bien).
+    """
+    excedidos = []
+    for r in resultados:
+        maximo = presupuestos.get(r["caso"])
+        if maximo is not None and r["consultas"] > maximo:
+            excedidos.append((r["caso"], r["consultas"], maximo))
+    return excedidos
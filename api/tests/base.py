@@ -0,0 +1,34 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.models import DetalleAlerta, Usuario
+
+
+def crear_usuario(nombre="vecino", **extra):
+    return Usuario.objects.create_user(f"{nombre}@example.com", "Clave.1234", nombre=nombre, **extra)
+
+
+def crear_incidente(usuario, **campos):
+    datos = {
+        "NombreIncidente": "Robo de celular", "Ubicacion": "Av. Arequipa",
+        "Latitud": -12.0464, "Longitud": -77.0428, "Escala": 1,
+    }
+    datos.update(campos)
+    return DetalleAlerta.objects.create(idUsuario=usuario, **datos)
+
+
+class ApiTestCase(TestCase):
+    """TestCase con MEDIA_ROOT temporal y un APIClient autenticado como `self.usuario`."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        ajuste = override_settings(MEDIA_ROOT=self.media, CORREO_POOL_EN_PROCESO=False)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.usuario = crear_usuario()
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.usuario)
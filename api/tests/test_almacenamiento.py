@@ -0,0 +1,62 @@
+import hashlib
+import os
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from api import almacenamiento
+from api.models import ArchivoContenido, DetalleAlerta
+
+from .base import ApiTestCase
+
+CONTENIDO = b"\x89PNG misma foto reportada por varios vecinos"
+
+
+class ReferenciasTests(ApiTestCase):
+    def _registrar(self, contenido=CONTENIDO, nombre="foto.PNG"):
+        r = self.cliente.post(reverse("registrar_incidente"), {
+            "Ubicacion": "Av. Arequipa", "NombreIncidente": "Robo", "escala": 1,
+            "Archivo": SimpleUploadedFile(nombre, contenido, content_type="image/png"),
+        }, format="multipart")
+        self.assertEqual(r.status_code, 201)
+        return DetalleAlerta.objects.get(pk=r.json()["registro"]["idTipoIncidencia"])
+
+    def _existe(self, nombre):
+        return os.path.exists(os.path.join(self.media, nombre))
+
+    def test_mismo_contenido_un_archivo(self):
+        a, b = self._registrar(), self._registrar(nombre="otra.png")
+        sha = hashlib.sha256(CONTENIDO).hexdigest()
+        self.assertEqual(a.Archivo.name, b.Archivo.name)
+        self.assertTrue(almacenamiento.es_contenido(a.Archivo.name))
+        self.assertTrue(a.Archivo.name.endswith(f"/{sha[:2]}/{sha[2:4]}/{sha}.png"))
+        fila = ArchivoContenido.objects.get(Ruta=a.Archivo.name)
+        self.assertEqual((fila.Sha256, fila.Tamano, fila.Referencias), (sha, len(CONTENIDO), 2))
+
+    def test_se_borra_con_la_ultima_referencia(self):
+        a, b = self._registrar(), self._registrar()
+        nombre = a.Archivo.name
+        with self.captureOnCommitCallbacks(execute=True):
+            a.delete()
+        self.assertEqual(ArchivoContenido.objects.get(Ruta=nombre).Referencias, 1)
+        self.assertTrue(self._existe(nombre))
+        with self.captureOnCommitCallbacks(execute=True):
+            b.delete()
+        self.assertFalse(ArchivoContenido.objects.filter(Ruta=nombre).exists())
+        self.assertFalse(self._existe(nombre))
+
+    def test_liberar_sobrante_no_baja_de_uno(self):
+        nombre = self._registrar().Archivo.name
+        almacenamiento.liberar_sobrante(nombre)
+        self.assertEqual(ArchivoContenido.objects.get(Ruta=nombre).Referencias, 1)
+        almacenamiento.referenciar(nombre, "x", 0)
+        almacenamiento.liberar_sobrante(nombre)
+        self.assertEqual(ArchivoContenido.objects.get(Ruta=nombre).Referencias, 1)
+
+    def test_purgar_respeta_referencias(self):
+        nombre = self._registrar().Archivo.name
+        self.assertEqual(almacenamiento.purgar(), 0)
+        self.assertTrue(self._existe(nombre))
+        ArchivoContenido.objects.filter(Ruta=nombre).update(Referencias=0)
+        self.assertEqual(almacenamiento.purgar(), 1)
+        self.assertFalse(self._existe(nombre))
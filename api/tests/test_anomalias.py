@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from api import anomalias
+from api.models import ActividadCelda, DetalleAlerta
+
+from .base import ApiTestCase
+
+PICO = (-12.0464, -77.0428)
+NORMAL = (-12.1464, -77.0428)
+
+
+class AnomaliasTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ahora = timezone.now().replace(minute=30, second=0, microsecond=0)
+        self.dets = []
+        # 4 semanas de historia a la misma hora: 1 incidente en PICO, 5 en NORMAL.
+        # Ahora: 8 en PICO (pico) y 6 en NORMAL (lo de siempre)
+        for semanas in range(4, 0, -1):
+            self._agregar(PICO, semanas, 1)
+            self._agregar(NORMAL, semanas, 5)
+        self._agregar(PICO, 0, 8)
+        self._agregar(NORMAL, 0, 6)
+        self.dets = DetalleAlerta.objects.bulk_create(self.dets)
+        self.celda_pico = self.dets[0].Geohash[:anomalias.PRECISION]
+
+    def _agregar(self, punto, semanas, cantidad):
+        for i in range(cantidad):
+            det = DetalleAlerta(
+                NombreIncidente="Robo", Ubicacion="x", Latitud=punto[0] + i / 100000, Longitud=punto[1],
+                FechaHora=self.ahora - timedelta(weeks=semanas, minutes=i), Escala=1, idUsuario=self.usuario)
+            det.calcular_geohash()
+            self.dets.append(det)
+
+    def _filas(self):
+        return set(ActividadCelda.objects.values_list(
+            "Celda", "HoraSemana", "Hora", "Cantidad", "Suma", "SumaCuadrados"))
+
+    def test_incremental_igual_a_reconstruir(self):
+        # En orden de llegada, un alta por request
+        for det in self.dets:
+            anomalias.registrar_alta(det)
+        incremental = self._filas()
+        anomalias.reconstruir(semanas=5)
+        self.assertEqual(incremental, self._filas())
+
+    def test_reporte_atrasado(self):
+        # Las altas de esta semana llegan antes que la historia
+        anomalias.registrar_altas(self.dets[-14:])
+        anomalias.registrar_altas(self.dets[:-14])
+        fila = ActividadCelda.objects.get(Celda=self.celda_pico)
+        self.assertEqual((fila.Cantidad, fila.Suma, fila.SumaCuadrados), (8, 12, 8 * 8 + 4))
+
+    def test_detectar_marca_solo_el_pico(self):
+        anomalias.registrar_altas(self.dets)
+        marcadas = anomalias.detectar(self.ahora)
+        self.assertEqual([m["celda"] for m in marcadas], [self.celda_pico])
+        pico = marcadas[0]
+        self.assertEqual((pico["observados"], pico["esperados"], pico["desviacion"]), (8, 1.0, 0.0))
+        self.assertEqual(pico["z"], 7.0)
+
+    def test_sin_historia_suficiente(self):
+        recientes = [d for d in self.dets if d.FechaHora > self.ahora - timedelta(weeks=1, hours=-1)]
+        anomalias.registrar_altas(recientes)
+        self.assertEqual(anomalias.detectar(self.ahora), [])
+
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.urls import reverse
+
+from api import cambios
+from api.models import DetalleAlerta
+
+from .base import ApiTestCase
+
+
+class DeltaSyncTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.usuario.is_staff = True
+        self.usuario.save(update_fields=["is_staff"])
+
+    def _registrar(self, nombre):
+        r = self.cliente.post(reverse("registrar_incidente"), {
+            "Ubicacion": "Av. Arequipa", "NombreIncidente": nombre, "escala": 1,
+            "Latitud": -12.05, "Longitud": -77.04}, format="multipart")
+        self.assertEqual(r.status_code, 201)
+        return r.json()["registro"]["idTipoIncidencia"]
+
+    def _cambios(self, since):
+        r = self.client.get(reverse("alertas_cambios"), {"since": since})
+        self.assertEqual(r.status_code, 200)
+        return r.json()
+
+    def _ops(self, datos):
+        return {c["alerta"]["id"] if c["op"] == "upsert" else c["id"]: c["op"] for c in datos["cambios"]}
+
+    def test_sincronizacion_inicial(self):
+        a = self._registrar("Robo")
+        datos = self.client.get(reverse("alertas_cambios")).json()
+        self.assertTrue(datos["completo"])
+        self.assertEqual(self._ops(datos), {a: "upsert"})
+        self.assertEqual(datos["version"], cambios.version_actual())
+        # Ya al día: nada nuevo y la misma versión
+        self.assertEqual(self._cambios(datos["version"]),
+                         {"version": datos["version"], "cambios": [], "mas": False, "completo": False})
+
+    def test_colapsa_por_incidente(self):
+        since = cambios.version_actual()
+        a = self._registrar("Robo")
+        b = self._registrar("Choque")
+        efimero = self._registrar("Incendio")
+        r = self.cliente.patch(reverse("gestion_update_incidente", kwargs={"id": a}),
+                               {"estado": "En proceso"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        DetalleAlerta.objects.get(pk=efimero).delete()
+
+        datos = self._cambios(since)
+        # Tres incidentes, cinco cambios: una entrada por incidente con su último estado
+        self.assertEqual(self._ops(datos), {a: "upsert", b: "upsert", efimero: "delete"})
+        alertas = {c["alerta"]["id"]: c["alerta"] for c in datos["cambios"] if c["op"] == "upsert"}
+        self.assertEqual(alertas[a]["estado"], "En proceso")
+        self.assertEqual(datos["version"], since + 5)
+
+        DetalleAlerta.objects.get(pk=b).delete()
+        self.assertEqual(self._ops(self._cambios(datos["version"])), {b: "delete"})
+
+    def test_mas_pagina_el_log(self):
+        since = cambios.version_actual()
+        ids = [self._registrar(f"Robo {i}") for i in range(5)]
+        vistos = []
+        with mock.patch.object(cambios, "LIMITE_CAMBIOS", 2):
+            while True:
+                datos = self._cambios(since)
+                vistos += list(self._ops(datos))
+                since = datos["version"]
+                if not datos["mas"]:
+                    break
+                self.assertEqual(len(datos["cambios"]), 2)
+        self.assertEqual(vistos, ids)
+        self.assertEqual(since, cambios.version_actual())
+
+    def test_since_invalido(self):
+        self.assertEqual(self.client.get(reverse("alertas_cambios"), {"since": "ayer"}).status_code, 400)
@@ -0,0 +1,128 @@
+import hashlib
+import os
+from unittest import mock
+
+from django.urls import reverse
+
+from api import cargas
+from api.models import ArchivoContenido, DetalleAlerta, SesionCarga
+
+from .base import ApiTestCase, crear_incidente
+
+CONTENIDO = b"video de prueba " * 1000
+
+
+class CargaReanudableTests(ApiTestCase):
+    def _subir(self, contenido=CONTENIDO, sha256=None):
+        r = self.cliente.post(reverse("cargas"), {
+            "nombre": "video.mp4", "tamano": len(contenido),
+            "sha256": sha256 or hashlib.sha256(contenido).hexdigest(),
+        }, format="json")
+        self.assertEqual(r.status_code, 201, r.data)
+        id_carga = r.data["id"]
+        mitad = len(contenido) // 2
+        for inicio, fin in ((0, mitad - 1), (mitad, len(contenido) - 1)):
+            r = self.cliente.put(
+                reverse("carga", args=[id_carga]), contenido[inicio:fin + 1],
+                content_type="application/octet-stream",
+                HTTP_CONTENT_RANGE=f"bytes {inicio}-{fin}/{len(contenido)}")
+            self.assertEqual(r.status_code, 200, r.data)
+        return id_carga
+
+    def _parte(self, id_carga):
+        return cargas._ruta_parte(SesionCarga.objects.get(pk=id_carga))
+
+    def _finalizar(self, id_carga, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.cliente.post(reverse("carga_finalizar", args=[id_carga]), data, format="json")
+
+    def test_rango_con_hueco_indica_desde_donde_reanudar(self):
+        r = self.cliente.post(reverse("cargas"), {
+            "nombre": "a.mp4", "tamano": 10, "sha256": "0" * 64}, format="json")
+        r = self.cliente.put(reverse("carga", args=[r.data["id"]]), b"12345",
+                             content_type="application/octet-stream",
+                             HTTP_CONTENT_RANGE="bytes 5-9/10")
+        self.assertEqual(r.status_code, 416)
+        self.assertEqual(r.data["recibido"], 0)
+
+    def test_finalizar_y_adjuntar(self):
+        det = crear_incidente(self.usuario)
+        r = self._finalizar(self._subir(), idTipoIncidencia=det.pk)
+        self.assertEqual(r.status_code, 200, r.data)
+        det.refresh_from_db()
+        self.assertTrue(os.path.exists(os.path.join(self.media, det.Archivo.name)))
+        self.assertEqual(ArchivoContenido.objects.get(Ruta=det.Archivo.name).Referencias, 1)
+
+    def test_reintento_de_finalizar_no_borra_el_archivo(self):
+        det = crear_incidente(self.usuario)
+        id_carga = self._subir()
+        self._finalizar(id_carga, idTipoIncidencia=det.pk)
+        det.refresh_from_db()
+        nombre = det.Archivo.name
+
+        r = self._finalizar(id_carga, idTipoIncidencia=det.pk)
+
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertEqual(DetalleAlerta.objects.get(pk=det.pk).Archivo.name, nombre)
+        self.assertEqual(ArchivoContenido.objects.get(Ruta=nombre).Referencias, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.media, nombre)))
+
+    def test_adjuntar_el_mismo_contenido_que_ya_tiene_no_lo_borra(self):
+        det = crear_incidente(self.usuario)
+        self._finalizar(self._subir(), idTipoIncidencia=det.pk)
+        det.refresh_from_db()
+
+        r = self._finalizar(self._subir(), idTipoIncidencia=det.pk)
+
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertEqual(ArchivoContenido.objects.get(Ruta=det.Archivo.name).Referencias, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.media, det.Archivo.name)))
+
+    def test_checksum_distinto_reinicia_la_carga(self):
+        id_carga = self._subir(sha256="f" * 64)
+
+        r = self._finalizar(id_carga)
+
+        self.assertEqual(r.status_code, 422)
+        self.assertEqual(r.data["recibido"], 0)
+        sesion = SesionCarga.objects.get(pk=id_carga)
+        self.assertEqual((sesion.Estado, sesion.Recibido), ("abierta", 0))
+        self.assertEqual(os.path.getsize(self._parte(id_carga)), 0)
+
+    def test_incidente_inexistente_no_deja_la_carga_a_medias(self):
+        id_carga = self._subir()
+
+        r = self._finalizar(id_carga, idTipoIncidencia=999999)
+
+        self.assertEqual(r.status_code, 404)
+        sesion = SesionCarga.objects.get(pk=id_carga)
+        self.assertEqual((sesion.Estado, sesion.Archivo), ("abierta", None))
+        self.assertTrue(os.path.exists(self._parte(id_carga)))
+        self.assertFalse(ArchivoContenido.objects.exists())
+        # El reintento sin incidente termina bien
+        self.assertEqual(self._finalizar(id_carga).status_code, 200)
+        self.assertFalse(os.path.exists(self._parte(id_carga)))
+
+    def test_carga_de_otro_incidente_se_rechaza_antes_de_guardar(self):
+        det, otro = crear_incidente(self.usuario), crear_incidente(self.usuario)
+        id_carga = self._subir()
+        self._finalizar(id_carga, idTipoIncidencia=det.pk)
+
+        r = self._finalizar(id_carga, idTipoIncidencia=otro.pk)
+
+        self.assertEqual(r.status_code, 409)
+        self.assertFalse(DetalleAlerta.objects.get(pk=otro.pk).Archivo)
+
+    def test_dos_reportes_no_adjuntan_la_misma_carga(self):
+        id_carga = self._finalizar(self._subir()).data["id"]
+        leida = SesionCarga.objects.get(pk=id_carga)  # "completa", leída antes que el otro request
+        datos = {"Ubicacion": "Av. Arequipa", "NombreIncidente": "Robo", "escala": 1, "carga": id_carga}
+        r = self.cliente.post(reverse("registrar_incidente"), datos, format="multipart")
+        self.assertEqual(r.status_code, 201, r.data)
+        # El segundo request vio la sesión antes de que el primero la adjuntara
+        with mock.patch.object(cargas, "obtener", return_value=leida):
+            r = self.cliente.post(reverse("registrar_incidente"), datos, format="multipart")
+        self.assertEqual(r.status_code, 400)
+        adjuntos = DetalleAlerta.objects.exclude(Archivo="")
+        self.assertEqual(adjuntos.count(), 1)
+        self.assertEqual(ArchivoContenido.objects.get(Ruta=adjuntos.get().Archivo.name).Referencias, 1)
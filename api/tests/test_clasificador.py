@@ -0,0 +1,60 @@
+from django.test import SimpleTestCase
+
+from api import clasificador, palabras
+from api.models import DetalleAlerta, EscalaAlerta
+
+from .base import ApiTestCase, crear_incidente
+
+
+class AutomataTests(SimpleTestCase):
+    def setUp(self):
+        self.automata = palabras.Automata([
+            ("robo", 1), ("robo a mano armada", 3), ("choque", 2), ("disparo", 3), ("rob", 1),
+        ])
+
+    def test_gana_la_escala_mas_alta(self):
+        self.assertEqual(self.automata.buscar("Robo de celular"), 1)
+        self.assertEqual(self.automata.buscar("choque y ROBO"), 2)
+        self.assertEqual(self.automata.buscar("Robo a mano armada en el paradero"), 3)
+
+    def test_inicio_de_palabra_y_tildes(self):
+        self.assertEqual(self.automata.buscar("Dos robos en la avenida"), 1)
+        self.assertIsNone(self.automata.buscar("un microbús detenido"))
+        self.assertEqual(self.automata.buscar("DISPARÓ al aire"), 3)
+        self.assertIsNone(self.automata.buscar(""))
+
+    def test_separar_y_normalizar(self):
+        self.assertEqual(palabras.separar("robo, asalto; hurto\n"), ["robo", "asalto", "hurto"])
+        self.assertEqual(palabras.normalizar("  Intentó de ROBO, ¡ayer!"), " intento de robo ayer ")
+
+
+class ClasificadorTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        EscalaAlerta.objects.all().delete()  # las palabras iniciales de la migración 0026
+        EscalaAlerta.objects.create(Descripcion="Bajo", palabra_clave="robo, hurto")
+        EscalaAlerta.objects.create(Descripcion="Alto", palabra_clave="balacera")
+        EscalaAlerta.objects.create(Descripcion="Otra cosa", palabra_clave="choque")  # se ignora
+        with self.captureOnCommitCallbacks(execute=True):
+            clasificador.invalidar()
+
+    def test_clasificar(self):
+        self.assertEqual(clasificador.clasificar("Hurto", "en el mercado"), 1)
+        self.assertEqual(clasificador.clasificar("Robo", "terminó en balacera"), 3)
+        self.assertEqual(clasificador.clasificar("Choque"), clasificador.SIN_ESCALA)
+
+    def test_recompila_al_cambiar_escalas(self):
+        self.assertEqual(clasificador.clasificar("Incendio"), clasificador.SIN_ESCALA)
+        with self.captureOnCommitCallbacks(execute=True):
+            EscalaAlerta.objects.create(Descripcion="Medio", palabra_clave="incendio")
+        self.assertEqual(clasificador.clasificar("Incendio"), 2)
+
+    def test_reclasificar_todas_respeta_las_manuales(self):
+        sin = crear_incidente(self.usuario, NombreIncidente="Hurto", Escala=clasificador.SIN_ESCALA)
+        cambia = crear_incidente(self.usuario, NombreIncidente="Balacera", Escala=1)
+        manual = crear_incidente(self.usuario, NombreIncidente="Persona sospechosa", Escala=2)
+
+        revisados, cambiados = clasificador.reclasificar(todas=True, workers=1)
+        self.assertEqual((revisados, cambiados), (3, 2))
+        escalas = dict(DetalleAlerta.objects.values_list("pk", "Escala"))
+        self.assertEqual(escalas, {sin.pk: 1, cambia.pk: 3, manual.pk: 2})
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import jwt
+from django.conf import settings
+from django.core import mail
+from django.core.mail import get_connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import correo
+from api.models import CorreoPendiente
+
+from .base import ApiTestCase
+
+
+class ResetPasswordTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.anonimo = APIClient()
+
+    def _solicitar(self):
+        r = self.anonimo.post("/api/enviar-correo", {"email": self.usuario.correo}, format="json")
+        self.assertEqual(r.status_code, 200)
+        fila = CorreoPendiente.objects.get(Origen="reset_password")
+        return fila, fila.CuerpoTexto.rsplit("/", 1)[1]
+
+    def _cambiar(self, token, password="Nueva.5678"):
+        return self.anonimo.post(f"/api/reset-password/{token}", {"password": password}, format="json")
+
+    def test_enviado_vacia_el_cuerpo(self):
+        fila, token = self._solicitar()
+        correo.procesar(get_connection("django.core.mail.backends.locmem.EmailBackend"))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(token, mail.outbox[0].body)
+        fila.refresh_from_db()
+        self.assertEqual(fila.Estado, "enviado")
+        self.assertEqual(fila.CuerpoTexto, "")
+
+    def test_token_de_un_solo_uso(self):
+        _, token = self._solicitar()
+        self.assertEqual(self._cambiar(token).status_code, 200)
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.check_password("Nueva.5678"))
+        # Cambió la contraseña: el mismo enlace ya no sirve
+        self.assertEqual(self._cambiar(token, "Otra.9012").status_code, 400)
+
+    def test_token_vencido_o_sin_exp(self):
+        vencido = jwt.encode({"idUsuario": self.usuario.idUsuario,
+                              "exp": timezone.now() - timedelta(minutes=1)},
+                             settings.SECRET_KEY, algorithm="HS256")
+        sin_exp = jwt.encode({"idUsuario": self.usuario.idUsuario},
+                             settings.SECRET_KEY, algorithm="HS256")
+        self.assertEqual(self._cambiar(vencido).status_code, 400)
+        self.assertEqual(self._cambiar(sin_exp).status_code, 400)
+
+    def test_purgar_enviados_antiguos(self):
+        viejo = correo.encolar("registro", "Hola", "a@example.com", "texto")
+        nuevo = correo.encolar("registro", "Hola", "b@example.com", "texto")
+        pendiente = correo.encolar("registro", "Hola", "c@example.com", "texto")
+        CorreoPendiente.objects.filter(pk=viejo.pk).update(
+            Estado="enviado", FechaEnvio=timezone.now() - timedelta(days=correo.RETENCION_DIAS + 1))
+        CorreoPendiente.objects.filter(pk=nuevo.pk).update(Estado="enviado", FechaEnvio=timezone.now())
+
+        self.assertEqual(correo.purgar(), 1)
+        self.assertEqual(set(CorreoPendiente.objects.values_list("pk", flat=True)),
+                         {nuevo.pk, pendiente.pk})
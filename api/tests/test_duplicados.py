@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from api import duplicados
+from api.models import DetalleAlerta
+
+from .base import ApiTestCase, crear_incidente
+
+LAT, LNG = -12.0464, -77.0428
+METRO = 1 / 111_320  # grados de latitud
+
+
+class CriteriosTests(SimpleTestCase):
+    def test_similitud(self):
+        f = duplicados.fichas
+        self.assertEqual(duplicados.similitud(f("Robo"), f("Robo de celular")), 1.0)
+        self.assertEqual(duplicados.similitud(f("Choque"), f("Incendio")), 0.0)
+        self.assertEqual(duplicados.similitud(f("ROBÓ de celular"), f("robo del celular")), 1.0)
+        self.assertEqual(duplicados.similitud(f("de la"), f("Robo")), 0.0)
+
+    def test_distancia(self):
+        self.assertAlmostEqual(duplicados.distancia_metros(LAT, LNG, LAT + 100 * METRO, LNG), 100, delta=0.5)
+
+
+class BuscarCanonicoTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ahora = timezone.now()
+        self.canonico = crear_incidente(self.usuario, NombreIncidente="Robo de celular",
+                                        Latitud=LAT, Longitud=LNG, FechaHora=self.ahora)
+
+    def _buscar(self, nombre="Robo", metros=50, minutos=10):
+        return duplicados.buscar_canonico(
+            LAT + metros * METRO, LNG, self.ahora + timedelta(minutes=minutos), nombre)
+
+    def test_cerca_parecido_y_reciente(self):
+        self.assertEqual(self._buscar(), self.canonico.pk)
+
+    def test_criterios_que_lo_descartan(self):
+        self.assertIsNone(self._buscar(metros=duplicados.RADIO_METROS + 20))
+        self.assertIsNone(self._buscar(nombre="Incendio"))
+        self.assertIsNone(self._buscar(minutos=duplicados.VENTANA.total_seconds() / 60 + 5))
+        DetalleAlerta.objects.filter(pk=self.canonico.pk).update(EstadoIncidente="Resuelto")
+        self.assertIsNone(self._buscar())
+
+    def test_elige_el_mas_cercano(self):
+        cercano = crear_incidente(self.usuario, NombreIncidente="Robo", Latitud=LAT + 45 * METRO,
+                                  Longitud=LNG, FechaHora=self.ahora)
+        self.assertEqual(self._buscar(metros=50), cercano.pk)
+
+
+class LoteTests(ApiTestCase):
+    def _dets(self, *puntos):
+        ahora = timezone.now()
+        dets = [DetalleAlerta(NombreIncidente=nombre, Ubicacion="x", Latitud=LAT + metros * METRO,
+                              Longitud=LNG, FechaHora=ahora + timedelta(minutes=i),
+                              Escala=1, idUsuario=self.usuario)
+                for i, (nombre, metros) in enumerate(puntos)]
+        for det in dets:
+            det.calcular_geohash()
+        return DetalleAlerta.objects.bulk_create(dets)
+
+    def test_enlazar_lote(self):
+        existente = crear_incidente(self.usuario, NombreIncidente="Choque", Latitud=LAT + 500 * METRO,
+                                    Longitud=LNG, FechaHora=timezone.now())
+        robo, robo2, choque, lejos = self._dets(
+            ("Robo de celular", 0), ("Robo", 30), ("Choque múltiple", 520), ("Robo", 2000))
+        enlazados = duplicados.enlazar_lote([robo, robo2, choque, lejos])
+        self.assertEqual({d.pk for d in enlazados}, {robo2.pk, choque.pk})
+        canonicos = dict(DetalleAlerta.objects.values_list("pk", "idCanonico"))
+        self.assertEqual(canonicos[robo2.pk], robo.pk)
+        self.assertEqual(canonicos[choque.pk], existente.pk)
+        self.assertIsNone(canonicos[lejos.pk])
+
+    def test_agrupar_historial_igual_que_al_registrar(self):
+        robo, robo2, _ = self._dets(("Robo de celular", 0), ("Robo", 30), ("Incendio", 10))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(duplicados.agrupar(), (3, 1))
+        self.assertEqual(DetalleAlerta.objects.get(pk=robo2.pk).idCanonico_id, robo.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(duplicados.separar_todos(), 1)
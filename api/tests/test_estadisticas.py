@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.urls import reverse
+
+from api import estadisticas
+from api.models import DetalleAlerta, ResumenDiarioAlerta
+
+from .base import ApiTestCase
+
+
+def _resumen():
+    return {
+        (f.Fecha, f.Escala, f.EstadoIncidente): (f.Total, f.ConAtencion)
+        for f in ResumenDiarioAlerta.objects.all() if f.Total or f.ConAtencion
+    }
+
+
+class ResumenIncrementalTests(ApiTestCase):
+    """El resumen que mantienen las vistas coincide con el reconstruido desde cero."""
+
+    def setUp(self):
+        super().setUp()
+        self.usuario.is_staff = True
+        self.usuario.save(update_fields=["is_staff"])
+
+    def _registrar(self, nombre, lat, escala=1):
+        r = self.cliente.post(reverse("registrar_incidente"), {
+            "Ubicacion": "Av. Arequipa", "NombreIncidente": nombre, "escala": escala,
+            "Latitud": lat, "Longitud": -77.0428}, format="multipart")
+        self.assertEqual(r.status_code, 201)
+        return r.json()["registro"]
+
+    def _igual_a_reconstruido(self):
+        incremental = _resumen()
+        estadisticas.reconstruir()
+        self.assertEqual(incremental, _resumen())
+
+    def test_altas_cambios_y_duplicados(self):
+        robo = self._registrar("Robo de celular", -12.05)
+        self._registrar("Choque", -12.10, escala=3)
+        duplicado = self._registrar("Robo de un celular", -12.0501)
+        self.assertEqual(duplicado["duplicado_de"], robo["idTipoIncidencia"])
+        self.cliente.post(reverse("registrar_incidentes_lote"), [
+            {"Ubicacion": "x", "NombreIncidente": f"Incendio {i}", "escala": 1 + i % 3,
+             "Latitud": -12.2 - i / 10, "Longitud": -77.0}
+            for i in range(6)], format="json")
+
+        r = self.cliente.patch(reverse("gestion_update_incidente", kwargs={"id": robo["idTipoIncidencia"]}),
+                               {"estado": "En proceso"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        r = self.cliente.patch(reverse("gestion_update_incidentes_lote"),
+                               {"estado": "Resuelto", "filtro": {"escala": 3}}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self._igual_a_reconstruido()
+
+    def test_borrar_canonico_promueve_al_duplicado(self):
+        canonico = self._registrar("Robo de celular", -12.05)
+        self._registrar("Robo de celular", -12.0501)
+        DetalleAlerta.objects.get(pk=canonico["idTipoIncidencia"]).delete()
+        self.assertEqual(sum(t for t, _ in _resumen().values()), 1)
+        self._igual_a_reconstruido()
+
+    def test_dashboard_lee_el_resumen(self):
+        self._registrar("Robo", -12.05, escala=3)
+        self._registrar("Choque", -12.10, escala=2)
+        datos = estadisticas.calcular_dashboard()
+        self.assertEqual(datos["total_incidentes"], 2)
+        self.assertEqual(datos["alertas_alta_escala"], 1)
+        self.assertEqual(datos["alertas_hoy"], 2)
+
+    def test_dashboard_stats_sin_datos_simulados(self):
+        self._registrar("Robo", -12.05, escala=3)
+        self._registrar("Choque", -12.10, escala=1)
+        stats = self.cliente.get(reverse("dashboard_stats")).json()["stats"]
+        # Sin atenciones no hay casos resueltos
+        self.assertEqual((stats["total_incidentes"], stats["casos_resueltos"], stats["resueltas_hoy"]),
+                         (2, 0, 0))
+        self.assertEqual((stats["alertas_activas"], stats["porcentaje_alta_escala"]), (2, 50.0))
+
+    def test_dashboard_stats_error_sin_traza(self):
+        with mock.patch.object(estadisticas, "calcular_dashboard", side_effect=RuntimeError("secreto")), \
+                self.assertLogs("api.views", "ERROR"):
+            r = self.cliente.get(reverse("dashboard_stats"))
+        self.assertEqual(r.status_code, 500)
+        self.assertNotIn("traceback", r.json())
+        self.assertNotIn("secreto", r.content.decode())
@@ -0,0 +1,41 @@
+import json
+from unittest import mock
+
+from django.urls import reverse
+
+from api import exportacion
+from api.models import DetalleAlerta
+
+from .base import ApiTestCase, crear_incidente
+
+
+class StreamTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = [crear_incidente(self.usuario, NombreIncidente=f"Robo {i}").pk for i in range(5)]
+
+    def _cuerpo(self, r):
+        self.assertTrue(r.streaming)
+        self.assertEqual(r["Cache-Control"], "no-store")
+        return b"".join(r.streaming_content).decode()
+
+    def test_json_igual_al_listado(self):
+        esperado = self.cliente.get(reverse("todas_alertas")).json()
+        # Lotes chicos: el arreglo se arma bien entre un lote del cursor y el siguiente
+        with mock.patch.object(exportacion, "CHUNK_SIZE", 2):
+            r = self.cliente.get(reverse("todas_alertas"), {"stream": "json"})
+        self.assertEqual(r["Content-Type"], "application/json")
+        self.assertEqual(json.loads(self._cuerpo(r)), esperado)
+
+    def test_ndjson_una_fila_por_linea(self):
+        r = self.cliente.get(reverse("historial_incidentes"), HTTP_ACCEPT="application/x-ndjson")
+        self.assertEqual(r["Content-Type"], "application/x-ndjson")
+        lineas = self._cuerpo(r).splitlines()
+        self.assertEqual(len(lineas), len(self.ids))
+        esperado = self.cliente.get(reverse("historial_incidentes")).json()
+        self.assertEqual([json.loads(linea) for linea in lineas], esperado)
+
+    def test_sin_filas(self):
+        DetalleAlerta.objects.all().delete()
+        self.assertEqual(self._cuerpo(self.cliente.get(reverse("todas_alertas"), {"stream": "1"})), "[]")
+        self.assertEqual(self._cuerpo(self.cliente.get(reverse("todas_alertas"), {"stream": "ndjson"})), "")
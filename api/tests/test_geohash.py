@@ -0,0 +1,75 @@
+import random
+
+from django.test import SimpleTestCase
+
+from api import geohash
+from api.heatmap import FiltroHeatmap
+from api.models import DetalleAlerta
+
+from .base import ApiTestCase
+
+# (s, w, n, e): barrio, distrito, ciudad y cruzando el ecuador y Greenwich
+BBOXES = [
+    (-12.05, -77.05, -12.04, -77.04),
+    (-12.2, -77.2, -11.9, -76.9),
+    (-12.6, -77.3, -11.5, -76.6),
+    (-0.3, -0.3, 0.3, 0.3),
+]
+MUNDO = (-80.0, -170.0, 80.0, 170.0)  # ni la precisión 1 alcanza: sólo el filtro exacto
+
+
+def _puntos(s, w, n, e, cantidad, rnd):
+    # Un margen alrededor del bbox y sus bordes exactos: lo de adentro y lo de afuera
+    alto, ancho = n - s, e - w
+    puntos = [(s, w), (n, e), (s, e), (n, w)]
+    puntos += [(rnd.uniform(s - alto / 2, n + alto / 2), rnd.uniform(w - ancho / 2, e + ancho / 2))
+               for _ in range(cantidad)]
+    return puntos
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode_conocido(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    def test_caja_contiene_el_punto(self):
+        rnd = random.Random(1)
+        for _ in range(200):
+            lat, lng = rnd.uniform(-90, 90), rnd.uniform(-180, 180)
+            for precision in (1, 5, geohash.PRECISION):
+                s, w, n, e = geohash.caja(geohash.encode(lat, lng, precision))
+                self.assertTrue(s <= lat <= n and w <= lng <= e)
+                self.assertEqual((n - s, e - w), geohash.tamano_celda(precision))
+
+    def test_celdas_cubren_el_bbox(self):
+        rnd = random.Random(2)
+        for bbox in BBOXES:
+            celdas = geohash.celdas_bbox(*bbox)
+            self.assertLessEqual(len(celdas), geohash.MAX_CELDAS)
+            s, w, n, e = bbox
+            for lat, lng in _puntos(*bbox, 300, rnd):
+                if s <= lat <= n and w <= lng <= e:
+                    self.assertTrue(geohash.encode(lat, lng).startswith(tuple(celdas)), (bbox, lat, lng))
+
+    def test_bbox_demasiado_grande(self):
+        self.assertIsNone(geohash.celdas_bbox(*MUNDO))
+
+
+class FiltroBboxTests(ApiTestCase):
+    def test_igual_al_filtro_exacto(self):
+        rnd = random.Random(3)
+        dets = []
+        for bbox in [*BBOXES, MUNDO]:
+            for lat, lng in _puntos(*bbox, 60, rnd):
+                det = DetalleAlerta(NombreIncidente="Robo", Ubicacion="x", Latitud=lat, Longitud=lng,
+                                    Escala=1, idUsuario=self.usuario)
+                det.calcular_geohash()
+                dets.append(det)
+        DetalleAlerta.objects.bulk_create(dets)
+
+        for s, w, n, e in [*BBOXES, MUNDO]:
+            por_celdas = FiltroHeatmap({"bbox": f"{s},{w},{n},{e}"}).queryset()
+            exacto = DetalleAlerta.objects.filter(
+                Latitud__gte=s, Latitud__lte=n, Longitud__gte=w, Longitud__lte=e)
+            self.assertEqual(set(por_celdas.values_list("pk", flat=True)),
+                             set(exacto.values_list("pk", flat=True)), (s, w, n, e))
+            self.assertTrue(exacto.exists())
@@ -0,0 +1,33 @@
+from api.models import Administrador, DetalleAlerta, RolUsuario
+
+from .base import ApiTestCase, crear_incidente
+
+
+class EstadoLoteTests(ApiTestCase):
+    URL = "/api/gestion/incidentes/estado/"
+
+    def setUp(self):
+        super().setUp()
+        self.incidentes = [crear_incidente(self.usuario) for _ in range(3)]
+        self.ids = [d.pk for d in self.incidentes]
+
+    def _resolver(self):
+        return self.cliente.patch(self.URL, {"estado": "Resuelto", "ids": self.ids}, format="json")
+
+    def test_usuario_comun_no_puede(self):
+        r = self._resolver()
+        self.assertEqual(r.status_code, 403)
+        self.assertIn("error", r.json())
+        self.assertFalse(DetalleAlerta.objects.filter(EstadoIncidente="Resuelto").exists())
+
+    def test_staff(self):
+        self.usuario.is_staff = True
+        self.usuario.save(update_fields=["is_staff"])
+        self.assertEqual(self._resolver().status_code, 200)
+        self.assertEqual(DetalleAlerta.objects.filter(EstadoIncidente="Resuelto").count(), 3)
+
+    def test_administrador(self):
+        rol = RolUsuario.objects.create(NombreRol="Administrador", idUsuario=self.usuario)
+        Administrador.objects.create(idRolUsuario=rol, Nombre="Ana", Apellido="Pérez")
+        self.assertEqual(self._resolver().status_code, 200)
+        self.assertEqual(DetalleAlerta.objects.filter(EstadoIncidente="Resuelto").count(), 3)
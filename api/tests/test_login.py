@@ -0,0 +1,58 @@
+import importlib
+
+from django.apps import apps
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import roles
+from api.models import Administrador, RolUsuario, Usuario
+
+from .base import ApiTestCase, crear_usuario
+
+claves = importlib.import_module("api.migrations.0025_usuario_claves_normalizadas")
+
+
+class LoginTests(ApiTestCase):
+    def test_nombre_sin_distinguir_mayusculas(self):
+        r = APIClient().post(reverse("token_obtain_pair"),
+                             {"username": "VECINO", "password": "Clave.1234"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual((r.data["idUsuario"], r.data["role"]), (self.usuario.pk, "user"))
+
+    def test_rol_cacheado_se_invalida(self):
+        self.assertEqual(roles.rol(self.usuario), "user")
+        with self.captureOnCommitCallbacks(execute=True):
+            rol = RolUsuario.objects.create(NombreRol="Administrador", idUsuario=self.usuario)
+            Administrador.objects.create(idRolUsuario=rol, Nombre="Ana", Apellido="Pérez")
+        self.assertEqual(roles.rol(self.usuario), "admin")
+        # Sin la versión en el caché: se recrea con un valor nuevo y nada viejo reaparece
+        roles.cache.delete(roles._CLAVE_VERSION)
+        self.assertEqual(roles.rol(self.usuario), "admin")
+
+    def test_por_correo(self):
+        self.assertEqual(Usuario.objects.por_correo(" Vecino@Example.COM "), self.usuario)
+        self.assertIsNone(Usuario.objects.por_correo(""))
+
+
+class MigracionClavesTests(ApiTestCase):
+    def test_conflictos(self):
+        choques = claves.conflictos([
+            (1, "Ana", "ana@example.com"),
+            (2, "ANA", "otra@example.com"),
+            (3, None, "x@example.com"),
+            (4, "", "X@example.com"),
+            (5, None, None),
+        ])
+        self.assertEqual(sorted(choques), [
+            ("correo", "x@example.com", [3, 4]),
+            ("nombre", "ana", [1, 2]),
+        ])
+
+    def test_sin_nombre_no_chocan(self):
+        self.assertEqual(claves.conflictos([(1, None, "a@x.pe"), (2, None, "b@x.pe"), (3, "", "c@x.pe")]), [])
+
+    def test_poblar_falla_y_lista_las_cuentas(self):
+        otro = crear_usuario("otro")
+        Usuario.objects.filter(pk=otro.pk).update(nombre="Vecino")  # sin pasar por save()
+        with self.assertRaisesRegex(RuntimeError, f"nombre 'vecino': usuarios {self.usuario.pk}, {otro.pk}"):
+            claves.poblar_claves(apps, None)
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import cambios, duplicados, views
+from api.models import CorreoPendiente, DetalleAlerta
+
+from .base import ApiTestCase
+
+
+def _item(**campos):
+    datos = {"Ubicacion": "Av. Arequipa", "NombreIncidente": "Robo", "escala": 1,
+             "Latitud": -12.05, "Longitud": -77.04}
+    datos.update(campos)
+    return datos
+
+
+class LoteTests(ApiTestCase):
+    def _enviar(self, cuerpo):
+        return self.cliente.post(reverse("registrar_incidentes_lote"), cuerpo, format="json")
+
+    def test_errores_por_elemento(self):
+        version = cambios.version_actual()
+        r = self._enviar([
+            _item(),
+            _item(NombreIncidente=""),
+            "no es un objeto",
+            _item(escala=7),
+            _item(Latitud="norte"),
+            _item(NombreIncidente="Choque", Latitud=-12.3),
+        ])
+        self.assertEqual(r.status_code, 201)
+        datos = r.json()
+        self.assertEqual((datos["creados"], datos["errores"]), (2, 4))
+        resultados = datos["resultados"]
+        self.assertEqual([x["indice"] for x in resultados], list(range(6)))
+        self.assertEqual([x["ok"] for x in resultados], [True, False, False, False, False, True])
+        self.assertEqual(resultados[1]["error"], "Faltan campos: NombreIncidente")
+        self.assertEqual(resultados[2]["error"], "Se espera un objeto")
+        self.assertIn("escala", resultados[3]["error"])
+        self.assertIn("lat/lon", resultados[4]["error"])
+
+        creados = {resultados[0]["idTipoIncidencia"], resultados[5]["idTipoIncidencia"]}
+        self.assertEqual(set(DetalleAlerta.objects.values_list("pk", flat=True)), creados)
+        self.assertTrue(all(d.Geohash for d in DetalleAlerta.objects.all()))
+        self.assertEqual(CorreoPendiente.objects.count(), 2)
+        self.assertEqual(cambios.version_actual(), version + 2)
+
+    def test_todos_invalidos(self):
+        r = self._enviar({"incidentes": [_item(Ubicacion=""), _item(escala="alta")]})
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual((r.json()["creados"], r.json()["errores"]), (0, 2))
+        self.assertFalse(DetalleAlerta.objects.exists())
+
+    def test_cuerpo_invalido_y_limite(self):
+        for cuerpo in ([], {"incidentes": "x"}, {"otro": []}):
+            self.assertEqual(self._enviar(cuerpo).status_code, 400, cuerpo)
+        with mock.patch.object(views, "INCIDENTES_LOTE_MAX", 2):
+            self.assertEqual(self._enviar([_item()] * 3).status_code, 413)
+        self.assertEqual(APIClient().post(reverse("registrar_incidentes_lote"), [_item()],
+                                          format="json").status_code, 401)
+
+    def test_falla_a_mitad_no_deja_nada(self):
+        with mock.patch.object(duplicados, "enlazar_lote", side_effect=RuntimeError("sin conexión")):
+            r = self._enviar([_item(), _item(NombreIncidente="Choque")])
+        self.assertEqual(r.status_code, 500)
+        self.assertFalse(DetalleAlerta.objects.exists())
+        self.assertFalse(CorreoPendiente.objects.exists())
+
+    def test_duplicados_dentro_del_lote(self):
+        r = self._enviar([_item(NombreIncidente="Robo de celular"), _item(Latitud=-12.0501)])
+        primero, segundo = r.json()["resultados"]
+        self.assertIsNone(primero["duplicado_de"])
+        self.assertEqual(segundo["duplicado_de"], primero["idTipoIncidencia"])
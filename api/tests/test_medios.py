@@ -0,0 +1,111 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import medios, miniaturas
+from api.models import DetalleAlerta
+
+from .base import ApiTestCase, crear_usuario
+
+CONTENIDO = bytes(range(256)) * 4  # 1024 bytes
+
+
+class NombreSeguroTests(SimpleTestCase):
+    def test_rechaza_rutas_y_temporales(self):
+        for nombre in ("../settings.py", "archivos/../../x", "archivos//x", "./x",
+                       ".entrantes/123", "archivos/.oculto", "archivos/video.mp4.part"):
+            self.assertIsNone(medios._nombre_seguro(nombre), nombre)
+        self.assertEqual(medios._nombre_seguro("archivos/ab/cd/f.jpg"), "archivos/ab/cd/f.jpg")
+
+
+class ServirTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        r = self.cliente.post(reverse("registrar_incidente"), {
+            "Ubicacion": "Av. Arequipa", "NombreIncidente": "Robo", "escala": 1,
+            "Archivo": SimpleUploadedFile("video.mp4", CONTENIDO, content_type="video/mp4"),
+        }, format="multipart")
+        self.assertEqual(r.status_code, 201)
+        self.nombre = DetalleAlerta.objects.get(pk=r.json()["registro"]["idTipoIncidencia"]).Archivo.name
+        self.ruta = f"{settings.MEDIA_URL}{self.nombre}"
+
+    def _jwt(self, usuario):
+        return {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(usuario).access_token}"}
+
+    def _get(self, url=None, **extra):
+        r = self.client.get(url or self.ruta, **extra)
+        cuerpo = b"".join(r.streaming_content) if r.streaming else r.content
+        return r, cuerpo
+
+    def test_autorizacion(self):
+        self.assertEqual(self._get()[0].status_code, 401)
+        self.assertEqual(self._get(**self._jwt(crear_usuario("otro")))[0].status_code, 403)
+        r, cuerpo = self._get(**self._jwt(self.usuario))
+        self.assertEqual((r.status_code, cuerpo), (200, CONTENIDO))
+        staff = crear_usuario("staff", is_staff=True)
+        self.assertEqual(self._get(**self._jwt(staff))[0].status_code, 200)
+        # La miniatura hereda el permiso de su original (aún no generada: 404, no 403)
+        miniatura = f"{settings.MEDIA_URL}{miniaturas.rutas(self.nombre)[0]}"
+        self.assertEqual(self._get(miniatura, **self._jwt(crear_usuario("otro2")))[0].status_code, 403)
+        self.assertEqual(self._get(miniatura, **self._jwt(self.usuario))[0].status_code, 404)
+
+    def test_url_firmada(self):
+        firmada = medios.url(None, self.nombre)
+        r, cuerpo = self._get(firmada)
+        self.assertEqual((r.status_code, cuerpo), (200, CONTENIDO))
+        self.assertIn("immutable", r["Cache-Control"])
+        self.assertTrue(r["Cache-Control"].startswith("private"))
+
+        # Firma de otro archivo, alterada o vencida: se exige usuario
+        otra = medios.url(None, "archivos_alertas/otro.mp4").split("?")[1]
+        self.assertEqual(self._get(f"{self.ruta}?{otra}")[0].status_code, 401)
+        exp = int(time.time()) - 1
+        vencida = f"{self.ruta}?exp={exp}&firma={medios._firma(self.nombre, exp)}"
+        self.assertEqual(self._get(vencida)[0].status_code, 401)
+        # Pasadas las ventanas de validez la URL emitida vence; una nueva sí vale
+        with mock.patch.object(medios.time, "time", return_value=time.time() + 3 * medios.FIRMA_SEGUNDOS):
+            self.assertEqual(self._get(firmada)[0].status_code, 401)
+            self.assertEqual(self._get(medios.url(None, self.nombre))[0].status_code, 200)
+
+    def test_rangos(self):
+        auth = self._jwt(self.usuario)
+        r, cuerpo = self._get(HTTP_RANGE="bytes=10-19", **auth)
+        self.assertEqual((r.status_code, cuerpo, r["Content-Range"]), (206, CONTENIDO[10:20], "bytes 10-19/1024"))
+        r, cuerpo = self._get(HTTP_RANGE="bytes=-4", **auth)
+        self.assertEqual((r.status_code, cuerpo), (206, CONTENIDO[-4:]))
+        r, cuerpo = self._get(HTTP_RANGE="bytes=1000-", **auth)
+        self.assertEqual((r.status_code, cuerpo, r["Content-Length"]), (206, CONTENIDO[1000:], "24"))
+
+        for invalido in ("bytes=1024-", "bytes=20-10", "bytes=-0"):
+            r, _ = self._get(HTTP_RANGE=invalido, **auth)
+            self.assertEqual((r.status_code, r["Content-Range"]), (416, "bytes */1024"), invalido)
+
+        # Multi-rango o If-Range de otra versión: archivo completo
+        self.assertEqual(self._get(HTTP_RANGE="bytes=0-1,5-6", **auth)[1], CONTENIDO)
+        r, cuerpo = self._get(HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"otra"', **auth)
+        self.assertEqual((r.status_code, cuerpo), (200, CONTENIDO))
+
+    def test_condicional_y_offload(self):
+        auth = self._jwt(self.usuario)
+        etag = self._get(**auth)[0]["ETag"]
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag, **auth)[0].status_code, 304)
+        with mock.patch.object(medios, "SERVIDOR", "nginx"):
+            r, cuerpo = self._get(**auth)
+        self.assertEqual((r["X-Accel-Redirect"], cuerpo), (medios.ACCEL_PREFIJO + self.nombre, b""))
+
+    def test_nombres_no_servidos(self):
+        auth = self._jwt(self.usuario)
+        # Temporales y cargas a medio subir: 404 antes de mirar permisos
+        for nombre in (".entrantes/1", f"{self.nombre}.part"):
+            self.assertEqual(self._get(f"{settings.MEDIA_URL}{nombre}")[0].status_code, 404)
+        # Un archivo ajeno que no existe no se distingue de uno existente
+        no_existe = f"{settings.MEDIA_URL}archivos_alertas/no-existe.mp4"
+        self.assertEqual(self._get(no_existe, **auth)[0].status_code, 403)
+        staff = self._jwt(crear_usuario("staff", is_staff=True))
+        self.assertEqual(self._get(no_existe, **staff)[0].status_code, 404)
+        self.assertEqual(self.client.post(self.ruta, **auth).status_code, 405)
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import metricas
+
+from .base import ApiTestCase
+
+
+def _pid_muerto():
+    pid = 2 ** 22
+    while metricas._proceso_vivo(pid):
+        pid += 1
+    return pid
+
+
+class DirectorioTemporal:
+    """Cada test escribe sus archivos en un METRICAS_DIR propio."""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        for parche in (mock.patch.object(metricas, "DIRECTORIO", directorio),
+                       mock.patch.object(metricas, "_archivos", {})):
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.directorio = directorio
+
+    def _otro_proceso(self, tipo, pid, clave, valor):
+        archivo = metricas._ArchivoMmap(os.path.join(self.directorio, f"{tipo}_{pid}.db"))
+        archivo.sumar(clave, valor)
+
+
+class ExposicionTests(DirectorioTemporal, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        registro = list(metricas.REGISTRO)
+        self.addCleanup(setattr, metricas, "REGISTRO", registro)
+        metricas.REGISTRO.clear()
+        self.contador = metricas.Contador("prueba_total", "Ayuda", ("vista",))
+        self.gauge = metricas.Gauge("prueba_en_curso", "Ayuda")
+        self.histograma = metricas.Histograma("prueba_segundos", "Ayuda", buckets=(0.1, 1))
+
+    def _lineas(self):
+        return [linea for linea in metricas.exposicion().splitlines() if not linea.startswith("#")]
+
+    def test_suma_los_procesos(self):
+        self.contador.inc(vista="a")
+        self.contador.inc(2, vista="a")
+        muerto = _pid_muerto()
+        # Los contadores de un worker que ya terminó se conservan; sus gauges no
+        self._otro_proceso("acumulado", muerto, metricas._clave("prueba_total", ["a"]), 4)
+        self._otro_proceso("gauge", muerto, metricas._clave("prueba_en_curso", []), 7)
+        with self.gauge.en_curso():
+            self.gauge.inc()
+            lineas = self._lineas()
+        self.assertIn('prueba_total{vista="a"} 7', lineas)
+        self.assertIn("prueba_en_curso 2", lineas)
+
+    def test_histograma_acumula_buckets(self):
+        for valor in (0.05, 0.5, 0.7, 3):
+            self.histograma.observar(valor)
+        self.assertEqual(self._lineas(), [
+            'prueba_segundos_bucket{le="0.1"} 1',
+            'prueba_segundos_bucket{le="1"} 3',
+            'prueba_segundos_bucket{le="+Inf"} 4',
+            "prueba_segundos_sum 4.25",
+            "prueba_segundos_count 4",
+        ])
+
+    def test_etiquetas_escapadas_y_validadas(self):
+        self.contador.inc(vista='di"jo\n')
+        self.assertIn('prueba_total{vista="di\\"jo\\n"} 1', self._lineas())
+        with self.assertRaises(ValueError):
+            self.contador.inc(ruta="x")
+
+    def test_archivo_crece_y_se_reabre(self):
+        claves = [metricas._clave("prueba_total", [f"vista-{i:05d}"]) for i in range(3000)]
+        for clave in claves:
+            metricas._sumar("acumulado", clave, 1)
+        ruta = os.path.join(self.directorio, f"acumulado_{os.getpid()}.db")
+        self.assertGreater(os.path.getsize(ruta), metricas._TAMANO_INICIAL)
+        # Un worker reiniciado con el mismo pid sigue sumando sobre sus registros
+        metricas._ArchivoMmap(ruta).sumar(claves[-1], 1)
+        leidos = dict(metricas._leer(ruta))
+        self.assertEqual(len(leidos), len(claves))
+        self.assertEqual(leidos[claves[-1]], 2)
+
+
+class MetricasEndpointTests(DirectorioTemporal, ApiTestCase):
+    def test_requiere_token_o_staff(self):
+        url = reverse("metricas")
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        with override_settings(METRICAS_TOKEN="secreto"):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer otro").status_code, 401)
+            r = self.client.get(url, HTTP_AUTHORIZATION="Bearer secreto")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], metricas.CONTENT_TYPE)
+
+        jwt = APIClient()
+        jwt.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.usuario).access_token}")
+        self.assertEqual(jwt.get(url).status_code, 401)
+        self.usuario.is_staff = True
+        self.usuario.save(update_fields=["is_staff"])
+        self.assertEqual(jwt.get(url).status_code, 200)
+
+    def test_registra_los_requests(self):
+        self.cliente.get(reverse("todas_alertas"))
+        with override_settings(METRICAS_TOKEN="secreto"):
+            texto = self.client.get(reverse("metricas"), HTTP_AUTHORIZATION="Bearer secreto").content.decode()
+        self.assertIn('seguridad_http_requests_total{vista="todas_alertas",metodo="GET",status="200"} 1',
+                      texto)
+        self.assertIn('seguridad_http_request_duration_seconds_count{vista="todas_alertas",metodo="GET"} 1',
+                      texto)
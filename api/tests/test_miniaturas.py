@@ -0,0 +1,93 @@
+import io
+import os
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from api import imagenes, miniaturas
+from api.models import DetalleAlerta
+
+from .base import ApiTestCase
+
+if imagenes.hay_pillow():
+    from PIL import Image
+
+
+def _png(ancho=1600, alto=800, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (ancho, alto), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@unittest.skipUnless(imagenes.hay_pillow(), "requiere Pillow")
+class MiniaturasTests(ApiTestCase):
+    def _registrar(self, contenido):
+        with mock.patch.object(miniaturas, "enviar") as enviar, \
+                self.captureOnCommitCallbacks(execute=True):
+            r = self.cliente.post(reverse("registrar_incidente"), {
+                "Ubicacion": "Av. Arequipa", "NombreIncidente": "Robo", "escala": 1,
+                "Archivo": SimpleUploadedFile("foto.png", contenido, content_type="image/png"),
+            }, format="multipart")
+        self.assertEqual(r.status_code, 201)
+        return DetalleAlerta.objects.get(pk=r.json()["registro"]["idTipoIncidencia"]), enviar
+
+    def _terminar(self, det):
+        futuro = Future()
+        futuro.set_result(imagenes.generar(*miniaturas._argumentos(det.Archivo.name)))
+        return miniaturas._guardar(det.pk, det.Archivo.name, futuro)
+
+    def test_generar_respeta_los_lados(self):
+        det, enviar = self._registrar(_png())
+        enviar.assert_called_once_with(det.pk, det.Archivo.name)
+        self.assertIsNone(det.Miniatura)
+
+        self.assertTrue(self._terminar(det))
+        miniatura, previa = miniaturas.rutas(det.Archivo.name)
+        with Image.open(os.path.join(self.media, miniatura)) as img:
+            self.assertEqual(img.size, (miniaturas.MINIATURA_LADO, miniaturas.MINIATURA_LADO // 2))
+        with Image.open(os.path.join(self.media, previa)) as img:
+            self.assertEqual((img.format, max(img.size)), ("JPEG", miniaturas.PREVIA_LADO))
+
+        det.refresh_from_db()
+        self.assertEqual(det.Miniatura, miniatura)
+        datos = self.cliente.get(reverse("gestion_list_incidentes")).json()
+        self.assertTrue(datos[0]["thumbnail_url"])
+
+    def test_mismo_contenido_reutiliza_la_miniatura(self):
+        contenido = _png()
+        primero, _ = self._registrar(contenido)
+        self._terminar(primero)
+        segundo, enviar = self._registrar(contenido)
+        enviar.assert_not_called()
+        self.assertEqual(segundo.Miniatura, miniaturas.rutas(primero.Archivo.name)[0])
+
+    def test_no_pisa_un_archivo_cambiado(self):
+        det, _ = self._registrar(_png())
+        nombre = det.Archivo.name
+        DetalleAlerta.objects.filter(pk=det.pk).update(Archivo="incidentes/otro.png")
+        futuro = Future()
+        futuro.set_result([])
+        self.assertFalse(miniaturas._guardar(det.pk, nombre, futuro))
+        fallido = Future()
+        fallido.set_exception(OSError("imagen corrupta"))
+        with self.assertLogs("api.miniaturas", "WARNING"):
+            self.assertFalse(miniaturas._guardar(det.pk, "incidentes/otro.png", fallido))
+
+    def test_procesar_pendientes(self):
+        procesable, _ = self._registrar(_png())
+        corrupto, _ = self._registrar(b"\x89PNG no es una imagen")
+        with mock.patch.object(miniaturas, "_pool", return_value=ThreadPoolExecutor(2)), \
+                self.assertLogs("api.miniaturas", "WARNING"):
+            self.assertEqual(miniaturas.procesar_pendientes(), (1, 1))
+        self.assertEqual(
+            dict(DetalleAlerta.objects.values_list("pk", "Miniatura")),
+            {procesable.pk: miniaturas.rutas(procesable.Archivo.name)[0], corrupto.pk: None})
+
+    def test_previa_para_correo(self):
+        det, _ = self._registrar(_png())
+        ruta = miniaturas.previa_para_correo(det.Archivo.name)
+        self.assertEqual(ruta, os.path.join(self.media, miniaturas.rutas(det.Archivo.name)[1]))
+        self.assertIsNone(miniaturas.previa_para_correo("incidentes/no-existe.pdf"))
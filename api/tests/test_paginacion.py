@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from api import paginacion
+
+from .base import ApiTestCase, crear_incidente
+
+
+class CursorTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        ahora = timezone.now().replace(microsecond=0)
+        # Grupos con la misma FechaHora: el pk desempata sin saltar ni repetir filas
+        self.ids = [
+            crear_incidente(self.usuario, FechaHora=ahora - timedelta(minutes=i // 3)).pk
+            for i in range(11)
+        ]
+
+    def _todas(self, page_size):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            params = {"page_size": page_size}
+            if cursor:
+                params["cursor"] = cursor
+            r = self.cliente.get(reverse("todas_alertas"), params)
+            self.assertEqual(r.status_code, 200)
+            datos = r.json()
+            vistos += [a["id"] for a in datos["results"]]
+            paginas += 1
+            cursor = datos["next"]
+            if not cursor:
+                return vistos, paginas
+
+    def test_recorre_todo_en_orden(self):
+        esperados = [a["id"] for a in self.cliente.get(reverse("todas_alertas")).json()]
+        for page_size in (1, 3, 4, 11, 50):
+            vistos, paginas = self._todas(page_size)
+            self.assertEqual(vistos, esperados, page_size)
+            self.assertEqual(paginas, max(1, -(-len(esperados) // page_size)))
+
+    def test_filas_nuevas_no_desplazan_la_pagina(self):
+        r = self.cliente.get(reverse("todas_alertas"), {"page_size": 4}).json()
+        crear_incidente(self.usuario)  # llega arriba de todo mientras se pagina
+        siguiente = self.cliente.get(reverse("todas_alertas"),
+                                     {"page_size": 4, "cursor": r["next"]}).json()
+        primera = {a["id"] for a in r["results"]}
+        self.assertFalse(primera & {a["id"] for a in siguiente["results"]})
+
+    def test_cursor_invalido(self):
+        for cursor in ("no-es-base64!", paginacion.codificar_cursor(timezone.now(), 1)[:-4]):
+            r = self.cliente.get(reverse("todas_alertas"), {"cursor": cursor})
+            self.assertEqual(r.status_code, 400)
+        r = self.cliente.get(reverse("todas_alertas"), {"page_size": "diez"})
+        self.assertEqual(r.status_code, 400)
+
+    def test_codificar_decodificar(self):
+        fecha = timezone.now()
+        self.assertEqual(paginacion.decodificar_cursor(paginacion.codificar_cursor(fecha, 42)),
+                         (fecha, 42))
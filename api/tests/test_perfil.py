@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import autenticacion
+from api.models import Usuario
+
+from .base import ApiTestCase
+
+
+class UsuarioCacheadoTests(ApiTestCase):
+    """Las vistas que guardan request.user no pisan columnas con la copia cacheada."""
+
+    def setUp(self):
+        super().setUp()
+        autenticacion.usuarios.limpiar()
+        self.addCleanup(autenticacion.usuarios.limpiar)
+        self.jwt = APIClient()
+        token = RefreshToken.for_user(self.usuario).access_token
+        self.jwt.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        # Primer request: el usuario queda en la caché del proceso
+        self.assertEqual(self.jwt.get("/api/perfil-usuario/").status_code, 200)
+        # Cambio hecho por otro worker: sin señal, la copia cacheada queda vieja
+        Usuario.objects.filter(pk=self.usuario.pk).update(nombre="renombrado", is_staff=True)
+
+    def test_cambiar_password_no_pisa_otras_columnas(self):
+        r = self.jwt.post("/api/cambiar-password/", {"nueva": "Nueva.5678"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        u = Usuario.objects.get(pk=self.usuario.pk)
+        self.assertTrue(u.check_password("Nueva.5678"))
+        self.assertEqual(u.nombre, "renombrado")
+        self.assertTrue(u.is_staff)
+
+    def test_perfil_solo_guarda_el_nombre(self):
+        r = self.jwt.patch("/api/perfil-usuario/", {"telefono": "999888777"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        u = Usuario.objects.get(pk=self.usuario.pk)
+        self.assertEqual(u.nombre, "renombrado")
+        self.assertTrue(u.is_staff)
+
+
+class InvalidacionEntreWorkersTests(ApiTestCase):
+    """Un cambio hecho en otro worker se ve en el siguiente request, sin esperar el TTL."""
+
+    def setUp(self):
+        super().setUp()
+        autenticacion.usuarios.limpiar()
+        self.addCleanup(autenticacion.usuarios.limpiar)
+        self.jwt = APIClient()
+        token = RefreshToken.for_user(self.usuario).access_token
+        self.jwt.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.jwt.get("/api/perfil-usuario/").status_code, 200)
+
+    def _otro_worker(self, **campos):
+        # Otro proceso guarda al usuario: su LRU local no es el nuestro, sólo comparten CACHES
+        with mock.patch.object(autenticacion.usuarios, "invalidar"), \
+                self.captureOnCommitCallbacks(execute=True):
+            Usuario.objects.filter(pk=self.usuario.pk).update(**campos)
+            autenticacion.invalidar(self.usuario.pk)
+
+    def test_desactivado_en_otro_worker(self):
+        self._otro_worker(is_active=False)
+        self.assertEqual(self.jwt.get("/api/perfil-usuario/").status_code, 401)
+
+    def test_sin_cambios_sigue_cacheado(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        # Sin invalidación la copia local vale hasta AUTH_CACHE_SEGUNDOS
+        self.assertEqual(self.jwt.get("/api/perfil-usuario/").status_code, 200)
+
+    def test_version_expulsada_del_cache(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        cache.delete(autenticacion._clave_version(self.usuario.pk))
+        self.assertEqual(self.jwt.get("/api/perfil-usuario/").status_code, 401)
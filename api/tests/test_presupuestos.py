@@ -0,0 +1,99 @@
+from django.urls import reverse
+
+from api import dataset, estadisticas
+from api.testing import PRESUPUESTOS, PresupuestoExcedido, presupuesto_consultas
+
+from .base import ApiTestCase, crear_incidente
+
+PAGINA = {"page_size": "20"}
+
+# caso de api.benchmark -> (url_name, parámetros)
+LECTURAS = {
+    "mis_reportes": ("mis_reportes", None),
+    "mis_reportes_paginado": ("mis_reportes_slash", PAGINA),
+    "todas_alertas": ("todas_alertas", None),
+    "todas_alertas_paginado": ("todas_alertas", PAGINA),
+    "todas_alertas_ndjson": ("todas_alertas", {"stream": "ndjson"}),
+    "dashboard_stats": ("dashboard_stats", None),
+    "recent_activities": ("recent_activities", None),
+    "historial_incidentes": ("historial_incidentes", None),
+    "historial_incidentes_paginado": ("historial_incidentes", PAGINA),
+    "heatmap": ("heatmap-alertas", None),
+    "gestion_list_incidentes": ("gestion_list_incidentes", None),
+    "gestion_list_incidentes_paginado": ("gestion_list_incidentes", PAGINA),
+}
+
+
+NOMBRES = ("Robo de celular", "Choque vehicular", "Incendio", "Asalto a mano armada")
+
+
+def _incidente(i=0, lat=-12.0464, nombre=None):
+    """Mismo día, escala y celda: las consultas de escritura dependen de los grupos, no de las filas."""
+    return {
+        "Ubicacion": "Av. Arequipa", "NombreIncidente": nombre or NOMBRES[i % len(NOMBRES)],
+        "escala": 1, "Latitud": lat + i / 100000, "Longitud": -77.0428,
+    }
+
+
+class PresupuestoConsultasTests(ApiTestCase):
+    """Las consultas de los endpoints calientes no crecen con las filas (sin N+1)."""
+
+    def _leer(self, caso):
+        url_name, params = LECTURAS[caso]
+        # Primer request fuera del conteo: cachés (roles, versión, tiles) en caliente
+        self.cliente.get(reverse(url_name), params)
+        with presupuesto_consultas(PRESUPUESTOS[caso]) as registro:
+            r = self.cliente.get(reverse(url_name), params)
+            if r.streaming:
+                b"".join(r.streaming_content)
+        self.assertEqual(r.status_code, 200, caso)
+        return registro.consultas
+
+    def test_lecturas_constantes(self):
+        dataset.sembrar_incidentes(5, [self.usuario.idUsuario], dias=10, semilla=1)
+        pocas = {caso: self._leer(caso) for caso in LECTURAS}
+        dataset.sembrar_incidentes(60, [self.usuario.idUsuario], dias=10, semilla=2)
+        muchas = {caso: self._leer(caso) for caso in LECTURAS}
+        self.assertEqual(pocas, muchas)
+
+    def test_registrar_incidente(self):
+        # El primero crea las filas del resumen y de la celda; el segundo (otro hecho en
+        # el mismo lugar, no duplicado) sólo las actualiza
+        self.cliente.post(reverse("registrar_incidente"), _incidente(0), format="multipart")
+        with presupuesto_consultas(PRESUPUESTOS["registrar_incidente"]):
+            r = self.cliente.post(reverse("registrar_incidente"), _incidente(1), format="multipart")
+        self.assertEqual(r.status_code, 201)
+        self.assertIsNone(r.json()["registro"]["duplicado_de"])
+
+    def test_lote_no_depende_del_tamano(self):
+        # Tres lugares a ~220 m (no son duplicados entre sí) en la misma celda de anomalías
+        # (6mc5yb): tras el primer lote, los siguientes sólo actualizan filas existentes
+        self.cliente.post(reverse("registrar_incidentes_lote"),
+                          [_incidente(i, -11.997) for i in range(3)], format="json")
+        consultas = []
+        for n, lat in ((5, -11.995), (40, -11.993)):
+            with presupuesto_consultas(PRESUPUESTOS["registrar_incidentes_lote"]) as registro:
+                r = self.cliente.post(reverse("registrar_incidentes_lote"),
+                                      [_incidente(i, lat) for i in range(n)], format="json")
+            self.assertEqual(r.status_code, 201)
+            consultas.append(registro.consultas)
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_estado_lote_no_depende_del_tamano(self):
+        self.usuario.is_staff = True
+        self.usuario.save(update_fields=["is_staff"])
+        grupos = [[crear_incidente(self.usuario).pk for _ in range(n)] for n in (5, 40)]
+        estadisticas.reconstruir()
+        consultas = []
+        for ids, estado in zip(grupos, ("En proceso", "Resuelto")):
+            with presupuesto_consultas(PRESUPUESTOS["gestion_update_incidentes_lote"]) as registro:
+                r = self.cliente.patch(reverse("gestion_update_incidentes_lote"),
+                                       {"estado": estado, "ids": ids}, format="json")
+            self.assertEqual(r.status_code, 200)
+            consultas.append(registro.consultas)
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_excedido(self):
+        with self.assertRaises(PresupuestoExcedido):
+            with presupuesto_consultas(0):
+                self.cliente.get(reverse("todas_alertas"))
@@ -0,0 +1,75 @@
+import struct
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from api import renderers
+
+from .base import ApiTestCase, crear_incidente
+
+BINARIO = "application/vnd.seguridad.heatmap"
+
+
+def decodificar(cuerpo):
+    """Lector del formato descrito en api/renderers.py, como lo haría el cliente."""
+    assert cuerpo[:4] == renderers.MAGIC
+    count, lat0, lng0, paso = struct.unpack_from("<Iddd", cuerpo, 4)
+    pos = 4 + struct.calcsize("<Iddd")
+    (n_estados,) = struct.unpack_from("<B", cuerpo, pos)
+    pos += 1
+    estados = []
+    for _ in range(n_estados):
+        (largo,) = struct.unpack_from("<B", cuerpo, pos)
+        estados.append(cuerpo[pos + 1:pos + 1 + largo].decode("utf-8"))
+        pos += 1 + largo
+    assert len(cuerpo) == pos + 6 * count
+    puntos = []
+    for i in range(count):
+        lat_q, lng_q, intensidad, estado = struct.unpack_from("<HHBB", cuerpo, pos + 6 * i)
+        puntos.append([lat0 + lat_q * paso, lng0 + lng_q * paso, intensidad / 255, estados[estado]])
+    return puntos
+
+
+class EmpaquetarTests(SimpleTestCase):
+    def test_ida_y_vuelta(self):
+        puntos = [[-12.0464, -77.0428, 1.0, "Pendiente"], [-12.2, -76.9, 0.33, "En proceso"],
+                  [-11.9, -77.1, 0.66, "Pendiente"]]
+        decodificados = decodificar(renderers.empaquetar_puntos(puntos))
+        # Span de ~0.3°: el paso de cuantización es de ~0.5 m
+        for original, leido in zip(puntos, decodificados):
+            self.assertAlmostEqual(leido[0], original[0], delta=1e-5)
+            self.assertAlmostEqual(leido[1], original[1], delta=1e-5)
+            self.assertAlmostEqual(leido[2], original[2], delta=1 / 255)
+            self.assertEqual(leido[3], original[3])
+
+    def test_vacio_y_un_solo_punto(self):
+        self.assertEqual(decodificar(renderers.empaquetar_puntos([])), [])
+        (punto,) = decodificar(renderers.empaquetar_puntos([[-12.0, -77.0, 0.5, "Pendiente"]]))
+        self.assertEqual(punto[:2], [-12.0, -77.0])
+
+
+class NegociacionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        crear_incidente(self.usuario, Escala=3)
+        crear_incidente(self.usuario, Latitud=-12.1, Longitud=-77.0, Escala=1, EstadoIncidente="En proceso")
+
+    def test_mismo_contenido_que_json(self):
+        url = reverse("heatmap-alertas")
+        como_json = self.cliente.get(url).json()["points"]
+        r = self.cliente.get(url, HTTP_ACCEPT=BINARIO)
+        self.assertEqual(r["Content-Type"], BINARIO)
+        self.assertIn("Accept", r["Vary"])
+        binario = decodificar(r.content)
+        self.assertEqual(len(binario), len(como_json))
+        for esperado, leido in zip(como_json, binario):
+            self.assertAlmostEqual(leido[0], esperado[0], delta=1e-5)
+            self.assertAlmostEqual(leido[1], esperado[1], delta=1e-5)
+            self.assertAlmostEqual(leido[2], esperado[2], delta=1 / 255)
+            self.assertEqual(leido[3], esperado[3])
+        # ?format=heatmap sin cabecera Accept
+        self.assertEqual(self.cliente.get(url, {"format": "heatmap"}).content, r.content)
+
+    def test_json_por_defecto(self):
+        r = self.cliente.get(reverse("heatmap-alertas"))
+        self.assertEqual(r["Content-Type"], "application/json")
@@ -0,0 +1,86 @@
+import json
+from contextlib import asynccontextmanager
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import RequestFactory
+from django.urls import reverse
+
+from api import tiempo_real
+from api.heatmap import punto
+
+from .base import ApiTestCase, crear_incidente
+
+DENTRO = (-12.0464, -77.0428)
+FUERA = (-12.5, -77.0428)
+BBOX = "-12.1,-77.1,-12.0,-77.0"
+
+
+def _leer(bloque):
+    evento, data = bloque.strip().split("\n")
+    return evento.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+class HeatmapStreamTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.visible = crear_incidente(self.usuario, Latitud=DENTRO[0], Longitud=DENTRO[1], Escala=3)
+
+    @asynccontextmanager
+    async def _abrir(self, **params):
+        request = RequestFactory().get(reverse("heatmap-alertas-stream"), params)
+        response = await tiempo_real.heatmap_stream(request)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        eventos = aiter(response.streaming_content)
+        try:
+            yield eventos
+        finally:
+            await eventos.aclose()
+
+    async def _siguiente(self, eventos):
+        return _leer((await anext(eventos)).decode())
+
+    async def _nuevo(self, lat, lng, **campos):
+        det = await sync_to_async(crear_incidente)(self.usuario, Latitud=lat, Longitud=lng, **campos)
+        return punto(det)
+
+    async def test_snapshot_y_cambios_filtrados(self):
+        async with self._abrir(bbox=BBOX) as eventos:
+            tipo, snapshot = await self._siguiente(eventos)
+            self.assertEqual(tipo, "snapshot")
+            self.assertEqual([p[4] for p in snapshot["points"]], [self.visible.pk])
+
+            # Fuera del bbox no se envía; dentro llega como upsert
+            tiempo_real.broker.difundir({"tipo": "upsert", "punto": await self._nuevo(*FUERA)})
+            nuevo = await self._nuevo(*DENTRO, Escala=2)
+            tiempo_real.broker.difundir({"tipo": "upsert", "punto": nuevo})
+            tipo, data = await self._siguiente(eventos)
+            self.assertEqual((tipo, data["point"][4], data["point"][2]), ("upsert", nuevo["id"], 0.66))
+
+            # Resuelto deja de coincidir: se retira del mapa del cliente
+            tiempo_real.broker.difundir({"tipo": "upsert", "punto": {**nuevo, "estado": "Resuelto"}})
+            self.assertEqual(await self._siguiente(eventos), ("remove", {"id": nuevo["id"]}))
+
+    async def test_ping_sin_eventos(self):
+        with mock.patch.object(tiempo_real, "HEARTBEAT_SEGUNDOS", 0.01):
+            async with self._abrir() as eventos:
+                await self._siguiente(eventos)
+                self.assertEqual(await anext(eventos), b": ping\n\n")
+
+    async def test_cola_desbordada_reenvia_snapshot(self):
+        with mock.patch.object(tiempo_real, "COLA_MAXIMA", 1):
+            async with self._abrir() as eventos:
+                await self._siguiente(eventos)
+                nuevo = await self._nuevo(*DENTRO)
+                for _ in range(3):
+                    tiempo_real.broker.difundir({"tipo": "upsert", "punto": nuevo})
+                tipo, snapshot = await self._siguiente(eventos)
+        self.assertEqual(tipo, "snapshot")
+        self.assertEqual({p[4] for p in snapshot["points"]}, {self.visible.pk, nuevo["id"]})
+
+    def test_publicar_sale_al_hacer_commit(self):
+        with mock.patch.object(tiempo_real.broker, "difundir") as difundir:
+            with self.captureOnCommitCallbacks(execute=True):
+                tiempo_real.publicar(self.visible)
+                difundir.assert_not_called()
+            difundir.assert_called_once_with({"tipo": "upsert", "punto": punto(self.visible)})
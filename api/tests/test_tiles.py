@@ -0,0 +1,74 @@
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from api import tiles
+from api.models import DetalleAlerta
+
+from .base import ApiTestCase, crear_incidente
+
+LAT, LNG = -12.0464, -77.0428
+Z = 14
+
+
+class BinearTests(SimpleTestCase):
+    def test_celdas_y_limites(self):
+        x, y = tiles.tile_para_punto(LAT, LNG, Z)
+        s, w, n, e = tiles.limites_tile(Z, x, y)
+        self.assertTrue(s <= LAT <= n and w <= LNG <= e)
+
+        # Dos puntos en la misma celda y uno en la esquina opuesta del tile
+        lats = np.array([n - 1e-6, n - 2e-6, s + 1e-6])
+        lngs = np.array([w + 1e-6, w + 2e-6, e - 1e-6])
+        celdas = tiles.binear(lats, lngs, np.array([1.0, 2.0, 3.0]), Z, x, y, bins=4)
+        self.assertEqual([(c[2], c[3]) for c in celdas], [(3.0, 2), (3.0, 1)])
+        # El centro de cada celda queda dentro del tile
+        for la, lo, _, _ in celdas:
+            self.assertTrue(s < la < n and w < lo < e)
+
+
+class TileCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        crear_incidente(self.usuario, Escala=3)
+
+    def _tile(self, z, **params):
+        x, y = tiles.tile_para_punto(LAT, LNG, z)
+        return self.cliente.get(reverse("heatmap-tiles", kwargs={"z": z, "x": x, "y": y}), params)
+
+    def test_agrega_y_respeta_resueltos(self):
+        crear_incidente(self.usuario, EstadoIncidente="Resuelto")
+        r = self._tile(Z)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["meta"]["count"], 1)
+        self.assertEqual(self._tile(Z, incluir_resueltos="yes").json()["meta"]["count"], 2)
+        self.assertEqual(self._tile(tiles.ZOOM_MAX + 1).status_code, 400)
+
+    def test_invalida_al_hacer_commit_solo_zooms_altos(self):
+        bajo = tiles.ZOOM_MIN_INVALIDAR - 1
+        self.assertEqual(self._tile(Z).json()["meta"]["count"], 1)
+        self.assertEqual(self._tile(bajo).json()["meta"]["count"], 1)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            r = self.cliente.post(reverse("registrar_incidente"), {
+                "Ubicacion": "Av. Arequipa", "NombreIncidente": "Choque", "escala": 2,
+                "Latitud": LAT, "Longitud": LNG}, format="multipart")
+            self.assertEqual(r.status_code, 201)
+            # Antes del commit el tile cacheado sigue siendo el anterior
+            self.assertEqual(self._tile(Z).json()["meta"]["count"], 1)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self._tile(Z).json()["meta"]["count"], 2)
+        # El zoom bajo no se borra: se renueva al expirar
+        self.assertEqual(self._tile(bajo).json()["meta"]["count"], 1)
+        x, y = tiles.tile_para_punto(LAT, LNG, bajo)
+        cache.delete(tiles._clave(bajo, x, y, False))
+        self.assertEqual(self._tile(bajo).json()["meta"]["count"], 2)
+
+    def test_borrar_invalida(self):
+        self.assertEqual(self._tile(Z).json()["meta"]["count"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            DetalleAlerta.objects.all().delete()
+        self.assertEqual(self._tile(Z).json()["cells"], [])
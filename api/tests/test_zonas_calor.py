@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+import numpy as np
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from api import zonas_calor
+from api.models import DetalleAlerta, ZonaCalor
+
+from .base import ApiTestCase, crear_incidente
+
+LAT, LNG = -12.0464, -77.0428
+METRO = 1 / 111_320  # grados de latitud
+
+
+class DbscanTests(SimpleTestCase):
+    def test_nucleos_bordes_y_ruido(self):
+        # Una fila de puntos cada 100 m (eps 150, 3 puntos): los extremos son borde, no núcleo
+        xy = np.array([[0, 0], [100, 0], [200, 0], [300, 0], [5000, 0], [5100, 0]], dtype=float)
+        etiquetas = zonas_calor.dbscan(xy, 150, 3)
+        self.assertEqual(len(set(etiquetas[:4])), 1)
+        self.assertGreaterEqual(etiquetas[0], 0)
+        self.assertEqual(list(etiquetas[4:]), [-1, -1])
+
+    def test_envolvente(self):
+        cuadrado = [[0, 0], [1, 0], [1, 1], [0, 1], [0.5, 0.5], [0.2, 0.8]]
+        self.assertEqual(sorted(zonas_calor.envolvente(cuadrado)), [0, 1, 2, 3])
+
+
+class ZonasCalorTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        ahora = timezone.now()
+        dets = []
+        # Foco de 8 incidentes en ~60 m, hace unas horas; 3 aislados; 6 juntos pero de hace 3 días
+        for i in range(8):
+            dets.append((LAT + (i % 3) * 20 * METRO, LNG + (i // 3) * 20 * METRO, 1 + i % 3,
+                         ahora - timedelta(hours=2)))
+        for i in range(3):
+            dets.append((LAT + (i + 1) * 3000 * METRO, LNG, 1, ahora - timedelta(hours=1)))
+        for i in range(6):
+            dets.append((LAT - 5000 * METRO + i * 10 * METRO, LNG, 1, ahora - timedelta(days=3)))
+        filas = [DetalleAlerta(NombreIncidente="Robo", Ubicacion="x", Latitud=la, Longitud=lo, Escala=e,
+                               FechaHora=f, idUsuario=self.usuario) for la, lo, e, f in dets]
+        for det in filas:
+            det.calcular_geohash()
+        DetalleAlerta.objects.bulk_create(filas)
+
+    def _zonas(self, **params):
+        r = self.cliente.get(reverse("zonas-calor"), params)
+        self.assertEqual(r.status_code, 200)
+        return r.json()
+
+    def test_actualizar_por_ventana_y_escala(self):
+        resultado = zonas_calor.actualizar()
+        self.assertEqual(resultado[("24h", 1)], 1)
+        self.assertEqual(resultado[("7d", 1)], 2)
+        self.assertEqual(resultado[("24h", 3)], 0)  # sólo 2 de escala 3 en el foco
+
+        zona, = self._zonas(ventana="24h")["zonas"]
+        self.assertEqual(zona["cantidad"], 8)
+        self.assertEqual(zona["escala_max"], 3)
+        self.assertLess(zona["radio_metros"], 60)
+        self.assertAlmostEqual(zona["lat"], LAT + 20 * METRO, delta=15 * METRO)
+        # La semana incluye el foco viejo; de mayor a menor peso
+        pesos = [z["peso"] for z in self._zonas(ventana="7d")["zonas"]]
+        self.assertEqual(pesos, sorted(pesos, reverse=True))
+        self.assertEqual(self._zonas(ventana="24h", escala_min=3)["zonas"], [])
+
+    def test_cache_por_fecha_de_calculo(self):
+        calculado = timezone.now() - timedelta(minutes=5)
+        zonas_calor.actualizar(["24h"])
+        ZonaCalor.objects.update(FechaCalculo=calculado)
+        self.assertEqual(self._zonas(ventana="24h")["zonas"][0]["cantidad"], 8)
+
+        # Mismo cálculo: se sirve desde el caché aunque la fila cambie por fuera
+        ZonaCalor.objects.update(Cantidad=99)
+        self.assertEqual(self._zonas(ventana="24h")["zonas"][0]["cantidad"], 8)
+        # Otra ventana/escala no comparte la entrada
+        self.assertEqual(self._zonas(ventana="24h", escala_min=2)["zonas"][0]["cantidad"], 99)
+
+        # El comando (otro proceso) recalcula: nueva FechaCalculo, nueva clave, sin invalidar
+        for i in range(2):
+            crear_incidente(self.usuario, Latitud=LAT + i * 10 * METRO, Longitud=LNG)
+        zonas_calor.actualizar(["24h"])
+        datos = self._zonas(ventana="24h")
+        self.assertEqual(datos["zonas"][0]["cantidad"], 10)
+        self.assertGreater(datos["calculado"], calculado.isoformat())
+
+    def test_sin_calculo_y_parametros(self):
+        self.assertEqual(self._zonas()["zonas"], [])
+        self.assertIsNone(self._zonas()["calculado"])
+        self.assertEqual(self.cliente.get(reverse("zonas-calor"), {"ventana": "1h"}).status_code, 400)
+        self.assertEqual(self.cliente.get(reverse("zonas-calor"), {"escala_min": "x"}).status_code, 400)
@@ -0,0 +1,217 @@
+# api/tiempo_real.py — push del mapa de calor por Server-Sent Events (requiere ASGI)
+#
+# Flujo: las vistas que crean/actualizan DetalleAlerta llaman a `publicar(det)`.
+# En PostgreSQL el evento viaja por NOTIFY (se entrega al hacer commit y llega a
+# todos los procesos ASGI); cada proceso tiene UN solo LISTEN que reparte los
+# eventos a las conexiones SSE abiertas. En otras bases (desarrollo) el reparto
+# es sólo dentro del proceso.
+
+import asyncio
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
+
+from .heatmap import FiltroHeatmap, _escala_to_intensity, punto
+
+try:
+    import psycopg
+except ImportError:  # sólo psycopg2: sin LISTEN asíncrono
+    psycopg = None
+
+logger = logging.getLogger(__name__)
+
+CANAL = "heatmap_alertas"
+HEARTBEAT_SEGUNDOS = getattr(settings, "HEATMAP_STREAM_HEARTBEAT", 15)
+COLA_MAXIMA = 1000
+
+
+def _usa_notify():
+    return connection.vendor == "postgresql" and psycopg is not None
+
+
+def _fila(p):
+    # Mismo formato que HeatmapAlertView + id al final: [lat, lng, intensity, estado, id]
+    return [p["lat"], p["lng"], _escala_to_intensity(p["escala"]), p["estado"], p["id"]]
+
+
+# ---------------------------------------------------------------------------
+#  Publicación (lado de las vistas síncronas)
+# ---------------------------------------------------------------------------
+def publicar(det, tipo="upsert"):
+    """
+    Emite el cambio de un DetalleAlerta ("upsert" o "delete").
+    Debe llamarse dentro de la transacción que hace el cambio: el evento sólo
+    sale si ésta hace commit. Los duplicados (api/duplicados.py) no están en el mapa.
+    """
+    if tipo == "upsert" and det.idCanonico_id:
+        return
+    evento = {"tipo": tipo, "punto": punto(det)}
+    if _usa_notify():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CANAL, json.dumps(evento)])
+    else:
+        transaction.on_commit(lambda: broker.difundir(evento))
+
+
+def publicar_lote(dets, tipo="upsert"):
+    """Como `publicar` para varios DetalleAlerta: un solo pg_notify por lote."""
+    eventos = [{"tipo": tipo, "punto": punto(det)} for det in dets
+               if tipo != "upsert" or not det.idCanonico_id]
+    if not eventos:
+        return
+    if _usa_notify():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, e) FROM unnest(%s::text[]) AS e",
+                [CANAL, [json.dumps(evento) for evento in eventos]],
+            )
+    else:
+        def _difundir():
+            for evento in eventos:
+                broker.difundir(evento)
+        transaction.on_commit(_difundir)
+
+
+# ---------------------------------------------------------------------------
+#  Reparto a las conexiones abiertas (lado ASGI)
+# ---------------------------------------------------------------------------
+class _Cola(asyncio.Queue):
+    desbordada = False
+
+
+def _encolar(cola, evento):
+    try:
+        cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Cliente lento: se le reenviará un snapshot completo
+        cola.desbordada = True
+
+
+class _Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = {}  # cola -> event loop
+        self._escucha = None
+
+    def suscribir(self):
+        cola = _Cola(maxsize=COLA_MAXIMA)
+        with self._lock:
+            self._suscriptores[cola] = asyncio.get_running_loop()
+        return cola
+
+    def cancelar(self, cola):
+        with self._lock:
+            self._suscriptores.pop(cola, None)
+
+    def difundir(self, evento):
+        with self._lock:
+            destinos = list(self._suscriptores.items())
+        for cola, loop in destinos:
+            loop.call_soon_threadsafe(_encolar, cola, evento)
+
+    def asegurar_escucha(self):
+        if not _usa_notify():
+            return
+        if self._escucha is None or self._escucha.done():
+            self._escucha = asyncio.get_running_loop().create_task(self._escuchar())
+
+    def _hay_suscriptores(self):
+        with self._lock:
+            return bool(self._suscriptores)
+
+    async def _escuchar(self):
+        db = settings.DATABASES["default"]
+        while self._hay_suscriptores():
+            try:
+                aconn = await psycopg.AsyncConnection.connect(
+                    dbname=db["NAME"], user=db.get("USER") or None,
+                    password=db.get("PASSWORD") or None,
+                    host=db.get("HOST") or None, port=db.get("PORT") or None,
+                    autocommit=True,
+                )
+                async with aconn:
+                    await aconn.execute(f"LISTEN {CANAL}")
+                    async for notificacion in aconn.notifies():
+                        self.difundir(json.loads(notificacion.payload))
+                        if not self._hay_suscriptores():
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("LISTEN %s interrumpido, reintentando", CANAL)
+                await asyncio.sleep(5)
+
+
+broker = _Broker()
+
+
+# ---------------------------------------------------------------------------
+#  Endpoint SSE
+# ---------------------------------------------------------------------------
+def _sse(evento, data):
+    return f"event: {evento}\ndata: {json.dumps(data)}\n\n"
+
+
+def _snapshot(filtro):
+    rows = filtro.queryset().order_by("-FechaHora").values_list(
+        "idTipoIncidencia", "Latitud", "Longitud", "Escala", "EstadoIncidente"
+    )[:filtro.limit]
+    points = [[lat, lng, _escala_to_intensity(esc), estado, pk]
+              for (pk, lat, lng, esc, estado) in rows]
+    return {"points": points, "meta": {"count": len(points)}}
+
+
+async def heatmap_stream(request):
+    """
+    GET /api/alertas/heatmap/stream/ — text/event-stream
+    Acepta los mismos filtros que /api/alertas/heatmap/.
+    Eventos: `snapshot` {points, meta}, `upsert` {point}, `remove` {id}.
+    Cada punto es [lat, lng, intensity, estado, id].
+    """
+    filtro = FiltroHeatmap(request.GET)
+
+    # Suscribirse ANTES del snapshot para no perder cambios intermedios
+    cola = broker.suscribir()
+    broker.asegurar_escucha()
+
+    async def eventos():
+        try:
+            snapshot = await sync_to_async(_snapshot)(filtro)
+            visibles = {p[4] for p in snapshot["points"]}
+            yield _sse("snapshot", snapshot)
+
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), HEARTBEAT_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+
+                if cola.desbordada:
+                    cola.desbordada = False
+                    while not cola.empty():
+                        cola.get_nowait()
+                    snapshot = await sync_to_async(_snapshot)(filtro)
+                    visibles = {p[4] for p in snapshot["points"]}
+                    yield _sse("snapshot", snapshot)
+                    continue
+
+                p = evento["punto"]
+                if evento["tipo"] != "delete" and filtro.coincide(p):
+                    visibles.add(p["id"])
+                    yield _sse("upsert", {"point": _fila(p)})
+                elif p["id"] in visibles:
+                    visibles.discard(p["id"])
+                    yield _sse("remove", {"id": p["id"]})
+        finally:
+            broker.cancelar(cola)
+
+    response = StreamingHttpResponse(eventos(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: no bufferizar el stream
+    return response
@@ -0,0 +1,140 @@
+# api/tiles.py — mapa de calor agregado por tiles (z/x/y, Web Mercator) con caché por tile
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .heatmap import FiltroHeatmap, _escala_to_intensity
+
+BINS = getattr(settings, "HEATMAP_TILE_BINS", 64)  # celdas por lado del tile
+ZOOM_MAX = getattr(settings, "HEATMAP_TILE_ZOOM_MAX", 18)
+CACHE_SEGUNDOS = getattr(settings, "HEATMAP_TILE_CACHE_SECONDS", 300)
+# Bajo este zoom un tile cubre una región entera: cualquier alta lo invalidaría y
+# recalcularlo es lo más caro. Esos tiles no se borran; expiran por CACHE_SEGUNDOS
+ZOOM_MIN_INVALIDAR = getattr(settings, "HEATMAP_TILE_ZOOM_MIN_INVALIDAR", 10)
+MERCATOR_LAT_MAX = 85.05112878
+
+# Tabla escala -> intensidad para aplicar _escala_to_intensity de forma vectorizada
+_PESOS_ESCALA = np.array([_escala_to_intensity(e) for e in range(5)])
+
+
+def _clave(z, x, y, incluir_resueltos):
+    return f"heatmap_tile:{z}:{x}:{y}:{int(incluir_resueltos)}"
+
+
+def tile_valido(z, x, y):
+    return 0 <= z <= ZOOM_MAX and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def _mercator_y(lat):
+    """Fracción vertical global (0 = norte) de una o varias latitudes."""
+    lat = np.clip(lat, -MERCATOR_LAT_MAX, MERCATOR_LAT_MAX)
+    rad = np.radians(lat)
+    return (1.0 - np.log(np.tan(rad) + 1.0 / np.cos(rad)) / np.pi) / 2.0
+
+
+def _lat_de_mercator(fy):
+    return np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * fy))))
+
+
+def limites_tile(z, x, y):
+    """(south, west, north, east) en grados."""
+    n = 1 << z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = float(_lat_de_mercator(y / n))
+    south = float(_lat_de_mercator((y + 1) / n))
+    return south, west, north, east
+
+
+def tile_para_punto(lat, lng, z):
+    n = 1 << z
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int(float(_mercator_y(lat)) * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def binear(lats, lngs, pesos, z, x, y, bins=BINS):
+    """
+    Agrupa los puntos del tile en una grilla bins×bins (vectorizado).
+    Devuelve las celdas no vacías como [lat, lng, peso, cantidad] en el centro de la celda.
+    """
+    n = 1 << z
+    fx = (lngs + 180.0) / 360.0 * n - x
+    fy = _mercator_y(lats) * n - y
+    col = np.clip((fx * bins).astype(np.int64), 0, bins - 1)
+    fila = np.clip((fy * bins).astype(np.int64), 0, bins - 1)
+    idx = fila * bins + col
+
+    peso = np.bincount(idx, weights=pesos, minlength=bins * bins)
+    cantidad = np.bincount(idx, minlength=bins * bins)
+    ocupadas = np.flatnonzero(cantidad)
+
+    filas_o, cols_o = np.divmod(ocupadas, bins)
+    centro_lng = (x + (cols_o + 0.5) / bins) / n * 360.0 - 180.0
+    centro_lat = _lat_de_mercator((y + (filas_o + 0.5) / bins) / n)
+    return [
+        [round(float(la), 6), round(float(lo), 6), round(float(p), 3), int(c)]
+        for la, lo, p, c in zip(centro_lat, centro_lng, peso[ocupadas], cantidad[ocupadas])
+    ]
+
+
+def _calcular(z, x, y, incluir_resueltos):
+    s, w, n, e = limites_tile(z, x, y)
+    filtro = FiltroHeatmap({
+        "bbox": f"{s},{w},{n},{e}",
+        "incluir_resueltos": "1" if incluir_resueltos else "",
+    })
+    filas = list(filtro.queryset().values_list("Latitud", "Longitud", "Escala"))
+    if filas:
+        datos = np.array(filas, dtype=np.float64)
+        pesos = _PESOS_ESCALA[np.clip(datos[:, 2].astype(np.int64), 0, 4)]
+        celdas = binear(datos[:, 0], datos[:, 1], pesos, z, x, y)
+    else:
+        celdas = []
+    return {
+        "z": z, "x": x, "y": y,
+        "bins": BINS,
+        "bounds": [s, w, n, e],
+        "cells": celdas,
+        "meta": {
+            "count": len(filas),
+            "max": max((c[2] for c in celdas), default=0),
+        },
+    }
+
+
+def obtener_tile(z, x, y, incluir_resueltos=False):
+    clave = _clave(z, x, y, incluir_resueltos)
+    data = cache.get(clave)
+    if data is None:
+        data = _calcular(z, x, y, incluir_resueltos)
+        cache.set(clave, data, CACHE_SEGUNDOS)
+    return data
+
+
+def invalidar(lat, lng):
+    """
+    Borra del caché los tiles que contienen el punto, desde ZOOM_MIN_INVALIDAR
+    hasta ZOOM_MAX; los de zoom menor se renuevan solos al expirar.
+    Se ejecuta al hacer commit para que nadie recachee el estado anterior.
+    """
+    invalidar_puntos([(lat, lng)])
+
+
+def invalidar_puntos(puntos):
+    """Como `invalidar` para varios (lat, lng): un solo delete_many al hacer commit."""
+    puntos = [(lat, lng) for lat, lng in puntos if lat is not None and lng is not None]
+    if not puntos:
+        return
+
+    def _borrar():
+        claves = set()
+        for lat, lng in puntos:
+            for z in range(ZOOM_MIN_INVALIDAR, ZOOM_MAX + 1):
+                x, y = tile_para_punto(lat, lng, z)
+                claves.update((_clave(z, x, y, False), _clave(z, x, y, True)))
+        cache.delete_many(list(claves))
+
+    transaction.on_commit(_borrar)
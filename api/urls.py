@@ -3,7 +3,7 @@ from django.db import transaction
 from rest_framework_simplejwt.views import TokenRefreshView
 
 # 🔹 Importar views completo para poder usar views.todas_alertas
-from . import views
+from . import views, tiempo_real
 
 # 🔹 Importaciones específicas (si prefieres tener claridad en las rutas)
 from .views import (
@@ -13,18 +13,26 @@ from .views import (
     resumen,
     mis_reportes,
     registrar_incidente,
+    registrar_incidentes_lote,
     enviar_correo,
     Cambio_Contrasena,
     perfil_usuario,
     cambiar_password,
     # Dashboard views
     dashboard_stats,
+    dashboard_anomalias,
     emergency_personnel,
     recent_activities,
     historial_incidentes,
     gestion_list_incidentes,
     gestion_update_incidente,
+    gestion_update_incidentes_lote,
     HeatmapAlertView,
+    HeatmapTileView,
+    ZonasCalorView,
+    CargaListView,
+    CargaView,
+    carga_finalizar,
 )
 
 urlpatterns = [
@@ -42,7 +50,9 @@ urlpatterns = [
 
     path('registrar-incidente',  registrar_incidente, name='registrar_incidente'),
     path('registrar-incidente/', registrar_incidente, name='registrar_incidente_slash'),
+    path('incidentes/lote/', registrar_incidentes_lote, name='registrar_incidentes_lote'),
     path('todas_alertas/', views.todas_alertas, name='todas_alertas'),
+    path('alertas/cambios/', views.alertas_cambios, name='alertas_cambios'),
 
 
     path('enviar-correo', enviar_correo, name='enviar_correo'),
@@ -55,16 +65,34 @@ urlpatterns = [
     path('dashboard/stats/', dashboard_stats, name='dashboard_stats'),
     path('dashboard/personnel/', emergency_personnel, name='emergency_personnel'),
     path('dashboard/activities/', recent_activities, name='recent_activities'),
+    path('dashboard/anomalias/', dashboard_anomalias, name='dashboard_anomalias'),
     # path('dashboard/locations/', incidents_by_location, name='incidents_by_location'),  # Comentado - función no existe aún
     # Historial (ya existente)
     path('historial/incidentes/', historial_incidentes, name='historial_incidentes'),
     
     #================PATH PARA EL MAPA DE CALOR EN TIEMPO REAL==============================
     path("alertas/heatmap/", HeatmapAlertView.as_view(), name="heatmap-alertas"),
+    # Push por Server-Sent Events (servir con Seguridad/asgi.py)
+    path("alertas/heatmap/stream/", tiempo_real.heatmap_stream, name="heatmap-alertas-stream"),
+    # Densidad agregada por tiles z/x/y (cacheada por tile)
+    path("alertas/heatmap/tiles/<int:z>/<int:x>/<int:y>", HeatmapTileView.as_view(), name="heatmap-tiles"),
+    path("alertas/heatmap/tiles/<int:z>/<int:x>/<int:y>/", HeatmapTileView.as_view(), name="heatmap-tiles-slash"),
+    # Zonas calientes (DBSCAN periódico: manage.py calcular_zonas_calor)
+    path("alertas/zonas-calor/", ZonasCalorView.as_view(), name="zonas-calor"),
 
     # ---------------- NUEVAS RUTAS PARA GESTIÓN ----------------
     # GET listado para Gestión
     path('gestion/incidentes/', gestion_list_incidentes, name='gestion_list_incidentes'),
     # PATCH actualización de estado
     path('gestion/incidentes/<int:id>/', gestion_update_incidente, name='gestion_update_incidente'),
+    # PATCH cambio de estado masivo (ids o filtro)
+    path('gestion/incidentes/estado/', gestion_update_incidentes_lote, name='gestion_update_incidentes_lote'),
+
+    # Subidas reanudables de fotos/videos (por partes, con Content-Range)
+    path('cargas/', CargaListView.as_view(), name='cargas'),
+    path('cargas/<uuid:id>/', CargaView.as_view(), name='carga'),
+    path('cargas/<uuid:id>/finalizar/', carga_finalizar, name='carga_finalizar'),
+
+    # Métricas Prometheus (token METRICAS_TOKEN o usuario staff)
+    path('metricas', views.metricas_prometheus, name='metricas'),
 ]
@@ -2,6 +2,8 @@
 
 # ===== Standard library =====
 from datetime import datetime, timedelta
+import hmac
+import logging
 import jwt
 
 # ===== Django (core & utils) =====
@@ -12,40 +14,51 @@ from django.contrib.auth.models import User
 from django.db import IntegrityError, transaction
 from django.db.models import Count, Max
 from django.db.models.functions import TruncDate
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import salted_hmac
 from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
 
 # ===== Django REST Framework & JWT =====
 from rest_framework import serializers, status
-from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes, renderer_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.core.mail import send_mail
-import threading
 from .models import DetalleAlerta
-from email.mime.image import MIMEImage
-import os
 
 # ===== App local =====
 from .models import (
     Usuario, DetalleAlerta, Alerta, Administrador, RolUsuario,
     RolAutoridad, DetalleAutoridad, AtencionReporte,
-    EstadoAtencionReporte, EscalaAlerta, PerfilUsuario
+    EstadoAtencionReporte, EscalaAlerta, PerfilUsuario, SesionCarga, normalizar_clave
 )
+from . import (
+    anomalias, cambios, cargas, clasificador, correo, duplicados, estadisticas, exportacion, medios,
+    metricas, miniaturas, paginacion, roles, tiempo_real, tiles, zonas_calor,
+)
+from .autenticacion import JWTAutenticacionCacheada
+from .heatmap import VERDADEROS, FiltroHeatmap, _escala_to_intensity
+from .renderers import HeatmapBinarioRenderer, NdjsonRenderer
 from .serializer import (
     DetalleAlertaSerializer,
     HistorialIncidenteSerializer,
+    anotar_estado_atencion,
     GestionIncidenteSerializer,
     IncidenteEstadoUpdateSerializer,
+    IncidentesEstadoLoteSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
 
 # ----------------------- LOGIN -----------------------
 
@@ -58,8 +71,8 @@ class MyTokenObtainPairSerializer(serializers.Serializer):
         username = attrs.get("username")
         password = attrs.get("password")
 
-        # Autenticación por NOMBRE en tu tabla Usuario
-        user = Usuario.objects.filter(nombre=username).first()
+        # Autenticación por NOMBRE (sin distinguir mayúsculas, índice único)
+        user = Usuario.objects.por_nombre(username)
         if not user or not user.check_password(password):
             raise serializers.ValidationError(
                 "Usuario o contraseña incorrectos")
@@ -72,10 +85,9 @@ class MyTokenObtainPairSerializer(serializers.Serializer):
         refresh["username"] = user.nombre
         refresh["email"] = user.correo
 
-        # Deducimos rol: si el usuario está enlazado a un Administrador
-        es_admin = Administrador.objects.filter(
-            idRolUsuario__idUsuario=user).exists()
-        refresh["role"] = "admin" if es_admin else "user"
+        # Deducimos rol: si el usuario está enlazado a un Administrador (cacheado)
+        rol = roles.rol(user)
+        refresh["role"] = rol
 
         return {
             "refresh": str(refresh),
@@ -83,7 +95,7 @@ class MyTokenObtainPairSerializer(serializers.Serializer):
             "idUsuario": user.idUsuario,
             "username":  user.nombre,
             "email":     user.correo,
-            "role":      "admin" if es_admin else "user",
+            "role":      rol,
         }
 
 
@@ -104,14 +116,19 @@ def registro(request):
         if not nombre or not correo or not contra:
             return Response({"error": "username, email y password son requeridos"}, status=400)
 
-        if Usuario.objects.filter(nombre__iexact=nombre).exists():
+        if Usuario.objects.filter(NombreNormalizado=normalizar_clave(nombre)).exists():
             return Response({"error": "El usuario ya existe"}, status=400)
-        if Usuario.objects.filter(correo__iexact=correo).exists():
+        if Usuario.objects.filter(CorreoNormalizado=normalizar_clave(correo)).exists():
             return Response({"error": "El correo ya está registrado"}, status=400)
 
         # Tu manager create_user espera (correo, contra, **extra)
-        user = Usuario.objects.create_user(
-            correo=correo, contra=contra, nombre=nombre)
+        try:
+            with transaction.atomic():
+                user = Usuario.objects.create_user(
+                    correo=correo, contra=contra, nombre=nombre)
+        except IntegrityError:
+            # Registro simultáneo con el mismo nombre/correo: lo decide el índice único
+            return Response({"error": "El usuario o correo ya está registrado"}, status=400)
 
         # (opcional) crear rol 'Usuario'
         if not RolUsuario.objects.filter(idUsuario=user, NombreRol="Usuario").exists():
@@ -148,22 +165,27 @@ def resumen(request):
     hoy = timezone.localdate()  # respeta TIME_ZONE/USE_TZ
 
     # --- Última fecha de reporte del usuario (fecha, sin hora)
-    ultimo = (
+    ultimo_dt = (
         DetalleAlerta.objects
         .filter(idUsuario_id=u.idUsuario)
-        .annotate(d=TruncDate("FechaHora"))
-        .aggregate(max_d=Max("d"))
-        .get("max_d")
+        .aggregate(max_dt=Max("FechaHora"))
+        .get("max_dt")
     )
+    ultimo = timezone.localdate(ultimo_dt) if ultimo_dt else None
 
     # --- Usar el mayor entre hoy y la última fecha con datos
     fin = max([d for d in (hoy, ultimo) if d is not None])
     inicio = fin - timedelta(days=6)
 
+    # --- Rango como datetimes (usa el índice idUsuario+FechaHora; __date no puede)
+    tz = timezone.get_current_timezone()
+    desde = datetime.combine(inicio, datetime.min.time(), tzinfo=tz)
+    hasta = datetime.combine(fin + timedelta(days=1), datetime.min.time(), tzinfo=tz)
+
     # --- Pie: niveles por descripción (contar por pk, no por idAlerta)
     niveles_incidencia = (
         DetalleAlerta.objects
-        .filter(idUsuario_id=u.idUsuario, FechaHora__date__gte=inicio, FechaHora__date__lte=fin)
+        .filter(idUsuario_id=u.idUsuario, FechaHora__gte=desde, FechaHora__lt=hasta)
         .values("idEscalaIncidencia__Descripcion")
         .annotate(total=Count("pk"))
     )
@@ -171,7 +193,7 @@ def resumen(request):
     # --- Serie diaria (contar por pk)
     por_dia = (
         DetalleAlerta.objects
-        .filter(idUsuario_id=u.idUsuario, FechaHora__date__gte=inicio, FechaHora__date__lte=fin)
+        .filter(idUsuario_id=u.idUsuario, FechaHora__gte=desde, FechaHora__lt=hasta)
         .annotate(d=TruncDate("FechaHora"))
         .values("d")
         .annotate(cantidad=Count("pk"))
@@ -201,71 +223,36 @@ def resumen(request):
 @permission_classes([AllowAny])
 def dashboard_stats(request):
     try:
-        print("🔄 Iniciando cálculo de estadísticas del dashboard...")
-
-        # Estadísticas basadas en la tabla DetalleAlerta que tiene los datos reales
-        total_incidentes = DetalleAlerta.objects.count()
-        print(f"📊 Total incidentes encontrados: {total_incidentes}")
+        # Estadísticas leídas del rollup ResumenDiarioAlerta (mantenido al registrar
+        # y al cambiar el estado de un incidente), no de DetalleAlerta completo
+        resumen_dia = estadisticas.calcular_dashboard()
 
-        # Como no tenemos estados directos, vamos a simular basándonos en reportes de atención
+        total_incidentes = resumen_dia["total_incidentes"]
         # Casos que tienen reportes de atención los consideramos "resueltos"
-        casos_resueltos = DetalleAlerta.objects.filter(
-            atenciones__isnull=False
-        ).distinct().count()
-
-        # Si no hay reportes de atención, simulamos datos para demostración
-        if casos_resueltos == 0 and total_incidentes > 0:
-            # 60% simulado como resuelto
-            casos_resueltos = max(1, int(total_incidentes * 0.6))
-
-        print(f"✅ Casos resueltos: {casos_resueltos}")
-
+        casos_resueltos = resumen_dia["casos_resueltos"]
         # Alertas activas: incidentes de los últimos 7 días
-        fecha_limite = timezone.now() - timedelta(days=7)
-        alertas_activas = DetalleAlerta.objects.filter(
-            FechaHora__gte=fecha_limite
-        ).count()
-
-        # Si no hay alertas recientes, tomamos una parte del total
-        if alertas_activas == 0 and total_incidentes > 0:
-            alertas_activas = max(
-                1, int(total_incidentes * 0.3))  # 30% como activas
-
-        print(f"🚨 Alertas activas: {alertas_activas}")
+        alertas_activas = resumen_dia["alertas_activas"]
 
         # Estadísticas por escala (reemplazamos los estados por escalas)
-        alertas_alta_escala = DetalleAlerta.objects.filter(Escala=3).count()
-        alertas_media_escala = DetalleAlerta.objects.filter(Escala=2).count()
-        alertas_baja_escala = DetalleAlerta.objects.filter(Escala=1).count()
+        alertas_alta_escala = resumen_dia["alertas_alta_escala"]
+        alertas_media_escala = resumen_dia["alertas_media_escala"]
+        alertas_baja_escala = resumen_dia["alertas_baja_escala"]
 
-        # Incidentes por día (últimos 7 días) basado en DetalleAlerta
-        today = timezone.now().date()
+        # Incidentes por día (últimos 7 días)
+        today = timezone.localdate()
+        por_dia = resumen_dia["por_dia"]
         week_data = []
 
         for i in range(7):
             date = today - timedelta(days=6-i)
-            count = DetalleAlerta.objects.filter(
-                FechaHora__date=date
-            ).count()
-
-            # Contar por escala para ese día
-            alta_dia = DetalleAlerta.objects.filter(
-                FechaHora__date=date,
-                Escala=3
-            ).count()
-            media_dia = DetalleAlerta.objects.filter(
-                FechaHora__date=date,
-                Escala=2
-            ).count()
-            baja_dia = DetalleAlerta.objects.filter(
-                FechaHora__date=date,
-                Escala=1
-            ).count()
+            alta_dia = por_dia.get((date, 3), 0)
+            media_dia = por_dia.get((date, 2), 0)
+            baja_dia = por_dia.get((date, 1), 0)
 
             week_data.append({
                 'date': date.strftime('%Y-%m-%d'),
                 'day': date.strftime('%a'),
-                'total': count,
+                'total': alta_dia + media_dia + baja_dia + por_dia.get((date, 4), 0),
                 'alta': alta_dia,
                 'media': media_dia,
                 'baja': baja_dia
@@ -284,18 +271,6 @@ def dashboard_stats(request):
             porcentaje_alta_escala = round(
                 (alertas_alta_escala / total_incidentes) * 100, 1)
 
-        # Calcular alertas resueltas hoy
-        alertas_resueltas_hoy = DetalleAlerta.objects.filter(
-            FechaHora__date=today,
-            atenciones__isnull=False
-        ).distinct().count()
-
-        # Si no hay datos, simulamos
-        if alertas_resueltas_hoy == 0 and total_incidentes > 0:
-            alertas_hoy = DetalleAlerta.objects.filter(
-                FechaHora__date=today).count()
-            alertas_resueltas_hoy = max(0, int(alertas_hoy * 0.5))
-
         stats_response = {
             'total_incidentes': total_incidentes,
             'casos_resueltos': casos_resueltos,
@@ -306,11 +281,9 @@ def dashboard_stats(request):
             'porcentaje_resolucion': porcentaje_resolucion,
             'porcentaje_activos': porcentaje_activos,
             'porcentaje_alta_escala': porcentaje_alta_escala,
-            'resueltas_hoy': alertas_resueltas_hoy
+            'resueltas_hoy': resumen_dia["resueltas_hoy"],
         }
 
-        print(f"✅ Estadísticas calculadas: {stats_response}")
-
         return JsonResponse({
             'success': True,
             'stats': stats_response,
@@ -318,19 +291,26 @@ def dashboard_stats(request):
             'last_updated': timezone.now().isoformat()
         })
 
-    except Exception as e:
-        print(f"❌ Error en dashboard_stats: {str(e)}")
-        import traceback
-        print(f"📍 Traceback completo: {traceback.format_exc()}")
-
+    except Exception:
+        logger.exception("Error en dashboard_stats")
         return JsonResponse({
             'success': False,
-            'error': str(e),
             'message': 'Error al obtener estadísticas del dashboard',
-            'traceback': traceback.format_exc()
         }, status=500)
 
 
+# 🔹 API para anomalías: celdas con más incidentes que lo habitual para esta hora
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def dashboard_anomalias(request):
+    """
+    Ruta: /api/dashboard/anomalias/
+    Celdas cuyo conteo de las últimas horas supera su línea base por hora de la semana
+    (api/anomalias.py, mantenida al registrar). No consulta DetalleAlerta.
+    """
+    return Response({"success": True, **anomalias.obtener()})
+
+
 # 🔹 API para personal de emergencia
 @csrf_exempt
 @api_view(['GET'])
@@ -467,7 +447,7 @@ def recent_activities(request):
         if not activities:
             try:
                 # Intentar con DetalleAlerta
-                incidentes = DetalleAlerta.objects.order_by('-FechaHora')[:5]
+                incidentes = DetalleAlerta.objects.select_related('idUsuario').order_by('-FechaHora')[:5]
                 for incidente in incidentes:
                     try:
                         time_diff = timezone.now() - incidente.FechaHora
@@ -568,9 +548,19 @@ def mis_reportes(request):
     reportes = (
         DetalleAlerta.objects
         .filter(idUsuario_id=u.idUsuario)
-        .order_by('-FechaHora')
+        .order_by(*paginacion.ORDEN)
     )
 
+    # Paginación por cursor opcional (?page_size=&cursor=)
+    if paginacion.solicitada(request):
+        try:
+            filas, siguiente = paginacion.paginar(request, reportes)
+        except paginacion.CursorInvalido as e:
+            return Response({"error": str(e)}, status=400)
+        serializer = DetalleAlertaSerializer(
+            filas, many=True, context={'request': request})
+        return Response(paginacion.respuesta(serializer.data, siguiente))
+
     # Usa el serializer para incluir Archivo correctamente (con contexto request)
     serializer = DetalleAlertaSerializer(
         reportes, many=True, context={'request': request})
@@ -581,131 +571,179 @@ def mis_reportes(request):
 ESCALAS = {1: "Bajo", 2: "Medio", 3: "Alto", 4: "Pendiente (por asignar)"}
 
 def enviar_correo_reporte(asunto, mensaje, destinatario):
-    """Envía el correo en segundo plano (sin demorar la respuesta del servidor)."""
-    try:
-        send_mail(asunto, mensaje, settings.DEFAULT_FROM_EMAIL, [destinatario], fail_silently=False)
-    except Exception as e:
-        print(f"⚠️ Error al enviar correo: {e}")
+    """Encola el correo en el outbox (lo envía el pool de api.correo, sin demorar la respuesta)."""
+    correo.encolar("reporte", asunto, destinatario, mensaje)
 
 
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
 from django.utils.html import strip_tags
-import threading
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-@parser_classes([JSONParser, MultiPartParser, FormParser])
-def registrar_incidente(request):
+def _correo_confirmacion(u, det):
+    """Encola el correo de confirmación del reporte (en la transacción del DetalleAlerta)."""
+    correo.encolar(**_datos_correo_confirmacion(u, det))
+
+
+def _datos_correo_confirmacion(u, det):
+    """Argumentos de correo.encolar / correo.encolar_lote para la confirmación de `det`."""
+    embebida = correo.adjunto_embebible(det.Archivo)
+
+    # 📩 Armar el mensaje HTML con imagen embebida
+    asunto = "Confirmación de Reporte - Sistema de Seguridad Ciudadana"
+
+    mensaje_html = f"""
+    <html>
+      <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <p>Hola <b>{u.nombre}</b>,</p>
+        <p>Tu reporte ha sido registrado exitosamente.</p>
+
+        <h3>📝 Detalles del Incidente:</h3>
+        <ul style="list-style-type: none; padding: 0;">
+          <li><b>Nombre del Incidente:</b> {det.NombreIncidente}</li>
+          <li><b>Descripción:</b> {det.Descripcion}</li>
+          <li><b>Escala:</b> {ESCALAS.get(det.Escala, '')}</li>
+          <li><b>Ubicación:</b> {det.Ubicacion}</li>
+          <li><b>Fecha:</b> {det.FechaHora.strftime('%d/%m/%Y %H:%M')}</li>
+        </ul>
     """
-    Crea un DetalleAlerta para el usuario autenticado y envía una notificación al correo del usuario.
+
+    # 📷 Si hay archivo, incrustarlo en el correo
+    mensaje_html += "<p><b>📷 Imagen del incidente:</b></p>"
+    if embebida:
+        mensaje_html += '<img src="cid:imagen_reporte" style="max-width: 100%; border-radius: 8px; border: 1px solid #ccc; margin-top: 10px;" />'
+    elif det.Archivo:
+        # Video o imagen muy grande: no se embebe en el correo
+        mensaje_html += "<p>El archivo adjunto quedó guardado con tu reporte.</p>"
+    else:
+        mensaje_html += "<p>No se adjuntó ninguna imagen.</p>"
+
+    mensaje_html += """
+        <br>
+        <p>Gracias por contribuir con la seguridad ciudadana.</p>
+        <p>Atentamente,<br>👮 <b>Equipo de Seguridad Ciudadana</b></p>
+      </body>
+    </html>
     """
-    u = request.user
-    Ubicacion = (request.data.get("Ubicacion") or "").strip()
-    Descripcion = (request.data.get("Descripcion") or "").strip()
-    NombreIncidente = (request.data.get("NombreIncidente") or "").strip()
-    escala = request.data.get("escala")
-    lat = request.data.get("Latitud")
-    lon = request.data.get("Longitud")
-    archivo = request.FILES.get("Archivo")
+
+    return {
+        "origen": "registro_incidente",
+        "asunto": asunto,
+        "destinatario": u.correo,
+        "texto": strip_tags(mensaje_html),
+        "html": mensaje_html,
+        "adjunto_inline": det.Archivo.name if embebida else None,
+    }
+
+
+def _texto(valor):
+    return ("" if valor is None else str(valor)).strip()
+
+
+def _validar_incidente(datos):
+    """
+    Reglas comunes de registrar_incidente y registrar_incidentes_lote.
+    Si no viene `escala`, la asigna api.clasificador (4 si ninguna palabra coincide).
+    Devuelve (campos para DetalleAlerta, None) o (None, mensaje de error).
+    """
+    Ubicacion = _texto(datos.get("Ubicacion"))
+    Descripcion = _texto(datos.get("Descripcion"))
+    NombreIncidente = _texto(datos.get("NombreIncidente"))
+    escala = datos.get("escala")
+    lat = datos.get("Latitud")
+    lon = datos.get("Longitud")
 
     faltantes = []
     if not Ubicacion:
         faltantes.append("Ubicacion")
     if not NombreIncidente:
         faltantes.append("NombreIncidente")
-    if not escala:
-        faltantes.append("escala")
 
     if faltantes:
-        return Response({"error": f"Faltan campos: {', '.join(faltantes)}"}, status=400)
+        return None, f"Faltan campos: {', '.join(faltantes)}"
+
+    if escala in (None, ""):
+        # Sin escala: se asigna por las palabras clave de EscalaAlerta
+        escala = clasificador.clasificar(NombreIncidente, Descripcion)
 
     try:
         escala = int(escala)
         lat = float(lat) if lat else None
         lon = float(lon) if lon else None
-    except ValueError:
-        return Response({"error": "escala debe ser 1, 2 o 3 y lat/lon deben ser números"}, status=400)
+    except (TypeError, ValueError):
+        return None, "escala debe ser 1, 2 o 3 y lat/lon deben ser números"
 
     if escala not in ESCALAS:
-        return Response({"error": "escala debe ser 1(Bajo), 2(Medio) o 3(Alto)"}, status=400)
+        return None, "escala debe ser 1(Bajo), 2(Medio) o 3(Alto)"
 
-    try:
-        # Crear el reporte
-        det = DetalleAlerta.objects.create(
-            Ubicacion=Ubicacion,
-            Descripcion=Descripcion,
-            NombreIncidente=NombreIncidente,
-            Escala=escala,
-            idUsuario=u,
-            Latitud=lat,
-            Longitud=lon,
-            Archivo=archivo,
-            FechaHora=timezone.now(),
-        )
+    return {
+        "Ubicacion": Ubicacion,
+        "Descripcion": Descripcion,
+        "NombreIncidente": NombreIncidente,
+        "Escala": escala,
+        "Latitud": lat,
+        "Longitud": lon,
+    }, None
 
-        # 📩 Armar el mensaje HTML con imagen embebida
-        asunto = "Confirmación de Reporte - Sistema de Seguridad Ciudadana"
-
-        mensaje_html = f"""
-        <html>
-          <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <p>Hola <b>{u.nombre}</b>,</p>
-            <p>Tu reporte ha sido registrado exitosamente.</p>
-
-            <h3>📝 Detalles del Incidente:</h3>
-            <ul style="list-style-type: none; padding: 0;">
-              <li><b>Nombre del Incidente:</b> {det.NombreIncidente}</li>
-              <li><b>Descripción:</b> {det.Descripcion}</li>
-              <li><b>Escala:</b> {ESCALAS.get(det.Escala, '')}</li>
-              <li><b>Ubicación:</b> {det.Ubicacion}</li>
-              <li><b>Fecha:</b> {det.FechaHora.strftime('%d/%m/%Y %H:%M')}</li>
-            </ul>
-        """
-
-        # 📷 Si hay archivo, incrustarlo en el correo
-        mensaje_html += "<p><b>📷 Imagen del incidente:</b></p>"
-        if det.Archivo:
-            mensaje_html += '<img src="cid:imagen_reporte" style="max-width: 100%; border-radius: 8px; border: 1px solid #ccc; margin-top: 10px;" />'
-        else:
-            mensaje_html += "<p>No se adjuntó ninguna imagen.</p>"
-
-        mensaje_html += """
-            <br>
-            <p>Gracias por contribuir con la seguridad ciudadana.</p>
-            <p>Atentamente,<br>👮 <b>Equipo de Seguridad Ciudadana</b></p>
-          </body>
-        </html>
-        """
-
-        mensaje_texto = strip_tags(mensaje_html)
-
-        def enviar_correo_html():
-            email = EmailMultiAlternatives(
-                asunto,
-                mensaje_texto,
-                settings.DEFAULT_FROM_EMAIL,
-                [u.correo],
-            )
-            email.attach_alternative(mensaje_html, "text/html")
 
-            # Adjuntar imagen embebida (CID)
-            if det.Archivo:
-                ruta_imagen = det.Archivo.path
-                if os.path.exists(ruta_imagen):
-                    with open(ruta_imagen, 'rb') as f:
-                        imagen = MIMEImage(f.read())
-                        imagen.add_header('Content-ID', '<imagen_reporte>')
-                        imagen.add_header('Content-Disposition', 'inline', filename=os.path.basename(ruta_imagen))
-                        email.attach(imagen)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, MultiPartParser, FormParser])
+def registrar_incidente(request):
+    """
+    Crea un DetalleAlerta para el usuario autenticado y envía una notificación al correo del usuario.
+    """
+    u = request.user
+    archivo = request.FILES.get("Archivo")
+    # Alternativa para videos/fotos grandes: id de una carga reanudable ya finalizada
+    id_carga = request.data.get("carga")
+
+    campos, error = _validar_incidente(request.data)
+    if error:
+        return Response({"error": error}, status=400)
 
-            email.send()
+    sesion_carga = None
+    if id_carga and not archivo:
+        try:
+            sesion_carga = cargas.obtener(u, id_carga)
+        except cargas.ErrorCarga:
+            return Response({"error": "carga no encontrada"}, status=400)
+        if sesion_carga.Estado != "completa":
+            return Response({"error": "la carga no está finalizada o ya fue adjuntada"}, status=400)
 
-        threading.Thread(target=enviar_correo_html).start()
+    try:
+        # Crear el reporte y actualizar el resumen diario en la misma transacción
+        with transaction.atomic():
+            if sesion_carga:
+                # Releer con bloqueo: dos reportes con la misma carga no la adjuntan ambos
+                sesion_carga = SesionCarga.objects.select_for_update().filter(
+                    idSesion=sesion_carga.idSesion, idUsuario=u).first()
+                if sesion_carga is None or sesion_carga.Estado != "completa":
+                    return Response({"error": "la carga no está finalizada o ya fue adjuntada"},
+                                    status=400)
+            ahora = timezone.now()
+            det = DetalleAlerta.objects.create(
+                **campos,
+                idUsuario=u,
+                Archivo=archivo,
+                FechaHora=ahora,
+                # Mismo hecho ya reportado cerca y hace poco: queda enlazado a ese incidente
+                idCanonico_id=duplicados.buscar_canonico(
+                    campos["Latitud"], campos["Longitud"], ahora, campos["NombreIncidente"]),
+            )
+            if sesion_carga:
+                cargas.validar_adjunto(sesion_carga, det)
+                cargas.adjuntar(sesion_carga, det)
+            estadisticas.registrar_alta(det)
+            anomalias.registrar_alta(det)
+            cambios.registrar(det.idTipoIncidencia, "insert")
+            tiempo_real.publicar(det)
+            tiles.invalidar(det.Latitud, det.Longitud)
+            miniaturas.programar(det)
+            # 📩 Correo de confirmación por el outbox: se envía sólo si el reporte se guarda
+            _correo_confirmacion(u, det)
 
         # Retornar respuesta normal
-        archivo_url = f"{settings.MEDIA_URL}{det.Archivo}" if det.Archivo else ""
+        archivo_url = medios.url(None, det.Archivo.name) if det.Archivo else ""
         return Response({
             "message": "Incidente registrado correctamente",
             "registro": {
@@ -717,74 +755,208 @@ def registrar_incidente(request):
                 "Escala": ESCALAS.get(det.Escala, ""),
                 "Latitud": det.Latitud,
                 "Longitud": det.Longitud,
-                "Archivo": archivo_url or ""
+                "Archivo": archivo_url or "",
+                "duplicado_de": det.idCanonico_id,
             }
         }, status=201)
 
+    except cargas.ErrorCarga as e:
+        return _error_carga(e)
     except Exception as e:
         return Response({"error": str(e)}, status=500)
+
+
+INCIDENTES_LOTE_MAX = getattr(settings, "INCIDENTES_LOTE_MAX", 500)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser])
+def registrar_incidentes_lote(request):
+    """
+    Alta masiva para centrales de llamadas e integraciones: recibe un arreglo JSON de
+    incidentes (o {"incidentes": [...]}) con los mismos campos y reglas que
+    registrar_incidente (sin archivos). Los válidos se insertan con un solo bulk_create
+    y sus correos con un solo INSERT en el outbox; los reportes del mismo hecho quedan
+    enlazados a su incidente canónico (`duplicado_de`). La respuesta trae el resultado
+    de cada elemento en el orden recibido.
+    """
+    u = request.user
+    items = request.data.get("incidentes") if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        return Response({"error": "Se espera un arreglo de incidentes no vacío"}, status=400)
+    if len(items) > INCIDENTES_LOTE_MAX:
+        return Response(
+            {"error": f"Máximo {INCIDENTES_LOTE_MAX} incidentes por lote"}, status=413)
+
+    resultados = [None] * len(items)
+    nuevos = []
+    ahora = timezone.now()
+    for indice, item in enumerate(items):
+        if not isinstance(item, dict):
+            resultados[indice] = {"indice": indice, "ok": False, "error": "Se espera un objeto"}
+            continue
+        campos, error = _validar_incidente(item)
+        if error:
+            resultados[indice] = {"indice": indice, "ok": False, "error": error}
+            continue
+        det = DetalleAlerta(**campos, idUsuario=u, FechaHora=ahora)
+        det.calcular_geohash()  # bulk_create no llama a save()
+        nuevos.append((indice, det))
+
+    if nuevos:
+        try:
+            with transaction.atomic():
+                dets = DetalleAlerta.objects.bulk_create([det for _, det in nuevos], batch_size=500)
+                duplicados.enlazar_lote(dets)
+                estadisticas.registrar_altas(dets)
+                anomalias.registrar_altas(dets)
+                cambios.registrar_lote([det.idTipoIncidencia for det in dets], "insert")
+                tiempo_real.publicar_lote(dets)
+                tiles.invalidar_puntos([(det.Latitud, det.Longitud) for det in dets])
+                correo.encolar_lote([_datos_correo_confirmacion(u, det) for det in dets])
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+        for indice, det in nuevos:
+            resultados[indice] = {
+                "indice": indice,
+                "ok": True,
+                "idTipoIncidencia": det.idTipoIncidencia,
+                "FechaHora": det.FechaHora,
+                "duplicado_de": det.idCanonico_id,
+            }
+
+    return Response({
+        "creados": len(nuevos),
+        "errores": len(items) - len(nuevos),
+        "resultados": resultados,
+    }, status=201 if nuevos else 400)
 # ------------------ ALERTAS  -------------
+def _alerta_dict(a):
+    # Convertimos el objeto en diccionario (JSON serializable)
+    return {
+        "id": a.idTipoIncidencia,
+        "idTipoIncidencia": a.idTipoIncidencia,
+        "ubicacion": a.Ubicacion,
+        "descripcion": a.Descripcion,
+        "fecha": a.FechaHora.strftime("%Y-%m-%d %H:%M:%S"),
+        "nombre_incidente": a.NombreIncidente,
+        "escala": a.Escala,  # Devolver el escala directo (1, 2, 3, 4)
+        "estado": getattr(a, "EstadoIncidente", None) or "Pendiente",
+        "latitud": a.Latitud,
+        "longitud": a.Longitud,
+        "usuario": a.idUsuario_id if a.idUsuario_id else None,
+        "usuario_nombre": a.idUsuario.nombre if a.idUsuario else "Sistema",
+    }
+
+
 def todas_alertas(request):
     try:
         # Obtenemos todos los registros de DetalleAlerta
-        alertas = DetalleAlerta.objects.all().order_by('-FechaHora')
-
-        # Convertimos los objetos en diccionarios (JSON serializable)
-        data = [
-            {
-                "id": a.idTipoIncidencia,
-                "idTipoIncidencia": a.idTipoIncidencia,
-                "ubicacion": a.Ubicacion,
-                "descripcion": a.Descripcion,
-                "fecha": a.FechaHora.strftime("%Y-%m-%d %H:%M:%S"),
-                "nombre_incidente": a.NombreIncidente,
-                "escala": a.Escala,  # Devolver el escala directo (1, 2, 3, 4)
-                "estado": getattr(a, "EstadoIncidente", None) or "Pendiente",
-                "latitud": a.Latitud,
-                "longitud": a.Longitud,
-                "usuario": a.idUsuario_id if a.idUsuario_id else None,
-                "usuario_nombre": a.idUsuario.nombre if a.idUsuario else "Sistema",
-            }
-            for a in alertas
-        ]
+        # select_related: _alerta_dict lee idUsuario.nombre en cada fila
+        alertas = DetalleAlerta.objects.select_related("idUsuario").order_by(*paginacion.ORDEN)
+
+        # Volcado completo en streaming (?stream=json|ndjson) para exportaciones
+        formato = exportacion.formato_solicitado(request)
+        if formato:
+            return exportacion.respuesta_stream(alertas, _alerta_dict, formato)
+
+        # Paginación por cursor opcional (?page_size=&cursor=)
+        if paginacion.solicitada(request):
+            try:
+                alertas, siguiente = paginacion.paginar(request, alertas)
+            except paginacion.CursorInvalido as e:
+                return JsonResponse({"error": str(e)}, status=400)
+            return JsonResponse(paginacion.respuesta(
+                [_alerta_dict(a) for a in alertas], siguiente))
+
+        data = [_alerta_dict(a) for a in alertas]
 
         return JsonResponse(data, safe=False)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
     
+# ------------------ DELTA-SYNC DE ALERTAS -------------
+def alertas_cambios(request):
+    """
+    Ruta: /api/alertas/cambios/?since=<version>
+    Devuelve sólo las alertas creadas/actualizadas/eliminadas después de `since`
+    y la nueva versión. Sin `since` devuelve todas las alertas como upsert
+    (sincronización inicial). Si `mas` es true, repetir con la versión recibida.
+    """
+    since = request.GET.get("since")
+    try:
+        if since in (None, ""):
+            # Leer la versión ANTES que las filas: lo que cambie entre medio se reenvía
+            version = cambios.version_actual()
+            alertas = DetalleAlerta.objects.select_related("idUsuario").order_by(*paginacion.ORDEN)
+            return JsonResponse({
+                "version": version,
+                "cambios": [{"op": "upsert", "alerta": _alerta_dict(a)} for a in alertas],
+                "mas": False,
+                "completo": True,
+            })
+
+        try:
+            since = int(since)
+        except ValueError:
+            return JsonResponse({"error": "since debe ser un número de versión"}, status=400)
+
+        lista, version, mas = cambios.cambios_desde(since, _alerta_dict)
+        return JsonResponse({
+            "version": version,
+            "cambios": lista,
+            "mas": mas,
+            "completo": False,
+        })
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
 # ---------- Determinar escala automáticamente ----------
 def determinar_escala(descripcion):
-    texto = descripcion.lower()
-    if any(palabra in texto for palabra in ["robo", "asalto", "hurto", "intento de asesinato", "asesinato", "homicidio"]):
-        return 3  # Alto
-    elif any(palabra in texto for palabra in ["accidente", "choque", "incendio", "explosión"]):
-        return 2  # Medio
-    elif any(palabra in texto for palabra in ["daño", "vandalismo", "desperfecto", "mascota perdida", "robo de mascota"]):
-        return 1  # Bajo
-    else:
-        return 4  # Pendiente (por asignar)
+    # Palabras clave de EscalaAlerta (api/clasificador.py); 4 = Pendiente (por asignar)
+    return clasificador.clasificar(descripcion)
 
 # ------------------ RESET PASSWORD (opcional) -------------
+RESET_PASSWORD_MINUTOS = getattr(settings, "RESET_PASSWORD_MINUTOS", 30)
+
+
+def _huella_password(usuario):
+    """HMAC del hash actual: el enlace deja de valer cuando cambia la contraseña."""
+    return salted_hmac("reset_password", usuario.password).hexdigest()[:20]
+
+
+def token_reset_password(usuario):
+    """JWT del enlace: vence en RESET_PASSWORD_MINUTOS y deja de servir al cambiar la contraseña."""
+    return jwt.encode({
+        "idUsuario": usuario.idUsuario,
+        "pwd": _huella_password(usuario),
+        "exp": timezone.now() + timedelta(minutes=RESET_PASSWORD_MINUTOS),
+    }, settings.SECRET_KEY, algorithm="HS256")
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def enviar_correo(request):
     try:
         email = (request.data.get('email') or '').strip().lower()
-        usuario = Usuario.objects.filter(correo__iexact=email).first()
+        usuario = Usuario.objects.por_correo(email)
         if not usuario:
             return JsonResponse({"error": "El correo no está registrado"}, status=400)
 
-        token = jwt.encode({"idUsuario": usuario.idUsuario},
-                           settings.SECRET_KEY, algorithm="HS256")
+        token = token_reset_password(usuario)
         reset_url = f"http://localhost:5173/reset-password/{token}"
 
-        send_mail(
+        # Outbox: el pool de api.correo lo envía fuera del request
+        correo.encolar(
+            "reset_password",
             'Restablecer contraseña',
+            email,
             f'Haz clic en el siguiente enlace para restablecer tu contraseña:\n{reset_url}',
-            getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@tuapp.com"),
-            [email],
-            fail_silently=False,
         )
         return JsonResponse({"message": "Correo enviado"})
     except Exception as e:
@@ -795,15 +967,22 @@ def enviar_correo(request):
 @permission_classes([AllowAny])
 def Cambio_Contrasena(request, token):
     try:
-        data = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        data = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"],
+                          options={"require": ["exp"]})
         id_usuario = data.get("idUsuario")
         usuario = Usuario.objects.get(idUsuario=id_usuario)
+        if not hmac.compare_digest(str(data.get("pwd", "")), _huella_password(usuario)):
+            return JsonResponse({"error": "El enlace ya fue utilizado"}, status=400)
         new_password = (request.data.get("password") or "").strip()
         if not new_password:
             return JsonResponse({"error": "Nueva contraseña requerida"}, status=400)
         usuario.set_password(new_password)
-        usuario.save()
+        usuario.save(update_fields=["password"])
         return JsonResponse({"message": "Contraseña cambiada con éxito"})
+    except jwt.ExpiredSignatureError:
+        return JsonResponse({"error": "El enlace expiró, solicita uno nuevo"}, status=400)
+    except jwt.InvalidTokenError:
+        return JsonResponse({"error": "Enlace inválido"}, status=400)
     except Usuario.DoesNotExist:
         return JsonResponse({"error": "Usuario no encontrado"}, status=404)
     except Exception as e:
@@ -841,6 +1020,11 @@ def perfil_usuario(request):
     ce_nom = data.get("contacto_emergencia_nombre")
     ce_tel = data.get("contacto_emergencia_telefono")
 
+    if nombre is not None and str(nombre).strip():
+        otro = Usuario.objects.por_nombre(nombre)
+        if otro is not None and otro.pk != u.pk:
+            return Response({"error": "Ese nombre de usuario ya está en uso"}, status=400)
+
     with transaction.atomic():
         if nombre is not None:
             u.nombre = str(nombre).strip()
@@ -883,9 +1067,10 @@ def cambiar_password(request):
             status=400
         )
 
-    # Cambiar la contraseña directamente
+    # Cambiar la contraseña directamente. request.user puede ser la copia cacheada
+    # (api/autenticacion.py): sólo se escribe la contraseña, no el resto de columnas
     u.set_password(nueva)
-    u.save()
+    u.save(update_fields=["password"])
 
     return Response({"message": "Contraseña actualizada correctamente"})
 
@@ -894,89 +1079,50 @@ def cambiar_password(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, NdjsonRenderer])
 def historial_incidentes(request):
     """
     Devuelve todos los DetalleAlerta con su estado actual (última AtencionReporte).
     Ruta nueva y separada: /api/historial/incidentes/
+    Query params opcionales: page_size/cursor (paginado) o stream=json|ndjson (volcado).
     """
-    qs = DetalleAlerta.objects.select_related(
-        "idUsuario").order_by("-FechaHora")
+    qs = anotar_estado_atencion(DetalleAlerta.objects.select_related(
+        "idUsuario")).order_by(*paginacion.ORDEN)
+
+    # Volcado completo en streaming (?stream=json|ndjson) para la exportación a Excel
+    formato = exportacion.formato_solicitado(request)
+    if formato:
+        ser = HistorialIncidenteSerializer()
+        return exportacion.respuesta_stream(qs, ser.to_representation, formato)
+
+    # Paginación por cursor opcional (?page_size=&cursor=)
+    if paginacion.solicitada(request):
+        try:
+            filas, siguiente = paginacion.paginar(request, qs)
+        except paginacion.CursorInvalido as e:
+            return Response({"error": str(e)}, status=400)
+        data = HistorialIncidenteSerializer(filas, many=True).data
+        return Response(paginacion.respuesta(data, siguiente))
+
     serializer = HistorialIncidenteSerializer(qs, many=True)
     return Response(serializer.data)
 
 
 # ==================================== VIEWS PARA EL MAPA DE CALOR EN TIEMPO REAL ==================================== #
 
-def _parse_iso(dt_str):
-    if not dt_str:
-        return None
-    dt = parse_datetime(dt_str) or datetime.fromisoformat(dt_str)
-    # Normaliza a aware si viene naive
-    if dt and timezone.is_naive(dt):
-        dt = timezone.make_aware(dt, timezone.get_current_timezone())
-    return dt
-
-def _escala_to_intensity(escala: int | None) -> float:
-    return {1: 0.33, 2: 0.66, 3: 1.0}.get(int(escala or 1), 0.33)
-
 class HeatmapAlertView(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
+    # JSON por defecto; binario compacto con Accept: application/vnd.seguridad.heatmap
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, HeatmapBinarioRenderer]
 
     def get(self, request, *args, **kwargs):
-        qs = DetalleAlerta.objects.filter(
-            Latitud__isnull=False,
-            Longitud__isnull=False
-        )
-
-        # --- filtros de estado ---
-        incluir_resueltos = str(request.query_params.get("incluir_resueltos", "")).lower() in {"1","true","t","yes","y"}
-        if not incluir_resueltos:
-            qs = qs.exclude(EstadoIncidente="Resuelto")
-
-        estados_csv = request.query_params.get("estado")  # p.ej. "Pendiente,En proceso"
-        if estados_csv:
-            estados = [s.strip() for s in estados_csv.split(",") if s.strip()]
-            if estados:
-                qs = qs.filter(EstadoIncidente__in=estados)
-
-        # --- fechas ---
-        dt_start = _parse_iso(request.query_params.get("start"))
-        dt_end = _parse_iso(request.query_params.get("end"))
-        if dt_start:
-            qs = qs.filter(FechaHora__gte=dt_start)
-        if dt_end:
-            qs = qs.filter(FechaHora__lte=dt_end)
-
-        # --- escala ---
-        escala_min = request.query_params.get("escala_min")
-        escala_max = request.query_params.get("escala_max")
-        if escala_min:
-            qs = qs.filter(Escala__gte=int(escala_min))
-        if escala_max:
-            qs = qs.filter(Escala__lte=int(escala_max))
-
-        # --- bbox ---
-        bbox = request.query_params.get("bbox")  # "south,west,north,east"
-        if bbox:
-            try:
-                s, w, n, e = map(float, bbox.split(","))
-                qs = qs.filter(
-                    Latitud__gte=s, Latitud__lte=n,
-                    Longitud__gte=w, Longitud__lte=e
-                )
-            except Exception:
-                pass
-
-        # --- límite ---
-        try:
-            limit = int(request.query_params.get("limit") or 2000)
-        except Exception:
-            limit = 2000
+        # Filtros compartidos con el stream en tiempo real (api/heatmap.py)
+        filtro = FiltroHeatmap(request.query_params)
 
         # --- consulta principal ---
-        rows = qs.order_by("-FechaHora").values_list(
+        rows = filtro.queryset().order_by("-FechaHora").values_list(
             "Latitud", "Longitud", "Escala", "EstadoIncidente"
-        )[:limit]
+        )[:filtro.limit]
 
         points = [[lat, lng, _escala_to_intensity(esc), estado]
                   for (lat, lng, esc, estado) in rows]
@@ -987,13 +1133,61 @@ class HeatmapAlertView(APIView):
         for _, _, _, est in rows:
             by_status[est] = by_status.get(est, 0) + 1
 
-        return Response({
+        response = Response({
             "points": points,
             "meta": {
                 "count": len(points),
                 "by_status": by_status,
             }
         })
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+
+class HeatmapTileView(APIView):
+    """
+    Ruta: /api/alertas/heatmap/tiles/<z>/<x>/<y>
+    Densidad agregada por celdas (peso = _escala_to_intensity) para un tile
+    Web Mercator, sin límite de puntos. Cacheado por tile y compartido por
+    todos los clientes; se invalida al cambiar un incidente dentro del tile.
+    Query param opcional: incluir_resueltos.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request, z, x, y, *args, **kwargs):
+        if not tiles.tile_valido(z, x, y):
+            return Response({"error": "tile fuera de rango"}, status=400)
+
+        incluir_resueltos = str(request.query_params.get("incluir_resueltos", "")).lower() in VERDADEROS
+        response = Response(tiles.obtener_tile(z, x, y, incluir_resueltos))
+        response["Cache-Control"] = f"public, max-age={min(tiles.CACHE_SEGUNDOS, 60)}"
+        return response
+
+
+class ZonasCalorView(APIView):
+    """
+    Ruta: /api/alertas/zonas-calor/
+    Zonas calientes (agrupamientos DBSCAN) ya calculadas por `manage.py calcular_zonas_calor`:
+    centroide, radio, envolvente y conteo, de mayor a menor peso. No calcula nada en el request.
+    Query params opcionales: ventana (24h / 7d / 30d), escala_min (1-3).
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request, *args, **kwargs):
+        ventana = request.query_params.get("ventana", "7d")
+        if ventana not in zonas_calor.VENTANAS:
+            return Response({"error": f"ventana debe ser una de: {', '.join(zonas_calor.VENTANAS)}"},
+                            status=400)
+        try:
+            escala_min = int(request.query_params.get("escala_min", zonas_calor.ESCALAS[0]))
+        except ValueError:
+            escala_min = None
+        if escala_min not in zonas_calor.ESCALAS:
+            return Response({"error": f"escala_min debe ser una de: {zonas_calor.ESCALAS}"}, status=400)
+
+        response = Response(zonas_calor.obtener(ventana, escala_min))
+        response["Cache-Control"] = f"public, max-age={min(zonas_calor.CACHE_SEGUNDOS, 60)}"
+        return response
 
 
 # ============================================================================
@@ -1005,8 +1199,20 @@ def gestion_list_incidentes(request):
     Nuevo endpoint: lista incidencias con su EstadoIncidente para Gestión.
     Ruta: /api/gestion/incidentes/
     """
-    qs = DetalleAlerta.objects.select_related(
-        "idUsuario").order_by("-FechaHora")
+    # Sólo incidentes canónicos, con la cantidad de reportes duplicados de cada uno
+    qs = duplicados.anotar_duplicados(
+        DetalleAlerta.objects.filter(idCanonico__isnull=True).select_related("idUsuario")
+    ).order_by(*paginacion.ORDEN)
+
+    # Paginación por cursor opcional (?page_size=&cursor=)
+    if paginacion.solicitada(request):
+        try:
+            filas, siguiente = paginacion.paginar(request, qs)
+        except paginacion.CursorInvalido as e:
+            return Response({"error": str(e)}, status=400)
+        data = GestionIncidenteSerializer(filas, many=True).data
+        return Response(paginacion.respuesta(data, siguiente))
+
     data = GestionIncidenteSerializer(qs, many=True).data
     return Response(data)
 
@@ -1019,13 +1225,220 @@ def gestion_update_incidente(request, id):
     Ruta: /api/gestion/incidentes/<int:id>/
     Body: { "estado": "Pendiente" | "En proceso" | "Resuelto" }
     """
-    obj = get_object_or_404(DetalleAlerta, pk=id)
-    ser = IncidenteEstadoUpdateSerializer(data=request.data)
+    with transaction.atomic():
+        obj = get_object_or_404(
+            duplicados.anotar_duplicados(DetalleAlerta.objects.select_for_update()), pk=id)
+        ser = IncidenteEstadoUpdateSerializer(data=request.data)
+        if not ser.is_valid():
+            return Response(ser.errors, status=400)
+
+        estado_anterior = obj.EstadoIncidente
+        obj.EstadoIncidente = ser.validated_data["estado"]
+        obj.save(update_fields=["EstadoIncidente"])
+        estadisticas.registrar_cambio_estado(obj, estado_anterior)
+        cambios.registrar(obj.idTipoIncidencia, "update")
+        duplicados.propagar_estado([obj.pk], obj.EstadoIncidente)
+        tiempo_real.publicar(obj)
+        tiles.invalidar(obj.Latitud, obj.Longitud)
+
+    # Devolver el registro formateado para la tabla de gestión
+    return Response(GestionIncidenteSerializer(obj).data)
+
+
+GESTION_LOTE_MAX = getattr(settings, "GESTION_LOTE_MAX", 1000)
+
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def gestion_update_incidentes_lote(request):
+    """
+    Cambio de estado masivo (p. ej. cerrar el turno marcando todo "Resuelto").
+    Ruta: /api/gestion/incidentes/estado/
+    Body: { "estado": "Resuelto", "ids": [1, 2, ...] }
+       o  { "estado": "Resuelto", "filtro": {"estado": "En proceso", "escala": 1, "desde": ..., "hasta": ...} }
+    Un solo UPDATE en una transacción (más el de sus duplicados); devuelve sólo los
+    incidentes que cambiaron. Sólo staff o administradores.
+    """
+    if not roles.es_admin(request.user):
+        return Response({"error": "Solo un administrador puede cambiar incidentes en lote"}, status=403)
+    ser = IncidentesEstadoLoteSerializer(data=request.data)
     if not ser.is_valid():
         return Response(ser.errors, status=400)
+    nuevo = ser.validated_data["estado"]
+    ids = ser.validated_data.get("ids")
+    filtro = ser.validated_data.get("filtro") or {}
+
+    qs = DetalleAlerta.objects.all()
+    if ids:
+        if len(ids) > GESTION_LOTE_MAX:
+            return Response({"error": f"Máximo {GESTION_LOTE_MAX} incidentes por lote"}, status=413)
+        qs = qs.filter(pk__in=ids)
+    if "estado" in filtro:
+        qs = qs.filter(EstadoIncidente=filtro["estado"])
+    if "escala" in filtro:
+        qs = qs.filter(Escala=filtro["escala"])
+    if "desde" in filtro:
+        qs = qs.filter(FechaHora__gte=filtro["desde"])
+    if "hasta" in filtro:
+        qs = qs.filter(FechaHora__lte=filtro["hasta"])
 
-    obj.EstadoIncidente = ser.validated_data["estado"]
-    obj.save(update_fields=["EstadoIncidente"])
+    with transaction.atomic():
+        # Bloquear las filas que cambian: el estado anterior es el que se descuenta del resumen
+        objs = list(
+            duplicados.anotar_duplicados(qs.exclude(EstadoIncidente=nuevo))
+            .select_related("idUsuario")
+            .select_for_update(of=("self",))
+            .order_by(*paginacion.ORDEN)[:GESTION_LOTE_MAX + 1]
+        )
+        if len(objs) > GESTION_LOTE_MAX:
+            return Response(
+                {"error": f"El filtro abarca más de {GESTION_LOTE_MAX} incidentes; acótalo"},
+                status=413)
+        if objs:
+            DetalleAlerta.objects.filter(pk__in=[o.pk for o in objs]).update(EstadoIncidente=nuevo)
+            anteriores = [(o, o.EstadoIncidente) for o in objs]
+            for o in objs:
+                o.EstadoIncidente = nuevo
+            estadisticas.registrar_cambios_estado(anteriores)
+            cambios.registrar_lote([o.pk for o in objs], "update")
+            duplicados.propagar_estado([o.pk for o in objs], nuevo)
+            tiempo_real.publicar_lote(objs)
+            tiles.invalidar_puntos([(o.Latitud, o.Longitud) for o in objs])
 
-    # Devolver el registro formateado para la tabla de gestión
-    return Response(GestionIncidenteSerializer(obj).data)
+    return Response({
+        "actualizados": len(objs),
+        "incidentes": GestionIncidenteSerializer(objs, many=True).data,
+    })
+
+
+# ==================================== CARGAS REANUDABLES (FOTOS/VIDEOS) ==================================== #
+
+def _error_carga(e):
+    data = {"error": str(e)}
+    if e.recibido is not None:
+        data["recibido"] = e.recibido
+    return Response(data, status=e.status)
+
+
+class CargaListView(APIView):
+    """
+    Ruta: /api/cargas/
+    POST {nombre, tamano, sha256, tipo?} crea una sesión de carga por partes.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            sesion = cargas.crear(
+                request.user,
+                request.data.get("nombre"),
+                request.data.get("tamano"),
+                request.data.get("sha256"),
+                request.data.get("tipo"),
+            )
+        except cargas.ErrorCarga as e:
+            return _error_carga(e)
+        return Response(cargas.datos(sesion), status=201)
+
+
+class CargaView(APIView):
+    """
+    Ruta: /api/cargas/<id>/
+    GET: estado y bytes recibidos (para reanudar). PUT: un rango de bytes con
+    Content-Range: bytes inicio-fin/total (cuerpo crudo, application/octet-stream).
+    DELETE: cancela la carga.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id, *args, **kwargs):
+        try:
+            sesion = cargas.obtener(request.user, id)
+        except cargas.ErrorCarga as e:
+            return _error_carga(e)
+        return Response(cargas.datos(sesion))
+
+    def put(self, request, id, *args, **kwargs):
+        try:
+            sesion = cargas.obtener(request.user, id)
+            longitud = request.META.get("CONTENT_LENGTH")
+            # request.stream: se lee el cuerpo por bloques, sin request.data ni spool
+            sesion = cargas.escribir_rango(
+                sesion,
+                request.headers.get("Content-Range"),
+                int(longitud) if longitud else None,
+                request.stream,
+            )
+        except cargas.ErrorCarga as e:
+            return _error_carga(e)
+        return Response(cargas.datos(sesion))
+
+    def delete(self, request, id, *args, **kwargs):
+        try:
+            sesion = cargas.obtener(request.user, id)
+        except cargas.ErrorCarga as e:
+            return _error_carga(e)
+        if sesion.Estado != "abierta":
+            return Response({"error": "Sólo se pueden cancelar cargas abiertas"}, status=409)
+        cargas.cancelar(sesion)
+        return Response(status=204)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def carga_finalizar(request, id):
+    """
+    Ruta: /api/cargas/<id>/finalizar/
+    Verifica tamaño y SHA-256 y mueve el archivo a archivos_alertas/.
+    Body opcional: { "idTipoIncidencia": <id> } para adjuntarlo a un reporte propio.
+    """
+    id_incidente = request.data.get("idTipoIncidencia")
+    try:
+        with transaction.atomic():
+            sesion = get_object_or_404(
+                SesionCarga.objects.select_for_update(), idSesion=id, idUsuario=request.user)
+            det = None
+            if id_incidente:
+                # Antes de guardar el archivo: un 404 o un 409 no deja la carga a medias
+                det = get_object_or_404(
+                    DetalleAlerta.objects.select_for_update(),
+                    pk=id_incidente, idUsuario=request.user)
+                cargas.validar_adjunto(sesion, det)
+            sesion = cargas.finalizar(sesion)
+            if det is not None and cargas.adjuntar(sesion, det):
+                cambios.registrar(det.idTipoIncidencia, "update")
+                miniaturas.programar(det)
+    except cargas.ChecksumInvalido as e:
+        # Fuera de la transacción revertida: el reinicio queda guardado
+        cargas.reiniciar(e.sesion)
+        return _error_carga(e)
+    except cargas.ErrorCarga as e:
+        return _error_carga(e)
+    return Response(cargas.datos(sesion))
+
+
+# ==================================== MÉTRICAS (Prometheus) ==================================== #
+
+def _puede_ver_metricas(request):
+    # 1) Token fijo del scraper de Prometheus (Authorization: Bearer <METRICAS_TOKEN>)
+    token = getattr(settings, "METRICAS_TOKEN", "")
+    auth = request.headers.get("Authorization", "")
+    if token and auth.startswith("Bearer ") and hmac.compare_digest(auth[7:], token):
+        return True
+    # 2) Usuario staff autenticado con JWT
+    try:
+        resultado = JWTAutenticacionCacheada().authenticate(request)
+    except Exception:
+        return False
+    return bool(resultado and resultado[0].is_staff)
+
+
+def metricas_prometheus(request):
+    """
+    Ruta: /api/metricas
+    Métricas de todos los workers en formato de texto de Prometheus.
+    Requiere el token METRICAS_TOKEN o un usuario staff.
+    """
+    if not _puede_ver_metricas(request):
+        return JsonResponse({"error": "No autorizado"}, status=401)
+    return HttpResponse(metricas.exposicion(), content_type=metricas.CONTENT_TYPE)
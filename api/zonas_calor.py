@@ -0,0 +1,313 @@
+# api/zonas_calor.py — zonas calientes: DBSCAN periódico sobre las coordenadas de los incidentes
+#
+# `manage.py calcular_zonas_calor` (cron, o --cada N minutos) agrupa los incidentes canónicos
+# de cada ventana (ZONAS_CALOR_VENTANAS) y escala mínima (ZONAS_CALOR_ESCALAS) con DBSCAN:
+# un incidente es núcleo si tiene al menos MIN_PUNTOS vecinos a EPS_METROS o menos; los
+# núcleos conectados forman una zona y los vecinos no núcleo se suman a ella. Los vecinos se
+# buscan con una grilla de celdas de EPS_METROS/√2 (sólo las celdas cercanas), por bloques
+# y con NumPy. Cada zona guarda centroide, envolvente convexa, radio y conteo
+# en ZonaCalor; el endpoint sólo lee ese resultado, cacheado por su FechaCalculo: el comando
+# corre en otro proceso y el siguiente cálculo cambia la clave sin invalidar nada.
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .heatmap import _escala_to_intensity
+from .models import DetalleAlerta, ZonaCalor
+
+VENTANAS = getattr(settings, "ZONAS_CALOR_VENTANAS", {"24h": 24, "7d": 7 * 24, "30d": 30 * 24})
+ESCALAS = getattr(settings, "ZONAS_CALOR_ESCALAS", [1, 2, 3])
+EPS_METROS = getattr(settings, "ZONAS_CALOR_EPS_METROS", 250)
+MIN_PUNTOS = getattr(settings, "ZONAS_CALOR_MIN_PUNTOS", 5)
+MAX_ZONAS = getattr(settings, "ZONAS_CALOR_MAX_ZONAS", 200)  # por ventana y escala, las de más peso
+CACHE_SEGUNDOS = getattr(settings, "ZONAS_CALOR_CACHE_SECONDS", 3600)
+_METROS_POR_GRADO = 111_320.0
+_PARES_POR_BLOQUE = 2_000_000  # acota la memoria de los pares candidatos
+
+# Tabla escala -> intensidad (como api/tiles.py)
+_PESOS_ESCALA = np.array([_escala_to_intensity(e) for e in range(5)])
+
+
+# ---------------------------- DBSCAN ----------------------------
+def _proyectar(lat, lng):
+    """Lat/lng -> metros (equirectangular alrededor de la latitud media: escala de ciudad)."""
+    coseno = math.cos(math.radians(float(np.mean(lat))))
+    return np.column_stack((lng * coseno * _METROS_POR_GRADO, lat * _METROS_POR_GRADO))
+
+
+def _grilla(xy, eps):
+    """
+    Celdas de lado eps/√2 (dos puntos de una misma celda siempre son vecinos). Devuelve
+    `orden` (índices de `xy` ordenados por celda), la clave de celda ya ordenada y el ancho
+    de una fila de la grilla (la celda (cx+dx, cy+dy) es clave + dx*ancho + dy).
+    """
+    celdas = np.floor(xy / (eps / math.sqrt(2))).astype(np.int64)
+    celdas -= celdas.min(axis=0)
+    celdas[:, 1] += 2  # margen para las vecinas de abajo sin pasar a la columna anterior
+    ancho = int(celdas[:, 1].max()) + 3
+    clave = celdas[:, 0] * ancho + celdas[:, 1]
+    orden = np.argsort(clave, kind="stable")
+    return orden, clave[orden], ancho
+
+
+def _pares_vecinos(xy, clave, ancho, eps):
+    """
+    Genera bloques (i, j) de los pares a distancia <= eps (incluye i == j) sobre `xy` y
+    `clave` ya ordenados por celda: cada punto sólo se compara con las celdas a dos o menos
+    de la suya. Por bloques de _PARES_POR_BLOQUE candidatos: nunca están todos en memoria.
+    """
+    n = len(xy)
+    eps2 = eps * eps
+    for dx in range(-2, 3):
+        for dy in range(-2, 3):
+            vecina = clave + dx * ancho + dy
+            inicio = np.searchsorted(clave, vecina, "left")
+            cantidad = np.searchsorted(clave, vecina, "right") - inicio
+            acumulado = np.cumsum(cantidad)
+            desde = 0
+            while desde < n:
+                base = acumulado[desde - 1] if desde else 0
+                hasta = int(np.searchsorted(acumulado, base + _PARES_POR_BLOQUE, "right"))
+                hasta = min(max(hasta, desde + 1), n)
+                cant = cantidad[desde:hasta]
+                total = int(cant.sum())
+                if total:
+                    i = np.repeat(np.arange(desde, hasta), cant)
+                    corrimiento = np.arange(total) - np.repeat(np.cumsum(cant) - cant, cant)
+                    j = np.repeat(inicio[desde:hasta], cant) + corrimiento
+                    d = xy[i] - xy[j]
+                    cerca = np.einsum("ij,ij->i", d, d) <= eps2
+                    yield i[cerca], j[cerca]
+                desde = hasta
+
+
+def _componentes(n, a, b):
+    """Componente (menor índice) de cada nodo 0..n-1 del grafo de aristas a-b."""
+    componente = np.arange(n)
+    if not len(a):
+        return componente
+    a, b = np.concatenate((a, b)), np.concatenate((b, a))
+    while True:
+        anterior = componente.copy()
+        np.minimum.at(componente, a, componente[b])
+        componente = componente[componente]  # salto de puntero
+        if np.array_equal(componente, anterior):
+            return componente
+
+
+def dbscan(xy, eps, min_puntos):
+    """
+    Etiqueta de zona (0..k-1) de cada punto de `xy` (metros), o -1 si es ruido.
+    Dos pasadas por los pares: la primera cuenta vecinos (núcleos); la segunda sólo guarda
+    qué celdas quedan unidas por un par de núcleos y un núcleo vecino de cada borde.
+    """
+    n = len(xy)
+    etiquetas = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return etiquetas
+    orden, clave, ancho = _grilla(xy, eps)
+    xy = xy[orden]
+
+    vecinos = np.zeros(n, dtype=np.int64)
+    for i, _ in _pares_vecinos(xy, clave, ancho, eps):
+        vecinos += np.bincount(i, minlength=n)
+    nucleo = vecinos >= min_puntos
+    if not nucleo.any():
+        return etiquetas
+
+    # Los núcleos de una misma celda están todos conectados: el grafo es entre celdas
+    _, celda = np.unique(clave, return_inverse=True)
+    aristas = set()
+    nucleo_vecino = np.full(n, -1, dtype=np.int64)
+    for i, j in _pares_vecinos(xy, clave, ancho, eps):
+        ambos = nucleo[i] & nucleo[j] & (celda[i] < celda[j])
+        if ambos.any():
+            unicas = np.unique(np.column_stack((celda[i[ambos]], celda[j[ambos]])), axis=0)
+            aristas.update(map(tuple, unicas.tolist()))
+        borde = ~nucleo[i] & nucleo[j]
+        nucleo_vecino[i[borde]] = j[borde]
+
+    a, b = np.array(sorted(aristas), dtype=np.int64).reshape(-1, 2).T
+    componente = _componentes(int(celda.max()) + 1, a, b)
+
+    local = np.full(n, -1, dtype=np.int64)
+    local[nucleo] = componente[celda[nucleo]]
+    # Bordes: no núcleos con algún núcleo a eps se suman a esa zona
+    bordes = nucleo_vecino >= 0
+    local[bordes] = componente[celda[nucleo_vecino[bordes]]]
+
+    # Etiquetas compactas y de vuelta al orden original
+    zonas = local >= 0
+    _, compactas = np.unique(local[zonas], return_inverse=True)
+    local[zonas] = compactas
+    etiquetas[orden] = local
+    return etiquetas
+
+
+def envolvente(puntos):
+    """Envolvente convexa (cadena monótona) de [[x, y], ...]; índices en sentido antihorario."""
+    indices = sorted(range(len(puntos)), key=lambda k: (puntos[k][0], puntos[k][1]))
+    if len(indices) <= 2:
+        return indices
+
+    def giro(o, a, b):
+        return ((puntos[a][0] - puntos[o][0]) * (puntos[b][1] - puntos[o][1])
+                - (puntos[a][1] - puntos[o][1]) * (puntos[b][0] - puntos[o][0]))
+
+    inferior, superior = [], []
+    for k in indices:
+        while len(inferior) >= 2 and giro(inferior[-2], inferior[-1], k) <= 0:
+            inferior.pop()
+        inferior.append(k)
+    for k in reversed(indices):
+        while len(superior) >= 2 and giro(superior[-2], superior[-1], k) <= 0:
+            superior.pop()
+        superior.append(k)
+    return inferior[:-1] + superior[:-1]
+
+
+# ---------------------------- Cálculo ----------------------------
+def _zonas(lat, lng, escala, epoca, eps=EPS_METROS, min_puntos=MIN_PUNTOS):
+    """Zonas (dicts con los campos de ZonaCalor) de un conjunto de incidentes."""
+    if len(lat) < min_puntos:
+        return []
+    xy = _proyectar(lat, lng)
+    etiquetas = dbscan(xy, eps, min_puntos)
+    en_zona = etiquetas >= 0
+    k = int(etiquetas.max()) + 1 if en_zona.any() else 0
+    if not k:
+        return []
+
+    e = etiquetas[en_zona]
+    pesos = _PESOS_ESCALA[np.clip(escala[en_zona], 0, 4)]
+    cantidad = np.bincount(e, minlength=k)
+    peso = np.bincount(e, weights=pesos, minlength=k)
+    centro_lat = np.bincount(e, weights=pesos * lat[en_zona], minlength=k) / peso
+    centro_lng = np.bincount(e, weights=pesos * lng[en_zona], minlength=k) / peso
+    # Radio: distancia (en el mismo plano proyectado) del centroide al punto más lejano
+    coseno = math.cos(math.radians(float(np.mean(lat))))
+    dx = (lng[en_zona] - centro_lng[e]) * coseno * _METROS_POR_GRADO
+    dy = (lat[en_zona] - centro_lat[e]) * _METROS_POR_GRADO
+    radio = np.zeros(k)
+    np.maximum.at(radio, e, np.hypot(dx, dy))
+    escala_max = np.zeros(k, dtype=np.int64)
+    np.maximum.at(escala_max, e, np.where(escala[en_zona] == 4, 1, escala[en_zona]))
+    primero = np.full(k, np.inf)
+    ultimo = np.full(k, -np.inf)
+    np.minimum.at(primero, e, epoca[en_zona])
+    np.maximum.at(ultimo, e, epoca[en_zona])
+
+    mejores = np.argsort(-peso, kind="stable")[:MAX_ZONAS]
+    indices_zona = np.flatnonzero(en_zona)
+    por_zona = np.split(indices_zona[np.argsort(e, kind="stable")], np.cumsum(cantidad)[:-1])
+    zonas = []
+    for z in mejores:
+        miembros = por_zona[z]
+        casco = [[round(float(lat[m]), 6), round(float(lng[m]), 6)]
+                 for m in miembros[envolvente(xy[miembros].tolist())]]
+        zonas.append({
+            "Latitud": round(float(centro_lat[z]), 6),
+            "Longitud": round(float(centro_lng[z]), 6),
+            "RadioMetros": round(float(radio[z]), 1),
+            "Cantidad": int(cantidad[z]),
+            "Peso": round(float(peso[z]), 3),
+            "EscalaMaxima": int(escala_max[z]),
+            "Casco": casco,
+            "PrimerReporte": datetime.fromtimestamp(primero[z], tz=dt_timezone.utc),
+            "UltimoReporte": datetime.fromtimestamp(ultimo[z], tz=dt_timezone.utc),
+        })
+    return zonas
+
+
+def _cargar(horas):
+    """Incidentes canónicos con coordenadas de las últimas `horas`, como arreglos NumPy."""
+    desde = timezone.now() - timedelta(hours=horas)
+    filas = list(DetalleAlerta.objects.filter(
+        idCanonico__isnull=True, Latitud__isnull=False, Longitud__isnull=False, FechaHora__gte=desde,
+    ).values_list("Latitud", "Longitud", "Escala", "FechaHora"))
+    lat = np.fromiter((f[0] for f in filas), dtype=float, count=len(filas))
+    lng = np.fromiter((f[1] for f in filas), dtype=float, count=len(filas))
+    escala = np.fromiter((f[2] for f in filas), dtype=np.int64, count=len(filas))
+    epoca = np.fromiter((f[3].timestamp() for f in filas), dtype=float, count=len(filas))
+    return lat, lng, escala, epoca
+
+
+def _filtro(escala, epoca, horas, escala_min, ahora):
+    """Máscara de una ventana y escala mínima. Pendiente (4) cuenta como escala 1."""
+    efectiva = np.where(escala == 4, 1, escala)
+    return (epoca >= ahora - horas * 3600) & (efectiva >= escala_min)
+
+
+def guardar(ventana, escala_min, zonas, calculado=None):
+    """Reemplaza las zonas de (ventana, escala_min) en una transacción."""
+    calculado = calculado or timezone.now()
+    with transaction.atomic():
+        ZonaCalor.objects.filter(Ventana=ventana, EscalaMinima=escala_min).delete()
+        ZonaCalor.objects.bulk_create([
+            ZonaCalor(Ventana=ventana, EscalaMinima=escala_min, FechaCalculo=calculado, **z)
+            for z in zonas
+        ])
+
+
+def actualizar(ventanas=None):
+    """
+    Recalcula las zonas de las ventanas pedidas (todas por defecto) y cada escala mínima.
+    Una sola consulta (la ventana más larga); el resto se filtra en memoria.
+    Devuelve {(ventana, escala_min): cantidad de zonas}. Para `manage.py calcular_zonas_calor`.
+    """
+    ventanas = list(ventanas or VENTANAS)
+    desconocidas = [v for v in ventanas if v not in VENTANAS]
+    if desconocidas:
+        raise ValueError(f"ventanas desconocidas: {', '.join(desconocidas)}")
+    lat, lng, escala, epoca = _cargar(max(VENTANAS[v] for v in ventanas))
+    ahora = timezone.now()
+    resultado = {}
+    for ventana in ventanas:
+        for escala_min in ESCALAS:
+            m = _filtro(escala, epoca, VENTANAS[ventana], escala_min, ahora.timestamp())
+            zonas = _zonas(lat[m], lng[m], escala[m], epoca[m])
+            guardar(ventana, escala_min, zonas, ahora)
+            resultado[(ventana, escala_min)] = len(zonas)
+    return resultado
+
+
+# ---------------------------- Lectura (endpoint) ----------------------------
+def obtener(ventana, escala_min):
+    """
+    Zonas guardadas de (ventana, escala_min), de mayor a menor peso. Cacheado por la
+    FechaCalculo guardada (una lectura por índice): un cálculo nuevo cambia la clave.
+    """
+    filas = ZonaCalor.objects.filter(Ventana=ventana, EscalaMinima=escala_min)
+    calculado = filas.order_by("-Peso").values_list("FechaCalculo", flat=True).first()
+    clave = f"zonas_calor:{ventana}:{escala_min}:{calculado.timestamp() if calculado else 0}"
+    datos = cache.get(clave)
+    if datos is None:
+        zonas = list(filas.order_by("-Peso").values(
+            "Latitud", "Longitud", "RadioMetros", "Cantidad", "Peso",
+            "EscalaMaxima", "Casco", "PrimerReporte", "UltimoReporte"))
+        datos = {
+            "ventana": ventana,
+            "escala_min": escala_min,
+            "calculado": calculado.isoformat() if calculado else None,
+            "eps_metros": EPS_METROS,
+            "min_puntos": MIN_PUNTOS,
+            "zonas": [{
+                "lat": f["Latitud"],
+                "lng": f["Longitud"],
+                "radio_metros": f["RadioMetros"],
+                "cantidad": f["Cantidad"],
+                "peso": f["Peso"],
+                "escala_max": f["EscalaMaxima"],
+                "casco": f["Casco"],
+                "primer_reporte": f["PrimerReporte"].isoformat(),
+                "ultimo_reporte": f["UltimoReporte"].isoformat(),
+            } for f in zonas],
+        }
+        cache.set(clave, datos, CACHE_SEGUNDOS)
+    return datos
@@ -20,6 +20,7 @@ export default function Dashboard() {
   });
   const [personnel, setPersonnel] = useState([]);
   const [activities, setActivities] = useState([]);
+  const [anomalias, setAnomalias] = useState({ anomalias: [], ventana_horas: 0 });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -73,12 +74,23 @@ export default function Dashboard() {
     }
   };
 
+  const fetchAnomalias = async () => {
+    try {
+      const r = await fetch("http://127.0.0.1:8000/api/dashboard/anomalias/");
+      const data = await r.json();
+      if (data.success) setAnomalias(data);
+      else setError("Error al cargar anomalías");
+    } catch {
+      setError("Error de conexión con las anomalías");
+    }
+  };
+
   useEffect(() => {
     const load = async () => {
       setLoading(true);
       setError(null);
       try {
-        await Promise.all([fetchStats(), fetchPersonnel(), fetchActivities()]);
+        await Promise.all([fetchStats(), fetchPersonnel(), fetchActivities(), fetchAnomalias()]);
       } finally {
         setLoading(false);
       }
@@ -586,6 +598,51 @@ export default function Dashboard() {
                 </div>
               )}
             </div>
+
+            {/* Anomalías: celdas con más incidentes que lo habitual para esta hora */}
+            <div className="dashboard-section">
+              <div className="section-header">
+                <h3>
+                  <span className="section-icon">📈</span>
+                  Zonas con Actividad Inusual
+                </h3>
+                <div className="personnel-summary">
+                  <span className="total-count">
+                    últimas {anomalias.ventana_horas} h
+                  </span>
+                </div>
+              </div>
+              {loading ? (
+                <div className="loading">
+                  <div className="loading-spinner">🔄</div>
+                  Cargando anomalías...
+                </div>
+              ) : anomalias.anomalias.length === 0 ? (
+                <div className="empty-personnel">
+                  <div className="empty-icon">✅</div>
+                  <p>Sin actividad inusual en este momento</p>
+                </div>
+              ) : (
+                <div className="inbox-container">
+                  {anomalias.anomalias.slice(0, 5).map((a) => (
+                    <div key={a.celda} className="inbox-message unread">
+                      <div className="message-content">
+                        <div className="message-sender">
+                          {a.lat.toFixed(4)}, {a.lng.toFixed(4)}
+                        </div>
+                        <div className="message-body">
+                          {a.observados} incidentes (habitual: {a.esperados})
+                        </div>
+                      </div>
+                      <div className="message-meta">
+                        <div className="message-time">z = {a.z}</div>
+                        <div className="notification-bell">🚨</div>
+                      </div>
+                    </div>
+                  ))}
+                </div>
+              )}
+            </div>
           </div>
         )}
       </main>
@@ -8,6 +8,7 @@ export default function useHeatmapPolling({
     daysWindow = 14,              // ventana de tiempo
     params = {},                  // { escala_min, escala_max, bbox, incluir_resueltos, ... }
     authToken = null,             // opcional: JWT si tu endpoint lo requiere
+    stream = false,               // usar /alertas/heatmap/stream/ (SSE) y caer a polling si falla
 }) {
     const [points, setPoints] = useState([]); // cada punto: [lat, lng, intensity, estado?]
     const [loading, setLoading] = useState(true);
@@ -61,6 +62,42 @@ export default function useHeatmapPolling({
     };
 
     useEffect(() => {
+        // Modo push: snapshot inicial + cambios (upsert/remove) por Server-Sent Events
+        if (stream && typeof EventSource !== "undefined") {
+            const start = new Date(Date.now() - daysWindow * 24 * 60 * 60 * 1000).toISOString();
+            const qs = new URLSearchParams({ start, limit: 3000, ...params }).toString();
+            const es = new EventSource(`${baseUrl}/alertas/heatmap/stream/?${qs}`);
+            let recibido = false;
+            let fallback = null;
+
+            es.addEventListener("snapshot", (e) => {
+                recibido = true;
+                setPoints(JSON.parse(e.data).points || []);
+                setLoading(false);
+            });
+            es.addEventListener("upsert", (e) => {
+                const { point } = JSON.parse(e.data);
+                setPoints((prev) => [...prev.filter((p) => p[4] !== point[4]), point]);
+            });
+            es.addEventListener("remove", (e) => {
+                const { id } = JSON.parse(e.data);
+                setPoints((prev) => prev.filter((p) => p[4] !== id));
+            });
+            es.onerror = () => {
+                // Sin servidor ASGI: volver al polling clásico
+                if (!recibido) {
+                    es.close();
+                    fetchOnce();
+                    fallback = setInterval(fetchOnce, intervalMs);
+                }
+            };
+
+            return () => {
+                es.close();
+                if (fallback) clearInterval(fallback);
+            };
+        }
+
         // primera carga
         fetchOnce();
 
@@ -85,7 +122,7 @@ export default function useHeatmapPolling({
             if (abortRef.current) abortRef.current.abort();
         };
         // eslint-disable-next-line react-hooks/exhaustive-deps
-    }, [baseUrl, intervalMs, daysWindow, JSON.stringify(params), authToken]);
+    }, [baseUrl, intervalMs, daysWindow, JSON.stringify(params), authToken, stream]);
 
     // Contadores por estado (útil para UI/leyendas)
     const byStatus = useMemo(() => {
@@ -17,6 +17,7 @@ export default function MapCalor() {
         intervalMs: 10000, // refresca cada 10s
         daysWindow: 14,
         params: { escala_min: 1, escala_max: 3, bbox },
+        stream: true, // push por SSE; si no hay servidor ASGI vuelve al polling
     });
 
     // Leyenda simple (opcional)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import "../../css/Vista_usuario/alertas.css";
 
@@ -40,15 +40,37 @@ export default function MisAlertas({ darkMode }) {
     }
   };
 
-  // --- Cargar alertas desde el backend ---
+  // --- Cargar alertas desde el backend (delta-sync: sólo lo que cambió) ---
+  const versionRef = useRef(null);
+  const alertasRef = useRef(new Map());
+
   useEffect(() => {
     const fetchAlertas = async () => {
       try {
         const token = localStorage.getItem("access");
-        const res = await axios.get("http://127.0.0.1:8000/api/todas_alertas/", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        setAlertas(res.data);
+        let mas = true;
+        while (mas) {
+          const params = versionRef.current === null ? {} : { since: versionRef.current };
+          const res = await axios.get("http://127.0.0.1:8000/api/alertas/cambios/", {
+            headers: { Authorization: `Bearer ${token}` },
+            params,
+          });
+          const { version, cambios, completo } = res.data;
+          if (completo) alertasRef.current = new Map();
+          for (const c of cambios) {
+            if (c.op === "delete") alertasRef.current.delete(c.id);
+            else alertasRef.current.set(c.alerta.id, c.alerta);
+          }
+          versionRef.current = version;
+          mas = res.data.mas;
+          if (completo || cambios.length) {
+            setAlertas(
+              [...alertasRef.current.values()].sort((a, b) =>
+                b.fecha === a.fecha ? b.id - a.id : b.fecha.localeCompare(a.fecha)
+              )
+            );
+          }
+        }
       } catch (error) {
         console.error("Error al obtener alertas:", error);
       }
@@ -3,6 +3,7 @@ import { StyleSheet, Text, View, ActivityIndicator } from "react-native";
 import MapView, { Circle } from "react-native-maps";
 import AsyncStorage from "@react-native-async-storage/async-storage";
 import axios from "axios";
+import { decodificarHeatmap, HEATMAP_BINARIO } from "../../services/heatmapBinario";
 
 const BASE_URL = "http://192.168.18.5:8000/api";
 
@@ -26,11 +27,22 @@ export default function MapadeAlertas() {
     try {
       setLoading(true);
       const token = await AsyncStorage.getItem("access");
+      // Formato binario compacto (~6 bytes por punto en lugar de ~45 en JSON)
       const res = await axios.get(`${BASE_URL}/alertas/heatmap/`, {
-        headers: token ? { Authorization: `Bearer ${token}` } : {},
+        headers: {
+          Accept: HEATMAP_BINARIO,
+          ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
+        responseType: "arraybuffer",
       });
-      setPoints(res.data.points || []);
-      setByStatus(res.data.meta?.by_status || {});
+      const incoming = decodificarHeatmap(res.data);
+      setPoints(incoming);
+      setByStatus(
+        incoming.reduce((acc, p) => {
+          acc[p[3]] = (acc[p[3]] || 0) + 1;
+          return acc;
+        }, {})
+      );
     } catch (error) {
       console.error("Error al cargar incidentes:", error);
     } finally {
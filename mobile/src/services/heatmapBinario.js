@@ -0,0 +1,39 @@
+// mobile/src/services/heatmapBinario.js
+// Decodifica la respuesta binaria de /alertas/heatmap/ (Accept: application/vnd.seguridad.heatmap).
+// Formato documentado en api/renderers.py del backend. Devuelve [[lat, lng, intensity, estado], ...]
+
+export const HEATMAP_BINARIO = "application/vnd.seguridad.heatmap";
+
+const utf8 = (bytes) =>
+    decodeURIComponent(Array.from(bytes, (b) => "%" + b.toString(16).padStart(2, "0")).join(""));
+
+export function decodificarHeatmap(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== "HMB1") throw new Error("Formato de heatmap desconocido");
+
+    const count = view.getUint32(4, true);
+    const lat0 = view.getFloat64(8, true);
+    const lng0 = view.getFloat64(16, true);
+    const paso = view.getFloat64(24, true);
+
+    let o = 32;
+    const nEstados = view.getUint8(o++);
+    const estados = [];
+    for (let i = 0; i < nEstados; i++) {
+        const largo = view.getUint8(o++);
+        estados.push(utf8(new Uint8Array(buffer, o, largo)));
+        o += largo;
+    }
+
+    const points = new Array(count);
+    for (let i = 0; i < count; i++, o += 6) {
+        points[i] = [
+            lat0 + view.getUint16(o, true) * paso,
+            lng0 + view.getUint16(o + 2, true) * paso,
+            view.getUint8(o + 4) / 255,
+            estados[view.getUint8(o + 5)],
+        ];
+    }
+    return points;
+}